@@ -0,0 +1,442 @@
+"""
+Benchmark de la carga de alarmas: insertar_alarm_evento_from_excel (export "Alarm and
+Event Log") y procesar_alarm_report (Alarm Report con columna "Event Key").
+
+Genera libros sintéticos con el formato de HikCentral (filas de preámbulo antes de la
+cabecera "Mark", las 14 columnas, un porcentaje de eventos repetidos) y mide cada carga
+por etapa (read_excel, limpieza, event_key, tuplas, insert) contra un Postgres local
+descartable. Las etapas salen de las marcas de hikcentral_memoria, sin tracemalloc salvo
+con --memoria (que infla los tiempos).
+
+La base por defecto es hik_bench en localhost: se crea si no existe, se crean las tablas
+hik_alarm_extraccion / hik_alarm_evento y se vacían antes de cada corrida. Puerto, usuario
+y password salen de DB_PORT / DB_USER / DB_PASS (o del .env).
+
+Uso:
+    python bench_carga_alarmas.py --filas 1000,10000,100000 --repeticiones 3
+    python bench_carga_alarmas.py --filas 1000000 --funciones insertar --duplicados 0.3
+    python bench_carga_alarmas.py --filas 10000 --comparar bench_carga_alarmas_20250101_120000.json
+    python bench_carga_alarmas.py --solo-generar --filas 50000 --carpeta C:\\temp\\libros
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+BASE_BENCH = "hik_bench"
+BASE_PRODUCCION = "securityworld"
+HOSTS_LOCALES = {"localhost", "127.0.0.1", "::1"}
+
+COLUMNAS_ALARM_LOG = [
+    "Mark",
+    "Name",
+    "Trigger Alarm",
+    "Priority",
+    "Triggering Time (Client)",
+    "Source",
+    "Region",
+    "Trigger Event",
+    "Description",
+    "Status",
+    "Alarm Acknowledgment Time",
+    "Alarm Category",
+    "Remarks",
+    "More",
+]
+
+EVENTOS = [
+    ("Motion Detection", "Intrusión"),
+    ("Line Crossing", "Intrusión"),
+    ("Intrusion Detection", "Intrusión"),
+    ("Region Entrance", "Intrusión"),
+    ("Video Loss", "Falla técnica"),
+    ("Device Offline", "Falla técnica"),
+    ("Video Tampering", "Falla técnica"),
+    ("HDD Error", "Falla técnica"),
+]
+PRIORIDADES = ["High", "Medium", "Low"]
+ESTADOS = ["Unacknowledged", "Acknowledged", "Acknowledging"]
+
+FUNCIONES = {
+    "insertar": ("insertar_alarm_evento_from_excel", "log"),
+    "procesar": ("procesar_alarm_report", "report"),
+}
+
+DDL_TABLAS = """
+    CREATE TABLE IF NOT EXISTS public.hik_alarm_extraccion (
+        id SERIAL PRIMARY KEY,
+        archivo_nombre TEXT,
+        fecha_inicio TIMESTAMP NOT NULL DEFAULT now(),
+        fecha_fin TIMESTAMP,
+        total_filas INTEGER,
+        total_nuevos INTEGER,
+        total_duplicados INTEGER,
+        estado VARCHAR(20) NOT NULL DEFAULT 'EN_PROCESO',
+        observacion TEXT
+    );
+    CREATE TABLE IF NOT EXISTS public.hik_alarm_evento (
+        id BIGSERIAL PRIMARY KEY,
+        id_extraccion INTEGER,
+        mark TEXT,
+        name TEXT,
+        trigger_alarm TEXT,
+        priority TEXT,
+        triggering_time_client TIMESTAMP,
+        source TEXT,
+        region TEXT,
+        trigger_event TEXT,
+        description TEXT,
+        status TEXT,
+        alarm_acknowledgment_time TIMESTAMP,
+        alarm_category TEXT,
+        remarks TEXT,
+        more TEXT,
+        event_key VARCHAR(64) NOT NULL UNIQUE,
+        periodo INTEGER,
+        fecha_creacion TIMESTAMP DEFAULT now()
+    );
+"""
+
+
+# ========================
+# GENERADOR DE LIBROS
+# ========================
+def _evento_aleatorio(rnd: random.Random, inicio: datetime, segundos: int) -> list:
+    sitio = rnd.randint(1, 60)
+    camara = rnd.randint(1, 48)
+    evento, categoria = rnd.choice(EVENTOS)
+    disparo = inicio + timedelta(seconds=rnd.randrange(segundos))
+    estado = rnd.choice(ESTADOS)
+    reconocida = (
+        (disparo + timedelta(seconds=rnd.randint(30, 7200))).strftime("%Y-%m-%d %H:%M:%S")
+        if estado == "Acknowledged"
+        else "--"
+    )
+    return [
+        "",
+        f"{evento} - Sitio {sitio:02d} Cam {camara:02d}",
+        "Yes",
+        rnd.choice(PRIORIDADES),
+        disparo.strftime("%Y-%m-%d %H:%M:%S"),
+        f"Sitio {sitio:02d}_Cam{camara:02d}",
+        f"Lima/Sitio {sitio:02d}",
+        evento,
+        rnd.choice(["", "", f"Alarma generada por {evento.lower()}"]),
+        estado,
+        reconocida,
+        categoria,
+        rnd.choice(["", "", "", "Revisado por monitoreo"]),
+        "View",
+    ]
+
+
+def _event_key(fila: list) -> str:
+    """Misma receta que construir_event_key (name, fecha ISO, source, region, evento, prioridad, estado)."""
+    fecha = datetime.strptime(fila[4], "%Y-%m-%d %H:%M:%S").isoformat()
+    partes = [fila[1], fecha, fila[5], fila[6], fila[7], fila[3], fila[9]]
+    return hashlib.md5("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def generar_alarm_report(
+    destino: Path,
+    filas: int,
+    duplicados: float = 0.1,
+    formato: str = "log",
+    semilla: int = 42,
+) -> Path:
+    """
+    Escribe un libro sintético de `filas` eventos; `duplicados` es la fracción de filas que
+    repiten un evento anterior (mismo event_key).
+    formato "log": hoja "Alarm and Event Log" con preámbulo y cabecera "Mark" (export de la UI).
+    formato "report": cabecera en la primera fila y columna "Event Key" (procesar_alarm_report).
+    """
+    from openpyxl import Workbook
+
+    rnd = random.Random(semilla)
+    fin = datetime.now().replace(microsecond=0)
+    inicio = fin - timedelta(days=30)
+    segundos = int((fin - inicio).total_seconds())
+
+    wb = Workbook(write_only=True)
+    if formato == "log":
+        ws = wb.create_sheet("Alarm and Event Log")
+        ws.append(["Alarm and Event Log"])
+        ws.append(["Export Time", fin.strftime("%Y-%m-%d %H:%M:%S")])
+        ws.append(["Time", f"{inicio:%Y/%m/%d %H:%M:%S} - {fin:%Y/%m/%d %H:%M:%S}"])
+        ws.append(["Total", str(filas)])
+        ws.append([])
+        ws.append(COLUMNAS_ALARM_LOG)
+    else:
+        ws = wb.create_sheet("Alarm Report")
+        ws.append(COLUMNAS_ALARM_LOG + ["Event Key"])
+
+    previas: list[list] = []
+    for _ in range(filas):
+        if previas and rnd.random() < duplicados:
+            fila = rnd.choice(previas)
+        else:
+            fila = _evento_aleatorio(rnd, inicio, segundos)
+            # Basta una muestra acotada para elegir de dónde salen los repetidos
+            if len(previas) < 50_000:
+                previas.append(fila)
+        ws.append(fila if formato == "log" else fila + [_event_key(fila)])
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(destino)
+    return destino
+
+
+def libro_bench(carpeta: Path, filas: int, duplicados: float, formato: str, semilla: int) -> Path:
+    """Reusa el libro si ya se generó con los mismos parámetros (1M filas tarda minutos)."""
+    destino = carpeta / f"alarm_{formato}_{filas}_dup{int(duplicados * 100)}_s{semilla}.xlsx"
+    if destino.exists():
+        return destino
+    inicio = time.perf_counter()
+    generar_alarm_report(destino, filas, duplicados, formato, semilla)
+    print(f"[BENCH] Generado {destino.name} en {time.perf_counter() - inicio:.1f}s")
+    return destino
+
+
+# ========================
+# BASE DESCARTABLE
+# ========================
+def preparar_base(db_host: str, db_name: str, permitir_remoto: bool):
+    """Apunta get_pg_connection a la base del benchmark (la crea con sus tablas si no existe)."""
+    if db_name.lower() == BASE_PRODUCCION:
+        raise SystemExit(f"[BENCH] {db_name} es la base de producción; usar una base descartable.")
+    if db_host not in HOSTS_LOCALES and not permitir_remoto:
+        raise SystemExit(f"[BENCH] {db_host} no es local; agregar --permitir-remoto si es descartable.")
+    os.environ["DB_HOST"] = db_host
+    os.environ["DB_NAME"] = db_name
+
+    import psycopg2
+
+    admin = psycopg2.connect(
+        host=db_host,
+        port=os.getenv("DB_PORT", "5432"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASS", "123456"),
+        dbname="postgres",
+    )
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cur:
+            cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (db_name,))
+            if cur.fetchone() is None:
+                cur.execute(f'CREATE DATABASE "{db_name}"')
+                print(f"[BENCH] Base {db_name} creada en {db_host}")
+    finally:
+        admin.close()
+
+
+def vaciar_tablas(conn):
+    with conn.cursor() as cur:
+        cur.execute(DDL_TABLAS)
+        cur.execute(
+            "TRUNCATE public.hik_alarm_evento, public.hik_alarm_extraccion RESTART IDENTITY;"
+        )
+    conn.commit()
+
+
+# ========================
+# MEDICIÓN
+# ========================
+def medir_carga(eventalarms, funcion: str, archivo: Path, medir_memoria: bool) -> dict:
+    from hikcentral_memoria import activar_memoria, desactivar_memoria
+
+    conn = eventalarms.get_pg_connection()
+    try:
+        vaciar_tablas(conn)
+    finally:
+        conn.close()
+
+    registro = SimpleNamespace(detalle={})
+    token = activar_memoria(registro, medir_memoria)
+    inicio = time.perf_counter()
+    try:
+        if funcion == "insertar":
+            resultado = eventalarms.insertar_alarm_evento_from_excel(archivo)
+        else:
+            resultado = eventalarms.procesar_alarm_report(str(archivo), None)
+    finally:
+        desactivar_memoria(token)
+    total = time.perf_counter() - inicio
+
+    medicion = registro.detalle["memoria" if medir_memoria else "etapas"][-1]
+    return {
+        "total_seg": round(total, 3),
+        "etapas": {
+            e["etapa"]: {k: v for k, v in e.items() if k not in ("etapa", "top")}
+            for e in medicion["etapas"]
+        },
+        "filas_extraidas": (resultado or {}).get("filas_extraidas"),
+        "insertados": (resultado or {}).get("insertados"),
+    }
+
+
+def resumir(corridas: list[dict], filas: int) -> dict:
+    totales = [c["total_seg"] for c in corridas]
+    mediana = statistics.median(totales)
+    etapas: dict[str, dict] = {}
+    for corrida in corridas:
+        for etapa, datos in corrida["etapas"].items():
+            item = etapas.setdefault(etapa, {"seg": [], "pico_mb": []})
+            item["seg"].append(datos["seg"])
+            if "pico_mb" in datos:
+                item["pico_mb"].append(datos["pico_mb"])
+
+    resumen_etapas = {}
+    for etapa, valores in etapas.items():
+        resumen_etapas[etapa] = {
+            "seg_mediana": round(statistics.median(valores["seg"]), 4),
+            "seg_min": round(min(valores["seg"]), 4),
+        }
+        if valores["pico_mb"]:
+            resumen_etapas[etapa]["pico_mb_max"] = max(valores["pico_mb"])
+
+    return {
+        "total_seg_mediana": round(mediana, 3),
+        "total_seg_min": round(min(totales), 3),
+        "filas_por_seg": round(filas / mediana, 1) if mediana else None,
+        "insertados": corridas[-1]["insertados"],
+        "etapas": resumen_etapas,
+    }
+
+
+def clave_resultado(resultado: dict) -> tuple:
+    return resultado["funcion"], resultado["filas"], resultado["duplicados"]
+
+
+def comparar(resultados: list[dict], previo_path: Path):
+    """Imprime la diferencia de medianas contra un JSON anterior de este benchmark."""
+    with open(previo_path, encoding="utf-8") as f:
+        previo = {clave_resultado(r): r for r in json.load(f)["resultados"]}
+
+    print(f"[BENCH] === Comparación contra {previo_path.name} (medianas) ===")
+    for resultado in resultados:
+        anterior = previo.get(clave_resultado(resultado))
+        if anterior is None:
+            continue
+        funcion, filas, _ = clave_resultado(resultado)
+        filas_cmp = [("TOTAL", anterior["resumen"]["total_seg_mediana"], resultado["resumen"]["total_seg_mediana"])]
+        for etapa, datos in resultado["resumen"]["etapas"].items():
+            antes = anterior["resumen"]["etapas"].get(etapa)
+            if antes:
+                filas_cmp.append((etapa, antes["seg_mediana"], datos["seg_mediana"]))
+        for etapa, antes, ahora in filas_cmp:
+            cambio = f"{(ahora - antes) / antes * 100:+6.1f}%" if antes else "   n/a"
+            print(
+                f"[BENCH] {funcion:<9} {filas:>8} | {etapa:<20} {antes:9.3f}s -> {ahora:9.3f}s ({cambio})"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark por etapa de la carga de alarmas a Postgres.")
+    parser.add_argument("--filas", default="1000,10000,100000", help="Tamaños separados por coma (1k a 1M)")
+    parser.add_argument("--duplicados", type=float, default=0.1, help="Fracción de eventos repetidos (0 a 1)")
+    parser.add_argument("--funciones", default="insertar,procesar", help="insertar, procesar")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument(
+        "--carpeta",
+        type=str,
+        default=None,
+        help="Carpeta de los libros generados (se reusan entre corridas)",
+    )
+    parser.add_argument("--solo-generar", action="store_true", help="Genera los libros y termina")
+    parser.add_argument("--memoria", action="store_true", help="Mide también pico/retenido por etapa (tracemalloc)")
+    parser.add_argument("--db-host", default="localhost")
+    parser.add_argument("--db-name", default=BASE_BENCH)
+    parser.add_argument("--permitir-remoto", action="store_true", help="Permite un DB_HOST que no es local")
+    parser.add_argument("--salida", type=str, default=None, help="Archivo JSON de resultados")
+    parser.add_argument("--comparar", type=str, default=None, help="JSON anterior para comparar medianas")
+    args = parser.parse_args()
+
+    tamanos = [int(t) for t in args.filas.split(",") if t.strip()]
+    funciones = [f.strip().lower() for f in args.funciones.split(",") if f.strip()]
+    desconocidas = [f for f in funciones if f not in FUNCIONES]
+    if desconocidas:
+        parser.error(f"funciones desconocidas: {desconocidas}")
+    carpeta = Path(args.carpeta) if args.carpeta else Path(__file__).resolve().parent / "bench_libros"
+
+    if args.solo_generar:
+        for filas in tamanos:
+            for funcion in funciones:
+                print(f"[BENCH] {libro_bench(carpeta, filas, args.duplicados, FUNCIONES[funcion][1], args.semilla)}")
+        return
+
+    # Antes de importar el script: load_dotenv no pisa DB_HOST / DB_NAME ya definidos
+    preparar_base(args.db_host, args.db_name, args.permitir_remoto)
+    import hikcentral_open_eventalarms as eventalarms
+
+    resultados: list[dict] = []
+    for filas in tamanos:
+        for funcion in funciones:
+            nombre_funcion, formato = FUNCIONES[funcion]
+            archivo = libro_bench(carpeta, filas, args.duplicados, formato, args.semilla)
+            corridas = []
+            for i in range(args.repeticiones):
+                print(f"[BENCH] {nombre_funcion} | {filas} filas | corrida {i + 1}/{args.repeticiones}")
+                corrida = medir_carga(eventalarms, funcion, archivo, args.memoria)
+                for etapa, datos in corrida["etapas"].items():
+                    print(f"[BENCH]   {etapa:<20} {datos['seg']:9.3f}s")
+                print(f"[BENCH]   {'total':<20} {corrida['total_seg']:9.3f}s | insertados: {corrida['insertados']}")
+                corridas.append(corrida)
+            resultados.append(
+                {
+                    "funcion": funcion,
+                    "filas": filas,
+                    "duplicados": args.duplicados,
+                    "archivo": archivo.name,
+                    "corridas": corridas,
+                    "resumen": resumir(corridas, filas),
+                }
+            )
+
+    print("[BENCH] === Resumen (medianas) ===")
+    for resultado in resultados:
+        resumen = resultado["resumen"]
+        etapas = " | ".join(f"{e} {d['seg_mediana']:.2f}s" for e, d in resumen["etapas"].items())
+        print(
+            f"[BENCH] {resultado['funcion']:<9} {resultado['filas']:>8} filas: "
+            f"{resumen['total_seg_mediana']:8.2f}s ({resumen['filas_por_seg']} filas/s) | {etapas}"
+        )
+
+    if args.comparar:
+        comparar(resultados, Path(args.comparar))
+
+    import pandas as pd
+
+    salida = Path(args.salida) if args.salida else (
+        Path(__file__).resolve().parent
+        / f"bench_carga_alarmas_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "pandas": pd.__version__,
+                    "maquina": platform.node(),
+                    "repeticiones": args.repeticiones,
+                    "semilla": args.semilla,
+                    "memoria": args.memoria,
+                },
+                "resultados": resultados,
+            },
+            f,
+            indent=2,
+        )
+    print(f"[BENCH] Resultados guardados en: {salida}")
+
+
+if __name__ == "__main__":
+    main()
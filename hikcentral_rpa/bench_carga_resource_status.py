@@ -0,0 +1,480 @@
+"""
+Benchmark de las cargas de Resource Status: process_camera_resource_status,
+process_encoding_device_status, process_ip_speaker_status y process_alarm_input_status.
+
+Genera para cada hoja un libro sintético con su nombre de hoja y su fila de cabecera
+(Camera 7, Encoding Device 6, IP Speaker 6, Alarm Input 7) y mide, para la carga inicial
+(tabla vacía) y para la recarga del mismo libro (todo ON CONFLICT DO UPDATE, el caso de
+todos los días):
+    parse_seg   read_excel hasta armar los registros (marcas de hikcentral_memoria)
+    upsert_seg  el guardar_* de la hoja
+    wal_bytes   bytes de WAL escritos durante la carga (pg_current_wal_lsn)
+    tabla_bytes tamaño de la tabla con índices al terminar
+
+Usa la misma base descartable que bench_carga_alarmas (hik_bench en localhost) y crea ahí
+las cuatro tablas. El WAL es de todo el cluster: medir en un Postgres sin otra actividad.
+
+Uso:
+    python bench_carga_resource_status.py --dispositivos 1000,10000,50000 --repeticiones 3
+    python bench_carga_resource_status.py --hojas camera --dispositivos 200000 --repeticiones 1
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+from bench_carga_alarmas import BASE_BENCH, preparar_base
+from hikcentral_memoria import activar_memoria, desactivar_memoria
+
+# hoja -> (opción en PROCESADORES_RESOURCE_STATUS, fila de cabecera, tabla, columnas)
+HOJAS = {
+    "Camera": (
+        "camera",
+        7,
+        "hik_camera_resource_status",
+        [
+            "Name",
+            "Channel Address",
+            "Device Address",
+            "Area",
+            "Device Model",
+            "Network Status",
+            "Video Signal",
+            "Recording Status",
+            "Auto-Check Time",
+        ],
+    ),
+    "Encoding Device": (
+        "encoding device",
+        6,
+        "hik_encoding_device_status",
+        [
+            "Name",
+            "Address",
+            "Serial No.",
+            "Version",
+            "Network Status",
+            "Time Sync Status",
+            "HDD Status",
+            "HDD Usage",
+            "RAID",
+            "Recording Status",
+            "Hot Spare Status",
+            "Arming Status",
+            "Manufacturer",
+            "First Added Time",
+            "Auto-Check Time",
+        ],
+    ),
+    "IP Speaker": (
+        "ip speaker",
+        6,
+        "hik_ip_speaker_status",
+        [
+            "Name",
+            "Address",
+            "Serial No.",
+            "Version",
+            "Network Status",
+            "Time Sync Status",
+            "First Added Time",
+            "Auto-Check Time",
+        ],
+    ),
+    "Alarm Input": (
+        "alarm input",
+        7,
+        "hik_alarm_input_status",
+        [
+            "Name",
+            "Device",
+            "Area",
+            "Partition (Area)",
+            "Network Status",
+            "Arming Status",
+            "Bypass Status",
+            "Fault Status",
+            "Alarm Status",
+            "Detector Connection Status",
+            "Battery Status",
+            "Device Battery Capacity",
+            "Zone Tampering Status",
+            "Auto-Check Time",
+        ],
+    ),
+}
+
+# Mismas columnas y claves de conflicto que los guardar_* del script
+DDL_TABLAS = {
+    "hik_camera_resource_status": """
+        CREATE TABLE IF NOT EXISTS public.hik_camera_resource_status (
+            id BIGSERIAL PRIMARY KEY,
+            camera_name TEXT,
+            device_code TEXT NOT NULL UNIQUE,
+            site_name TEXT,
+            device_type TEXT,
+            online_status TEXT,
+            record_status TEXT,
+            signal_status TEXT,
+            last_online_time TIMESTAMP,
+            ip_address TEXT,
+            created_at TIMESTAMP,
+            updated_at TIMESTAMP
+        );
+    """,
+    "hik_encoding_device_status": """
+        CREATE TABLE IF NOT EXISTS public.hik_encoding_device_status (
+            id BIGSERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            address TEXT NOT NULL,
+            serial_no TEXT,
+            version TEXT,
+            network_status TEXT,
+            time_sync_status TEXT,
+            hdd_status TEXT,
+            hdd_usage TEXT,
+            raid TEXT,
+            recording_status TEXT,
+            hot_spare_status TEXT,
+            arming_status TEXT,
+            manufacturer TEXT,
+            first_added_time TIMESTAMP,
+            auto_check_time TIMESTAMP,
+            updated_at TIMESTAMP,
+            UNIQUE (name, address)
+        );
+    """,
+    "hik_ip_speaker_status": """
+        CREATE TABLE IF NOT EXISTS public.hik_ip_speaker_status (
+            id BIGSERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            address TEXT NOT NULL,
+            serial_no TEXT,
+            version TEXT,
+            network_status TEXT,
+            time_sync_status TEXT,
+            first_added_time TIMESTAMP,
+            auto_check_time TIMESTAMP,
+            updated_at TIMESTAMP,
+            UNIQUE (name, address)
+        );
+    """,
+    "hik_alarm_input_status": """
+        CREATE TABLE IF NOT EXISTS public.hik_alarm_input_status (
+            id BIGSERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            device TEXT NOT NULL,
+            area TEXT,
+            partition_area TEXT,
+            network_status TEXT,
+            arming_status TEXT,
+            bypass_status TEXT,
+            fault_status TEXT,
+            alarm_status TEXT,
+            detector_connection_status TEXT,
+            battery_status TEXT,
+            device_battery_capacity TEXT,
+            zone_tampering_status TEXT,
+            auto_check_time TIMESTAMP,
+            updated_at TIMESTAMP,
+            UNIQUE (name, device)
+        );
+    """,
+}
+
+FASES = ("inicial", "recarga")
+
+
+# ========================
+# GENERADOR DE LIBROS
+# ========================
+def _fecha(rnd: random.Random, base: datetime, dias: int) -> str:
+    return (base - timedelta(seconds=rnd.randrange(dias * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _ip(i: int) -> str:
+    return f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+
+
+def _fila(hoja: str, i: int, rnd: random.Random, ahora: datetime) -> list:
+    sitio = i // 64 + 1
+    en_linea = "Online" if rnd.random() < 0.93 else "Offline"
+    if hoja == "Camera":
+        return [
+            f"Sitio {sitio:04d}_Cam{i % 64 + 1:02d}",
+            f"{_ip(sitio)}_{i % 64 + 1}",
+            _ip(sitio),
+            f"Lima/Sitio {sitio:04d}",
+            rnd.choice(["DS-2CD2143G2-I", "DS-2CD2T47G2-L", "DS-2DE4425IW-DE"]),
+            en_linea,
+            "Normal" if en_linea == "Online" else "Exception",
+            rnd.choice(["Recording", "Recording", "Not Recording"]),
+            _fecha(rnd, ahora, 1),
+        ]
+    if hoja == "Encoding Device":
+        return [
+            f"NVR Sitio {sitio:04d}-{i % 64 + 1:02d}",
+            _ip(i),
+            f"DS-7732NI-K4{i:016d}",
+            "V4.30.085 build 210607",
+            en_linea,
+            rnd.choice(["Synchronized", "Synchronized", "Not Synchronized"]),
+            rnd.choice(["Normal", "Normal", "Exception"]),
+            f"{rnd.randint(5, 99)}%",
+            "--",
+            rnd.choice(["Recording", "Not Recording"]),
+            "--",
+            rnd.choice(["Armed", "Disarmed"]),
+            "Hikvision",
+            _fecha(rnd, ahora, 900),
+            _fecha(rnd, ahora, 1),
+        ]
+    if hoja == "IP Speaker":
+        return [
+            f"Parlante Sitio {sitio:04d}-{i % 64 + 1:02d}",
+            _ip(i),
+            f"DS-QAZ1325G1{i:016d}",
+            "V1.1.3 build 230410",
+            en_linea,
+            rnd.choice(["Synchronized", "Not Synchronized"]),
+            _fecha(rnd, ahora, 900),
+            _fecha(rnd, ahora, 1),
+        ]
+    return [
+        f"Zona {i % 64 + 1:02d}",
+        f"Panel Sitio {sitio:04d}",
+        f"Lima/Sitio {sitio:04d}",
+        f"Partición {i % 4 + 1}",
+        en_linea,
+        rnd.choice(["Armed", "Disarmed"]),
+        rnd.choice(["Not Bypassed", "Not Bypassed", "Bypassed"]),
+        rnd.choice(["Normal", "Normal", "Fault"]),
+        rnd.choice(["Normal", "Normal", "Alarm"]),
+        rnd.choice(["Connected", "Disconnected"]),
+        rnd.choice(["Normal", "Low Battery"]),
+        f"{rnd.randint(10, 100)}%",
+        rnd.choice(["Normal", "Tampered"]),
+        _fecha(rnd, ahora, 1),
+    ]
+
+
+def generar_resource_status(destino: Path, hoja: str, dispositivos: int, semilla: int = 42) -> Path:
+    """Libro con la hoja `hoja`: preámbulo hasta su fila de cabecera y `dispositivos` filas únicas."""
+    from openpyxl import Workbook
+
+    _, fila_cabecera, _, columnas = HOJAS[hoja]
+    rnd = random.Random(semilla)
+    ahora = datetime.now().replace(microsecond=0)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(hoja)
+    # Filas de preámbulo sin celdas vacías, para que la cabecera caiga en header=fila_cabecera
+    preambulo = [
+        ["Resource Status"],
+        ["Resource Type", hoja],
+        ["Export Time", ahora.strftime("%Y-%m-%d %H:%M:%S")],
+        ["Total", str(dispositivos)],
+    ]
+    preambulo += [["-"] for _ in range(fila_cabecera - len(preambulo))]
+    for fila in preambulo:
+        ws.append(fila)
+    ws.append(columnas)
+    for i in range(dispositivos):
+        ws.append(_fila(hoja, i, rnd, ahora))
+
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    wb.save(destino)
+    return destino
+
+
+def libro_bench(carpeta: Path, hoja: str, dispositivos: int, semilla: int) -> Path:
+    nombre = hoja.replace(" ", "_")
+    destino = carpeta / f"resource_{nombre}_{dispositivos}_s{semilla}.xlsx"
+    if destino.exists():
+        return destino
+    inicio = time.perf_counter()
+    generar_resource_status(destino, hoja, dispositivos, semilla)
+    print(f"[BENCH] Generado {destino.name} en {time.perf_counter() - inicio:.1f}s")
+    return destino
+
+
+# ========================
+# MEDICIÓN
+# ========================
+def vaciar_tabla(conn, tabla: str):
+    with conn.cursor() as cur:
+        cur.execute(DDL_TABLAS[tabla])
+        cur.execute(f"TRUNCATE public.{tabla} RESTART IDENTITY;")
+    conn.commit()
+
+
+def estado_base(conn, tabla: str) -> tuple[str, int, int]:
+    """(LSN del WAL, bytes de la tabla con índices, filas)."""
+    with conn.cursor() as cur:
+        cur.execute(
+            f"SELECT pg_current_wal_lsn(), pg_total_relation_size('public.{tabla}'), count(*) FROM public.{tabla};"
+        )
+        lsn, tamano, filas = cur.fetchone()
+    conn.commit()
+    return str(lsn), int(tamano), int(filas)
+
+
+def wal_entre(conn, lsn_antes: str, lsn_despues: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_wal_lsn_diff(%s, %s);", (lsn_despues, lsn_antes))
+        diferencia = cur.fetchone()[0]
+    conn.commit()
+    return int(diferencia)
+
+
+def medir_carga(resourcestatus, conn, hoja: str, archivo: Path) -> dict:
+    opcion, _, tabla, _ = HOJAS[hoja]
+    _, procesar = resourcestatus.PROCESADORES_RESOURCE_STATUS[opcion]
+
+    lsn_antes, _, _ = estado_base(conn, tabla)
+    registro = SimpleNamespace(detalle={})
+    token = activar_memoria(registro, medir_memoria=False)
+    inicio = time.perf_counter()
+    try:
+        procesar(str(archivo))
+    finally:
+        desactivar_memoria(token)
+    total = time.perf_counter() - inicio
+    lsn_despues, tamano, filas = estado_base(conn, tabla)
+
+    etapas = {e["etapa"]: e["seg"] for e in registro.detalle["etapas"][-1]["etapas"]}
+    return {
+        "total_seg": round(total, 3),
+        "parse_seg": round(sum(seg for etapa, seg in etapas.items() if etapa != "guardar"), 4),
+        "upsert_seg": round(etapas.get("guardar", 0.0), 4),
+        "wal_bytes": wal_entre(conn, lsn_antes, lsn_despues),
+        "tabla_bytes": tamano,
+        "filas_tabla": filas,
+        "etapas": etapas,
+    }
+
+
+def resumir(corridas: list[dict], dispositivos: int) -> dict:
+    def mediana(campo: str):
+        return statistics.median(c[campo] for c in corridas)
+
+    total = mediana("total_seg")
+    return {
+        "total_seg_mediana": round(total, 3),
+        "parse_seg_mediana": round(mediana("parse_seg"), 4),
+        "upsert_seg_mediana": round(mediana("upsert_seg"), 4),
+        "wal_bytes_mediana": int(mediana("wal_bytes")),
+        "tabla_bytes": corridas[-1]["tabla_bytes"],
+        "filas_tabla": corridas[-1]["filas_tabla"],
+        "dispositivos_por_seg": round(dispositivos / total, 1) if total else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de parseo y upsert de las hojas de Resource Status.")
+    parser.add_argument("--dispositivos", default="1000,10000,50000", help="Tamaños separados por coma (1k a 200k)")
+    parser.add_argument(
+        "--hojas",
+        default="camera,encoding device,ip speaker,alarm input",
+        help="Hojas separadas por coma",
+    )
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--carpeta", type=str, default=None, help="Carpeta de los libros generados")
+    parser.add_argument("--solo-generar", action="store_true", help="Genera los libros y termina")
+    parser.add_argument("--db-host", default="localhost")
+    parser.add_argument("--db-name", default=BASE_BENCH)
+    parser.add_argument("--permitir-remoto", action="store_true", help="Permite un DB_HOST que no es local")
+    parser.add_argument("--salida", type=str, default=None, help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    por_opcion = {opcion: hoja for hoja, (opcion, _, _, _) in HOJAS.items()}
+    pedidas = [h.strip().lower() for h in args.hojas.split(",") if h.strip()]
+    desconocidas = [h for h in pedidas if h not in por_opcion]
+    if desconocidas:
+        parser.error(f"hojas desconocidas: {desconocidas}")
+    hojas = [por_opcion[h] for h in pedidas]
+    tamanos = [int(t) for t in args.dispositivos.split(",") if t.strip()]
+    carpeta = Path(args.carpeta) if args.carpeta else Path(__file__).resolve().parent / "bench_libros"
+
+    if args.solo_generar:
+        for dispositivos in tamanos:
+            for hoja in hojas:
+                print(f"[BENCH] {libro_bench(carpeta, hoja, dispositivos, args.semilla)}")
+        return
+
+    # Antes de importar el script: load_dotenv no pisa DB_HOST / DB_NAME ya definidos
+    preparar_base(args.db_host, args.db_name, args.permitir_remoto)
+    import hikcentral_export_resourcestatus as resourcestatus
+
+    resultados: list[dict] = []
+    conn = resourcestatus.get_pg_connection()
+    try:
+        for dispositivos in tamanos:
+            for hoja in hojas:
+                tabla = HOJAS[hoja][2]
+                archivo = libro_bench(carpeta, hoja, dispositivos, args.semilla)
+                corridas: dict[str, list[dict]] = {fase: [] for fase in FASES}
+                for i in range(args.repeticiones):
+                    vaciar_tabla(conn, tabla)
+                    for fase in FASES:
+                        print(f"[BENCH] {hoja} | {dispositivos} | {fase} | corrida {i + 1}/{args.repeticiones}")
+                        corrida = medir_carga(resourcestatus, conn, hoja, archivo)
+                        print(
+                            f"[BENCH]   parse: {corrida['parse_seg']:8.3f}s | upsert: {corrida['upsert_seg']:8.3f}s | "
+                            f"WAL: {corrida['wal_bytes'] / 1024**2:8.1f} MB | tabla: {corrida['tabla_bytes'] / 1024**2:7.1f} MB"
+                        )
+                        corridas[fase].append(corrida)
+                resultados.append(
+                    {
+                        "hoja": hoja,
+                        "dispositivos": dispositivos,
+                        "archivo": archivo.name,
+                        "corridas": corridas,
+                        "resumen": {fase: resumir(corridas[fase], dispositivos) for fase in FASES},
+                    }
+                )
+    finally:
+        conn.close()
+
+    print("[BENCH] === Resumen (medianas) ===")
+    for resultado in resultados:
+        for fase, resumen in resultado["resumen"].items():
+            print(
+                f"[BENCH] {resultado['hoja']:<16} {resultado['dispositivos']:>7} {fase:<8} "
+                f"parse: {resumen['parse_seg_mediana']:8.3f}s | upsert: {resumen['upsert_seg_mediana']:8.3f}s | "
+                f"WAL: {resumen['wal_bytes_mediana'] / 1024**2:8.1f} MB | {resumen['dispositivos_por_seg']} disp/s"
+            )
+
+    import pandas as pd
+
+    salida = Path(args.salida) if args.salida else (
+        Path(__file__).resolve().parent
+        / f"bench_carga_resource_status_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "pandas": pd.__version__,
+                    "maquina": platform.node(),
+                    "repeticiones": args.repeticiones,
+                    "semilla": args.semilla,
+                },
+                "resultados": resultados,
+            },
+            f,
+            indent=2,
+        )
+    print(f"[BENCH] Resultados guardados en: {salida}")
+
+
+if __name__ == "__main__":
+    main()
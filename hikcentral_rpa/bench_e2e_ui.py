@@ -0,0 +1,257 @@
+"""
+Benchmark end to end de los flujos Selenium contra la UI local de hikcentral_ui_stub.
+
+Levanta el stub (latencia configurable), apunta descargas, Downloadcenter y logs a una
+carpeta de trabajo y corre los flujos reales:
+    resource  run_resource_status (lo que ejecuta run()) por cada opción pedida
+    alarmas   run_for_host de hikcentral_open_eventalarms (Event and Alarm Search + Export)
+Reporta por paso el tiempo de los StepTimer del script (las mismas marcas [n] que van a
+LOG_RPA_PASOS), la mediana entre repeticiones y las peticiones que recibió el stub.
+
+Las cargas van a la base descartable de bench_carga_alarmas (hik_bench en localhost); las
+tablas se crean y vacían antes de cada corrida. LOG_RPA_EJECUCION no existe ahí: el aviso
+"No se pudo registrar el rendimiento" es esperado.
+
+Uso:
+    python bench_e2e_ui.py --repeticiones 3 --latencia 0.3 --latencia-export 2
+    python bench_e2e_ui.py --flujos resource --opciones Camera --lean --headless --contar-comandos
+    python bench_e2e_ui.py --flujos alarmas --eventos 100000 --sin-go-maintenance
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from bench_carga_alarmas import BASE_BENCH, preparar_base, vaciar_tablas
+from bench_carga_resource_status import HOJAS, estado_base, vaciar_tabla
+from hikcentral_ui_stub import iniciar_stub_ui
+
+FLUJOS = ("resource", "alarmas")
+# Opciones que maneja seleccionar_opcion_resource_status (Alarm Input no tiene pestaña en el script)
+OPCIONES_RESOURCE = ("Camera", "Encoding Device", "IP Speaker")
+
+
+def pasos_de(ctx) -> list[dict]:
+    pasos = []
+    for paso in ctx.recorder.steps:
+        if paso["num_paso"] == 0:
+            continue
+        item = {"paso": paso["descripcion"], "tiempo_paso": paso["tiempo_paso"], "tiempo_total": paso["tiempo_total"]}
+        comandos = (paso.get("detalle") or {}).get("comandos")
+        if comandos:
+            item["comandos"] = comandos
+        pasos.append(item)
+    return pasos
+
+
+def medir_resource(resourcestatus, url: str, opcion: str, args) -> dict:
+    tabla = next(t for _, (o, _, t, _) in HOJAS.items() if o == opcion.lower())
+    conn = resourcestatus.get_pg_connection()
+    try:
+        vaciar_tabla(conn, tabla)
+    finally:
+        conn.close()
+
+    ctx = resourcestatus.crear_contexto(
+        opcion,
+        url=url,
+        download_dir=resourcestatus.DOWNLOAD_DIR,
+        contar_comandos=args.contar_comandos,
+    )
+    inicio = time.perf_counter()
+    # run_resource_status atrapa sus errores y las marcas [FIN]/[ERROR] no tienen número de
+    # paso (no quedan en el recorder): terminó bien si la tabla vaciada recibió el libro
+    resourcestatus.run_resource_status(opcion, lean=args.lean, headless=args.headless, ctx=ctx)
+    total_seg = round(time.perf_counter() - inicio, 3)
+    conn = resourcestatus.get_pg_connection()
+    try:
+        _, _, filas = estado_base(conn, tabla)
+    finally:
+        conn.close()
+    return {
+        "ok": filas > 0,
+        "total_seg": total_seg,
+        "insertados": filas,
+        "pasos": pasos_de(ctx),
+    }
+
+
+def medir_alarmas(eventalarms, host: str, args) -> dict:
+    conn = eventalarms.get_pg_connection()
+    try:
+        vaciar_tablas(conn)
+    finally:
+        conn.close()
+
+    ctx = eventalarms.crear_contexto(host, "Event and Alarm", contar_comandos=args.contar_comandos)
+    # crear_contexto arma la carpeta con el host y "127.0.0.1:puerto" no es un nombre válido en Windows
+    ctx.download_dir = eventalarms.DOWNLOAD_DIR / "ui_stub"
+    inicio = time.perf_counter()
+    resultado: dict = {}
+    error = None
+    try:
+        resultado = eventalarms.run_for_host(host, lean=args.lean, headless=args.headless, ctx=ctx)
+    except Exception as e:
+        error = f"{e.__class__.__name__}: {e}"
+    return {
+        "ok": error is None and bool(resultado.get("ok")),
+        "total_seg": round(time.perf_counter() - inicio, 3),
+        "insertados": resultado.get("insertados", 0),
+        "error": error,
+        "pasos": pasos_de(ctx),
+    }
+
+
+def resumir(corridas: list[dict]) -> dict:
+    por_paso: dict[str, list[float]] = {}
+    for corrida in corridas:
+        for paso in corrida["pasos"]:
+            por_paso.setdefault(paso["paso"], []).append(paso["tiempo_paso"])
+    return {
+        "ok": sum(1 for c in corridas if c["ok"]),
+        "total_seg_mediana": round(statistics.median(c["total_seg"] for c in corridas), 3),
+        "pasos": {paso: round(statistics.median(valores), 3) for paso, valores in por_paso.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flujos Selenium end to end contra la UI local de HikCentral.")
+    parser.add_argument("--flujos", default="resource,alarmas", help="resource, alarmas")
+    parser.add_argument("--opciones", default=",".join(OPCIONES_RESOURCE), help="Opciones de Resource Status")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--latencia", type=float, default=0.2, help="Segundos por llamada de la página al stub")
+    parser.add_argument("--latencia-export", type=float, default=1.0, help="Segundos extra de cada export")
+    parser.add_argument("--dispositivos", type=int, default=1000, help="Filas de los libros de Resource Status")
+    parser.add_argument("--eventos", type=int, default=5000, help="Filas del Alarm Report")
+    parser.add_argument(
+        "--sin-go-maintenance",
+        action="store_true",
+        help="Portal sin 'Go to Maintenance': mide el camino por navigation_menuPop",
+    )
+    parser.add_argument("--lean", action="store_true", help="Perfil de navegador lean")
+    parser.add_argument("--headless", action="store_true", help="Chrome sin ventana (con --lean)")
+    parser.add_argument("--contar-comandos", action="store_true", help="Comandos WebDriver por paso")
+    parser.add_argument("--carpeta", type=str, default=None, help="Carpeta de los libros generados")
+    parser.add_argument(
+        "--trabajo",
+        type=str,
+        default=None,
+        help="Carpeta para descargas, Downloadcenter y logs (default: temporal)",
+    )
+    parser.add_argument("--db-host", default="localhost")
+    parser.add_argument("--db-name", default=BASE_BENCH)
+    parser.add_argument("--permitir-remoto", action="store_true", help="Permite un DB_HOST que no es local")
+    parser.add_argument("--salida", type=str, default=None, help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    flujos = [f.strip().lower() for f in args.flujos.split(",") if f.strip()]
+    desconocidos = [f for f in flujos if f not in FLUJOS]
+    if desconocidos:
+        parser.error(f"flujos desconocidos: {desconocidos}")
+    opciones = [o.strip() for o in args.opciones.split(",") if o.strip()]
+    no_soportadas = [o for o in opciones if o.lower() not in {x.lower() for x in OPCIONES_RESOURCE}]
+    if no_soportadas:
+        parser.error(f"opciones sin pestaña en el script: {no_soportadas}")
+
+    trabajo = Path(args.trabajo) if args.trabajo else Path(tempfile.mkdtemp(prefix="hik_e2e_"))
+    carpeta = Path(args.carpeta) if args.carpeta else Path(__file__).resolve().parent / "bench_libros"
+    downloadcenter = trabajo / "Downloadcenter"
+
+    # Antes de importar los scripts: DOWNLOAD_DIR y LOG_DIR se leen al importar y
+    # load_dotenv no pisa lo ya definido
+    os.environ["HIK_DOWNLOAD_DIR"] = str(trabajo / "downloads")
+    os.environ["HIK_DOWNLOADCENTER"] = str(downloadcenter)
+    os.environ["HIK_LOG_DIR"] = str(trabajo / "logs")
+    preparar_base(args.db_host, args.db_name, args.permitir_remoto)
+    import hikcentral_export_resourcestatus as resourcestatus
+    import hikcentral_open_eventalarms as eventalarms
+
+    # El script de alarmas tiene LOG_DIR fijo
+    eventalarms.LOG_DIR = trabajo / "logs"
+    resourcestatus.DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+
+    server, url = iniciar_stub_ui(
+        downloadcenter,
+        dispositivos=args.dispositivos,
+        eventos=args.eventos,
+        latencia=args.latencia,
+        latencia_export=args.latencia_export,
+        go_maintenance=not args.sin_go_maintenance,
+        carpeta_libros=carpeta,
+    )
+    host = f"127.0.0.1:{server.server_address[1]}"
+    print(f"[BENCH] Stub UI en {url} | trabajo: {trabajo}")
+
+    casos = []
+    if "resource" in flujos:
+        casos += [("resource", opcion) for opcion in opciones]
+    if "alarmas" in flujos:
+        casos.append(("alarmas", "Event and Alarm"))
+
+    resultados: list[dict] = []
+    try:
+        for flujo, opcion in casos:
+            corridas = []
+            for i in range(args.repeticiones):
+                print(f"[BENCH] {flujo} | {opcion} | corrida {i + 1}/{args.repeticiones}")
+                if flujo == "resource":
+                    corrida = medir_resource(resourcestatus, url, opcion, args)
+                else:
+                    corrida = medir_alarmas(eventalarms, host, args)
+                for paso in corrida["pasos"]:
+                    print(f"[BENCH]   {paso['paso']:<45} {paso['tiempo_paso']:7.2f}s")
+                estado = "OK" if corrida["ok"] else f"FALLÓ {corrida.get('error') or ''}".strip()
+                print(f"[BENCH]   {'total':<45} {corrida['total_seg']:7.2f}s | {estado}")
+                corridas.append(corrida)
+            resultados.append(
+                {"flujo": flujo, "opcion": opcion, "corridas": corridas, "resumen": resumir(corridas)}
+            )
+    finally:
+        server.shutdown()
+
+    print("[BENCH] === Resumen (medianas) ===")
+    for resultado in resultados:
+        resumen = resultado["resumen"]
+        print(
+            f"[BENCH] {resultado['flujo']:<8} {resultado['opcion']:<16} "
+            f"{resumen['total_seg_mediana']:8.2f}s | ok {resumen['ok']}/{args.repeticiones}"
+        )
+        for paso, seg in resumen["pasos"].items():
+            print(f"[BENCH]     {paso:<45} {seg:7.2f}s")
+    print(f"[BENCH] Peticiones al stub: {dict(sorted(server.peticiones.items()))}")
+
+    salida = Path(args.salida) if args.salida else (
+        Path(__file__).resolve().parent / f"bench_e2e_ui_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "maquina": platform.node(),
+                    "repeticiones": args.repeticiones,
+                    "latencia": args.latencia,
+                    "latencia_export": args.latencia_export,
+                    "dispositivos": args.dispositivos,
+                    "eventos": args.eventos,
+                    "go_maintenance": not args.sin_go_maintenance,
+                    "lean": args.lean,
+                    "headless": args.headless,
+                },
+                "resultados": resultados,
+                "peticiones_stub": server.peticiones,
+            },
+            f,
+            indent=2,
+        )
+    print(f"[BENCH] Resultados guardados en: {salida}")
+
+
+if __name__ == "__main__":
+    main()
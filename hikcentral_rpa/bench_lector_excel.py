@@ -0,0 +1,153 @@
+"""
+Benchmark de los backends de hikcentral_excel.leer_excel contra pd.read_excel.
+
+Para cada libro que leen las cargas (las cuatro hojas de Resource Status, el "Alarm and
+Event Log" con header=None y dtype=str, y el Alarm Report con "Event Key") mide cada
+backend instalado y compara el DataFrame con el de pd.read_excel (backend "pandas") con
+pandas.testing.assert_frame_equal. Un backend que no da lo mismo se marca DISTINTO con la
+primera diferencia y no cuenta para el orden.
+
+Los libros salen de los generadores de bench_carga_resource_status / bench_carga_alarmas
+(se reusan en bench_libros). No usa Postgres.
+
+Uso:
+    python bench_lector_excel.py --filas 10000,100000 --repeticiones 3
+    python bench_lector_excel.py --libros alarm_log --filas 1000000 --backends calamine,pandas
+"""
+import argparse
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import bench_carga_alarmas
+import bench_carga_resource_status
+from hikcentral_excel import BACKENDS, ORDEN_AUTO, backend_disponible, leer_excel
+
+# libro -> parámetros de leer_excel con los que lo lee el script
+LIBROS = {
+    **{
+        f"resource_{hoja.lower().replace(' ', '_')}": {"hoja": hoja, "header": fila_cabecera, "dtype": None}
+        for hoja, (_, fila_cabecera, _, _) in bench_carga_resource_status.HOJAS.items()
+    },
+    "alarm_log": {"hoja": "Alarm and Event Log", "header": None, "dtype": str},
+    "alarm_report": {"hoja": None, "header": 0, "dtype": None},
+}
+
+
+def libro_de(carpeta: Path, libro: str, filas: int, semilla: int) -> Path:
+    if libro.startswith("alarm_"):
+        return bench_carga_alarmas.libro_bench(carpeta, filas, 0.1, libro.split("_", 1)[1], semilla)
+    return bench_carga_resource_status.libro_bench(carpeta, LIBROS[libro]["hoja"], filas, semilla)
+
+
+def diferencia(df: pd.DataFrame, referencia: pd.DataFrame) -> str | None:
+    try:
+        pd.testing.assert_frame_equal(df, referencia)
+    except AssertionError as e:
+        return " ".join(str(e).split())[:300]
+    return None
+
+
+def medir_libro(archivo: Path, parametros: dict, backends: list[str], repeticiones: int) -> dict:
+    referencia = leer_excel(archivo, backend="pandas", **parametros)
+    resultado: dict[str, dict] = {}
+    for backend in backends:
+        tiempos = []
+        df = None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            df = leer_excel(archivo, backend=backend, **parametros)
+            tiempos.append(time.perf_counter() - inicio)
+        resultado[backend] = {
+            "seg_mediana": round(statistics.median(tiempos), 3),
+            "seg": [round(t, 3) for t in tiempos],
+            "filas": len(df),
+            "columnas": len(df.columns),
+            "diferencia": None if backend == "pandas" else diferencia(df, referencia),
+        }
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los backends de lectura de Excel de las cargas.")
+    parser.add_argument("--filas", default="10000,100000", help="Tamaños separados por coma")
+    parser.add_argument("--libros", default=",".join(LIBROS), help="Libros separados por coma")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Backends a medir (los no instalados se saltean)")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--carpeta", type=str, default=None, help="Carpeta de los libros generados")
+    parser.add_argument("--salida", type=str, default=None, help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    libros = [l.strip().lower() for l in args.libros.split(",") if l.strip()]
+    desconocidos = [l for l in libros if l not in LIBROS]
+    if desconocidos:
+        parser.error(f"libros desconocidos: {desconocidos}")
+    pedidos = [b.strip().lower() for b in args.backends.split(",") if b.strip()]
+    desconocidos = [b for b in pedidos if b not in BACKENDS]
+    if desconocidos:
+        parser.error(f"backends desconocidos: {desconocidos}")
+    backends = [b for b in pedidos if backend_disponible(b)]
+    for backend in pedidos:
+        if backend not in backends:
+            print(f"[BENCH] {backend} no está instalado, se saltea")
+    tamanos = [int(t) for t in args.filas.split(",") if t.strip()]
+    carpeta = Path(args.carpeta) if args.carpeta else Path(__file__).resolve().parent / "bench_libros"
+
+    resultados: list[dict] = []
+    for filas in tamanos:
+        for libro in libros:
+            archivo = libro_de(carpeta, libro, filas, args.semilla)
+            print(f"[BENCH] {libro} | {filas} filas | {archivo.name}")
+            medicion = medir_libro(archivo, LIBROS[libro], backends, args.repeticiones)
+            base = medicion.get("pandas", {}).get("seg_mediana")
+            for backend, datos in medicion.items():
+                relativo = f"x{base / datos['seg_mediana']:5.1f}" if base and datos["seg_mediana"] else ""
+                estado = "DISTINTO: " + datos["diferencia"] if datos["diferencia"] else "igual"
+                print(f"[BENCH]   {backend:<9} {datos['seg_mediana']:8.3f}s {relativo:>6} | {estado}")
+            resultados.append({"libro": libro, "filas": filas, "archivo": archivo.name, "backends": medicion})
+
+    # Orden por la suma de medianas, solo backends que dieron lo mismo que pd.read_excel en todos los libros
+    totales: dict[str, float] = {}
+    for backend in backends:
+        mediciones = [r["backends"][backend] for r in resultados]
+        if all(m["diferencia"] is None for m in mediciones):
+            totales[backend] = round(sum(m["seg_mediana"] for m in mediciones), 3)
+        else:
+            print(f"[BENCH] {backend} no es equivalente en al menos un libro")
+    orden = sorted(totales, key=totales.get)
+    print("[BENCH] === Orden (suma de medianas, equivalentes) ===")
+    for backend in orden:
+        print(f"[BENCH] {backend:<9} {totales[backend]:8.3f}s")
+    print(f"[BENCH] ORDEN_AUTO actual: {', '.join(ORDEN_AUTO)}")
+
+    salida = Path(args.salida) if args.salida else (
+        Path(__file__).resolve().parent / f"bench_lector_excel_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "fecha": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "pandas": pd.__version__,
+                    "maquina": platform.node(),
+                    "repeticiones": args.repeticiones,
+                    "semilla": args.semilla,
+                },
+                "resultados": resultados,
+                "orden": [{"backend": b, "seg": totales[b]} for b in orden],
+            },
+            f,
+            indent=2,
+        )
+    print(f"[BENCH] Resultados guardados en: {salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Benchmark del perfil de navegador: compara el perfil actual contra el perfil lean.
+
+Para cada perfil abre Chrome, hace login en HikCentral y navega hasta la tabla
+de Camera en Resource Status, midiendo el tiempo de cada paso y la RSS del árbol
+de procesos (chromedriver + Chrome + renderers) al final de cada paso.
+
+Uso:
+    python bench_perfil_navegador.py --url http://172.16.9.10/#/ --repeticiones 3
+    python bench_perfil_navegador.py --perfiles lean --headless
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime
+from pathlib import Path
+
+import psutil
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import hikcentral_export_resourcestatus as resourcestatus
+from hikcentral_driver import cerrar_driver
+
+
+def rss_arbol_procesos(driver) -> float:
+    """RSS total en MB de chromedriver y todos sus procesos hijos."""
+    try:
+        raiz = psutil.Process(driver.service.process.pid)
+    except (AttributeError, psutil.Error):
+        return 0.0
+
+    total = 0
+    for proc in [raiz, *raiz.children(recursive=True)]:
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            continue
+    return total / (1024**2)
+
+
+def medir_corrida(url: str, lean: bool, headless: bool) -> list[dict]:
+    pasos: list[dict] = []
+    inicio = time.perf_counter()
+    ultimo = inicio
+    driver = None
+
+    def marcar(nombre: str):
+        nonlocal ultimo
+        ahora = time.perf_counter()
+        pasos.append(
+            {
+                "paso": nombre,
+                "tiempo_paso": round(ahora - ultimo, 3),
+                "tiempo_total": round(ahora - inicio, 3),
+                "rss_mb": round(rss_arbol_procesos(driver), 1) if driver else 0.0,
+            }
+        )
+        ultimo = ahora
+
+    try:
+        driver = resourcestatus.crear_driver(lean=lean, headless=headless)
+        wait = WebDriverWait(driver, 30)
+        marcar("crear_driver")
+
+        driver.get(url)
+        user_input = wait.until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'input[placeholder="User Name"]'))
+        )
+        marcar("abrir_login")
+
+        password_input = driver.find_element(By.CSS_SELECTOR, 'input[placeholder="Password"]')
+        user_input.clear()
+        user_input.send_keys(resourcestatus.HIK_USER)
+        password_input.clear()
+        password_input.send_keys(resourcestatus.HIK_PASSWORD)
+        wait.until(
+            EC.element_to_be_clickable((By.XPATH, "//*[normalize-space(text())='Log In']"))
+        ).click()
+        wait.until(lambda d: "/portal" in d.current_url)
+        marcar("login_portal")
+
+        resourcestatus.ir_a_pestana_maintenance(driver, wait)
+        resourcestatus.abrir_menu_resource_status(driver, wait)
+        marcar("resource_status")
+
+        resourcestatus.seleccionar_opcion_resource_status(driver, wait, "Camera")
+        resourcestatus.esperar_tabla_resource_status(driver, wait, "Camera")
+        marcar("tabla_camera")
+    finally:
+        if driver:
+            cerrar_driver(driver)
+
+    return pasos
+
+
+def resumir(corridas: list[list[dict]]) -> dict:
+    resumen: dict[str, dict] = {}
+    for corrida in corridas:
+        for paso in corrida:
+            item = resumen.setdefault(paso["paso"], {"tiempo_paso": [], "rss_mb": []})
+            item["tiempo_paso"].append(paso["tiempo_paso"])
+            item["rss_mb"].append(paso["rss_mb"])
+
+    return {
+        nombre: {
+            "tiempo_paso_mediana": round(statistics.median(valores["tiempo_paso"]), 3),
+            "rss_mb_mediana": round(statistics.median(valores["rss_mb"]), 1),
+            "rss_mb_max": round(max(valores["rss_mb"]), 1),
+        }
+        for nombre, valores in resumen.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara el perfil de Chrome actual vs lean.")
+    parser.add_argument("--url", default=resourcestatus.URL, help="URL de login de HikCentral")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument(
+        "--perfiles",
+        default="actual,lean",
+        help="Perfiles a medir separados por coma (actual, lean)",
+    )
+    parser.add_argument("--headless", action="store_true", help="Perfil lean sin ventana")
+    parser.add_argument("--salida", type=str, default=None, help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    perfiles = [p.strip().lower() for p in args.perfiles.split(",") if p.strip()]
+    resultados: dict[str, dict] = {}
+
+    for perfil in perfiles:
+        lean = perfil == "lean"
+        corridas = []
+        for i in range(args.repeticiones):
+            print(f"[BENCH] Perfil {perfil} | corrida {i + 1}/{args.repeticiones}")
+            corrida = medir_corrida(args.url, lean=lean, headless=args.headless and lean)
+            for paso in corrida:
+                print(
+                    f"[BENCH]   {paso['paso']:<18} paso: {paso['tiempo_paso']:7.2f}s | "
+                    f"total: {paso['tiempo_total']:7.2f}s | RSS árbol: {paso['rss_mb']:8.1f} MB"
+                )
+            corridas.append(corrida)
+        resultados[perfil] = {"corridas": corridas, "resumen": resumir(corridas)}
+
+    print("[BENCH] === Resumen (medianas) ===")
+    for perfil, data in resultados.items():
+        for paso, valores in data["resumen"].items():
+            print(
+                f"[BENCH] {perfil:<7} {paso:<18} paso: {valores['tiempo_paso_mediana']:7.2f}s | "
+                f"RSS: {valores['rss_mb_mediana']:8.1f} MB (max {valores['rss_mb_max']:.1f})"
+            )
+
+    salida = Path(args.salida) if args.salida else (
+        Path(__file__).resolve().parent
+        / f"bench_perfil_navegador_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2)
+    print(f"[BENCH] Resultados guardados en: {salida}")
+
+
+if __name__ == "__main__":
+    main()
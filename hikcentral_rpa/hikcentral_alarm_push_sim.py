@@ -0,0 +1,161 @@
+"""
+Simulador de push de alarmas de HikCentral para probar carga del receptor.
+
+Abre N conexiones keep-alive y envía OnEventNotify con `--por-peticion` eventos
+cada uno, intentando sostener `--tasa` eventos/s. Al final informa eventos/s
+logrados y latencia de respuesta (p50 / p99). Con `--duplicados` reenvía una
+fracción de eventos ya enviados para verificar la deduplicación por event_key.
+
+Uso:
+    python hikcentral_alarm_receiver.py --sin-db
+    python hikcentral_alarm_push_sim.py --tasa 5000 --segundos 20 --conexiones 16
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+PRIORIDADES = ["High", "Medium", "Low"]
+EVENTOS = ["Motion Detection", "Line Crossing", "Intrusion", "Video Loss", "Device Offline"]
+ESTADOS = ["Unacknowledged", "Acknowledged"]
+
+
+def generar_evento(n: int, base: datetime) -> dict:
+    return {
+        "eventId": f"SIM-{n:09d}",
+        "name": f"Alarma simulada {n % 500}",
+        "priority": PRIORIDADES[n % len(PRIORIDADES)],
+        "happenTime": (base + timedelta(milliseconds=n)).isoformat(timespec="seconds"),
+        "srcName": f"Camara {n % 2000}",
+        "regionName": f"Sitio {n % 50}",
+        "eventTypeName": EVENTOS[n % len(EVENTOS)],
+        "status": ESTADOS[0],
+        "description": "evento generado por hikcentral_alarm_push_sim",
+    }
+
+
+async def conexion(
+    host: str,
+    puerto: int,
+    path: str,
+    cola: asyncio.Queue,
+    latencias: list[float],
+    errores: list[str],
+):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        while True:
+            eventos = await cola.get()
+            if eventos is None:
+                break
+            cuerpo = json.dumps(
+                {"method": "OnEventNotify", "params": {"ability": "event_alarm", "events": eventos}}
+            ).encode("utf-8")
+            inicio = time.perf_counter()
+            writer.write(
+                (
+                    f"POST {path} HTTP/1.1\r\nHost: {host}:{puerto}\r\n"
+                    "Content-Type: application/json\r\n"
+                    f"Content-Length: {len(cuerpo)}\r\nConnection: keep-alive\r\n\r\n"
+                ).encode("latin-1")
+                + cuerpo
+            )
+            await writer.drain()
+
+            cabecera = await reader.readuntil(b"\r\n\r\n")
+            largo = 0
+            for linea in cabecera.decode("latin-1").split("\r\n")[1:]:
+                if linea.lower().startswith("content-length:"):
+                    largo = int(linea.split(":", 1)[1])
+            if largo:
+                await reader.readexactly(largo)
+            latencias.append(time.perf_counter() - inicio)
+
+            status = cabecera.split(b" ", 2)[1].decode()
+            if status != "200":
+                errores.append(status)
+    finally:
+        writer.close()
+
+
+async def simular(args) -> dict:
+    cola: asyncio.Queue = asyncio.Queue(maxsize=args.conexiones * 4)
+    latencias: list[float] = []
+    errores: list[str] = []
+    trabajadores = [
+        asyncio.create_task(conexion(args.host, args.puerto, args.path, cola, latencias, errores))
+        for _ in range(args.conexiones)
+    ]
+
+    base = datetime.now(timezone.utc).replace(microsecond=0)
+    peticiones_por_seg = max(1.0, args.tasa / args.por_peticion)
+    intervalo = 1.0 / peticiones_por_seg
+    enviados = 0
+    duplicados = 0
+    inicio = time.perf_counter()
+    proximo = inicio
+
+    while time.perf_counter() - inicio < args.segundos:
+        lote = []
+        for _ in range(args.por_peticion):
+            if enviados and random.random() < args.duplicados:
+                lote.append(generar_evento(random.randrange(enviados), base))
+                duplicados += 1
+            else:
+                lote.append(generar_evento(enviados, base))
+                enviados += 1
+        await cola.put(lote)
+
+        proximo += intervalo
+        espera = proximo - time.perf_counter()
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+    for _ in trabajadores:
+        await cola.put(None)
+    await asyncio.gather(*trabajadores)
+    duracion = time.perf_counter() - inicio
+
+    total = enviados + duplicados
+    latencias.sort()
+    return {
+        "eventos_enviados": total,
+        "eventos_unicos": enviados,
+        "eventos_duplicados": duplicados,
+        "peticiones": len(latencias),
+        "errores": len(errores),
+        "duracion_seg": round(duracion, 2),
+        "eventos_por_seg": round(total / duracion, 1) if duracion else 0.0,
+        "latencia_p50_ms": round(statistics.median(latencias) * 1000, 2) if latencias else None,
+        "latencia_p99_ms": (
+            round(latencias[int(len(latencias) * 0.99) - 1] * 1000, 2) if len(latencias) >= 100 else None
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulador de carga del receptor push de alarmas.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8089)
+    parser.add_argument("--path", default="/eventRcv")
+    parser.add_argument("--tasa", type=int, default=2000, help="Eventos por segundo objetivo")
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--conexiones", type=int, default=8)
+    parser.add_argument("--por-peticion", type=int, default=20, help="Eventos por POST")
+    parser.add_argument("--duplicados", type=float, default=0.0, help="Fracción de eventos reenviados (0-1)")
+    args = parser.parse_args()
+
+    print(
+        f"[SIM] Enviando ~{args.tasa} eventos/s durante {args.segundos}s "
+        f"a http://{args.host}:{args.puerto}{args.path} ({args.conexiones} conexiones)"
+    )
+    resultado = asyncio.run(simular(args))
+    for clave, valor in resultado.items():
+        print(f"[SIM] {clave}: {valor}")
+
+
+if __name__ == "__main__":
+    main()
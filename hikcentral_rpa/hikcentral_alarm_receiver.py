@@ -0,0 +1,359 @@
+"""
+Receptor push de alarmas (suscripción de eventos de HikCentral) hacia hik_alarm_evento.
+
+HikCentral hace POST del evento (OnEventNotify) a la URL suscrita; el receptor
+responde de inmediato, acumula los eventos durante HIK_PUSH_VENTANA segundos y los
+escribe en lote con la misma clave event_key / PERIODO que el export Excel
+(construir_event_key + fila_alarm_evento), así push y export deduplican entre sí.
+
+Solo usa asyncio de la librería estándar (HTTP/1.1 con keep-alive). La escritura
+en Postgres (psycopg2, bloqueante) se hace en un hilo para no frenar la recepción.
+
+Configuración (.env):
+    HIK_PUSH_PUERTO         puerto de escucha (default 8089)
+    HIK_PUSH_VENTANA        segundos de acumulación por lote (default 1.0)
+    HIK_PUSH_LOTE_MAX       eventos que fuerzan escritura inmediata (default 5000)
+    HIK_PUSH_PENDIENTES_MAX eventos en memoria antes de responder 503 (default 200000)
+
+Uso:
+    python hikcentral_alarm_receiver.py --puerto 8089
+    python hikcentral_alarm_receiver.py --sin-db      # solo mide recepción (carga con el simulador)
+
+Nota: la deduplicación contra el export solo se cumple si los campos del push
+(nombre, hora, origen, región, evento, prioridad, estado) traen el mismo texto
+que las columnas del Alarm Report; revisar MAPEO_PUSH según la versión de HCP.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import time
+from datetime import datetime
+
+from hikcentral_open_eventalarms import (
+    construir_event_key,
+    crear_registro_extraccion,
+    fila_alarm_evento,
+    get_pg_connection,
+    insertar_filas_alarm_evento,
+)
+
+# Campo del registro de hik_alarm_evento -> claves posibles en el evento push
+MAPEO_PUSH = {
+    "mark": ("mark",),
+    "name": ("name", "alarmName", "eventName"),
+    "trigger_alarm": ("triggerAlarm",),
+    "priority": ("priority", "priorityName", "eventLvl"),
+    "triggering_time_client": ("triggeringTime", "happenTime"),
+    "source": ("source", "srcName"),
+    "region": ("region", "regionName", "srcParentName"),
+    "trigger_event": ("triggerEvent", "eventTypeName", "eventType"),
+    "description": ("description",),
+    "status": ("status", "statusName"),
+    "alarm_acknowledgment_time": ("alarmAcknowledgmentTime", "ackTime"),
+    "alarm_category": ("alarmCategory", "category"),
+    "remarks": ("remarks",),
+    "more": ("more",),
+}
+
+CAMPOS_FECHA = ("triggering_time_client", "alarm_acknowledgment_time")
+
+
+def _fecha_local(valor) -> datetime | None:
+    """Hora ISO del push -> datetime local sin tz (igual que 'Triggering Time (Client)')."""
+    if valor in (None, ""):
+        return None
+    try:
+        fecha = datetime.fromisoformat(str(valor).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone().replace(tzinfo=None)
+    return fecha
+
+
+def mapear_evento_push(evento: dict) -> dict:
+    registro = {}
+    for campo, claves in MAPEO_PUSH.items():
+        valor = None
+        for clave in claves:
+            if evento.get(clave) not in (None, ""):
+                valor = evento[clave]
+                break
+        if campo in CAMPOS_FECHA:
+            valor = _fecha_local(valor)
+        elif valor is not None:
+            valor = str(valor).strip() or None
+        registro[campo] = valor
+    registro["event_key"] = construir_event_key(registro)
+    return registro
+
+
+def extraer_eventos(payload) -> list[dict]:
+    """Acepta OnEventNotify ({"params": {"events": [...]}}), {"events": [...]}, una lista o un evento."""
+    if isinstance(payload, list):
+        return [e for e in payload if isinstance(e, dict)]
+    if not isinstance(payload, dict):
+        return []
+    if isinstance(payload.get("params"), dict):
+        payload = payload["params"]
+    eventos = payload.get("events")
+    if isinstance(eventos, list):
+        return [e for e in eventos if isinstance(e, dict)]
+    return [payload]
+
+
+class EscritorAlarmas:
+    """
+    Escribe lotes en hik_alarm_evento con una conexión reutilizada.
+    Todo el receptor cuelga de un único registro de hik_alarm_extraccion.
+    """
+
+    def __init__(self, sin_db: bool = False):
+        self.sin_db = sin_db
+        self.conn = None
+        self.id_extraccion: int | None = None
+        self.insertados = 0
+        self.duplicados = 0
+
+    def _conexion(self):
+        if self.conn is None or self.conn.closed:
+            self.conn = get_pg_connection()
+            if self.id_extraccion is None:
+                nombre = f"PUSH_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+                self.id_extraccion = crear_registro_extraccion(self.conn, nombre)
+        return self.conn
+
+    def escribir(self, registros: list[dict]) -> int:
+        # Dedupe dentro del lote (reintentos del emisor)
+        unicos = list({r["event_key"]: r for r in registros}.values())
+        if self.sin_db:
+            self.insertados += len(unicos)
+            self.duplicados += len(registros) - len(unicos)
+            return len(unicos)
+
+        conn = self._conexion()
+        try:
+            fecha_creacion = datetime.now()
+            filas = [fila_alarm_evento(self.id_extraccion, r, fecha_creacion) for r in unicos]
+            nuevos = insertar_filas_alarm_evento(conn, filas)
+            with conn.cursor() as cur:
+                cur.execute(
+                    """
+                    UPDATE public.hik_alarm_extraccion
+                    SET total_filas = COALESCE(total_filas, 0) + %s,
+                        total_nuevos = COALESCE(total_nuevos, 0) + %s,
+                        total_duplicados = COALESCE(total_duplicados, 0) + %s
+                    WHERE id = %s;
+                    """,
+                    (len(registros), nuevos, len(registros) - nuevos, self.id_extraccion),
+                )
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            self.conn = None
+            raise
+        self.insertados += nuevos
+        self.duplicados += len(registros) - nuevos
+        return nuevos
+
+    def cerrar(self, estado: str = "OK"):
+        if self.sin_db or self.id_extraccion is None:
+            return
+        try:
+            conn = self._conexion()
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE public.hik_alarm_extraccion SET fecha_fin = now(), estado = %s WHERE id = %s;",
+                    (estado, self.id_extraccion),
+                )
+            conn.commit()
+            conn.close()
+        except Exception as exc:
+            print(f"[WARN] No se pudo cerrar hik_alarm_extraccion id={self.id_extraccion}: {exc}")
+
+
+class ReceptorAlarmas:
+    def __init__(
+        self,
+        escritor: EscritorAlarmas,
+        ventana: float = 1.0,
+        lote_max: int = 5000,
+        pendientes_max: int = 200000,
+    ):
+        self.escritor = escritor
+        self.ventana = ventana
+        self.lote_max = lote_max
+        self.pendientes_max = pendientes_max
+        self._pendientes: list[dict] = []
+        self._primer_pendiente: float | None = None
+        self._hay_lote = asyncio.Event()
+        self._escritura: asyncio.Task | None = None
+        self.recibidos = 0
+        self.rechazados = 0
+        self.lotes = 0
+        self.lag_max = 0.0
+
+    # ---------- HTTP ----------
+    async def atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    cabecera = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+
+                lineas = cabecera.decode("latin-1").split("\r\n")
+                metodo = lineas[0].split(" ", 1)[0].upper()
+                headers = {}
+                for linea in lineas[1:]:
+                    if ":" in linea:
+                        k, v = linea.split(":", 1)
+                        headers[k.strip().lower()] = v.strip()
+
+                largo = int(headers.get("content-length") or 0)
+                cuerpo = await reader.readexactly(largo) if largo else b""
+                status, respuesta = self._procesar(metodo, cuerpo)
+
+                cerrar = headers.get("connection", "").lower() == "close"
+                writer.write(
+                    (
+                        f"HTTP/1.1 {status}\r\n"
+                        "Content-Type: application/json\r\n"
+                        f"Content-Length: {len(respuesta)}\r\n"
+                        f"Connection: {'close' if cerrar else 'keep-alive'}\r\n\r\n"
+                    ).encode("latin-1")
+                    + respuesta
+                )
+                await writer.drain()
+                if cerrar:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _procesar(self, metodo: str, cuerpo: bytes) -> tuple[str, bytes]:
+        if metodo != "POST":
+            return "200 OK", b'{"code":"0","msg":"alive"}'
+        if len(self._pendientes) >= self.pendientes_max:
+            self.rechazados += 1
+            return "503 Service Unavailable", b'{"code":"503","msg":"busy"}'
+        try:
+            payload = json.loads(cuerpo or b"{}")
+        except ValueError:
+            return "400 Bad Request", b'{"code":"400","msg":"invalid json"}'
+
+        eventos = [mapear_evento_push(e) for e in extraer_eventos(payload)]
+        if eventos:
+            if not self._pendientes:
+                self._primer_pendiente = time.perf_counter()
+            self._pendientes.extend(eventos)
+            self.recibidos += len(eventos)
+            if len(self._pendientes) >= self.lote_max:
+                self._hay_lote.set()
+        return "200 OK", b'{"code":"0","msg":"success"}'
+
+    # ---------- Escritura por lotes ----------
+    async def volcar_periodicamente(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._hay_lote.wait(), timeout=self.ventana)
+            except asyncio.TimeoutError:
+                pass
+            self._hay_lote.clear()
+            await self.volcar()
+
+    async def volcar(self):
+        await self.esperar_escritura()
+        if not self._pendientes:
+            return
+        lote, self._pendientes = self._pendientes, []
+        lag = time.perf_counter() - (self._primer_pendiente or time.perf_counter())
+        self.lag_max = max(self.lag_max, lag)
+        # El lote ya salió de _pendientes: si cancelan el volcador (cierre) la escritura
+        # sigue en su hilo y servir la espera antes de cerrar la conexión
+        self._escritura = asyncio.create_task(self._escribir(lote, lag))
+        await asyncio.shield(self._escritura)
+
+    async def _escribir(self, lote: list[dict], lag: float):
+        try:
+            nuevos = await asyncio.to_thread(self.escritor.escribir, lote)
+            self.lotes += 1
+            print(
+                f"[PUSH] Lote {self.lotes}: {len(lote)} eventos | nuevos: {nuevos} | "
+                f"duplicados: {len(lote) - nuevos} | espera en memoria: {lag:.2f}s"
+            )
+        except Exception as exc:
+            # Se reencolan para el próximo intento; la dedupe por event_key evita duplicar
+            print(f"[ERROR] Falló escritura de lote push ({len(lote)} eventos): {exc}")
+            self._pendientes[:0] = lote
+
+    async def esperar_escritura(self):
+        """Espera el lote que se está escribiendo (si hay uno en curso)."""
+        if self._escritura is not None:
+            await self._escritura
+            self._escritura = None
+
+    def resumen(self) -> str:
+        return (
+            f"recibidos: {self.recibidos} | insertados: {self.escritor.insertados} | "
+            f"duplicados: {self.escritor.duplicados} | rechazados (503): {self.rechazados} | "
+            f"lotes: {self.lotes} | espera máx: {self.lag_max:.2f}s"
+        )
+
+
+async def servir(puerto: int, receptor: ReceptorAlarmas, host: str = "0.0.0.0"):
+    server = await asyncio.start_server(receptor.atender, host, puerto, backlog=1024)
+    volcador = asyncio.create_task(receptor.volcar_periodicamente())
+    print(f"[PUSH] Receptor de alarmas escuchando en http://{host}:{puerto}/")
+
+    detener = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, detener.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: se corta con KeyboardInterrupt
+
+    try:
+        async with server:
+            await detener.wait()
+    finally:
+        volcador.cancel()
+        # volcar espera el lote en curso y escribe lo que quede (incluido un lote reencolado)
+        await receptor.volcar()
+        print(f"[PUSH] Resumen: {receptor.resumen()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Receptor push de alarmas de HikCentral.")
+    parser.add_argument("--puerto", type=int, default=int(os.getenv("HIK_PUSH_PUERTO", "8089")))
+    parser.add_argument("--ventana", type=float, default=float(os.getenv("HIK_PUSH_VENTANA", "1.0")))
+    parser.add_argument("--lote-max", type=int, default=int(os.getenv("HIK_PUSH_LOTE_MAX", "5000")))
+    parser.add_argument(
+        "--pendientes-max", type=int, default=int(os.getenv("HIK_PUSH_PENDIENTES_MAX", "200000"))
+    )
+    parser.add_argument("--sin-db", action="store_true", help="No escribe en Postgres (prueba de carga)")
+    args = parser.parse_args()
+
+    escritor = EscritorAlarmas(sin_db=args.sin_db)
+    receptor = ReceptorAlarmas(escritor, args.ventana, args.lote_max, args.pendientes_max)
+    estado = "OK"
+    try:
+        asyncio.run(servir(args.puerto, receptor))
+    except KeyboardInterrupt:
+        pass
+    except Exception:
+        estado = "ERROR"
+        raise
+    finally:
+        escritor.cerrar(estado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+
+# ========================
+# CONTEO DE COMANDOS WEBDRIVER (opt-in)
+# ========================
+# Envuelve driver.execute y cuenta cada round trip a chromedriver por tipo
+# (findElements, executeScript, isElementDisplayed, ...) y por helper del RPA que lo
+# originó (find_click_by_text, wait_loading_end, ...). StepTimer.mark corta el
+# acumulado en cada paso, así cada paso lleva sus propios conteos e histograma.
+#   HIK_CONTAR_COMANDOS=1  activa el conteo (o --contar-comandos en los scripts)
+
+RPA_DIR = str(Path(__file__).resolve().parent)
+BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+def conteo_solicitado(flag: bool = False) -> bool:
+    return flag or os.getenv("HIK_CONTAR_COMANDOS", "").strip().lower() in ("1", "true", "si", "yes")
+
+
+def _bucket(ms: float) -> str:
+    for limite in BUCKETS_MS:
+        if ms <= limite:
+            return f"<={limite}ms"
+    return f">{BUCKETS_MS[-1]}ms"
+
+
+def _helper_llamador() -> str:
+    """Primera función del RPA (fuera de selenium y de este módulo) en la pila de la llamada."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        archivo = frame.f_code.co_filename
+        if archivo.startswith(RPA_DIR) and not archivo.endswith(("hikcentral_comandos.py", "hikcentral_trace.py")):
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return "?"
+
+
+class ContadorComandos:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reiniciar()
+
+    def _reiniciar(self):
+        self.total = 0
+        self.segundos = 0.0
+        self.por_tipo: dict[str, list[float]] = defaultdict(list)
+        self.por_helper: dict[str, int] = defaultdict(int)
+        self.histograma: dict[str, int] = defaultdict(int)
+
+    def registrar(self, comando: str, segundos: float, helper: str):
+        ms = segundos * 1000
+        with self._lock:
+            self.total += 1
+            self.segundos += segundos
+            self.por_tipo[comando].append(ms)
+            self.por_helper[helper] += 1
+            self.histograma[_bucket(ms)] += 1
+
+    def cortar(self) -> dict | None:
+        """Devuelve lo acumulado desde el corte anterior y reinicia. None si no hubo comandos."""
+        with self._lock:
+            if not self.total:
+                return None
+            por_tipo = {}
+            for comando, latencias in sorted(self.por_tipo.items(), key=lambda kv: -len(kv[1])):
+                ordenadas = sorted(latencias)
+                por_tipo[comando] = {
+                    "n": len(ordenadas),
+                    "seg": round(sum(ordenadas) / 1000, 3),
+                    "p50_ms": round(ordenadas[len(ordenadas) // 2], 1),
+                    "max_ms": round(ordenadas[-1], 1),
+                }
+            resumen = {
+                "total": self.total,
+                "seg": round(self.segundos, 3),
+                "por_tipo": por_tipo,
+                "por_helper": dict(sorted(self.por_helper.items(), key=lambda kv: -kv[1])),
+                "histograma_ms": {
+                    b: self.histograma[b]
+                    for b in [f"<={l}ms" for l in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}ms"]
+                    if self.histograma.get(b)
+                },
+            }
+            self._reiniciar()
+            return resumen
+
+
+def contar_comandos(driver, contador: ContadorComandos | None = None) -> ContadorComandos:
+    """Instala el conteo sobre driver.execute (se apila sobre la instrumentación de trazas)."""
+    contador = contador or ContadorComandos()
+    original = driver.execute
+
+    def execute(driver_command, params=None):
+        inicio = time.perf_counter()
+        try:
+            return original(driver_command, params)
+        finally:
+            contador.registrar(driver_command, time.perf_counter() - inicio, _helper_llamador())
+
+    driver.execute = execute
+    driver.hik_contador_comandos = contador
+    return contador
+
+
+def resumen_corto(resumen: dict, max_tipos: int = 4) -> str:
+    tipos = ", ".join(f"{c} {d['n']}" for c, d in list(resumen["por_tipo"].items())[:max_tipos])
+    helpers = ", ".join(f"{h} {n}" for h, n in list(resumen["por_helper"].items())[:3])
+    return f"{resumen['total']} cmds / {resumen['seg']:.2f}s | {tipos} | helpers: {helpers}"
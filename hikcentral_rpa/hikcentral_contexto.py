@@ -0,0 +1,459 @@
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from contextlib import nullcontext
+from typing import Callable
+from urllib.parse import urlsplit
+
+import psutil
+
+from hikcentral_comandos import ContadorComandos, contar_comandos, conteo_solicitado, resumen_corto
+from hikcentral_har import GrabadorHar, har_solicitado
+from hikcentral_memoria import activar_memoria, desactivar_memoria, memoria_solicitada
+from hikcentral_metricas_pagina import MetricasPagina, metricas_solicitadas, resumen_pagina
+from hikcentral_perfilado import PerfiladorFases, activar_perfilador, desactivar_perfilador, perfil_solicitado
+from hikcentral_timeouts import (
+    TIMEOUTS_ADAPTATIVOS,
+    Plazo,
+    PlazoAgotado,
+    TimeoutsAdaptativos,
+    activar_timeouts,
+    cargar_timeouts,
+    desactivar_timeouts,
+    plazo_solicitado,
+)
+from hikcentral_trace import Trazador, activar, desactivar, trazador_actual
+
+
+# ========================
+# CONTEXTO DE EJECUCIÓN
+# ========================
+# Antes cada script guardaba URL, step_timer, performance_recorder y cpu_measurements
+# como globales del módulo, así que dos flujos no podían correr en el mismo intérprete.
+# Ahora cada ejecución arma un RunContext y lo pasa a los helpers.
+
+
+class PerformanceRecorder:
+    def __init__(self, start_time: float | None = None):
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        self.steps: list[dict] = []
+        self.cpu_max: float | None = None
+        self.cpu_mediciones: list[float] = []
+        # Datos de la ejecución completa (HAR de los exports, ...) para LOG_RPA_EJECUCION.DETALLE
+        self.detalle: dict = {}
+        # Perfilado por fase (opt-in); registrar_ejecucion_y_pasos lo guarda con el id de la ejecución
+        self.perfilador: PerfiladorFases | None = None
+        self.proc = psutil.Process(os.getpid())
+
+    def _parse_step_label(self, label: str) -> tuple[int | None, str]:
+        match = re.search(r"\[(\d+)\]", label)
+        if not match:
+            return None, label
+
+        return int(match.group(1)), label.strip()
+
+    def _update_cpu_max(self, cpu_percent: float):
+        if self.cpu_max is None or cpu_percent > self.cpu_max:
+            self.cpu_max = cpu_percent
+
+    def registrar_cpu(self, cpu_percent: float):
+        self.cpu_mediciones.append(cpu_percent)
+        self._update_cpu_max(cpu_percent)
+
+    def update_cpu(self, cpu_percent: float):
+        self._update_cpu_max(cpu_percent)
+
+    def add_step(
+        self,
+        label: str,
+        step_secs: float,
+        total_secs: float,
+        cpu_percent: float,
+        mem_percent: float,
+        proc_mem_mb: float,
+        detalle: dict | None = None,
+    ):
+        num_paso, descripcion = self._parse_step_label(label)
+        if num_paso is None:
+            return
+
+        self._update_cpu_max(cpu_percent)
+        self.steps.append(
+            {
+                "num_paso": num_paso,
+                "descripcion": descripcion,
+                "tiempo_paso": round(step_secs, 2),
+                "tiempo_total": round(total_secs, 2),
+                "cpu": round(cpu_percent, 1),
+                "ram": round(mem_percent, 1),
+                "py_mem": int(proc_mem_mb),
+                "detalle": detalle,
+            }
+        )
+
+    def record_baseline(self, cpu_percent: float, mem_percent: float):
+        self._update_cpu_max(cpu_percent)
+        total_secs = time.perf_counter() - self.start_time
+        self.steps.append(
+            {
+                "num_paso": 0,
+                "descripcion": "[0] Baseline antes de automatizar",
+                "tiempo_paso": 0.0,
+                "tiempo_total": round(total_secs, 2),
+                "cpu": round(cpu_percent, 1),
+                "ram": round(mem_percent, 1),
+                "py_mem": int(self.proc.memory_info().rss / (1024**2)),
+            }
+        )
+
+
+class StepTimer:
+    def __init__(
+        self,
+        start_time: float | None = None,
+        recorder: PerformanceRecorder | None = None,
+        trazador: Trazador | None = None,
+    ):
+        self.start = start_time if start_time is not None else time.perf_counter()
+        self.last = self.start
+        self.recorder = recorder
+        self.trazador = trazador
+        # Conteo de comandos WebDriver del driver de este hilo (ver RunContext.instrumentar)
+        self.contador: ContadorComandos | None = None
+        # Performance.getMetrics de la pestaña del mismo driver (opt-in)
+        self.metricas: MetricasPagina | None = None
+        # HAR de los pasos de export del mismo driver (opt-in, ver hikcentral_har.grabar_har)
+        self.har: GrabadorHar | None = None
+        # Proceso actual, para medir memoria del script de Python
+        self.proc = psutil.Process(os.getpid())
+
+    def mark(self, label: str):
+        """
+        Imprime:
+        - tiempo del paso
+        - tiempo total desde el inicio
+        - CPU y RAM del servidor
+        - RAM usada por este proceso de Python
+        """
+        now = time.perf_counter()
+        step_secs = now - self.last
+        total_secs = now - self.start
+
+        # Recursos del servidor
+        cpu_percent = psutil.cpu_percent(interval=0.1)          # CPU total del server
+        mem = psutil.virtual_memory()
+        mem_percent = mem.percent                               # % RAM total usada
+        proc_mem_mb = self.proc.memory_info().rss / (1024**2)   # MB usados por este script
+
+        print(
+            f"[PERF] {label:<45} "
+            f"paso: {step_secs:6.2f}s | total: {total_secs:6.2f}s | "
+            f"CPU: {cpu_percent:5.1f}% | RAM: {mem_percent:5.1f}% | "
+            f"PY-MEM: {proc_mem_mb:6.1f} MB"
+        )
+
+        detalle = {}
+        comandos = self.contador.cortar() if self.contador else None
+        if comandos:
+            detalle["comandos"] = comandos
+            print(f"[CMD]  {label:<45} {resumen_corto(comandos)}")
+        pagina = self.metricas.tomar() if self.metricas else None
+        if pagina:
+            detalle["pagina"] = pagina
+            print(f"[PAGE] {label:<45} {resumen_pagina(pagina)}")
+
+        if self.recorder:
+            self.recorder.registrar_cpu(cpu_percent)
+            self.recorder.add_step(
+                label,
+                step_secs,
+                total_secs,
+                cpu_percent,
+                mem_percent,
+                proc_mem_mb,
+                detalle=detalle or None,
+            )
+
+        # El paso va a la traza como span desde la marca anterior hasta esta
+        trazador = self.trazador or trazador_actual()
+        if trazador:
+            trazador.completo(
+                label.strip(),
+                "paso",
+                self.last * 1_000_000,
+                now * 1_000_000,
+                {
+                    "cpu": cpu_percent,
+                    "ram": mem_percent,
+                    "py_mem_mb": round(proc_mem_mb, 1),
+                    "comandos": comandos["total"] if comandos else None,
+                    **(pagina or {}),
+                },
+            )
+            if pagina:
+                trazador.contador(
+                    "Página HikCentral",
+                    {k: pagina[k] for k in ("js_heap_mb", "nodos_dom") if k in pagina},
+                )
+
+        self.last = now
+
+
+@dataclass
+class RunContext:
+    """
+    Estado de una ejecución (un host + una opción): URL, carpeta de descargas,
+    timer/recorder de rendimiento, conexión a Postgres y timeouts del host. Cada hilo
+    o tarea usa el suyo.
+    """
+
+    opcion: str
+    url: str
+    download_dir: Path
+    host: str | None = None
+    conectar: Callable[[], object] | None = None
+    recorder: PerformanceRecorder = field(default_factory=PerformanceRecorder)
+    trazador: Trazador | None = None
+    contar_comandos: bool = False
+    metricas_pagina: bool = False
+    har: bool = False
+    perfil: bool = False
+    # Memoria por etapa de las cargas con tracemalloc (ver hikcentral_memoria)
+    memoria: bool = False
+    log_dir: Path | None = None
+    # Con `script` y conexión, las esperas usan los p95 de este host (ver hikcentral_timeouts)
+    script: str | None = None
+    timeouts: TimeoutsAdaptativos | None = None
+    # Plazo global (default HIK_PLAZO_SEG); el main lo comparte entre los hosts del proceso
+    plazo: Plazo | None = None
+    timer: StepTimer = field(init=False)
+    _conn: object = field(default=None, init=False, repr=False)
+    _trazador_propio: bool = field(default=False, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.host is None:
+            self.host = urlsplit(self.url).hostname or self.url
+        # Queda en LOG_RPA_EJECUCION.DETALLE: la historia de timeouts se filtra por host
+        self.recorder.detalle["host"] = self.host
+        # Sin trazador explícito se usa el del proceso (run); si no hay, la ejecución guarda el suyo
+        if self.trazador is None:
+            self.trazador = trazador_actual()
+        if self.trazador is None:
+            self.trazador = Trazador(f"{self.opcion}_{self.host}")
+            self._trazador_propio = True
+        self.contar_comandos = conteo_solicitado(self.contar_comandos)
+        self.metricas_pagina = metricas_solicitadas(self.metricas_pagina)
+        self.har = har_solicitado(self.har)
+        if self.plazo is None:
+            self.plazo = plazo_solicitado()
+        self.memoria = memoria_solicitada(self.memoria)
+        self.perfil = perfil_solicitado(self.perfil)
+        if self.perfil:
+            self.recorder.perfilador = PerfiladorFases(
+                f"{self.opcion}_{self.host}",
+                self.log_dir or Path(__file__).resolve().parent / "logs",
+                self.recorder,
+            )
+        self.timer = self.nuevo_timer()
+
+    def nuevo_timer(self) -> StepTimer:
+        """Timer propio para un hilo de la misma ejecución (comparte recorder, inicio y traza)."""
+        return StepTimer(
+            start_time=self.recorder.start_time, recorder=self.recorder, trazador=self.trazador
+        )
+
+    def instrumentar(self, driver, timer: StepTimer | None = None):
+        """
+        Según lo pedido, cada marca de `timer` (default: el de la ejecución) lleva los
+        comandos WebDriver de `driver` y las métricas CDP de su pestaña, y los exports
+        graban HAR (el driver debe crearse con captura de red).
+        """
+        timer = timer or self.timer
+        if self.contar_comandos:
+            timer.contador = contar_comandos(driver)
+        if self.metricas_pagina:
+            metricas = MetricasPagina(driver)
+            if metricas.habilitar():
+                timer.metricas = metricas
+        if self.har:
+            timer.har = GrabadorHar(
+                driver,
+                self.log_dir or Path(__file__).resolve().parent / "logs",
+                f"{self.opcion}_{self.host}",
+                self.recorder,
+            )
+        return driver
+
+    def cargar_timeouts(self) -> TimeoutsAdaptativos:
+        """Timeouts de las esperas según la historia de esta opción en el host (una sola vez por ejecución)."""
+        if self.timeouts is not None:
+            return self.timeouts
+        self.timeouts = TimeoutsAdaptativos()
+        if not TIMEOUTS_ADAPTATIVOS or self.script is None or self.conectar is None:
+            return self.timeouts
+        try:
+            # Conexión aparte: la de la ejecución se abre recién al cargar/registrar
+            conn = self.conectar()
+            try:
+                self.timeouts = cargar_timeouts(conn, self.script, self.opcion, self.host)
+            finally:
+                conn.close()
+        except Exception as exc:
+            print(f"[WARN] Sin historia para timeouts adaptativos de {self.host}; se usan los fijos: {exc}")
+            return self.timeouts
+        resumen = self.timeouts.resumen()
+        if resumen:
+            self.recorder.detalle["timeouts"] = resumen
+            detalle = ", ".join(
+                f"{cat} {datos['timeout_seg']:.0f}s (p95 {datos['p95_seg']:.1f}s)" for cat, datos in resumen.items()
+            )
+            print(f"[TIMEOUT] {self.host}: {detalle}")
+        return self.timeouts
+
+    def activar(self):
+        """
+        Deja activos en el hilo actual el trazador (spans de WebDriver/DB/archivos), los
+        timeouts, el plazo, el perfilador y la medición de memoria de esta ejecución.
+        Devuelve el token para desactivar().
+        """
+        return (
+            activar(self.trazador),
+            activar_timeouts(self.cargar_timeouts(), self.plazo),
+            activar_perfilador(self.recorder.perfilador),
+            activar_memoria(self.recorder if self.memoria else None),
+        )
+
+    def desactivar(self, token):
+        token_traza, token_timeouts, token_perfil, token_memoria = token
+        desactivar_memoria(token_memoria)
+        desactivar_perfilador(token_perfil)
+        desactivar_timeouts(token_timeouts)
+        desactivar(token_traza)
+
+    def iniciar_fase(self, fase: str):
+        """Perfila desde aquí como `fase` en el hilo actual (sin --profile no hace nada)."""
+        if self.recorder.perfilador:
+            self.recorder.perfilador.iniciar(fase)
+
+    def detener_fase(self):
+        if self.recorder.perfilador:
+            self.recorder.perfilador.detener()
+
+    def fase(self, fase: str):
+        if self.recorder.perfilador is None:
+            return nullcontext()
+        return self.recorder.perfilador.fase(fase)
+
+    def plazo_vencido(self) -> bool:
+        return self.plazo is not None and self.plazo.vencido()
+
+    def fin_por_plazo(self, exc: BaseException | None = None) -> bool:
+        """
+        True si la ejecución terminó por el plazo global (PlazoAgotado, o un timeout de
+        Selenium recortado por el plazo). Deja estado "deadline" en el detalle de la ejecución.
+        """
+        if not isinstance(exc, PlazoAgotado) and not self.plazo_vencido():
+            return False
+        self.recorder.detalle["estado"] = "deadline"
+        print(f"[DEADLINE] {self.opcion} | {self.host}: plazo de {self.plazo.total_seg:.0f}s agotado, se corta la ejecución.")
+        return True
+
+    def mark(self, label: str):
+        self.timer.mark(label)
+
+    def baseline(self) -> tuple[float, float]:
+        cpu = psutil.cpu_percent(interval=1)
+        ram = psutil.virtual_memory().percent
+        self.recorder.registrar_cpu(cpu)
+        self.recorder.record_baseline(cpu, ram)
+        print(f"[PERF] [0] Baseline antes de automatizar... CPU: {cpu:.1f}% | RAM: {ram:.1f}%")
+        return cpu, ram
+
+    def finalizar(self) -> tuple[float, float, float]:
+        """Mide CPU/RAM al cierre y devuelve (cpu_final, ram_final, duracion_total_seg)."""
+        cpu = psutil.cpu_percent(interval=1)
+        ram = psutil.virtual_memory().percent
+        self.recorder.registrar_cpu(cpu)
+        print(f"[PERF] [FIN] Estado al terminar script... CPU: {cpu:.1f}% | RAM: {ram:.1f}%")
+        if self.recorder.perfilador:
+            # El registro en la base no cuenta para ninguna fase
+            self.recorder.perfilador.detener_todo()
+        self.trazador.completo(
+            f"{self.opcion} | {self.host}",
+            "host",
+            self.recorder.start_time * 1_000_000,
+            args={"url": self.url, "pasos": len(self.recorder.steps), "cpu_max": self.recorder.cpu_max},
+        )
+        if self._trazador_propio:
+            self.trazador.guardar()
+        return cpu, ram, time.perf_counter() - self.recorder.start_time
+
+    def conexion(self):
+        """Conexión a Postgres de esta ejecución (se abre al primer uso)."""
+        if self._conn is None or getattr(self._conn, "closed", False):
+            if self.conectar is None:
+                raise RuntimeError("RunContext sin función de conexión a la base.")
+            self._conn = self.conectar()
+        return self._conn
+
+    def cerrar(self):
+        # Sin registro en la base (o falló) el perfil se guarda igual, con fecha en vez de id
+        if self.recorder.perfilador and not self.recorder.perfilador.guardado:
+            self.recorder.perfilador.guardar()
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+def insertar_pasos_ejecucion(cur, id_ejecucion: int, pasos: list[dict]):
+    """
+    Inserta los pasos en LOG_RPA_EJECUCION_PASO. Si algún paso trae detalle (conteo de
+    comandos WebDriver, etc.) se guarda en la columna DETALLE (JSONB), que se crea si falta.
+    """
+    pasos_ordenados = sorted(pasos, key=lambda x: x.get("num_paso", 0))
+    con_detalle = any(paso.get("detalle") for paso in pasos_ordenados)
+    columnas = "ID_EJECUCION, NUM_PASO, DESCRIPCION, TIEMPO_PASO_SEG, TIEMPO_TOTAL_SEG, CPU_PORCENTAJE, RAM_PORCENTAJE, PY_MEM_NIVEL"
+    valores = "%s, %s, %s, %s, %s, %s, %s, %s"
+    if con_detalle:
+        cur.execute("ALTER TABLE PUBLIC.LOG_RPA_EJECUCION_PASO ADD COLUMN IF NOT EXISTS DETALLE JSONB")
+        columnas += ", DETALLE"
+        valores += ", %s::jsonb"
+
+    filas = []
+    for paso in pasos_ordenados:
+        fila = (
+            id_ejecucion,
+            paso.get("num_paso"),
+            paso.get("descripcion"),
+            paso.get("tiempo_paso"),
+            paso.get("tiempo_total"),
+            paso.get("cpu"),
+            paso.get("ram"),
+            paso.get("py_mem"),
+        )
+        if con_detalle:
+            detalle = paso.get("detalle")
+            fila += (json.dumps(detalle, default=str) if detalle else None,)
+        filas.append(fila)
+
+    cur.executemany(
+        f"INSERT INTO PUBLIC.LOG_RPA_EJECUCION_PASO ({columnas}) VALUES ({valores})",
+        filas,
+    )
+
+
+def guardar_detalle_ejecucion(cur, id_ejecucion: int, detalle: dict):
+    """Guarda el detalle de la ejecución (resumen HAR, ...) en LOG_RPA_EJECUCION.DETALLE (JSONB)."""
+    if not detalle:
+        return
+    cur.execute("ALTER TABLE PUBLIC.LOG_RPA_EJECUCION ADD COLUMN IF NOT EXISTS DETALLE JSONB")
+    cur.execute(
+        "UPDATE PUBLIC.LOG_RPA_EJECUCION SET DETALLE = %s::jsonb WHERE ID_EJECUCION = %s",
+        (json.dumps(detalle, default=str), id_ejecucion),
+    )
@@ -0,0 +1,373 @@
+import json
+import os
+import re
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+
+# ========================
+# CACHE LOCAL DE CHROMEDRIVER
+# ========================
+# ChromeDriverManager().install() hace descubrimiento de versión (y a veces red)
+# en cada ejecución. Aquí se fija un chromedriver por versión mayor de Chrome y
+# solo se vuelve a resolver cuando la versión instalada de Chrome cambia.
+
+DRIVER_CACHE_DIR = Path(
+    os.getenv(
+        "HIK_CHROMEDRIVER_CACHE",
+        str(Path(__file__).resolve().parent / "drivers"),
+    )
+)
+DRIVER_CACHE_FILE = DRIVER_CACHE_DIR / "chromedriver_cache.json"
+
+CHROME_REGISTRY_KEYS = [
+    ("HKEY_CURRENT_USER", r"Software\Google\Chrome\BLBeacon"),
+    ("HKEY_LOCAL_MACHINE", r"Software\Google\Chrome\BLBeacon"),
+    ("HKEY_LOCAL_MACHINE", r"Software\WOW6432Node\Google\Chrome\BLBeacon"),
+]
+
+CHROME_WINDOWS_DIRS = [
+    Path(os.environ.get("PROGRAMFILES", r"C:\Program Files")) / "Google" / "Chrome" / "Application",
+    Path(os.environ.get("PROGRAMFILES(X86)", r"C:\Program Files (x86)")) / "Google" / "Chrome" / "Application",
+    Path(os.environ.get("LOCALAPPDATA", str(Path.home()))) / "Google" / "Chrome" / "Application",
+]
+
+CHROME_BINARIES = [
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+]
+
+VERSION_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)\.(\d+)")
+
+
+def version_mayor(version: str | None) -> int | None:
+    if not version:
+        return None
+    match = VERSION_RE.search(version)
+    if not match:
+        return None
+    return int(match.group(1))
+
+
+def _version_desde_registro() -> str | None:
+    try:
+        import winreg
+    except ImportError:
+        return None
+
+    for hive_name, key_path in CHROME_REGISTRY_KEYS:
+        hive = getattr(winreg, hive_name)
+        try:
+            with winreg.OpenKey(hive, key_path) as key:
+                value, _ = winreg.QueryValueEx(key, "version")
+                if value:
+                    return str(value)
+        except OSError:
+            continue
+    return None
+
+
+def _version_desde_carpetas() -> str | None:
+    """Chrome en Windows instala cada versión en una carpeta Application/<version>."""
+    versiones: list[tuple[tuple[int, ...], str]] = []
+    for base in CHROME_WINDOWS_DIRS:
+        if not base.is_dir():
+            continue
+        for child in base.iterdir():
+            match = VERSION_RE.fullmatch(child.name)
+            if child.is_dir() and match:
+                versiones.append((tuple(int(p) for p in match.groups()), child.name))
+    if not versiones:
+        return None
+    return max(versiones)[1]
+
+
+def _version_desde_binario() -> str | None:
+    if sys.platform.startswith("win"):
+        # En Windows `chrome --version` abre el navegador en lugar de imprimir la versión.
+        return None
+
+    for binario in CHROME_BINARIES:
+        ruta = binario if os.path.isabs(binario) else shutil.which(binario)
+        if not ruta or not os.path.exists(ruta):
+            continue
+        try:
+            salida = subprocess.run(
+                [ruta, "--version"],
+                capture_output=True,
+                text=True,
+                timeout=10,
+            ).stdout
+        except (OSError, subprocess.SubprocessError):
+            continue
+        match = VERSION_RE.search(salida or "")
+        if match:
+            return match.group(0)
+    return None
+
+
+def detectar_version_chrome() -> str | None:
+    """
+    Devuelve la versión de Chrome instalada sin usar red.
+    Orden: HIK_CHROME_VERSION, registro de Windows, carpetas de instalación, binario.
+    """
+    env_version = os.getenv("HIK_CHROME_VERSION")
+    if env_version and env_version.strip():
+        return env_version.strip()
+
+    for detector in (_version_desde_registro, _version_desde_carpetas, _version_desde_binario):
+        version = detector()
+        if version:
+            return version
+    return None
+
+
+def detectar_version_driver(driver_path: Path) -> str | None:
+    try:
+        salida = subprocess.run(
+            [str(driver_path), "--version"],
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = VERSION_RE.search(salida or "")
+    return match.group(0) if match else None
+
+
+def _leer_cache() -> dict:
+    try:
+        with open(DRIVER_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_cache(data: dict):
+    DRIVER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = DRIVER_CACHE_FILE.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, DRIVER_CACHE_FILE)
+
+
+def _fijar_driver(origen: Path, chrome_major: int | None) -> Path:
+    """Copia el chromedriver resuelto a DRIVER_CACHE_DIR/<major>/ para que no dependa del cache de webdriver_manager."""
+    carpeta = DRIVER_CACHE_DIR / (str(chrome_major) if chrome_major is not None else "desconocido")
+    carpeta.mkdir(parents=True, exist_ok=True)
+    destino = carpeta / origen.name
+    if origen.resolve() != destino.resolve():
+        shutil.copy2(origen, destino)
+    try:
+        modo = destino.stat().st_mode
+        destino.chmod(modo | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    except OSError:
+        pass
+    return destino
+
+
+def _descargar_driver() -> Path:
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    return Path(ChromeDriverManager().install())
+
+
+def driver_en_cache_compatible(chrome_version: str | None) -> Path | None:
+    """
+    Devuelve el chromedriver del cache si existe y su versión mayor coincide con Chrome.
+    No ejecuta procesos ni usa red: solo lee el JSON del cache.
+    """
+    cache = _leer_cache()
+    ruta = cache.get("driver_path")
+    if not ruta or not Path(ruta).is_file():
+        return None
+
+    chrome_major = version_mayor(chrome_version)
+    driver_major = version_mayor(cache.get("driver_version")) or cache.get("chrome_major")
+    if chrome_major is None:
+        # No se pudo detectar Chrome: se confía en el driver fijado.
+        return Path(ruta)
+    if driver_major == chrome_major:
+        return Path(ruta)
+
+    print(
+        f"[DRIVER] Versión de Chrome cambió ({cache.get('chrome_version')} -> {chrome_version}), "
+        "se resolverá un nuevo chromedriver."
+    )
+    return None
+
+
+_lock_resolucion = threading.Lock()
+
+
+def resolver_chromedriver() -> str:
+    """
+    Devuelve la ruta a un chromedriver compatible con el Chrome instalado.
+
+    - CHROMEDRIVER_PATH tiene prioridad si apunta a un archivo existente.
+    - Si el cache local tiene un driver de la misma versión mayor, se usa sin red.
+    - Solo ante un cambio de versión (o cache vacío) se llama a ChromeDriverManager.
+    Serializado con un lock: varias sesiones en paralelo no descargan a la vez.
+    """
+    with _lock_resolucion:
+        return _resolver_chromedriver()
+
+
+def _resolver_chromedriver() -> str:
+    override = os.getenv("CHROMEDRIVER_PATH")
+    if override and Path(override).is_file():
+        return override
+
+    chrome_version = detectar_version_chrome()
+    cacheado = driver_en_cache_compatible(chrome_version)
+    if cacheado is not None:
+        print(f"[DRIVER] chromedriver en cache: {cacheado} (Chrome {chrome_version or 'no detectado'})")
+        return str(cacheado)
+
+    anterior = _leer_cache().get("driver_path")
+    try:
+        descargado = _descargar_driver()
+    except Exception as exc:
+        if anterior and Path(anterior).is_file():
+            print(f"[WARN] No se pudo actualizar chromedriver ({exc}); se usa el fijado: {anterior}")
+            return anterior
+        raise
+
+    chrome_major = version_mayor(chrome_version)
+    fijado = _fijar_driver(descargado, chrome_major)
+    driver_version = detectar_version_driver(fijado)
+    _guardar_cache(
+        {
+            "driver_path": str(fijado),
+            "driver_version": driver_version,
+            "chrome_version": chrome_version,
+            "chrome_major": chrome_major,
+            "actualizado": datetime.now().isoformat(timespec="seconds"),
+        }
+    )
+    print(f"[DRIVER] chromedriver fijado: {fijado} (driver {driver_version}, Chrome {chrome_version})")
+    return str(fijado)
+
+
+# ========================
+# PERFIL "LEAN" DEL NAVEGADOR
+# ========================
+# El portal HikCentral descarga mapas, imágenes, fuentes y widgets en vivo que
+# los flujos RPA no usan. El perfil lean los bloquea vía CDP, fija un viewport
+# pequeño y usa un user-data-dir desechable (en /dev/shm si existe).
+
+LEAN_WINDOW_SIZE = os.getenv("HIK_LEAN_WINDOW_SIZE", "1366,768")
+
+LEAN_BLOCKED_URLS = [
+    "*.png",
+    "*.jpg",
+    "*.jpeg",
+    "*.gif",
+    "*.webp",
+    "*.bmp",
+    "*.ico",
+    "*.woff",
+    "*.woff2",
+    "*.ttf",
+    "*.otf",
+    "*.eot",
+    "*.mp4",
+    "*.webm",
+    "*.flv",
+    "*.m3u8",
+    "*/tiles/*",
+    "*maptile*",
+    "*/ISAPI/Streaming/*",
+]
+
+LEAN_CHROME_ARGS = [
+    "--disable-background-timer-throttling",
+    "--disable-backgrounding-occluded-windows",
+    "--disable-renderer-backgrounding",
+    "--disable-extensions",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--disk-cache-size=1",
+]
+
+
+def perfil_lean_solicitado(flag: bool = False) -> bool:
+    return flag or os.getenv("HIK_BROWSER_PROFILE", "").strip().lower() == "lean"
+
+
+def headless_solicitado(flag: bool = False) -> bool:
+    return flag or os.getenv("HIK_HEADLESS", "0").strip() == "1"
+
+
+def _lean_blocked_urls() -> list[str]:
+    env_urls = os.getenv("HIK_LEAN_BLOCKED_URLS")
+    if env_urls is None:
+        return list(LEAN_BLOCKED_URLS)
+    return [u.strip() for u in env_urls.split(",") if u.strip()]
+
+
+def _crear_user_data_dir() -> Path:
+    base = os.getenv("HIK_LEAN_USER_DATA_ROOT")
+    if not base and Path("/dev/shm").is_dir():
+        base = "/dev/shm"
+    return Path(tempfile.mkdtemp(prefix="hik_lean_", dir=base or None))
+
+
+def aplicar_opciones_lean(chrome_options, headless: bool = False) -> Path:
+    """
+    Agrega al Options de Chrome los argumentos del perfil lean.
+    Devuelve el user-data-dir temporal creado, que se borra en cerrar_driver().
+    """
+    user_data_dir = _crear_user_data_dir()
+
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument(f"--window-size={LEAN_WINDOW_SIZE}")
+    chrome_options.add_argument(f"--user-data-dir={user_data_dir}")
+    for arg in LEAN_CHROME_ARGS:
+        chrome_options.add_argument(arg)
+
+    return user_data_dir
+
+
+def activar_bloqueo_recursos(driver):
+    """Bloquea recursos no esenciales y evita que la pestaña de export sea tratada como en segundo plano."""
+    urls = _lean_blocked_urls()
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        if urls:
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": urls})
+        driver.execute_cdp_cmd("Emulation.setFocusEmulationEnabled", {"enabled": True})
+        driver.execute_cdp_cmd("Page.setWebLifecycleState", {"state": "active"})
+    except Exception as exc:
+        print(f"[WARN] No se pudo aplicar el bloqueo de recursos del perfil lean: {exc}")
+        return
+    print(f"[DRIVER] Perfil lean activo: {len(urls)} patrones bloqueados")
+
+
+def cerrar_driver(driver):
+    """driver.quit() y borra el user-data-dir temporal del perfil lean, si existe."""
+    user_data_dir = getattr(driver, "hik_user_data_dir", None)
+    try:
+        driver.quit()
+    finally:
+        if user_data_dir:
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    print(resolver_chromedriver())
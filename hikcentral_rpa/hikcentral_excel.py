@@ -0,0 +1,200 @@
+import csv
+import io
+import os
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+
+# ========================
+# LECTOR DE EXCEL (backend intercambiable)
+# ========================
+# Las cargas leían con pd.read_excel y el engine openpyxl por defecto, lo más lento en
+# libros grandes. Acá cada backend solo entrega las filas de la hoja (lista de listas, con
+# la misma conversión de celdas que hacen los engines de pandas) y todas pasan por el mismo
+# TextParser que usa read_excel, así header / dtype / NaN quedan iguales sea cual sea el backend:
+#   calamine  python-calamine (Rust); ~10x más rápido que read_excel en bench_lector_excel
+#   openpyxl  openpyxl read_only con values_only; da lo mismo que read_excel pero casi no
+#             lo mejora, por eso no está en la selección automática
+#   csv       xlsx2csv a CSV en memoria y csv.reader (~2.5x); fechas y números tipados del
+#             libro llegan como texto, así que solo a pedido
+#   pandas    pd.read_excel tal cual (lo de antes y la referencia del benchmark)
+# En auto se usa el primero instalado de ORDEN_AUTO (el orden sale de bench_lector_excel).
+#   HIK_EXCEL_BACKEND         auto (default) | calamine | openpyxl | csv | pandas
+
+BACKENDS = ("calamine", "openpyxl", "csv", "pandas")
+ORDEN_AUTO = ("calamine", "pandas")
+
+# Módulo que necesita cada backend
+_MODULOS = {
+    "calamine": "python_calamine",
+    "openpyxl": "openpyxl",
+    "csv": "xlsx2csv",
+    "pandas": "openpyxl",
+}
+
+_backend_activo: str | None = None
+_lock = threading.Lock()
+
+
+def backend_disponible(backend: str) -> bool:
+    try:
+        __import__(_MODULOS[backend])
+    except ImportError:
+        return False
+    return True
+
+
+def backends_disponibles() -> list[str]:
+    return [b for b in BACKENDS if backend_disponible(b)]
+
+
+def backend_excel() -> str:
+    """Backend del proceso: HIK_EXCEL_BACKEND si está instalado, si no el primero de ORDEN_AUTO."""
+    global _backend_activo
+    with _lock:
+        if _backend_activo is not None:
+            return _backend_activo
+
+        pedido = os.getenv("HIK_EXCEL_BACKEND", "auto").strip().lower()
+        if pedido not in ("auto", *BACKENDS):
+            print(f"[WARN] HIK_EXCEL_BACKEND={pedido} no existe; se elige automáticamente.")
+        elif pedido != "auto" and not backend_disponible(pedido):
+            print(f"[WARN] Backend de Excel {pedido} sin {_MODULOS[pedido]} instalado; se elige automáticamente.")
+        elif pedido != "auto":
+            _backend_activo = pedido
+
+        if _backend_activo is None:
+            _backend_activo = next((b for b in ORDEN_AUTO if backend_disponible(b)), "pandas")
+        print(f"[EXCEL] Lector de Excel: {_backend_activo}")
+        return _backend_activo
+
+
+def _rebobinar(origen):
+    if hasattr(origen, "seek"):
+        origen.seek(0)
+    return origen
+
+
+def _numero(valor):
+    # Igual que los engines de pandas: 5.0 -> 5
+    if isinstance(valor, float):
+        entero = int(valor)
+        if entero == valor:
+            return entero
+    return valor
+
+
+def _celda_calamine(valor):
+    # calamine entrega date si la hora es 00:00; openpyxl siempre datetime
+    if isinstance(valor, date) and not isinstance(valor, datetime):
+        return datetime(valor.year, valor.month, valor.day)
+    return _numero(valor)
+
+
+def _normalizar(filas) -> list[list]:
+    """Como get_sheet_data de pandas: sin celdas vacías al final, sin filas vacías al final, ancho parejo."""
+    datos: list[list] = []
+    ultima_con_datos = -1
+    for numero, fila in enumerate(filas):
+        fila = list(fila)
+        while fila and fila[-1] == "":
+            fila.pop()
+        if fila:
+            ultima_con_datos = numero
+        datos.append(fila)
+    datos = datos[: ultima_con_datos + 1]
+    if datos:
+        ancho = max(len(f) for f in datos)
+        datos = [f + [""] * (ancho - len(f)) for f in datos]
+    return datos
+
+
+def _filas_calamine(origen, hoja: str | None):
+    from python_calamine import CalamineWorkbook
+
+    if hasattr(origen, "read"):
+        libro = CalamineWorkbook.from_filelike(origen)
+    else:
+        libro = CalamineWorkbook.from_path(str(origen))
+    if hoja is None:
+        sheet = libro.get_sheet_by_index(0)
+    elif hoja in libro.sheet_names:
+        sheet = libro.get_sheet_by_name(hoja)
+    else:
+        raise ValueError(f"Worksheet named '{hoja}' not found")
+    return [[_celda_calamine(v) for v in fila] for fila in sheet.to_python(skip_empty_area=False)]
+
+
+def _filas_openpyxl(origen, hoja: str | None):
+    from openpyxl import load_workbook
+    from openpyxl.cell.cell import ERROR_CODES
+
+    libro = load_workbook(origen, read_only=True, data_only=True, keep_links=False)
+    try:
+        if hoja is None:
+            ws = libro.worksheets[0]
+        elif hoja in libro.sheetnames:
+            ws = libro[hoja]
+        else:
+            raise ValueError(f"Worksheet named '{hoja}' not found")
+        # Las dimensiones guardadas en el xlsx pueden estar mal (pandas hace lo mismo)
+        ws.reset_dimensions()
+        return [
+            [
+                "" if v is None else np.nan if isinstance(v, str) and v in ERROR_CODES else _numero(v)
+                for v in fila
+            ]
+            for fila in ws.iter_rows(values_only=True)
+        ]
+    finally:
+        libro.close()
+
+
+def _filas_csv(origen, hoja: str | None):
+    from xlsx2csv import Xlsx2csv
+
+    conversor = Xlsx2csv(origen, outputencoding="utf-8", dateformat="%Y-%m-%d %H:%M:%S", skip_empty_lines=False)
+    if hoja is None:
+        sheetid = 1
+    else:
+        sheetid = conversor.getSheetIdByName(hoja)
+        if not sheetid:
+            raise ValueError(f"Worksheet named '{hoja}' not found")
+    salida = io.StringIO()
+    conversor.convert(salida, sheetid=sheetid)
+    salida.seek(0)
+    return list(csv.reader(salida))
+
+
+_FILAS = {
+    "calamine": _filas_calamine,
+    "openpyxl": _filas_openpyxl,
+    "csv": _filas_csv,
+}
+
+
+def leer_excel(
+    origen: str | Path | io.BytesIO,
+    hoja: str | None = None,
+    header: int | None = 0,
+    dtype=None,
+    backend: str | None = None,
+) -> pd.DataFrame:
+    """
+    Equivalente a pd.read_excel(origen, sheet_name=hoja or 0, header=header, dtype=dtype)
+    con el backend del proceso (o `backend`, lo usa el benchmark).
+    """
+    backend = backend or backend_excel()
+    origen = _rebobinar(origen)
+    if backend == "pandas":
+        return pd.read_excel(origen, sheet_name=hoja if hoja is not None else 0, header=header, dtype=dtype)
+
+    datos = _normalizar(_FILAS[backend](origen, hoja))
+    if not datos:
+        return pd.DataFrame()
+    return TextParser(datos, header=header, dtype=dtype).read()
@@ -1,4 +1,6 @@
+import argparse
 import os
+import shutil
 import time
 import traceback
 from pathlib import Path
@@ -15,7 +17,18 @@ from selenium.webdriver import ActionChains
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
+
+from hikcentral_contexto import RunContext
+from hikcentral_driver import (
+    activar_bloqueo_recursos,
+    aplicar_opciones_lean,
+    cerrar_driver,
+    headless_solicitado,
+    perfil_lean_solicitado,
+    resolver_chromedriver,
+)
+from hikcentral_hosts import host_disponible
+from hikcentral_timeouts import PLAZO_SEG, Plazo, espera, plazo_solicitado
 
 
 # ========================
@@ -28,17 +41,20 @@ HIK_USER = os.getenv("HIK_USER", "Analitica_reportes")
 HIK_PASSWORD = os.getenv("HIK_PASSWORD", "AbcDef*91Ghj#")
 
 DOWNLOAD_DIR = Path(r"C:\\portal-sw\SecurityWorld\hikcentral_rpa\downloads")
+LOG_DIR = Path(os.getenv("HIK_LOG_DIR") or r"C:\\portal-sw\\SecurityWorld\\hikcentral_rpa\\logs")
 
 
-def crear_driver() -> webdriver.Chrome:
+def crear_driver(
+    lean: bool = False, headless: bool = False, download_dir: Path = DOWNLOAD_DIR
+) -> webdriver.Chrome:
     """Configura y devuelve un driver de Chrome listo para descargar archivos."""
 
-    DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    download_dir.mkdir(parents=True, exist_ok=True)
 
     chrome_options = Options()
 
     prefs = {
-        "download.default_directory": str(DOWNLOAD_DIR),
+        "download.default_directory": str(download_dir),
         "download.prompt_for_download": False,
         "download.directory_upgrade": True,
         "safebrowsing.enabled": False,
@@ -53,21 +69,37 @@ def crear_driver() -> webdriver.Chrome:
     chrome_options.add_argument("--safebrowsing-disable-download-protection")
     chrome_options.add_argument("--disable-popup-blocking")
     chrome_options.add_argument("--disable-features=BlockInsecureDownloadRestrictions,DownloadBubble")
-    chrome_options.add_argument("--start-maximized")
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    lean = perfil_lean_solicitado(lean)
+    user_data_dir = None
+    if lean:
+        user_data_dir = aplicar_opciones_lean(chrome_options, headless=headless_solicitado(headless))
+    else:
+        chrome_options.add_argument("--start-maximized")
+
+    try:
+        service = Service(resolver_chromedriver())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        # Sin driver no hay cerrar_driver(): el user-data-dir temporal se borra acá
+        if user_data_dir:
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+        raise
+    driver.hik_user_data_dir = user_data_dir
 
     driver.execute_cdp_cmd(
         "Page.setDownloadBehavior",
         {
             "behavior": "allow",
-            "downloadPath": str(DOWNLOAD_DIR),
+            "downloadPath": str(download_dir),
         },
     )
 
-    driver.maximize_window()
-    print(f"[DEBUG] DOWNLOAD_DIR = {DOWNLOAD_DIR}")
+    if lean:
+        activar_bloqueo_recursos(driver)
+    else:
+        driver.maximize_window()
+    print(f"[DEBUG] DOWNLOAD_DIR = {download_dir}")
     return driver
 
 
@@ -85,6 +117,7 @@ def esperar_descarga(download_dir: Path, archivos_previos, timeout: int = 120) -
 
     print("[9] Esperando archivo descargado...")
     inicio = time.time()
+    timeout = espera("descarga", timeout)
 
     while True:
         archivos_actuales = os.listdir(download_dir)
@@ -117,7 +150,7 @@ def export_camera_status_to_excel(driver: webdriver.Chrome, wait: WebDriverWait,
     print("[8] Abriendo panel de exportación desde Camera...")
 
     # Guardar listado previo de archivos para detectar el nuevo
-    archivos_previos = os.listdir(DOWNLOAD_DIR)
+    archivos_previos = os.listdir(download_dir)
 
     # 1) Click en el botón Export del header de la pestaña Camera
     export_toolbar_button = wait.until(
@@ -164,7 +197,7 @@ def export_camera_status_to_excel(driver: webdriver.Chrome, wait: WebDriverWait,
     driver.execute_script("arguments[0].click();", export_confirm_button)
 
     # 5) Esperar que el archivo termine de descargarse en download_dir
-    archivo_descargado = esperar_descarga(DOWNLOAD_DIR, archivos_previos, timeout=180)
+    archivo_descargado = esperar_descarga(download_dir, archivos_previos, timeout=180)
     print(f"[10] Archivo descargado en: {archivo_descargado}")
 
 
@@ -289,7 +322,7 @@ def abrir_menu_resource_status(driver, wait):
         ),
     ]
 
-    local_wait = WebDriverWait(driver, 45)
+    local_wait = WebDriverWait(driver, espera("menu", 45))
 
     def intentar_click_resource_status(d):
         for by, selector in locators:
@@ -382,7 +415,7 @@ def esperar_tabla_camaras(driver, wait, timeout: int = 30):
         # Consideramos que la tabla "cargó" si tiene filas o si aparece el bloque vacío
         return len(filas) > 0 or len(empty) > 0
 
-    wait.until(tabla_cargada)
+    WebDriverWait(driver, espera("menu", timeout)).until(tabla_cargada)
 
 
 def cerrar_sesion(driver, wait: WebDriverWait):
@@ -417,16 +450,42 @@ def cerrar_sesion(driver, wait: WebDriverWait):
         print("[WARN] No se pudo cerrar sesión limpiamente.")
 
 
-def run():
-    driver = crear_driver()
-    wait = WebDriverWait(driver, 30)
+def run(
+    lean: bool = False,
+    headless: bool = False,
+    url: str = URL,
+    download_dir: Path = DOWNLOAD_DIR,
+    profile: bool = False,
+    plazo: Plazo | None = None,
+):
+    """URL y carpeta de descargas llegan por parámetro, así se puede correr por host en paralelo."""
+    if not host_disponible(url):
+        print(f"[ERROR] HikCentral no responde en {url}. Se omite la ejecución.")
+        return
+
+    # Este flujo no tiene fase de carga ni registro en la base: el contexto aporta el plazo
+    # (default HIK_PLAZO_SEG, lo pone el scheduler) y el perfil, que se guarda con fecha
+    ctx = RunContext(
+        opcion="Cameras",
+        url=url,
+        download_dir=download_dir,
+        perfil=profile,
+        log_dir=LOG_DIR,
+        plazo=plazo,
+    )
+    token = ctx.activar()
+    ctx.iniciar_fase("automatizacion")
+    driver = None
+    wait = None
 
     try:
-        print(f"[DEBUG] DOWNLOAD_DIR = {DOWNLOAD_DIR}")
+        driver = crear_driver(lean=lean, headless=headless, download_dir=download_dir)
+        wait = WebDriverWait(driver, espera("ui", 30))
+
         print("[1] Navegando a la URL...")
-        driver.get(URL)
+        driver.get(url)
         driver.delete_all_cookies()
-        driver.get(URL)
+        driver.get(url)
 
         # ========================
         # LOGIN
@@ -472,25 +531,45 @@ def run():
 
 
             # 2) Iniciar el flujo robusto de exportación
-            limpiar_descargas(DOWNLOAD_DIR)
-            export_camera_status_to_excel(driver, wait, DOWNLOAD_DIR)
+            limpiar_descargas(download_dir)
+            export_camera_status_to_excel(driver, wait, download_dir)
 
             # Aquí podrías añadir lógica adicional para renombrar/mover el archivo descargado
         except Exception as e:
+            if ctx.plazo_vencido():
+                raise
             print(f"[ERROR] Ocurrió un problema en la exportación de cámaras: {e}")
             raise
 
     except Exception as e:
-        print(f"[ERROR] Ocurrió un problema: {e.__class__.__name__}: {e}")
-        traceback.print_exc()
+        if not ctx.fin_por_plazo(e):
+            print(f"[ERROR] Ocurrió un problema: {e.__class__.__name__}: {e}")
+            traceback.print_exc()
     finally:
         if driver:
             try:
-                cerrar_sesion(driver, wait)
+                if wait:
+                    # Con el plazo vencido el logout solo usa lo reservado, sin esperas largas
+                    cerrar_sesion(driver, WebDriverWait(driver, 5) if ctx.plazo_vencido() else wait)
             except Exception:
                 pass
-            driver.quit()
+            cerrar_driver(driver)
+        ctx.cerrar()
+        ctx.desactivar(token)
 
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Exportar el estado de cámaras de HikCentral a Excel.")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfila la automatización; perfil en LOG_DIR/perfiles (también HIK_PROFILE=1).",
+    )
+    parser.add_argument(
+        "--plazo-seg",
+        type=float,
+        default=PLAZO_SEG,
+        help="Plazo total de la ejecución; vencido, se corta con estado deadline (también HIK_PLAZO_SEG).",
+    )
+    args = parser.parse_args()
+    run(profile=args.profile, plazo=plazo_solicitado(args.plazo_seg))
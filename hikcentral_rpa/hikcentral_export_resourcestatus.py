@@ -1,6 +1,8 @@
 import argparse
+import io
 import os
 import re
+import shutil
 import time
 from datetime import datetime
 import traceback
@@ -8,7 +10,6 @@ from pathlib import Path
 
 import pandas as pd
 import numpy as np
-import psutil
 import psycopg2
 from dotenv import load_dotenv
 from psycopg2.extras import execute_batch
@@ -23,121 +24,40 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-
-
-class PerformanceRecorder:
-    def __init__(self, start_time: float | None = None):
-        self.start_time = start_time if start_time is not None else time.perf_counter()
-        self.steps: list[dict] = []
-        self.cpu_max: float | None = None
-        self.proc = psutil.Process(os.getpid())
-
-    def _parse_step_label(self, label: str) -> tuple[int | None, str]:
-        match = re.search(r"\[(\d+)\]", label)
-        if not match:
-            return None, label
-
-        return int(match.group(1)), label.strip()
-
-    def _update_cpu_max(self, cpu_percent: float):
-        if self.cpu_max is None or cpu_percent > self.cpu_max:
-            self.cpu_max = cpu_percent
-
-    def update_cpu(self, cpu_percent: float):
-        self._update_cpu_max(cpu_percent)
-
-    def add_step(
-        self,
-        label: str,
-        step_secs: float,
-        total_secs: float,
-        cpu_percent: float,
-        mem_percent: float,
-        proc_mem_mb: float,
-    ):
-        num_paso, descripcion = self._parse_step_label(label)
-        if num_paso is None:
-            return
-
-        self._update_cpu_max(cpu_percent)
-        self.steps.append(
-            {
-                "num_paso": num_paso,
-                "descripcion": descripcion,
-                "tiempo_paso": round(step_secs, 2),
-                "tiempo_total": round(total_secs, 2),
-                "cpu": round(cpu_percent, 1),
-                "ram": round(mem_percent, 1),
-                "py_mem": int(proc_mem_mb),
-            }
-        )
-
-    def record_baseline(self, cpu_percent: float, mem_percent: float):
-        self._update_cpu_max(cpu_percent)
-        total_secs = time.perf_counter() - self.start_time
-        self.steps.append(
-            {
-                "num_paso": 0,
-                "descripcion": "[0] Baseline antes de automatizar",
-                "tiempo_paso": 0.0,
-                "tiempo_total": round(total_secs, 2),
-                "cpu": round(cpu_percent, 1),
-                "ram": round(mem_percent, 1),
-                "py_mem": int(self.proc.memory_info().rss / (1024**2)),
-            }
-        )
-
-
-class StepTimer:
-    def __init__(self, start_time: float | None = None, recorder: PerformanceRecorder | None = None):
-        self.start = start_time if start_time is not None else time.perf_counter()
-        self.last = self.start
-        self.recorder = recorder
-        # Proceso actual, para medir memoria del script de Python
-        self.proc = psutil.Process(os.getpid())
-
-    def mark(self, label: str):
-        """
-        Imprime:
-        - tiempo del paso
-        - tiempo total desde el inicio
-        - CPU y RAM del servidor
-        - RAM usada por este proceso de Python
-        """
-        now = time.perf_counter()
-        step_secs = now - self.last
-        total_secs = now - self.start
-
-        # Recursos del servidor
-        cpu_percent = psutil.cpu_percent(interval=0.1)          # CPU total del server
-        registrar_cpu(cpu_percent)
-        mem = psutil.virtual_memory()
-        mem_percent = mem.percent                               # % RAM total usada
-        proc_mem_mb = self.proc.memory_info().rss / (1024**2)   # MB usados por este script
-
-        print(
-            f"[PERF] {label:<45} "
-            f"paso: {step_secs:6.2f}s | total: {total_secs:6.2f}s | "
-            f"CPU: {cpu_percent:5.1f}% | RAM: {mem_percent:5.1f}% | "
-            f"PY-MEM: {proc_mem_mb:6.1f} MB"
-        )
-
-        if self.recorder:
-            self.recorder.add_step(
-                label,
-                step_secs,
-                total_secs,
-                cpu_percent,
-                mem_percent,
-                proc_mem_mb,
-            )
 
-        self.last = now
+from hikcentral_contexto import (
+    PerformanceRecorder,
+    RunContext,
+    StepTimer,
+    guardar_detalle_ejecucion,
+    insertar_pasos_ejecucion,
+)
+from hikcentral_driver import (
+    activar_bloqueo_recursos,
+    aplicar_opciones_lean,
+    cerrar_driver,
+    headless_solicitado,
+    perfil_lean_solicitado,
+    resolver_chromedriver,
+)
+from hikcentral_excel import leer_excel
+from hikcentral_fetch_intercept import InterceptorExport
+from hikcentral_har import grabar_har
+from hikcentral_hosts import host_disponible
+from hikcentral_http_export import (
+    exportar_por_http,
+    habilitar_captura_red,
+    registrar_receta_desde_ui,
+)
+from hikcentral_memoria import etapas_memoria
+from hikcentral_openapi import extraer_resource_status_openapi
+from hikcentral_perfilado import perfilado
+from hikcentral_regresiones import revisar_ejecucion
+from hikcentral_spool import encolar_export
+from hikcentral_timeouts import PLAZO_SEG, Plazo, espera, plazo_solicitado
+from hikcentral_trace import instrumentar_driver, trazado
 
 
-# ========================
-# CONFIGURACIÓN GENERAL
 # ========================
 BASE_DIR = Path(__file__).resolve().parents[1]
 ENV_PATH = BASE_DIR / ".env"
@@ -148,15 +68,8 @@ SCRIPT_NAME = "hikcentral_export_resourcestatus.py"
 HIK_USER = os.getenv("HIK_USER", "Analitica_reportes")
 HIK_PASSWORD = os.getenv("HIK_PASSWORD", "SW2112asm")
 
-DOWNLOAD_DIR = Path(r"C:\\portal-sw\\SecurityWorld\\hikcentral_rpa\\downloads")
-
-cpu_measurements: list[float] = []
-step_timer: StepTimer | None = None
-performance_recorder: PerformanceRecorder | None = None
-
-
-def registrar_cpu(medicion: float):
-    cpu_measurements.append(medicion)
+LOG_DIR = Path(os.getenv("HIK_LOG_DIR") or r"C:\\portal-sw\\SecurityWorld\\hikcentral_rpa\\logs")
+DOWNLOAD_DIR = Path(os.getenv("HIK_DOWNLOAD_DIR") or r"C:\\portal-sw\\SecurityWorld\\hikcentral_rpa\\downloads")
 
 
 def get_pg_connection():
@@ -175,9 +88,10 @@ def registrar_ejecucion_y_pasos(
     cpu_final: float,
     ram_final: float,
     recorder: PerformanceRecorder | None,
+    conn=None,
 ):
     try:
-        conn = get_pg_connection()
+        conn = conn or get_pg_connection()
 
         cpu_max_value = recorder.cpu_max if recorder and recorder.cpu_max is not None else 0.0
         observacion = (
@@ -207,48 +121,37 @@ def registrar_ejecucion_y_pasos(
                 id_ejecucion = cur.fetchone()[0]
 
                 if recorder:
-                    pasos_ordenados = sorted(recorder.steps, key=lambda x: x.get("num_paso", 0))
-                    cur.executemany(
-                        """
-                        INSERT INTO PUBLIC.LOG_RPA_EJECUCION_PASO
-                        (ID_EJECUCION, NUM_PASO, DESCRIPCION, TIEMPO_PASO_SEG, TIEMPO_TOTAL_SEG, CPU_PORCENTAJE, RAM_PORCENTAJE, PY_MEM_NIVEL)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        [
-                            (
-                                id_ejecucion,
-                                paso.get("num_paso"),
-                                paso.get("descripcion"),
-                                paso.get("tiempo_paso"),
-                                paso.get("tiempo_total"),
-                                paso.get("cpu"),
-                                paso.get("ram"),
-                                paso.get("py_mem"),
-                            )
-                            for paso in pasos_ordenados
-                        ],
-                    )
+                    insertar_pasos_ejecucion(cur, id_ejecucion, recorder.steps)
+                    if recorder.perfilador:
+                        recorder.perfilador.guardar(id_ejecucion)
+                    guardar_detalle_ejecucion(cur, id_ejecucion, recorder.detalle)
 
         print("[INFO] Registro de rendimiento y pasos insertado correctamente.")
+        if recorder:
+            revisar_ejecucion(conn, id_ejecucion)
     except Exception as e:
         print(f"[ERROR] No se pudo registrar el rendimiento en la base de datos: {e}")
 
 
-def process_camera_resource_status(excel_path: str) -> None:
-    excel_file = Path(excel_path)
-    if not excel_file.exists():
-        excel_file = max(
-            DOWNLOAD_DIR.glob("Camera_*.xlsx"),
-            key=lambda p: p.stat().st_mtime,
-            default=None,
-        )
+def process_camera_resource_status(excel_path: str | io.BytesIO) -> None:
+    if isinstance(excel_path, io.BytesIO):
+        excel_file = excel_path
+    else:
+        excel_file = Path(excel_path)
+        if not excel_file.exists():
+            excel_file = max(
+                DOWNLOAD_DIR.glob("Camera_*.xlsx"),
+                key=lambda p: p.stat().st_mtime,
+                default=None,
+            )
 
-    if not excel_file or not excel_file.exists():
-        print("[ERROR] No se encontró un archivo de cámara para procesar.")
-        return
+        if not excel_file or not excel_file.exists():
+            raise FileNotFoundError(f"No se encontró un archivo de cámara para procesar: {excel_path}")
 
+    mem = etapas_memoria("Camera")
     try:
-        df = pd.read_excel(excel_file, sheet_name="Camera", header=7)
+        df = leer_excel(excel_file, hoja="Camera", header=7)
+        mem.marcar("read_excel")
         df = df[df["Name"].notna()].copy()
         df = df[
             [
@@ -278,6 +181,7 @@ def process_camera_resource_status(excel_path: str) -> None:
             },
             inplace=True,
         )
+        mem.marcar("filtro_copy")
 
         def safe_str(v):
             if v is None:
@@ -339,97 +243,123 @@ def process_camera_resource_status(excel_path: str) -> None:
                     "ip_address": safe_str(row.get("ip_address")),
                 }
             )
+        mem.marcar("registros")
 
-        if not records:
-            print("[INFO] No hay registros de cámaras para insertar/actualizar.")
-            return
-
-        sql = """
-            INSERT INTO PUBLIC.HIK_CAMERA_RESOURCE_STATUS (
-                CAMERA_NAME, DEVICE_CODE, SITE_NAME, DEVICE_TYPE, ONLINE_STATUS, RECORD_STATUS, SIGNAL_STATUS, LAST_ONLINE_TIME, IP_ADDRESS, CREATED_AT, UPDATED_AT
-            )
-            SELECT
-                %(camera_name)s,
-                %(device_code)s,
-                %(site_name)s,
-                %(device_type)s,
-                %(online_status)s,
-                %(record_status)s,
-                %(signal_status)s,
-                %(last_online_time)s,
-                %(ip_address)s,
-                NOW(),
-                NOW()
-            ON CONFLICT (DEVICE_CODE) DO UPDATE SET
-                CAMERA_NAME      = EXCLUDED.CAMERA_NAME,
-                SITE_NAME        = EXCLUDED.SITE_NAME,
-                DEVICE_TYPE      = EXCLUDED.DEVICE_TYPE,
-                ONLINE_STATUS    = EXCLUDED.ONLINE_STATUS,
-                RECORD_STATUS    = EXCLUDED.RECORD_STATUS,
-                SIGNAL_STATUS    = EXCLUDED.SIGNAL_STATUS,
-                LAST_ONLINE_TIME = EXCLUDED.LAST_ONLINE_TIME,
-                IP_ADDRESS       = EXCLUDED.IP_ADDRESS,
-                UPDATED_AT       = NOW();
-        """
-
-        try:
-            conn = get_pg_connection()
-            with conn:
-                with conn.cursor() as cur:
-                    execute_batch(cur, sql, records, page_size=500)
-            print(f"[INFO] Cámaras insertadas/actualizadas: {len(records)}")
-        except Exception as db_error:
-            print(f"[ERROR] No se pudieron insertar/actualizar las cámaras: {db_error}")
-            traceback.print_exc()
-        finally:
-            if 'conn' in locals() and conn:
-                conn.close()
+        guardar_camera_resource_status(records)
+        mem.marcar("guardar")
 
     except Exception as e:
+        # El que llama decide (run_resource_status lo registra, el loader del spool lo manda a error)
         print(f"[ERROR] Error al procesar el archivo de cámaras: {e}")
-        traceback.print_exc()
+        raise
+    finally:
+        mem.cerrar()
+
+
+def guardar_camera_resource_status(records: list[dict]) -> None:
+    """Upsert de registros de cámaras (mismo formato que arma process_camera_resource_status)."""
+    if not records:
+        print("[INFO] No hay registros de cámaras para insertar/actualizar.")
+        return
+
+    sql = """
+        INSERT INTO PUBLIC.HIK_CAMERA_RESOURCE_STATUS (
+            CAMERA_NAME, DEVICE_CODE, SITE_NAME, DEVICE_TYPE, ONLINE_STATUS, RECORD_STATUS, SIGNAL_STATUS, LAST_ONLINE_TIME, IP_ADDRESS, CREATED_AT, UPDATED_AT
+        )
+        SELECT
+            %(camera_name)s,
+            %(device_code)s,
+            %(site_name)s,
+            %(device_type)s,
+            %(online_status)s,
+            %(record_status)s,
+            %(signal_status)s,
+            %(last_online_time)s,
+            %(ip_address)s,
+            NOW(),
+            NOW()
+        ON CONFLICT (DEVICE_CODE) DO UPDATE SET
+            CAMERA_NAME      = EXCLUDED.CAMERA_NAME,
+            SITE_NAME        = EXCLUDED.SITE_NAME,
+            DEVICE_TYPE      = EXCLUDED.DEVICE_TYPE,
+            ONLINE_STATUS    = EXCLUDED.ONLINE_STATUS,
+            RECORD_STATUS    = EXCLUDED.RECORD_STATUS,
+            SIGNAL_STATUS    = EXCLUDED.SIGNAL_STATUS,
+            LAST_ONLINE_TIME = EXCLUDED.LAST_ONLINE_TIME,
+            IP_ADDRESS       = EXCLUDED.IP_ADDRESS,
+            UPDATED_AT       = NOW();
+    """
+
+    conn = None
+    try:
+        conn = get_pg_connection()
+        with conn:
+            with conn.cursor() as cur:
+                execute_batch(cur, sql, records, page_size=500)
+        print(f"[INFO] Cámaras insertadas/actualizadas: {len(records)}")
+    except Exception as db_error:
+        print(f"[ERROR] No se pudieron insertar/actualizar las cámaras: {db_error}")
+        raise
+    finally:
+        if conn:
+            conn.close()
 
 
-def process_encoding_device_status(excel_path: str) -> None:
+def process_encoding_device_status(excel_path: str | io.BytesIO) -> None:
     import pandas as pd
     import numpy as np
 
-    df = pd.read_excel(excel_path, sheet_name="Encoding Device", header=6)
-    df = df[df["Name"].notna()].copy()
-
-    df.rename(
-        columns={
-            "Name": "name",
-            "Address": "address",
-            "Serial No.": "serial_no",
-            "Version": "version",
-            "Network Status": "network_status",
-            "Time Sync Status": "time_sync_status",
-            "HDD Status": "hdd_status",
-            "HDD Usage": "hdd_usage",
-            "RAID": "raid",
-            "Recording Status": "recording_status",
-            "Hot Spare Status": "hot_spare_status",
-            "Arming Status": "arming_status",
-            "Manufacturer": "manufacturer",
-            "First Added Time": "first_added_time",
-            "Auto-Check Time": "auto_check_time",
-        },
-        inplace=True,
-    )
+    mem = etapas_memoria("Encoding Device")
+    try:
+        df = leer_excel(excel_path, hoja="Encoding Device", header=6)
+        mem.marcar("read_excel")
+        df = df[df["Name"].notna()].copy()
+        mem.marcar("filtro_copy")
+
+        df.rename(
+            columns={
+                "Name": "name",
+                "Address": "address",
+                "Serial No.": "serial_no",
+                "Version": "version",
+                "Network Status": "network_status",
+                "Time Sync Status": "time_sync_status",
+                "HDD Status": "hdd_status",
+                "HDD Usage": "hdd_usage",
+                "RAID": "raid",
+                "Recording Status": "recording_status",
+                "Hot Spare Status": "hot_spare_status",
+                "Arming Status": "arming_status",
+                "Manufacturer": "manufacturer",
+                "First Added Time": "first_added_time",
+                "Auto-Check Time": "auto_check_time",
+            },
+            inplace=True,
+        )
 
-    df["first_added_time"] = pd.to_datetime(df["first_added_time"], errors="coerce")
-    df["auto_check_time"] = pd.to_datetime(df["auto_check_time"], errors="coerce")
+        df["first_added_time"] = pd.to_datetime(df["first_added_time"], errors="coerce")
+        df["auto_check_time"] = pd.to_datetime(df["auto_check_time"], errors="coerce")
+        mem.marcar("renombrar_y_fechas")
 
-    df = df.replace({np.nan: None})
-    df["first_added_time"] = df["first_added_time"].where(
-        df["first_added_time"].notna(), None
-    )
-    df["auto_check_time"] = df["auto_check_time"].where(
-        df["auto_check_time"].notna(), None
-    )
+        df = df.replace({np.nan: None})
+        df["first_added_time"] = df["first_added_time"].where(
+            df["first_added_time"].notna(), None
+        )
+        df["auto_check_time"] = df["auto_check_time"].where(
+            df["auto_check_time"].notna(), None
+        )
+        mem.marcar("replace_nan_where")
+
+        records = df.to_dict(orient="records")
+        mem.marcar("to_dict")
+        guardar_encoding_device_status(records)
+        mem.marcar("guardar")
+    finally:
+        mem.cerrar()
 
-    records = df.to_dict(orient="records")
+
+def guardar_encoding_device_status(records: list[dict]) -> None:
+    """Upsert de Encoding Devices (mismo formato de registro que arma process_encoding_device_status)."""
     if not records:
         print("[INFO] No hay registros de Encoding Device para procesar.")
         return
@@ -500,40 +430,54 @@ def process_encoding_device_status(excel_path: str) -> None:
         conn.close()
 
 
-def process_ip_speaker_status(excel_path: str) -> None:
+def process_ip_speaker_status(excel_path: str | io.BytesIO) -> None:
     import pandas as pd
     import numpy as np
-    from psycopg2.extras import execute_batch
 
-    df = pd.read_excel(excel_path, sheet_name="IP Speaker", header=6)
-    df = df[df["Name"].notna()].copy()
-
-    df.rename(
-        columns={
-            "Name": "name",
-            "Address": "address",
-            "Serial No.": "serial_no",
-            "Version": "version",
-            "Network Status": "network_status",
-            "Time Sync Status": "time_sync_status",
-            "First Added Time": "first_added_time",
-            "Auto-Check Time": "auto_check_time",
-        },
-        inplace=True,
-    )
+    mem = etapas_memoria("IP Speaker")
+    try:
+        df = leer_excel(excel_path, hoja="IP Speaker", header=6)
+        mem.marcar("read_excel")
+        df = df[df["Name"].notna()].copy()
+        mem.marcar("filtro_copy")
 
-    df["first_added_time"] = pd.to_datetime(df["first_added_time"], errors="coerce")
-    df["auto_check_time"] = pd.to_datetime(df["auto_check_time"], errors="coerce")
+        df.rename(
+            columns={
+                "Name": "name",
+                "Address": "address",
+                "Serial No.": "serial_no",
+                "Version": "version",
+                "Network Status": "network_status",
+                "Time Sync Status": "time_sync_status",
+                "First Added Time": "first_added_time",
+                "Auto-Check Time": "auto_check_time",
+            },
+            inplace=True,
+        )
 
-    df = df.replace({np.nan: None})
-    df["first_added_time"] = df["first_added_time"].where(
-        df["first_added_time"].notna(), None
-    )
-    df["auto_check_time"] = df["auto_check_time"].where(
-        df["auto_check_time"].notna(), None
-    )
+        df["first_added_time"] = pd.to_datetime(df["first_added_time"], errors="coerce")
+        df["auto_check_time"] = pd.to_datetime(df["auto_check_time"], errors="coerce")
+        mem.marcar("renombrar_y_fechas")
 
-    records = df.to_dict(orient="records")
+        df = df.replace({np.nan: None})
+        df["first_added_time"] = df["first_added_time"].where(
+            df["first_added_time"].notna(), None
+        )
+        df["auto_check_time"] = df["auto_check_time"].where(
+            df["auto_check_time"].notna(), None
+        )
+        mem.marcar("replace_nan_where")
+
+        records = df.to_dict(orient="records")
+        mem.marcar("to_dict")
+        guardar_ip_speaker_status(records)
+        mem.marcar("guardar")
+    finally:
+        mem.cerrar()
+
+
+def guardar_ip_speaker_status(records: list[dict]) -> None:
+    """Upsert de IP Speakers (mismo formato de registro que arma process_ip_speaker_status)."""
     if not records:
         print("[INFO] No hay registros de IP Speaker para procesar.")
         return
@@ -582,42 +526,56 @@ def process_ip_speaker_status(excel_path: str) -> None:
         conn.close()
 
 
-def process_alarm_input_status(excel_path: str) -> None:
+def process_alarm_input_status(excel_path: str | io.BytesIO) -> None:
     import pandas as pd
     import numpy as np
-    from psycopg2.extras import execute_batch
 
-    df = pd.read_excel(excel_path, sheet_name="Alarm Input", header=7)
-    df = df[df["Name"].notna()].copy()
-
-    df.rename(
-        columns={
-            "Name": "name",
-            "Device": "device",
-            "Area": "area",
-            "Partition (Area)": "partition_area",
-            "Network Status": "network_status",
-            "Arming Status": "arming_status",
-            "Bypass Status": "bypass_status",
-            "Fault Status": "fault_status",
-            "Alarm Status": "alarm_status",
-            "Detector Connection Status": "detector_connection_status",
-            "Battery Status": "battery_status",
-            "Device Battery Capacity": "device_battery_capacity",
-            "Zone Tampering Status": "zone_tampering_status",
-            "Auto-Check Time": "auto_check_time",
-        },
-        inplace=True,
-    )
+    mem = etapas_memoria("Alarm Input")
+    try:
+        df = leer_excel(excel_path, hoja="Alarm Input", header=7)
+        mem.marcar("read_excel")
+        df = df[df["Name"].notna()].copy()
+        mem.marcar("filtro_copy")
 
-    df["auto_check_time"] = pd.to_datetime(df["auto_check_time"], errors="coerce")
+        df.rename(
+            columns={
+                "Name": "name",
+                "Device": "device",
+                "Area": "area",
+                "Partition (Area)": "partition_area",
+                "Network Status": "network_status",
+                "Arming Status": "arming_status",
+                "Bypass Status": "bypass_status",
+                "Fault Status": "fault_status",
+                "Alarm Status": "alarm_status",
+                "Detector Connection Status": "detector_connection_status",
+                "Battery Status": "battery_status",
+                "Device Battery Capacity": "device_battery_capacity",
+                "Zone Tampering Status": "zone_tampering_status",
+                "Auto-Check Time": "auto_check_time",
+            },
+            inplace=True,
+        )
+
+        df["auto_check_time"] = pd.to_datetime(df["auto_check_time"], errors="coerce")
+        mem.marcar("renombrar_y_fechas")
+
+        df = df.replace({np.nan: None})
+        df["auto_check_time"] = df["auto_check_time"].where(
+            df["auto_check_time"].notna(), None
+        )
+        mem.marcar("replace_nan_where")
+
+        records = df.to_dict(orient="records")
+        mem.marcar("to_dict")
+        guardar_alarm_input_status(records)
+        mem.marcar("guardar")
+    finally:
+        mem.cerrar()
 
-    df = df.replace({np.nan: None})
-    df["auto_check_time"] = df["auto_check_time"].where(
-        df["auto_check_time"].notna(), None
-    )
 
-    records = df.to_dict(orient="records")
+def guardar_alarm_input_status(records: list[dict]) -> None:
+    """Upsert de Alarm Inputs (mismo formato de registro que arma process_alarm_input_status)."""
     if not records:
         print("[INFO] No hay registros de Alarm Input para procesar.")
         return
@@ -684,15 +642,20 @@ def process_alarm_input_status(excel_path: str) -> None:
         conn.close()
 
 
-def crear_driver() -> webdriver.Chrome:
+def crear_driver(
+    lean: bool = False,
+    headless: bool = False,
+    capturar_red: bool = False,
+    download_dir: Path = DOWNLOAD_DIR,
+) -> webdriver.Chrome:
     """Configura y devuelve un driver de Chrome listo para descargar archivos."""
 
-    DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    download_dir.mkdir(parents=True, exist_ok=True)
 
     chrome_options = Options()
 
     prefs = {
-        "download.default_directory": str(DOWNLOAD_DIR),
+        "download.default_directory": str(download_dir),
         "download.prompt_for_download": False,
         "download.directory_upgrade": True,
         "safebrowsing.enabled": False,
@@ -707,21 +670,40 @@ def crear_driver() -> webdriver.Chrome:
     chrome_options.add_argument("--safebrowsing-disable-download-protection")
     chrome_options.add_argument("--disable-popup-blocking")
     chrome_options.add_argument("--disable-features=BlockInsecureDownloadRestrictions,DownloadBubble")
-    chrome_options.add_argument("--start-maximized")
+    if capturar_red:
+        habilitar_captura_red(chrome_options)
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    lean = perfil_lean_solicitado(lean)
+    user_data_dir = None
+    if lean:
+        user_data_dir = aplicar_opciones_lean(chrome_options, headless=headless_solicitado(headless))
+    else:
+        chrome_options.add_argument("--start-maximized")
+
+    try:
+        service = Service(resolver_chromedriver())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        # Sin driver no hay cerrar_driver(): el user-data-dir temporal se borra acá
+        if user_data_dir:
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+        raise
+    driver.hik_user_data_dir = user_data_dir
+    instrumentar_driver(driver)
 
     driver.execute_cdp_cmd(
         "Page.setDownloadBehavior",
         {
             "behavior": "allow",
-            "downloadPath": str(DOWNLOAD_DIR),
+            "downloadPath": str(download_dir),
         },
     )
 
-    driver.maximize_window()
-    print(f"[DEBUG] DOWNLOAD_DIR = {DOWNLOAD_DIR}")
+    if lean:
+        activar_bloqueo_recursos(driver)
+    else:
+        driver.maximize_window()
+    print(f"[DEBUG] DOWNLOAD_DIR = {download_dir}")
     return driver
 
 
@@ -734,11 +716,18 @@ def limpiar_descargas(download_dir: Path = DOWNLOAD_DIR):
             pass
 
 
-def esperar_descarga(download_dir: Path, archivos_previos, timeout: int = 120) -> str:
+@trazado("archivo")
+def esperar_descarga(
+    download_dir: Path,
+    archivos_previos,
+    timeout: int = 120,
+    timer: StepTimer | None = None,
+) -> str:
     """Espera hasta detectar un nuevo archivo .xlsx o .xls en download_dir."""
 
     print("[9] Esperando archivo descargado...")
     inicio = time.time()
+    timeout = espera("descarga", timeout)
 
     while True:
         archivos_actuales = os.listdir(download_dir)
@@ -754,8 +743,8 @@ def esperar_descarga(download_dir: Path, archivos_previos, timeout: int = 120) -
             archivo = nuevos[0]
             ruta = str(download_dir / archivo)
             print(f"[9] Archivo encontrado: {ruta}")
-            if step_timer:
-                step_timer.mark("[9] Descarga detectada")
+            if timer:
+                timer.mark("[9] Descarga detectada")
             return ruta
 
         if time.time() - inicio > timeout:
@@ -820,7 +809,7 @@ def click_menu_item_by_title(driver, title: str) -> bool:
     return False
 
 
-def ir_a_pestana_maintenance(driver, wait):
+def ir_a_pestana_maintenance(driver, wait, timer: StepTimer | None = None):
     print("[4] Abriendo pestaña Maintenance...")
 
     # 1) Intentar botón "Go to Maintenance" del panel Device Statistics
@@ -836,8 +825,8 @@ def ir_a_pestana_maintenance(driver, wait):
             )
         )
         driver.execute_script("arguments[0].click();", boton_go)
-        if step_timer:
-            step_timer.mark("[4] Pestaña Maintenance")
+        if timer:
+            timer.mark("[4] Pestaña Maintenance")
         return
     except TimeoutException:
         print("   [Aviso] Botón 'Go to Maintenance' no encontrado, pruebo menú principal...")
@@ -866,8 +855,8 @@ def ir_a_pestana_maintenance(driver, wait):
             )
         )
         driver.execute_script("arguments[0].click();", opcion_maintenance)
-        if step_timer:
-            step_timer.mark("[4] Pestaña Maintenance")
+        if timer:
+            timer.mark("[4] Pestaña Maintenance")
         return
     except TimeoutException:
         print("   [Aviso] Menú 'Maintenance' no disponible, pruebo pestaña superior...")
@@ -884,14 +873,14 @@ def ir_a_pestana_maintenance(driver, wait):
             )
         )
         driver.execute_script("arguments[0].click();", tab_maintenance)
-        if step_timer:
-            step_timer.mark("[4] Pestaña Maintenance")
+        if timer:
+            timer.mark("[4] Pestaña Maintenance")
         return
     except TimeoutException:
         raise Exception("No se pudo hacer clic en la pestaña 'Maintenance'")
 
 
-def abrir_menu_resource_status(driver, wait):
+def abrir_menu_resource_status(driver, wait, timer: StepTimer | None = None):
     print("[5] Abriendo menú Resource Status...")
 
     locators = [
@@ -908,7 +897,7 @@ def abrir_menu_resource_status(driver, wait):
         ),
     ]
 
-    local_wait = WebDriverWait(driver, 45)
+    local_wait = WebDriverWait(driver, espera("menu", 45))
 
     def intentar_click_resource_status(d):
         for by, selector in locators:
@@ -934,8 +923,8 @@ def abrir_menu_resource_status(driver, wait):
 
     try:
         local_wait.until(intentar_click_resource_status)
-        if step_timer:
-            step_timer.mark("[5] Menú Resource Status")
+        if timer:
+            timer.mark("[5] Menú Resource Status")
     except TimeoutException:
         raise Exception("No se pudo hacer clic en el menú 'Resource Status'")
 
@@ -969,7 +958,7 @@ def wait_loading_end(driver, timeout: int = 15):
         (By.CSS_SELECTOR, "div.loading-mask"),
         (By.CSS_SELECTOR, "div.hik-loader, div.hik-loading"),
     ]
-    end_time = time.time() + timeout
+    end_time = time.time() + espera("menu", timeout)
     while time.time() < end_time:
         visible = False
         for by, selector in overlays:
@@ -1252,7 +1241,9 @@ def seleccionar_camera(driver, wait):
     seleccionar_opcion_resource_status(driver, wait, "Camera")
 
 
-def esperar_tabla_resource_status(driver, wait, opcion: str, timeout: int = 30):
+def esperar_tabla_resource_status(
+    driver, wait, opcion: str, timeout: int = 30, timer: StepTimer | None = None
+):
     """
     Espera a que la tabla de la opción seleccionada esté lista:
     - con filas, o
@@ -1272,8 +1263,8 @@ def esperar_tabla_resource_status(driver, wait, opcion: str, timeout: int = 30):
 
     wait.until(tabla_cargada)
 
-    if step_timer:
-        step_timer.mark(f"[7] Tabla recursos cargada ({opcion})")
+    if timer:
+        timer.mark(f"[7] Tabla recursos cargada ({opcion})")
 
 
 def encontrar_boton_export(driver, wait):
@@ -1333,22 +1324,25 @@ def export_resource_status_to_excel(
     wait: WebDriverWait,
     download_dir: Path,
     opcion: str,
-) -> Path:
+    interceptor: InterceptorExport | None = None,
+    timer: StepTimer | None = None,
+) -> Path | io.BytesIO:
     """
     Navega a Maintenance -> Resource Status -> <opcion>,
     abre el panel Export, selecciona Excel, hace clic en Export
     y espera al archivo descargado en download_dir.
-    Devuelve la ruta final del .xlsx.
+    Devuelve la ruta final del .xlsx, o el libro en memoria si hay `interceptor`
+    (Chrome igual completa la descarga a download_dir por su cuenta).
     """
 
-    abrir_menu_resource_status(driver, wait)
+    abrir_menu_resource_status(driver, wait, timer=timer)
     seleccionar_opcion_resource_status(driver, wait, opcion)
-    esperar_tabla_resource_status(driver, wait, opcion)
+    esperar_tabla_resource_status(driver, wait, opcion, timer=timer)
 
     print(f"[8] Abriendo panel de exportación desde {opcion}...")
 
-    if step_timer:
-        step_timer.mark(f"[8] Panel exportación ({opcion})")
+    if timer:
+        timer.mark(f"[8] Panel exportación ({opcion})")
 
     archivos_previos = os.listdir(download_dir)
     
@@ -1366,8 +1360,8 @@ def export_resource_status_to_excel(
         )
     )
 
-    if step_timer:
-        step_timer.mark(f"[8] Panel exportación abierto ({opcion})")
+    if timer:
+        timer.mark(f"[8] Panel exportación abierto ({opcion})")
 
     excel_options = driver.find_elements(
         By.XPATH,
@@ -1387,14 +1381,23 @@ def export_resource_status_to_excel(
     )
     driver.execute_script("arguments[0].click();", export_confirm_button)
 
-    if step_timer:
-        step_timer.mark(f"[8] Export lanzado ({opcion})")
+    if timer:
+        timer.mark(f"[8] Export lanzado ({opcion})")
 
-    archivo_descargado = esperar_descarga(download_dir, archivos_previos, timeout=180)
+    if interceptor is not None:
+        libro = interceptor.esperar_libro(timeout=espera("descarga", 180))
+        if libro is not None:
+            print(f"[10] Archivo recibido en memoria: {libro.nombre}")
+            if timer:
+                timer.mark("[10] Archivo descargado")
+            return libro.buffer()
+        print("[WARN] No se interceptó el export; se espera la descarga en disco.")
+
+    archivo_descargado = esperar_descarga(download_dir, archivos_previos, timeout=180, timer=timer)
     print(f"[10] Archivo descargado en: {archivo_descargado}")
 
-    if step_timer:
-        step_timer.mark("[10] Archivo descargado")
+    if timer:
+        timer.mark("[10] Archivo descargado")
     return Path(archivo_descargado)
 
 
@@ -1407,43 +1410,146 @@ def export_camera_status_to_excel(driver: webdriver.Chrome, wait: WebDriverWait,
     return export_resource_status_to_excel(driver, wait, download_dir, "Camera")
 
 
-def run():
-    global step_timer, performance_recorder
-    parser = argparse.ArgumentParser(
-        description="Exportar opciones de Resource Status a Excel en HikCentral."
-    )
-    parser.add_argument(
-        "--option",
-        "-o",
-        dest="opcion",
-        default="Camera",
-        help="Nombre de la opción dentro de Resource Status (ej: 'Camera', 'Encoding Device').",
+PROCESADORES_RESOURCE_STATUS = {
+    "camera": ("Camera_", process_camera_resource_status),
+    "encoding device": ("Encoding Device_", process_encoding_device_status),
+    "ip speaker": ("IP Speaker_", process_ip_speaker_status),
+    "alarm input": ("Alarm Input_", process_alarm_input_status),
+}
+
+
+@trazado("carga")
+@perfilado("carga")
+def procesar_resource_status(opcion: str, origen: Path | io.BytesIO | None) -> None:
+    """
+    Envía el export de la opción a su process_*_status.
+    `origen` puede ser la ruta descargada o el libro en memoria (export HTTP directo).
+    """
+    procesador = PROCESADORES_RESOURCE_STATUS.get(opcion.lower())
+    if procesador is None:
+        return
+
+    prefijo, funcion = procesador
+    if isinstance(origen, io.BytesIO):
+        funcion(origen)
+        return
+
+    archivo_procesar = encontrar_ultimo_archivo(prefijo, ".xlsx") or origen
+    if archivo_procesar:
+        funcion(str(archivo_procesar))
+    else:
+        print(f"[ERROR] No se encontró archivo de {opcion} para procesar.")
+
+
+def encolar_resource_status(opcion: str, origen: Path | io.BytesIO | None, host_label: str) -> Path | None:
+    """Como procesar_resource_status, pero deja el export en el spool para el loader."""
+    procesador = PROCESADORES_RESOURCE_STATUS.get(opcion.lower())
+    if procesador is None:
+        return None
+
+    if isinstance(origen, io.BytesIO):
+        return encolar_export(origen.getvalue(), host_label, opcion)
+
+    archivo = encontrar_ultimo_archivo(procesador[0], ".xlsx") or origen
+    if not archivo:
+        print(f"[ERROR] No se encontró archivo de {opcion} para encolar.")
+        return None
+    return encolar_export(Path(archivo), host_label, opcion)
+
+
+GUARDADORES_RESOURCE_STATUS = {
+    "camera": guardar_camera_resource_status,
+    "encoding device": guardar_encoding_device_status,
+    "ip speaker": guardar_ip_speaker_status,
+    "alarm input": guardar_alarm_input_status,
+}
+
+
+@trazado("db")
+@perfilado("carga")
+def guardar_resource_status(opcion: str, records: list[dict]) -> None:
+    """Upsert de registros ya mapeados (p. ej. extraídos por OpenAPI) en la tabla de la opción."""
+    guardador = GUARDADORES_RESOURCE_STATUS.get(opcion.lower())
+    if guardador is None:
+        print(f"[WARN] Opción sin tabla de destino: {opcion}")
+        return
+    guardador(records)
+
+
+def crear_contexto(
+    opcion: str,
+    url: str = URL,
+    download_dir: Path = DOWNLOAD_DIR,
+    contar_comandos: bool = False,
+    metricas_pagina: bool = False,
+    har: bool = False,
+    perfil: bool = False,
+    memoria: bool = False,
+    plazo: Plazo | None = None,
+) -> RunContext:
+    return RunContext(
+        opcion=opcion,
+        url=url,
+        download_dir=download_dir,
+        conectar=get_pg_connection,
+        contar_comandos=contar_comandos,
+        metricas_pagina=metricas_pagina,
+        har=har,
+        perfil=perfil,
+        memoria=memoria,
+        log_dir=LOG_DIR,
+        script=SCRIPT_NAME,
+        plazo=plazo,
     )
-    args = parser.parse_args()
-    opcion = args.opcion
 
-    performance_recorder = PerformanceRecorder(time.perf_counter())
 
-    baseline_cpu = psutil.cpu_percent(interval=1)
-    registrar_cpu(baseline_cpu)
-    baseline_ram = psutil.virtual_memory().percent
-    print(f"[PERF] [0] Baseline antes de automatizar... CPU: {baseline_cpu:.1f}% | RAM: {baseline_ram:.1f}%")
-    if performance_recorder:
-        performance_recorder.record_baseline(baseline_cpu, baseline_ram)
+def run_resource_status(
+    opcion: str = "Camera",
+    *,
+    lean: bool = False,
+    headless: bool = False,
+    http_export: bool = False,
+    en_memoria: bool = False,
+    fuente: str = "ui",
+    spool: bool = False,
+    ctx: RunContext | None = None,
+) -> None:
+    """Exporta y carga una opción de Resource Status. Todo el estado de la ejecución vive en `ctx`."""
+    ctx = ctx or crear_contexto(opcion)
+    host_label = ctx.host
+    ctx.baseline()
+    token_traza = ctx.activar()
+    ctx.iniciar_fase("automatizacion")
 
     driver = None
-    step_timer = StepTimer(
-        start_time=performance_recorder.start_time if performance_recorder else None,
-        recorder=performance_recorder,
-    )
-    timer = step_timer
+    interceptor: InterceptorExport | None = None
+    timer = ctx.timer
     try:
-        driver = crear_driver()
-        wait = WebDriverWait(driver, 30)
+        if ctx.plazo:
+            ctx.plazo.verificar("inicio")
+        if fuente == "openapi":
+            records = extraer_resource_status_openapi(opcion)
+            if timer:
+                timer.mark(f"[8] Extracción OpenAPI ({opcion})")
+            guardar_resource_status(opcion, records)
+            if timer:
+                timer.mark("[FIN] Script completo")
+            return
+
+        if not host_disponible(ctx.url):
+            raise RuntimeError(f"HikCentral no responde en {host_label}")
+
+        driver = crear_driver(
+            lean=lean,
+            headless=headless,
+            capturar_red=http_export or ctx.har,
+            download_dir=ctx.download_dir,
+        )
+        ctx.instrumentar(driver)
+        wait = WebDriverWait(driver, espera("ui", 30))
 
-        print(f"[DEBUG] DOWNLOAD_DIR = {DOWNLOAD_DIR}")
         print("[1] Navegando a la URL...")
-        driver.get(URL)
+        driver.get(ctx.url)
         if timer:
             timer.mark("[1] Navegando a la URL")
 
@@ -1484,98 +1590,183 @@ def run():
         if timer:
             timer.mark("[3] Portal principal cargado")
 
-        ir_a_pestana_maintenance(driver, wait)
+        if http_export:
+            libro_http = exportar_por_http(driver, ctx.url, host_label, opcion)
+            if libro_http is not None:
+                if timer:
+                    timer.mark(f"[8] Export HTTP directo ({opcion})")
+                if spool:
+                    encolar_resource_status(opcion, io.BytesIO(libro_http), host_label)
+                else:
+                    procesar_resource_status(opcion, io.BytesIO(libro_http))
+                if timer:
+                    timer.mark("[FIN] Script completo")
+                return
+
+        ir_a_pestana_maintenance(driver, wait, timer=timer)
+
+        if en_memoria:
+            interceptor = InterceptorExport(driver)
+            if not interceptor.iniciar():
+                interceptor = None
 
         try:
-            limpiar_descargas(DOWNLOAD_DIR)
-            archivo_descargado = export_resource_status_to_excel(
-                driver, wait, DOWNLOAD_DIR, opcion
-            )
+            limpiar_descargas(ctx.download_dir)
+            with grabar_har(timer, f"Export {opcion}"):
+                archivo_descargado = export_resource_status_to_excel(
+                    driver, wait, ctx.download_dir, opcion, interceptor=interceptor, timer=timer
+                )
 
             if timer:
                 timer.mark("[8] Export completado")
 
             print(f"[OK] Export de '{opcion}' completado.")
 
-            archivo_procesar = None
-
-            if opcion.lower() == "camera":
-                ultimo_archivo = encontrar_ultimo_archivo("Camera_", ".xlsx")
-                archivo_procesar = ultimo_archivo or archivo_descargado
+            if http_export:
+                registrar_receta_desde_ui(driver, ctx.url, host_label, opcion)
 
-                if archivo_procesar:
-                    process_camera_resource_status(str(archivo_procesar))
-
-            elif opcion.lower() == "encoding device":
-                archivo_procesar = encontrar_ultimo_archivo(
-                    "Encoding Device_", ".xlsx"
-                )
-                if archivo_procesar:
-                    process_encoding_device_status(str(archivo_procesar))
-                else:
-                    print(
-                        "[ERROR] No se encontró archivo de Encoding Device para procesar."
-                    )
-
-            elif opcion.lower() == "ip speaker":
-                archivo_procesar = encontrar_ultimo_archivo(
-                    "IP Speaker_", ".xlsx"
-                )
-                if archivo_procesar:
-                    process_ip_speaker_status(str(archivo_procesar))
-                else:
-                    print(
-                        "[ERROR] No se encontró archivo de IP Speaker para procesar."
-                    )
-
-            elif opcion.lower() == "alarm input":
-                archivo_procesar = encontrar_ultimo_archivo(
-                    "Alarm Input_", ".xlsx"
-                )
-                if archivo_procesar:
-                    process_alarm_input_status(str(archivo_procesar))
-                else:
-                    print(
-                        "[ERROR] No se encontró archivo de Alarm Input para procesar."
-                    )
+            if spool:
+                encolar_resource_status(opcion, archivo_descargado, host_label)
+            else:
+                procesar_resource_status(opcion, archivo_descargado)
 
             if timer:
                 timer.mark("[FIN] Script completo")
         except Exception as e:
+            if ctx.plazo_vencido():
+                raise
             print(f"[ERROR] Ocurrió un problema en la exportación de '{opcion}': {e}")
             if timer:
                 timer.mark("[ERROR] Fin por excepción")
             raise
 
     except Exception as e:
-        print(f"[ERROR] Ocurrió un problema en la exportación de '{opcion}': {e.__class__.__name__}: {e}")
-        traceback.print_exc()
-        if timer:
-            timer.mark("[ERROR] Fin por excepción")
+        if ctx.fin_por_plazo(e):
+            if timer:
+                timer.mark("[ERROR] Fin por plazo")
+        else:
+            print(f"[ERROR] Ocurrió un problema en la exportación de '{opcion}': {e.__class__.__name__}: {e}")
+            traceback.print_exc()
+            if timer:
+                timer.mark("[ERROR] Fin por excepción")
     finally:
+        if interceptor is not None:
+            interceptor.detener()
         if driver:
-            driver.quit()
-
-        final_cpu = psutil.cpu_percent(interval=1)
-        final_ram = psutil.virtual_memory().percent
-        registrar_cpu(final_cpu)
-        if performance_recorder:
-            performance_recorder.update_cpu(final_cpu)
-        print(f"[PERF] [FIN] Estado al terminar script... CPU: {final_cpu:.1f}% | RAM: {final_ram:.1f}%")
-
-        duracion_total_seg = (
-            time.perf_counter() - performance_recorder.start_time
-            if performance_recorder
-            else 0.0
-        )
+            cerrar_driver(driver)
 
+        final_cpu, final_ram, duracion_total_seg = ctx.finalizar()
+        try:
+            conn = ctx.conexion()
+        except Exception:
+            conn = None
         registrar_ejecucion_y_pasos(
             opcion=opcion,
             duracion_total_seg=duracion_total_seg,
             cpu_final=final_cpu,
             ram_final=final_ram,
-            recorder=performance_recorder,
+            recorder=ctx.recorder,
+            conn=conn,
         )
+        ctx.cerrar()
+        ctx.desactivar(token_traza)
+
+
+
+def run():
+    parser = argparse.ArgumentParser(
+        description="Exportar opciones de Resource Status a Excel en HikCentral."
+    )
+    parser.add_argument(
+        "--option",
+        "-o",
+        dest="opcion",
+        default="Camera",
+        help="Nombre de la opción dentro de Resource Status (ej: 'Camera', 'Encoding Device').",
+    )
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        help="Perfil de navegador lean (bloquea imágenes/fuentes/mapas, viewport fijo).",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Ejecuta Chrome sin ventana (solo con --lean o HIK_BROWSER_PROFILE=lean).",
+    )
+    parser.add_argument(
+        "--http-export",
+        action="store_true",
+        help="Reproduce por HTTP el export grabado (lo graba en la primera ejecución por UI).",
+    )
+    parser.add_argument(
+        "--en-memoria",
+        action="store_true",
+        help="Intercepta el export (CDP Fetch) y lo procesa desde memoria.",
+    )
+    parser.add_argument(
+        "--fuente",
+        choices=["ui", "openapi"],
+        default=os.getenv("HIK_RESOURCE_FUENTE", "ui"),
+        help="ui: export por navegador (default). openapi: OpenAPI de HikCentral, sin navegador.",
+    )
+    parser.add_argument(
+        "--spool",
+        action="store_true",
+        help="Deja el export en el spool y no carga a Postgres (lo hace hikcentral_spool_loader.py).",
+    )
+    parser.add_argument("--url", default=URL, help="URL de login de HikCentral")
+    parser.add_argument(
+        "--contar-comandos",
+        action="store_true",
+        help="Cuenta los comandos WebDriver por tipo y por paso (también HIK_CONTAR_COMANDOS=1).",
+    )
+    parser.add_argument(
+        "--metricas-pagina",
+        action="store_true",
+        help="Guarda por paso las métricas CDP de la página: heap, DOM, layout/script (también HIK_METRICAS_PAGINA=1).",
+    )
+    parser.add_argument(
+        "--har",
+        action="store_true",
+        help="Graba un HAR de los pasos de export en LOG_DIR/har con timings por request (también HIK_HAR=1).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfila por separado automatización y carga; perfiles en LOG_DIR/perfiles (también HIK_PROFILE=1).",
+    )
+    parser.add_argument(
+        "--memoria",
+        action="store_true",
+        help="Mide con tracemalloc el pico y lo retenido por etapa de la carga (también HIK_MEMORIA=1).",
+    )
+    parser.add_argument(
+        "--plazo-seg",
+        type=float,
+        default=PLAZO_SEG,
+        help="Plazo total de la ejecución; vencido, se corta con estado deadline (también HIK_PLAZO_SEG).",
+    )
+    args = parser.parse_args()
+    run_resource_status(
+        args.opcion,
+        lean=args.lean,
+        headless=args.headless,
+        http_export=args.http_export,
+        en_memoria=args.en_memoria,
+        fuente=args.fuente,
+        spool=args.spool,
+        ctx=crear_contexto(
+            args.opcion,
+            url=args.url,
+            contar_comandos=args.contar_comandos,
+            metricas_pagina=args.metricas_pagina,
+            har=args.har,
+            perfil=args.profile,
+            memoria=args.memoria,
+            plazo=plazo_solicitado(args.plazo_seg),
+        ),
+    )
 
 
 if __name__ == "__main__":
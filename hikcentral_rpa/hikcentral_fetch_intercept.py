@@ -0,0 +1,208 @@
+import base64
+import io
+import queue
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+from hikcentral_http_export import extraer_libro
+
+
+# ========================
+# INTERCEPCIÓN CDP FETCH DEL EXPORT
+# ========================
+# En lugar de esperar a que el export aparezca en disco (listdir/rglob + tamaño
+# estable + copy2) y volver a leerlo con pandas, se pausa la respuesta del export
+# con CDP Fetch (etapa Response), se toma el cuerpo en memoria y se entrega como
+# BytesIO al lector. El archivado a disco se hace en un hilo aparte.
+
+PATRONES_INTERCEPCION = ["*export*", "*Export*", "*download*", "*Download*", "*.xls*"]
+
+MIME_LIBRO = (
+    "spreadsheetml",
+    "ms-excel",
+    "octet-stream",
+    "application/zip",
+    "x-zip-compressed",
+)
+
+FILENAME_RE = re.compile(r"filename\*?=(?:UTF-8'')?\"?([^\";]+)\"?", re.IGNORECASE)
+
+_archivador = ThreadPoolExecutor(max_workers=1, thread_name_prefix="hik_archivo")
+_archivos_pendientes: list[Future] = []
+
+
+@dataclass
+class LibroCapturado:
+    nombre: str
+    contenido: bytes
+    url: str | None = None
+
+    def buffer(self) -> io.BytesIO:
+        return io.BytesIO(self.contenido)
+
+
+def _guardar_bytes(contenido: bytes, destino: Path) -> Path:
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_suffix(destino.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(contenido)
+    tmp.replace(destino)
+    print(f"[ARCHIVO] Export archivado en: {destino}")
+    return destino
+
+
+def archivar_async(contenido: bytes, destino: Path) -> Future:
+    """Escribe el export a disco en segundo plano (fuera del camino crítico)."""
+    futuro = _archivador.submit(_guardar_bytes, contenido, destino)
+    _archivos_pendientes.append(futuro)
+    return futuro
+
+
+def esperar_archivado(timeout: float | None = 60):
+    """Espera a que terminen los archivados pendientes (al cerrar el script)."""
+    while _archivos_pendientes:
+        futuro = _archivos_pendientes.pop()
+        try:
+            futuro.result(timeout=timeout)
+        except Exception as exc:
+            print(f"[WARN] No se pudo archivar el export: {exc}")
+
+
+def _nombre_desde_respuesta(headers: dict[str, str], url: str) -> str:
+    disposition = headers.get("content-disposition", "")
+    match = FILENAME_RE.search(disposition)
+    if match:
+        return unquote(match.group(1)).strip()
+    return Path(urlsplit(url).path).name or "export.xlsx"
+
+
+def _parece_libro(headers: dict[str, str]) -> bool:
+    tipo = headers.get("content-type", "").lower()
+    disposition = headers.get("content-disposition", "").lower()
+    if "attachment" in disposition or ".xls" in disposition or ".zip" in disposition:
+        return True
+    return any(m in tipo for m in MIME_LIBRO)
+
+
+class InterceptorExport:
+    """
+    Escucha Fetch.requestPaused en un hilo propio (trio + bidi_connection de Selenium)
+    y deja en una cola los libros Excel que pasan por el navegador.
+    """
+
+    def __init__(self, driver, patrones: list[str] | None = None):
+        self.driver = driver
+        self.patrones = patrones or PATRONES_INTERCEPCION
+        self._libros: queue.Queue[LibroCapturado] = queue.Queue()
+        self._listo = threading.Event()
+        self._hilo: threading.Thread | None = None
+        self._trio_token = None
+        self._cancel_scope = None
+        self.error: Exception | None = None
+
+    def iniciar(self, timeout: float = 10) -> bool:
+        self._hilo = threading.Thread(target=self._ejecutar, name="hik_fetch_intercept", daemon=True)
+        self._hilo.start()
+        listo = self._listo.wait(timeout)
+        if self.error is not None:
+            print(f"[WARN] Intercepción CDP Fetch no disponible: {self.error}")
+            return False
+        if not listo:
+            print(f"[WARN] Intercepción CDP Fetch no quedó activa en {timeout:.0f}s; se descarga a disco.")
+            self.detener()
+            return False
+        print("[FETCH] Intercepción de export activa")
+        return True
+
+    def _ejecutar(self):
+        import trio
+
+        try:
+            trio.run(self._escuchar)
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self._listo.set()
+
+    async def _escuchar(self):
+        import trio
+
+        self._trio_token = trio.lowlevel.current_trio_token()
+        with trio.CancelScope() as scope:
+            self._cancel_scope = scope
+            async with self.driver.bidi_connection() as connection:
+                session, devtools = connection.session, connection.devtools
+                patrones = [
+                    devtools.fetch.RequestPattern(
+                        url_pattern=p,
+                        request_stage=devtools.fetch.RequestStage.RESPONSE,
+                    )
+                    for p in self.patrones
+                ]
+                patrones.append(
+                    devtools.fetch.RequestPattern(
+                        url_pattern="*",
+                        resource_type=devtools.network.ResourceType.DOCUMENT,
+                        request_stage=devtools.fetch.RequestStage.RESPONSE,
+                    )
+                )
+                await session.execute(devtools.fetch.enable(patterns=patrones))
+                self._listo.set()
+
+                async for evento in session.listen(devtools.fetch.RequestPaused):
+                    try:
+                        await self._procesar(session, devtools, evento)
+                    except Exception as exc:
+                        print(f"[WARN] Error procesando respuesta interceptada: {exc}")
+
+    async def _procesar(self, session, devtools, evento):
+        headers = {h.name.lower(): h.value for h in (evento.response_headers or [])}
+        status = evento.response_status_code or 0
+
+        # La petición queda pausada en Chrome hasta el continue_request: se hace siempre,
+        # aunque falle la lectura del cuerpo (ese libro sigue a disco como sin intercepción)
+        try:
+            if 200 <= status < 300 and _parece_libro(headers):
+                body, base64_encoded = await session.execute(
+                    devtools.fetch.get_response_body(evento.request_id)
+                )
+                contenido = base64.b64decode(body) if base64_encoded else body.encode("latin-1")
+                libro = extraer_libro(contenido)
+                if libro is not None:
+                    nombre = _nombre_desde_respuesta(headers, evento.request.url)
+                    if nombre.lower().endswith(".zip"):
+                        nombre = nombre[:-4] + ".xlsx"
+                    self._libros.put(LibroCapturado(nombre=nombre, contenido=libro, url=evento.request.url))
+                    print(f"[FETCH] Export interceptado en memoria: {nombre} ({len(libro) / 1024:.1f} KB)")
+        finally:
+            await session.execute(devtools.fetch.continue_request(evento.request_id))
+
+    def esperar_libro(self, timeout: float = 180) -> LibroCapturado | None:
+        try:
+            return self._libros.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def descartar_pendientes(self) -> list[LibroCapturado]:
+        """Vacía la cola (libros que llegaron después de que su espera se venció)."""
+        descartados = []
+        while True:
+            try:
+                descartados.append(self._libros.get_nowait())
+            except queue.Empty:
+                return descartados
+
+    def detener(self):
+        if self._trio_token is not None and self._cancel_scope is not None:
+            import trio
+
+            try:
+                trio.from_thread.run_sync(self._cancel_scope.cancel, trio_token=self._trio_token)
+            except Exception:
+                pass
+        if self._hilo is not None:
+            self._hilo.join(timeout=5)
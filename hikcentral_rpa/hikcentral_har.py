@@ -0,0 +1,221 @@
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+from hikcentral_http_export import CABECERAS_SESION, eventos_red
+
+
+# ========================
+# HAR DE LOS PASOS DE EXPORT (opt-in)
+# ========================
+# Arma un HAR 1.2 con los eventos CDP Network.* del log 'performance' de ChromeDriver
+# (el mismo que usa el export HTTP) entre iniciar() y detener(). Por request guarda
+# blocked/dns/connect/ssl/send/wait (TTFB)/receive y los bytes recibidos. El resumen con
+# las N requests más lentas queda en el detalle de la ejecución (LOG_RPA_EJECUCION.DETALLE).
+#   HIK_HAR=1        activa la grabación (o --har en los scripts)
+#   HIK_HAR_TOP_N    requests más lentas en el resumen (default 10)
+# Las cabeceras de sesión (token, cookies) se guardan como "<redacted>": el HAR se comparte.
+
+HAR_TOP_N = int(os.getenv("HIK_HAR_TOP_N", "10"))
+
+
+def har_solicitado(flag: bool = False) -> bool:
+    return flag or os.getenv("HIK_HAR", "").strip().lower() in ("1", "true", "si", "yes")
+
+
+CABECERAS_REDACTADAS = CABECERAS_SESION | {"cookie", "set-cookie"}
+
+
+def _headers_har(headers: dict | None) -> list[dict]:
+    return [
+        {"name": k, "value": "<redacted>" if k.lower() in CABECERAS_REDACTADAS else str(v)}
+        for k, v in (headers or {}).items()
+    ]
+
+
+def _tramo(inicio: float, fin: float) -> float:
+    if inicio is None or fin is None or inicio < 0 or fin < 0:
+        return -1
+    return round(fin - inicio, 3)
+
+
+def _timings(timing: dict | None, fin_seg: float | None) -> dict:
+    """Convierte ResourceTiming de CDP (offsets en ms desde requestTime) a timings de HAR."""
+    if not timing:
+        return {"blocked": -1, "dns": -1, "connect": -1, "ssl": -1, "send": 0, "wait": 0, "receive": 0}
+
+    def g(clave: str) -> float:
+        return timing.get(clave, -1)
+
+    primero = next((g(c) for c in ("dnsStart", "connectStart", "sendStart") if g(c) >= 0), 0)
+    receive = 0.0
+    if fin_seg is not None and g("receiveHeadersEnd") >= 0:
+        receive = max((fin_seg - timing["requestTime"]) * 1000 - g("receiveHeadersEnd"), 0)
+    return {
+        "blocked": round(primero, 3),
+        "dns": _tramo(g("dnsStart"), g("dnsEnd")),
+        "connect": _tramo(g("connectStart"), g("connectEnd")),
+        "ssl": _tramo(g("sslStart"), g("sslEnd")),
+        "send": max(_tramo(g("sendStart"), g("sendEnd")), 0),
+        "wait": max(_tramo(g("sendEnd"), g("receiveHeadersEnd")), 0),
+        "receive": round(receive, 3),
+    }
+
+
+def construir_entradas(eventos: list[dict]) -> list[dict]:
+    requests: dict[str, dict] = {}
+    for evento in eventos:
+        metodo = evento.get("method")
+        params = evento.get("params", {})
+        rid = params.get("requestId")
+        if not rid:
+            continue
+        req = requests.setdefault(rid, {})
+        if metodo == "Network.requestWillBeSent":
+            req["request"] = params.get("request", {})
+            req["wall"] = params.get("wallTime")
+        elif metodo == "Network.responseReceived":
+            req["response"] = params.get("response", {})
+        elif metodo == "Network.loadingFinished":
+            req["fin"] = params.get("timestamp")
+            req["bytes"] = params.get("encodedDataLength", 0)
+        elif metodo == "Network.loadingFailed":
+            req["fin"] = params.get("timestamp")
+            req["error"] = params.get("errorText")
+
+    entradas = []
+    for rid, req in requests.items():
+        request = req.get("request")
+        if not request or request.get("url", "").startswith("data:"):
+            continue
+        response = req.get("response", {})
+        timings = _timings(response.get("timing"), req.get("fin"))
+        total = sum(v for k, v in timings.items() if k != "ssl" and v > 0)
+        inicio = datetime.fromtimestamp(req["wall"], tz=timezone.utc) if req.get("wall") else datetime.now(timezone.utc)
+        bytes_red = int(req.get("bytes") or response.get("encodedDataLength") or 0)
+        entradas.append(
+            {
+                "startedDateTime": inicio.isoformat(),
+                "time": round(total, 3),
+                "request": {
+                    "method": request.get("method", "GET"),
+                    "url": request.get("url"),
+                    "httpVersion": response.get("protocol", ""),
+                    "headers": _headers_har(request.get("headers")),
+                    "queryString": [
+                        {"name": k, "value": v} for k, v in parse_qsl(urlsplit(request.get("url", "")).query)
+                    ],
+                    "cookies": [],
+                    "headersSize": -1,
+                    "bodySize": len(request.get("postData") or ""),
+                },
+                "response": {
+                    "status": response.get("status", 0),
+                    "statusText": response.get("statusText", req.get("error") or ""),
+                    "httpVersion": response.get("protocol", ""),
+                    "headers": _headers_har(response.get("headers")),
+                    "cookies": [],
+                    "content": {"size": bytes_red, "mimeType": response.get("mimeType", "")},
+                    "redirectURL": "",
+                    "headersSize": -1,
+                    "bodySize": bytes_red,
+                },
+                "cache": {},
+                "timings": timings,
+                "_requestId": rid,
+                "_error": req.get("error"),
+            }
+        )
+    entradas.sort(key=lambda e: e["startedDateTime"])
+    return entradas
+
+
+def resumen_lentas(entradas: list[dict], top_n: int = HAR_TOP_N) -> list[dict]:
+    lentas = sorted(entradas, key=lambda e: e["time"], reverse=True)[:top_n]
+    return [
+        {
+            "url": urlsplit(e["request"]["url"]).path,
+            "metodo": e["request"]["method"],
+            "status": e["response"]["status"],
+            "total_ms": round(e["time"], 1),
+            "ttfb_ms": round(e["timings"]["wait"], 1),
+            "descarga_ms": round(e["timings"]["receive"], 1),
+            "bytes": e["response"]["bodySize"],
+        }
+        for e in lentas
+    ]
+
+
+class GrabadorHar:
+    def __init__(self, driver, log_dir: Path, nombre: str, recorder=None, top_n: int = HAR_TOP_N):
+        self.driver = driver
+        self.carpeta = Path(log_dir) / "har"
+        self.nombre = "".join(c if c.isalnum() or c in "-_." else "_" for c in nombre)
+        self.recorder = recorder
+        self.top_n = top_n
+        self._desde = None
+
+    def iniciar(self):
+        # Solo cuentan los eventos posteriores (el buffer es compartido con el export HTTP)
+        self._desde = len(eventos_red(self.driver))
+
+    def detener(self, etiqueta: str) -> dict | None:
+        if self._desde is None:
+            return None
+        eventos = eventos_red(self.driver)[self._desde:]
+        self._desde = None
+        entradas = construir_entradas(eventos)
+        if not entradas:
+            print(f"[HAR] {etiqueta}: sin requests registradas (¿driver sin log 'performance'?).")
+            return None
+
+        har = {
+            "log": {
+                "version": "1.2",
+                "creator": {"name": "hikcentral_rpa", "version": "1.0"},
+                "pages": [],
+                "entries": entradas,
+            }
+        }
+        archivo = None
+        try:
+            self.carpeta.mkdir(parents=True, exist_ok=True)
+            archivo = self.carpeta / f"{self.nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.har"
+            with open(archivo, "w", encoding="utf-8") as f:
+                json.dump(har, f, ensure_ascii=False)
+        except OSError as exc:
+            print(f"[WARN] No se pudo guardar el HAR de {etiqueta}: {exc}")
+
+        resumen = {
+            "etiqueta": etiqueta,
+            "archivo": str(archivo) if archivo else None,
+            "requests": len(entradas),
+            "bytes": sum(e["response"]["bodySize"] for e in entradas),
+            "mas_lentas": resumen_lentas(entradas, self.top_n),
+        }
+        print(f"[HAR] {etiqueta}: {resumen['requests']} requests, {resumen['bytes'] / 1024:.0f} KB -> {archivo}")
+        for req in resumen["mas_lentas"][:3]:
+            print(
+                f"[HAR]   {req['total_ms']:8.0f} ms (TTFB {req['ttfb_ms']:.0f} ms, "
+                f"descarga {req['descarga_ms']:.0f} ms) {req['metodo']} {req['url']} [{req['status']}]"
+            )
+        if self.recorder is not None:
+            self.recorder.detalle.setdefault("har", []).append(resumen)
+        return resumen
+
+
+@contextmanager
+def grabar_har(timer, etiqueta: str):
+    """Graba el HAR del bloque si el timer del hilo trae un GrabadorHar (RunContext con har)."""
+    grabador = getattr(timer, "har", None)
+    if grabador is None:
+        yield
+        return
+    grabador.iniciar()
+    try:
+        yield
+    finally:
+        grabador.detener(etiqueta)
@@ -0,0 +1,129 @@
+import json
+import os
+import ssl
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+
+# ========================
+# SONDEO DE HOSTS HIKCENTRAL (concurrente + cache con TTL)
+# ========================
+# Todos los hosts se sondean a la vez (el costo es el del más lento, no la suma).
+# El resultado (up + latencia) queda en un JSON compartido por los tres scripts;
+# dentro del TTL no se vuelve a sondear.
+#   HIK_HOSTS_CACHE  ruta del JSON (default: <tmp>/hikcentral_hosts_cache.json)
+#   HIK_HOSTS_TTL    segundos de validez (default 30)
+
+HOSTS_CACHE = Path(os.getenv("HIK_HOSTS_CACHE") or Path(tempfile.gettempdir()) / "hikcentral_hosts_cache.json")
+HOSTS_TTL = float(os.getenv("HIK_HOSTS_TTL", "30"))
+PROBE_TIMEOUT = 2.5
+
+_SSL_SIN_VERIFICAR = ssl._create_unverified_context()
+
+
+def url_sondeo(host: str) -> str:
+    """Acepta '172.16.9.10' o una URL completa ('https://172.16.9.253/#')."""
+    if "://" in host:
+        partes = urlsplit(host)
+        return f"{partes.scheme}://{partes.netloc}/"
+    return f"http://{host}/"
+
+
+def clave_host(host: str) -> str:
+    return urlsplit(url_sondeo(host)).netloc
+
+
+def sondear_host(host: str, timeout: float = PROBE_TIMEOUT) -> dict:
+    inicio = time.perf_counter()
+    up = False
+    request = Request(url_sondeo(host), method="GET")
+    try:
+        with urlopen(request, timeout=timeout, context=_SSL_SIN_VERIFICAR) as response:
+            up = response.status < 500
+    except HTTPError as exc:
+        up = exc.code < 500
+    except (URLError, TimeoutError, OSError):
+        up = False
+    return {
+        "host": host,
+        "up": up,
+        "latencia_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        "ts": time.time(),
+    }
+
+
+def _leer_cache() -> dict:
+    try:
+        with open(HOSTS_CACHE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _guardar_cache(entradas: dict):
+    # Merge con lo que otro script haya escrito mientras tanto; gana la entrada más nueva
+    actual = _leer_cache()
+    for clave, entrada in entradas.items():
+        if entrada["ts"] >= actual.get(clave, {}).get("ts", 0):
+            actual[clave] = entrada
+    try:
+        HOSTS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = HOSTS_CACHE.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(actual, f, indent=2)
+        tmp.replace(HOSTS_CACHE)
+    except OSError as exc:
+        print(f"[WARN] No se pudo escribir cache de hosts ({HOSTS_CACHE}): {exc}")
+
+
+def sondear_hosts(
+    hosts: list[str],
+    timeout: float = PROBE_TIMEOUT,
+    ttl: float = HOSTS_TTL,
+    forzar: bool = False,
+) -> list[dict]:
+    """
+    Estado de cada host (up, latencia_ms), en el mismo orden recibido.
+    Usa el cache si la entrada tiene menos de `ttl` segundos; el resto se sondea en paralelo.
+    """
+    cache = {} if forzar else _leer_cache()
+    ahora = time.time()
+    resultados: dict[str, dict] = {}
+    a_sondear = []
+    for host in hosts:
+        entrada = cache.get(clave_host(host))
+        if entrada and ahora - entrada.get("ts", 0) < ttl:
+            resultados[host] = {**entrada, "host": host, "cache": True}
+        else:
+            a_sondear.append(host)
+
+    if a_sondear:
+        with ThreadPoolExecutor(max_workers=len(a_sondear)) as pool:
+            for estado in pool.map(lambda h: sondear_host(h, timeout), a_sondear):
+                resultados[estado["host"]] = {**estado, "cache": False}
+        _guardar_cache({clave_host(h): {k: v for k, v in resultados[h].items() if k != "cache"} for h in a_sondear})
+
+    for host in hosts:
+        estado = resultados[host]
+        origen = "cache" if estado["cache"] else "sondeo"
+        print(
+            f"[HOSTS] {host}: {'UP' if estado['up'] else 'DOWN'} "
+            f"({estado['latencia_ms']:.0f} ms, {origen})"
+        )
+    return [resultados[h] for h in hosts]
+
+
+def ordenar_hosts(hosts: list[str], **kwargs) -> tuple[list[str], list[str]]:
+    """Devuelve (hosts arriba ordenados por latencia, hosts caídos)."""
+    estados = sondear_hosts(hosts, **kwargs)
+    arriba = sorted((e for e in estados if e["up"]), key=lambda e: e["latencia_ms"])
+    return [e["host"] for e in arriba], [e["host"] for e in estados if not e["up"]]
+
+
+def host_disponible(host: str, **kwargs) -> bool:
+    return sondear_hosts([host], **kwargs)[0]["up"]
@@ -0,0 +1,442 @@
+import io
+import json
+import os
+import re
+import time
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# ========================
+# EXPORT DIRECTO POR HTTP
+# ========================
+# La primera ejecución graba (vía el log "performance" de Chrome, que expone los
+# eventos CDP Network.*) las peticiones que dispara el panel Export. Esa "receta"
+# se guarda en JSON y en ejecuciones siguientes se reproduce desde Python con las
+# cookies/token de la sesión del navegador, sin abrir el drawer de Export.
+
+RECETAS_DIR = Path(
+    os.getenv(
+        "HIK_HTTP_RECETAS_DIR",
+        str(Path(__file__).resolve().parent / "recetas_export"),
+    )
+)
+
+PATRONES_EXPORT = ("export", "download", "report")
+
+# Cabeceras que no se reproducen tal cual (las pone requests o vienen de la sesión viva).
+CABECERAS_EXCLUIDAS = {
+    "cookie",
+    "content-length",
+    "host",
+    "connection",
+    "accept-encoding",
+    "origin",
+    "referer",
+}
+
+# Cabeceras que llevan el token de sesión; se toman de la sesión actual, no de la receta
+# (no se graban: serían credenciales en disco y en el replay pisarían el token vigente).
+CABECERAS_SESION = {"authorization", "token", "x-token", "x-csrf-token", "x-xsrf-token", "sessionid"}
+
+FECHA_RE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+
+def habilitar_captura_red(chrome_options):
+    """Activa el log 'performance' de ChromeDriver (eventos CDP Network.*)."""
+    chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+
+def eventos_red(driver) -> list[dict]:
+    """
+    Devuelve todos los eventos CDP Network.* vistos en el driver.
+    get_log('performance') vacía el buffer, así que se acumulan en el propio driver
+    para que varios consumidores puedan leerlos.
+    """
+    acumulados = getattr(driver, "hik_eventos_red", None)
+    if acumulados is None:
+        acumulados = []
+        driver.hik_eventos_red = acumulados
+
+    try:
+        entradas = driver.get_log("performance")
+    except Exception:
+        return acumulados
+
+    for entrada in entradas:
+        try:
+            mensaje = json.loads(entrada["message"])["message"]
+        except (KeyError, ValueError, TypeError):
+            continue
+        if str(mensaje.get("method", "")).startswith("Network."):
+            acumulados.append(mensaje)
+    return acumulados
+
+
+def _origen(url: str) -> str:
+    partes = urlsplit(url)
+    return f"{partes.scheme}://{partes.netloc}"
+
+
+def _ruta_relativa(url: str) -> str:
+    partes = urlsplit(url)
+    ruta = partes.path or "/"
+    return f"{ruta}?{partes.query}" if partes.query else ruta
+
+
+def _cuerpo_respuesta(driver, request_id: str):
+    try:
+        data = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+    except Exception:
+        return None
+    body = data.get("body")
+    if not body or data.get("base64Encoded"):
+        return None
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+def _valores_hoja(obj, ruta=()):
+    """Recorre un JSON y devuelve (ruta, valor) de cada string/número hoja."""
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            yield from _valores_hoja(v, ruta + (k,))
+    elif isinstance(obj, list):
+        for i, v in enumerate(obj):
+            yield from _valores_hoja(v, ruta + (i,))
+    elif isinstance(obj, (str, int)) and not isinstance(obj, bool):
+        yield ruta, str(obj)
+
+
+def _extraer(obj, ruta):
+    for clave in ruta:
+        try:
+            obj = obj[clave]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return obj
+
+
+def capturar_receta(driver, url_base: str, patrones=PATRONES_EXPORT) -> dict | None:
+    """
+    Arma la receta a partir de los eventos de red del export recién ejecutado en la UI.
+    Solo se consideran peticiones al mismo origen que url_base cuya URL contiene
+    alguno de los patrones. Los valores devueltos por un paso y usados por pasos
+    posteriores (ej: id de tarea de export) se registran como variables.
+    """
+    origen = _origen(url_base)
+    pasos: list[dict] = []
+    por_request_id: dict[str, dict] = {}
+
+    for evento in eventos_red(driver):
+        metodo = evento.get("method")
+        params = evento.get("params", {})
+        if metodo == "Network.requestWillBeSent":
+            req = params.get("request", {})
+            url = req.get("url", "")
+            if not url.startswith(origen):
+                continue
+            if not any(p in url.lower() for p in patrones):
+                continue
+            paso = {
+                "request_id": params.get("requestId"),
+                "method": req.get("method", "GET"),
+                "path": _ruta_relativa(url),
+                "headers": _cabeceras_reproducibles(req.get("headers", {})),
+                "post_data": req.get("postData"),
+                "variables": [],
+            }
+            pasos.append(paso)
+            por_request_id[paso["request_id"]] = paso
+        elif metodo == "Network.responseReceived":
+            paso = por_request_id.get(params.get("requestId"))
+            if paso is not None:
+                paso["mime_type"] = params.get("response", {}).get("mimeType")
+                paso["status"] = params.get("response", {}).get("status")
+
+    if not pasos:
+        return None
+
+    # Colapsar sondeos: peticiones idénticas consecutivas se reproducen en bucle.
+    colapsados: list[dict] = []
+    for paso in pasos:
+        previo = colapsados[-1] if colapsados else None
+        if (
+            previo is not None
+            and previo["method"] == paso["method"]
+            and previo["path"] == paso["path"]
+            and previo["post_data"] == paso["post_data"]
+        ):
+            previo["sondeo"] = True
+            previo["request_id_final"] = paso["request_id"]
+            continue
+        colapsados.append(paso)
+
+    respuestas = [
+        _cuerpo_respuesta(driver, p.get("request_id_final") or p["request_id"]) for p in colapsados
+    ]
+    for i, respuesta in enumerate(respuestas):
+        if respuesta is None:
+            continue
+        for ruta, valor in _valores_hoja(respuesta):
+            if len(valor) < 6:
+                continue
+            for j in range(i + 1, len(colapsados)):
+                destino = colapsados[j]
+                texto = (destino["path"] or "") + (destino["post_data"] or "")
+                if valor in texto:
+                    destino["variables"].append(
+                        {"paso": i, "ruta": list(ruta), "valor_grabado": valor}
+                    )
+
+    for paso in colapsados:
+        paso.pop("request_id", None)
+        paso.pop("request_id_final", None)
+
+    return {
+        "capturado": datetime.now().isoformat(timespec="seconds"),
+        "pasos": colapsados,
+    }
+
+
+def _archivo_receta(host_label: str, opcion: str) -> Path:
+    nombre = re.sub(r"[^A-Za-z0-9]+", "_", f"{host_label}_{opcion}").strip("_")
+    return RECETAS_DIR / f"{nombre}.json"
+
+
+def guardar_receta(host_label: str, opcion: str, receta: dict) -> Path:
+    RECETAS_DIR.mkdir(parents=True, exist_ok=True)
+    destino = _archivo_receta(host_label, opcion)
+    with open(destino, "w", encoding="utf-8") as f:
+        json.dump(receta, f, indent=2, ensure_ascii=False)
+    print(f"[HTTP-EXPORT] Receta guardada en: {destino} ({len(receta['pasos'])} pasos)")
+    return destino
+
+
+def cargar_receta(host_label: str, opcion: str) -> dict | None:
+    try:
+        with open(_archivo_receta(host_label, opcion), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cabeceras_reproducibles(headers: dict) -> dict:
+    """Cabeceras de la petición grabada sin las que pone requests ni las de la sesión."""
+    return {
+        k: v for k, v in headers.items() if k.lower() not in CABECERAS_EXCLUIDAS and k.lower() not in CABECERAS_SESION
+    }
+
+
+def sesion_desde_driver(driver, pool_maxsize: int = 8) -> requests.Session:
+    """requests.Session con pool de conexiones, las cookies del navegador y su token de sesión."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=2,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504)),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.verify = False
+
+    for cookie in driver.get_cookies():
+        session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain"),
+            path=cookie.get("path", "/"),
+        )
+
+    # Token de sesión: se toma de la petición XHR más reciente que lo haya enviado.
+    for evento in reversed(eventos_red(driver)):
+        if evento.get("method") != "Network.requestWillBeSent":
+            continue
+        headers = evento.get("params", {}).get("request", {}).get("headers", {})
+        token_headers = {k: v for k, v in headers.items() if k.lower() in CABECERAS_SESION}
+        if token_headers:
+            session.headers.update(token_headers)
+            break
+
+    try:
+        session.headers["User-Agent"] = driver.execute_script("return navigator.userAgent;")
+    except Exception:
+        pass
+
+    return session
+
+
+def _desplazar_fechas(texto: str | None, dias: int) -> str | None:
+    """Corre las fechas YYYY-MM-DD de la receta para que 'hoy' siga siendo hoy."""
+    if not texto or dias == 0:
+        return texto
+
+    def _reemplazo(match):
+        try:
+            fecha = datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        except ValueError:
+            return match.group(0)
+        return (fecha + timedelta(days=dias)).strftime("%Y-%m-%d")
+
+    return FECHA_RE.sub(_reemplazo, texto)
+
+
+def _es_zip(contenido: bytes) -> bool:
+    return contenido[:2] == b"PK"
+
+
+def extraer_libro(contenido: bytes) -> bytes | None:
+    """
+    Devuelve los bytes del .xlsx. Si la respuesta es un zip que contiene el libro
+    (como los Alarm_Report_*), extrae el primer .xls/.xlsx de adentro.
+    """
+    if not contenido or not _es_zip(contenido):
+        return None
+    try:
+        with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+            nombres = zf.namelist()
+            if "[Content_Types].xml" in nombres:
+                return contenido
+            for nombre in nombres:
+                if nombre.lower().endswith((".xlsx", ".xls")):
+                    return zf.read(nombre)
+    except zipfile.BadZipFile:
+        return None
+    return None
+
+
+def _buscar_url_descarga(respuesta) -> str | None:
+    for _, valor in _valores_hoja(respuesta):
+        baja = valor.lower()
+        if baja.endswith((".xlsx", ".xls", ".zip")) or ("download" in baja and "/" in baja):
+            return valor
+    return None
+
+
+def _progreso_completo(respuesta) -> bool:
+    for ruta, valor in _valores_hoja(respuesta):
+        if ruta and str(ruta[-1]).lower() in {"progress", "percent", "rate"} and valor in {"100", "100.0"}:
+            return True
+    return False
+
+
+def reproducir_export(
+    session: requests.Session,
+    url_base: str,
+    receta: dict,
+    timeout: int = 180,
+    intervalo_sondeo: float = 1.0,
+) -> bytes | None:
+    """
+    Reproduce la receta contra url_base. Devuelve los bytes del libro Excel
+    o None si la respuesta final no es un libro (el llamador cae al flujo UI).
+    """
+    origen = _origen(url_base)
+    pasos = receta.get("pasos") or []
+    try:
+        capturado = datetime.fromisoformat(receta.get("capturado", ""))
+        dias = (datetime.now().date() - capturado.date()).days
+    except ValueError:
+        dias = 0
+
+    fin = time.time() + timeout
+    respuestas_json: list = [None] * len(pasos)
+    ultima: requests.Response | None = None
+
+    for i, paso in enumerate(pasos):
+        path = _desplazar_fechas(paso["path"], dias)
+        post_data = _desplazar_fechas(paso.get("post_data"), dias)
+        for variable in paso.get("variables", []):
+            nuevo = _extraer(respuestas_json[variable["paso"]], variable["ruta"])
+            if nuevo is None:
+                print(f"[HTTP-EXPORT] Variable no disponible en paso {i}: {variable['ruta']}")
+                return None
+            path = path.replace(variable["valor_grabado"], str(nuevo))
+            if post_data:
+                post_data = post_data.replace(variable["valor_grabado"], str(nuevo))
+
+        dependientes = [
+            v for p in pasos[i + 1 :] for v in p.get("variables", []) if v["paso"] == i
+        ]
+
+        while True:
+            ultima = session.request(
+                paso["method"],
+                urljoin(origen, path),
+                headers=_cabeceras_reproducibles(paso.get("headers") or {}),
+                data=post_data.encode("utf-8") if post_data else None,
+                timeout=max(5, fin - time.time()),
+            )
+            if ultima.status_code >= 400:
+                print(f"[HTTP-EXPORT] Paso {i} respondió HTTP {ultima.status_code}: {path}")
+                return None
+
+            try:
+                respuestas_json[i] = ultima.json()
+            except ValueError:
+                respuestas_json[i] = None
+
+            if not paso.get("sondeo") or time.time() > fin:
+                break
+            if dependientes and all(
+                _extraer(respuestas_json[i], v["ruta"]) not in (None, "") for v in dependientes
+            ):
+                break
+            if not dependientes and _progreso_completo(respuestas_json[i]):
+                break
+            time.sleep(intervalo_sondeo)
+
+    if ultima is None:
+        return None
+
+    libro = extraer_libro(ultima.content)
+    if libro is None and respuestas_json[-1] is not None:
+        url_descarga = _buscar_url_descarga(respuestas_json[-1])
+        if url_descarga:
+            descarga = session.get(urljoin(origen, url_descarga), timeout=max(5, fin - time.time()))
+            if descarga.ok:
+                libro = extraer_libro(descarga.content)
+
+    if libro is None:
+        print("[HTTP-EXPORT] La respuesta final no contiene un libro Excel.")
+        return None
+
+    print(f"[HTTP-EXPORT] Libro recibido por HTTP ({len(libro) / 1024:.1f} KB)")
+    return libro
+
+
+def exportar_por_http(driver, url_base: str, host_label: str, opcion: str, timeout: int = 180) -> bytes | None:
+    """Atajo: carga la receta del host/opción y la reproduce con la sesión del driver."""
+    receta = cargar_receta(host_label, opcion)
+    if not receta:
+        print(f"[HTTP-EXPORT] Sin receta para {host_label}/{opcion}; se usará el flujo UI.")
+        return None
+
+    session = sesion_desde_driver(driver)
+    try:
+        return reproducir_export(session, url_base, receta, timeout=timeout)
+    except requests.RequestException as exc:
+        print(f"[HTTP-EXPORT] Error reproduciendo receta: {exc}")
+        return None
+    finally:
+        session.close()
+
+
+def registrar_receta_desde_ui(driver, url_base: str, host_label: str, opcion: str) -> Path | None:
+    """Tras un export por UI exitoso, graba la receta para las siguientes ejecuciones."""
+    receta = capturar_receta(driver, url_base)
+    if not receta:
+        print("[HTTP-EXPORT] No se detectaron peticiones de export para grabar.")
+        return None
+    return guardar_receta(host_label, opcion, receta)
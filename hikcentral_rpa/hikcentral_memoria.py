@@ -0,0 +1,170 @@
+import contextvars
+import os
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+
+# ========================
+# MEMORIA POR ETAPA DE LA INGESTA (tracemalloc, opt-in)
+# ========================
+# Las cargas con pandas hacen varias copias completas del DataFrame (.copy(), replace,
+# where, applymap) y en archivos grandes se ven picos de RSS. Con esto cada carga marca
+# sus etapas y por etapa queda:
+#   pico_mb      máximo asignado durante la etapa (sobre lo que había al empezar la carga)
+#   retenido_mb  lo que sigue vivo al terminar la etapa
+#   delta_mb     lo que la etapa sumó (o liberó) respecto de la anterior
+#   top          líneas con más memoria viva al cerrar la etapa
+#   seg          duración de la etapa
+# El resumen va a LOG_RPA_EJECUCION.DETALLE ("memoria") y se imprime como [MEM].
+# Sin tracemalloc (medir_memoria=False, lo usan los benchmarks de carga) solo quedan los
+# segundos por etapa, en DETALLE["etapas"] y como [ETAPA].
+#   HIK_MEMORIA=1             activa la medición (o --memoria en los scripts)
+#   HIK_MEMORIA_TOP_N         líneas por etapa en el top (default 3, 0 = sin snapshots)
+#
+# tracemalloc es global al proceso: con cargas en paralelo las cifras de una incluyen a las otras.
+
+MEMORIA_TOP_N = int(os.getenv("HIK_MEMORIA_TOP_N", "3"))
+
+# Cargas midiendo a la vez: tracemalloc se apaga recién cuando termina la última
+_mediciones_activas = 0
+_lock = threading.Lock()
+
+# (recorder, medir_memoria) de la ejecución activa en el hilo
+_recorder_memoria: contextvars.ContextVar[tuple | None] = contextvars.ContextVar(
+    "hik_recorder_memoria", default=None
+)
+
+
+def memoria_solicitada(flag: bool = False) -> bool:
+    return flag or os.getenv("HIK_MEMORIA", "").strip().lower() in ("1", "true", "si", "yes")
+
+
+def _mb(valor: int) -> float:
+    return round(valor / (1024**2), 1)
+
+
+class EtapasMemoria:
+    def __init__(
+        self,
+        nombre: str,
+        recorder=None,
+        top_n: int = MEMORIA_TOP_N,
+        medir_memoria: bool = True,
+    ):
+        self.nombre = nombre
+        self.recorder = recorder
+        self.top_n = top_n
+        self.medir_memoria = medir_memoria
+        self.etapas: list[dict] = []
+        self._cerrada = not medir_memoria
+        self.inicio = time.perf_counter()
+        self._previo_t = self.inicio
+        if not medir_memoria:
+            return
+        global _mediciones_activas
+        with _lock:
+            if _mediciones_activas == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            _mediciones_activas += 1
+        self.base, _ = tracemalloc.get_traced_memory()
+        self._previo = self.base
+        tracemalloc.reset_peak()
+
+    def _top_lineas(self) -> list[dict]:
+        # El snapshot se descarta acá mismo para no inflar la etapa siguiente
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+        )
+        return [
+            {
+                "linea": f"{Path(stat.traceback[0].filename).name}:{stat.traceback[0].lineno}",
+                "mb": _mb(stat.size),
+            }
+            for stat in snapshot.statistics("lineno")[: self.top_n]
+        ]
+
+    def marcar(self, etapa: str):
+        """Cierra la etapa que termina aquí (desde la marca anterior o el inicio de la carga)."""
+        ahora = time.perf_counter()
+        datos = {"etapa": etapa, "seg": round(ahora - self._previo_t, 4)}
+        if not self.medir_memoria:
+            self.etapas.append(datos)
+            print(f"[ETAPA] {self.nombre} | {etapa:<22} {datos['seg']:9.3f}s")
+            self._previo_t = time.perf_counter()
+            return
+
+        actual, pico = tracemalloc.get_traced_memory()
+        datos.update(
+            {
+                "pico_mb": _mb(pico - self.base),
+                "retenido_mb": _mb(actual - self.base),
+                "delta_mb": _mb(actual - self._previo),
+            }
+        )
+        if self.top_n:
+            datos["top"] = self._top_lineas()
+        self.etapas.append(datos)
+        print(
+            f"[MEM] {self.nombre} | {etapa:<22} pico: {datos['pico_mb']:8.1f} MB | "
+            f"retenido: {datos['retenido_mb']:8.1f} MB | delta: {datos['delta_mb']:+8.1f} MB"
+        )
+        self._previo = actual
+        tracemalloc.reset_peak()
+        # El snapshot del top no cuenta como tiempo de la etapa siguiente
+        self._previo_t = time.perf_counter()
+
+    def cerrar(self) -> dict:
+        global _mediciones_activas
+        resumen = {
+            "carga": self.nombre,
+            "seg": round(sum(e["seg"] for e in self.etapas), 4),
+            "etapas": self.etapas,
+        }
+        if self.medir_memoria:
+            resumen["pico_mb"] = max((e["pico_mb"] for e in self.etapas), default=0.0)
+        if self.recorder is not None:
+            clave = "memoria" if self.medir_memoria else "etapas"
+            self.recorder.detalle.setdefault(clave, []).append(resumen)
+        if not self._cerrada:
+            self._cerrada = True
+            with _lock:
+                _mediciones_activas -= 1
+                if _mediciones_activas == 0:
+                    tracemalloc.stop()
+        return resumen
+
+
+class _SinMedicion:
+    def marcar(self, etapa: str):
+        pass
+
+    def cerrar(self):
+        return None
+
+
+_SIN_MEDICION = _SinMedicion()
+
+
+def activar_memoria(recorder, medir_memoria: bool = True) -> contextvars.Token:
+    """
+    Las cargas del hilo (y de los hilos con en_contexto) registran sus etapas en `recorder`;
+    con medir_memoria=False solo los tiempos, sin el costo de tracemalloc.
+    """
+    return _recorder_memoria.set(None if recorder is None else (recorder, medir_memoria))
+
+
+def desactivar_memoria(token: contextvars.Token):
+    _recorder_memoria.reset(token)
+
+
+def etapas_memoria(nombre: str) -> EtapasMemoria | _SinMedicion:
+    """Medición para una carga; sin medición activa en el hilo ni HIK_MEMORIA=1 no hace nada."""
+    activo = _recorder_memoria.get()
+    if activo is not None:
+        recorder, medir_memoria = activo
+        return EtapasMemoria(nombre, recorder, medir_memoria=medir_memoria)
+    if memoria_solicitada():
+        return EtapasMemoria(nombre)
+    return _SIN_MEDICION
@@ -0,0 +1,80 @@
+import os
+
+
+# ========================
+# MÉTRICAS DE LA PÁGINA VÍA CDP (opt-in)
+# ========================
+# Performance.getMetrics de la pestaña activa en cada StepTimer.mark: heap JS, nodos DOM
+# y tiempo de layout/estilos/scripts/tareas del cliente web de HikCentral. Las duraciones
+# son acumuladas desde que se habilitó el dominio, así que se guarda el delta del paso:
+# si un paso lento tiene poco TaskDuration, el tiempo se fue esperando al servidor o en el script.
+#   HIK_METRICAS_PAGINA=1  activa la captura (o --metricas-pagina en los scripts)
+
+METRICAS_ABSOLUTAS = {
+    "JSHeapUsedSize": "js_heap_mb",
+    "JSHeapTotalSize": "js_heap_total_mb",
+    "Nodes": "nodos_dom",
+    "Documents": "documentos",
+    "JSEventListeners": "listeners",
+}
+METRICAS_DURACION = {
+    "TaskDuration": "task_seg",
+    "ScriptDuration": "script_seg",
+    "LayoutDuration": "layout_seg",
+    "RecalcStyleDuration": "estilos_seg",
+}
+
+
+def metricas_solicitadas(flag: bool = False) -> bool:
+    return flag or os.getenv("HIK_METRICAS_PAGINA", "").strip().lower() in ("1", "true", "si", "yes")
+
+
+class MetricasPagina:
+    def __init__(self, driver):
+        self.driver = driver
+        self.activa = False
+        self._previas: dict[str, float] = {}
+
+    def habilitar(self) -> bool:
+        try:
+            self.driver.execute_cdp_cmd("Performance.enable", {"timeDomain": "timeTicks"})
+            self.activa = True
+        except Exception as exc:
+            print(f"[WARN] CDP Performance no disponible; se omiten métricas de página: {exc}")
+            self.activa = False
+        return self.activa
+
+    def tomar(self) -> dict | None:
+        """Métricas actuales de la pestaña + delta de duraciones desde la toma anterior."""
+        if not self.activa:
+            return None
+        try:
+            crudas = self.driver.execute_cdp_cmd("Performance.getMetrics", {})["metrics"]
+        except Exception:
+            # El driver ya se cerró o la pestaña cambió: no se insiste en el resto de la ejecución
+            self.activa = False
+            return None
+
+        valores = {m["name"]: m["value"] for m in crudas}
+        resultado = {}
+        for nombre, clave in METRICAS_ABSOLUTAS.items():
+            if nombre in valores:
+                valor = valores[nombre]
+                resultado[clave] = round(valor / (1024**2), 1) if nombre.startswith("JSHeap") else int(valor)
+        for nombre, clave in METRICAS_DURACION.items():
+            if nombre in valores:
+                valor = valores[nombre]
+                previa = self._previas.get(nombre, 0.0)
+                # Una navegación completa (login -> portal) reinicia los contadores del documento:
+                # si bajó, lo acumulado en el documento nuevo es todo del paso
+                resultado[clave] = round(valor - previa if valor >= previa else valor, 3)
+                self._previas[nombre] = valor
+        return resultado
+
+
+def resumen_pagina(metricas: dict) -> str:
+    return (
+        f"task {metricas.get('task_seg', 0):.2f}s | script {metricas.get('script_seg', 0):.2f}s | "
+        f"layout {metricas.get('layout_seg', 0):.2f}s | heap {metricas.get('js_heap_mb', 0):.1f} MB | "
+        f"nodos {metricas.get('nodos_dom', 0)}"
+    )
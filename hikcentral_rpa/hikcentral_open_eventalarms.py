@@ -1,17 +1,19 @@
 import argparse
+import io
 import os
+import queue
 import shutil
+import threading
 import time
 import traceback
-from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, timedelta
 import hashlib
 from pathlib import Path
-from urllib.error import URLError, HTTPError
-from urllib.request import Request, urlopen
+from typing import Callable
 
 import pandas as pd
 import numpy as np
-import psutil
 import psycopg2
 from dotenv import load_dotenv
 from psycopg2.extras import execute_values
@@ -29,110 +31,42 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
-from webdriver_manager.chrome import ChromeDriverManager
-
-
-class PerformanceRecorder:
-    def __init__(self, start_time: float | None = None):
-        self.start_time = start_time if start_time is not None else time.perf_counter()
-        self.steps: list[dict] = []
-        self.cpu_max: float | None = None
-        self.proc = psutil.Process(os.getpid())
-
-    def _parse_step_label(self, label: str) -> tuple[int | None, str]:
-        import re
-
-        match = re.search(r"\[(\d+)\]", label)
-        if not match:
-            return None, label
-
-        return int(match.group(1)), label.strip()
-
-    def _update_cpu_max(self, cpu_percent: float):
-        if self.cpu_max is None or cpu_percent > self.cpu_max:
-            self.cpu_max = cpu_percent
-
-    def update_cpu(self, cpu_percent: float):
-        self._update_cpu_max(cpu_percent)
-
-    def add_step(
-        self,
-        label: str,
-        step_secs: float,
-        total_secs: float,
-        cpu_percent: float,
-        mem_percent: float,
-        proc_mem_mb: float,
-    ):
-        num_paso, descripcion = self._parse_step_label(label)
-        if num_paso is None:
-            return
-
-        self._update_cpu_max(cpu_percent)
-        self.steps.append(
-            {
-                "num_paso": num_paso,
-                "descripcion": descripcion,
-                "tiempo_paso": round(step_secs, 2),
-                "tiempo_total": round(total_secs, 2),
-                "cpu": round(cpu_percent, 1),
-                "ram": round(mem_percent, 1),
-                "py_mem": int(proc_mem_mb),
-            }
-        )
-
-    def record_baseline(self, cpu_percent: float, mem_percent: float):
-        self._update_cpu_max(cpu_percent)
-        total_secs = time.perf_counter() - self.start_time
-        self.steps.append(
-            {
-                "num_paso": 0,
-                "descripcion": "[0] Baseline antes de automatizar",
-                "tiempo_paso": 0.0,
-                "tiempo_total": round(total_secs, 2),
-                "cpu": round(cpu_percent, 1),
-                "ram": round(mem_percent, 1),
-                "py_mem": int(self.proc.memory_info().rss / (1024**2)),
-            }
-        )
-
-
-class StepTimer:
-    def __init__(self, start_time: float | None = None, recorder: PerformanceRecorder | None = None):
-        self.start = start_time if start_time is not None else time.perf_counter()
-        self.last = self.start
-        self.recorder = recorder
-        self.proc = psutil.Process(os.getpid())
-
-    def mark(self, label: str):
-        now = time.perf_counter()
-        step_secs = now - self.last
-        total_secs = now - self.start
-
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        registrar_cpu(cpu_percent)
-        mem = psutil.virtual_memory()
-        mem_percent = mem.percent
-        proc_mem_mb = self.proc.memory_info().rss / (1024**2)
-
-        print(
-            f"[PERF] {label:<45} "
-            f"paso: {step_secs:6.2f}s | total: {total_secs:6.2f}s | "
-            f"CPU: {cpu_percent:5.1f}% | RAM: {mem_percent:5.1f}% | "
-            f"PY-MEM: {proc_mem_mb:6.1f} MB"
-        )
-
-        if self.recorder:
-            self.recorder.add_step(
-                label,
-                step_secs,
-                total_secs,
-                cpu_percent,
-                mem_percent,
-                proc_mem_mb,
-            )
 
-        self.last = now
+from hikcentral_contexto import (
+    PerformanceRecorder,
+    RunContext,
+    StepTimer,
+    guardar_detalle_ejecucion,
+    insertar_pasos_ejecucion,
+)
+from hikcentral_driver import (
+    activar_bloqueo_recursos,
+    aplicar_opciones_lean,
+    cerrar_driver,
+    headless_solicitado,
+    perfil_lean_solicitado,
+    resolver_chromedriver,
+)
+from hikcentral_excel import leer_excel
+from hikcentral_fetch_intercept import (
+    InterceptorExport,
+    LibroCapturado,
+    archivar_async,
+    esperar_archivado,
+)
+from hikcentral_har import grabar_har
+from hikcentral_hosts import host_disponible, ordenar_hosts
+from hikcentral_http_export import (
+    exportar_por_http,
+    habilitar_captura_red,
+    registrar_receta_desde_ui,
+)
+from hikcentral_memoria import etapas_memoria
+from hikcentral_perfilado import perfilado
+from hikcentral_regresiones import revisar_ejecucion
+from hikcentral_spool import encolar_export
+from hikcentral_timeouts import PLAZO_SEG, Plazo, PlazoAgotado, espera, plazo_solicitado
+from hikcentral_trace import Trazador, activar, en_contexto, instrumentar_driver, span, trazado
 
 
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -140,23 +74,17 @@ ENV_PATH = BASE_DIR / ".env"
 load_dotenv(ENV_PATH)
 
 DEFAULT_HOSTS = ["172.16.9.10", "172.16.9.11"]
-URL = ""
 SCRIPT_NAME = "hikcentral_open_eventalarms.py"
 HIK_USER = os.getenv("HIK_USER", "Analitica_reportes")
 HIK_PASSWORD = os.getenv("HIK_PASSWORD", "SW2112asm")
 
 LOG_DIR = Path(r"C:\\portal-sw\\SecurityWorld\\hikcentral_rpa\\logs")
-DOWNLOAD_DIR = Path(r"C:\\portal-sw\\SecurityWorld\\hikcentral_rpa\\downloads")
+DOWNLOAD_DIR = Path(os.getenv("HIK_DOWNLOAD_DIR") or r"C:\\portal-sw\\SecurityWorld\\hikcentral_rpa\\downloads")
 
 
 def host_is_up(host: str, timeout: float = 2.5) -> bool:
-    url = f"http://{host}/"
-    request = Request(url, method="GET")
-    try:
-        with urlopen(request, timeout=timeout) as response:
-            return response.status < 500
-    except (HTTPError, URLError, TimeoutError, OSError):
-        return False
+    """Usa el cache compartido de hikcentral_hosts (no vuelve a sondear dentro del TTL)."""
+    return host_disponible(host, timeout=timeout)
 
 
 def resolve_hik_host(cli_host: str | None) -> tuple[str, str]:
@@ -173,10 +101,11 @@ def resolve_hik_host(cli_host: str | None) -> tuple[str, str]:
     else:
         hosts = DEFAULT_HOSTS
 
-    for host in hosts:
-        if host_is_up(host):
-            return host, "autodetect"
+    arriba, caidos = ordenar_hosts(hosts)
+    for host in caidos:
         print(f"[WARN] Host no responde: {host}")
+    if arriba:
+        return arriba[0], "autodetect"
 
     raise RuntimeError("Ningún host HikCentral disponible en HIK_HOSTS/DEFAULT_HOSTS")
 
@@ -298,42 +227,107 @@ def snapshot_alarm_reports(downloadcenter_root: Path) -> set[Path]:
     return files
 
 
+_alarm_reports_reclamados: set[Path] = set()
+_lock_reclamos = threading.Lock()
+# El Alarm_Report no dice de qué búsqueda salió y Downloadcenter lo comparten todas las
+# sesiones y hosts del proceso: cada export registra la hora de su clic en Save y los
+# reportes se reparten en orden (el más viejo al export pendiente más viejo). El lock solo
+# ordena snapshot + registro + clic en Save; la espera del reporte va sin lock.
+_locks_downloadcenter: dict[Path, threading.Lock] = {}
+# Hora del clic en Save de los exports que todavía esperan su Alarm_Report, por Downloadcenter
+_exports_pendientes: dict[Path, list[float]] = {}
+
+
+def lock_downloadcenter(downloadcenter_root: Path) -> threading.Lock:
+    with _lock_reclamos:
+        return _locks_downloadcenter.setdefault(downloadcenter_root.resolve(), threading.Lock())
+
+
+def reclamar_alarm_report(path: Path) -> bool:
+    """Marca un Alarm_Report de Downloadcenter como tomado (no se vuelve a entregar)."""
+    with _lock_reclamos:
+        if path in _alarm_reports_reclamados:
+            return False
+        _alarm_reports_reclamados.add(path)
+        return True
+
+
+def registrar_export(downloadcenter_root: Path) -> float:
+    """Anota un export pedido (llamar justo antes del clic en Save); devuelve su hora de pedido."""
+    with _lock_reclamos:
+        pedido = time.time()
+        _exports_pendientes.setdefault(downloadcenter_root.resolve(), []).append(pedido)
+        return pedido
+
+
+def liberar_export(downloadcenter_root: Path, pedido: float):
+    """El export ya recibió su Alarm_Report o dejó de esperarlo."""
+    with _lock_reclamos:
+        pendientes = _exports_pendientes.get(downloadcenter_root.resolve(), [])
+        if pedido in pendientes:
+            pendientes.remove(pedido)
+
+
+def tomar_alarm_report(downloadcenter_root: Path, before: set[Path], pedido: float) -> Path | None:
+    """
+    El Alarm_Report del export pedido a la hora `pedido`, ya estable y reclamado; None si
+    todavía no hay. Un reporte anterior al export pendiente más viejo es de un export que ya
+    dejó de esperar: se reclama y se descarta. Si hay un export pendiente anterior a este,
+    el reporte nuevo es suyo y este sigue esperando.
+    """
+    nuevos = {}
+    for p in snapshot_alarm_reports(downloadcenter_root):
+        if p in before or p in _alarm_reports_reclamados:
+            continue
+        try:
+            nuevos[p] = p.stat().st_mtime
+        except OSError:
+            continue
+    if not nuevos:
+        return None
+
+    with _lock_reclamos:
+        primero = min(_exports_pendientes.get(downloadcenter_root.resolve(), []), default=pedido)
+
+    candidato = min(nuevos, key=nuevos.get)
+    if nuevos[candidato] < primero:
+        if reclamar_alarm_report(candidato):
+            print(f"[WARN] Alarm_Report de un export anterior que no llegó a tiempo, se descarta: {candidato}")
+        return None
+    if primero < pedido:
+        return None
+
+    try:
+        # esperar tamaño estable (descarga terminada) y que se pueda abrir (evitar lock)
+        size1 = candidato.stat().st_size
+        time.sleep(1)
+        if size1 == 0 or candidato.stat().st_size != size1:
+            return None
+        with open(candidato, "rb") as f:
+            f.read(64)
+    except OSError:
+        return None
+    if not reclamar_alarm_report(candidato):
+        return None
+    return candidato
+
+
+@trazado("archivo")
 def wait_new_alarm_report(
     downloadcenter_root: Path,
     before: set[Path],
+    pedido: float,
     timeout: int = 180,
 ) -> Path | None:
-    fin = time.time() + timeout
-    last_candidate: Path | None = None
+    fin = time.time() + espera("descarga", timeout)
 
     while time.time() < fin:
-        current = snapshot_alarm_reports(downloadcenter_root)
-        nuevos = [p for p in current if p not in before]
-
-        if nuevos:
-            # el más nuevo por fecha de modificación
-            last_candidate = max(nuevos, key=lambda p: p.stat().st_mtime)
-
-            # esperar tamaño estable (descarga terminada)
-            try:
-                size1 = last_candidate.stat().st_size
-                time.sleep(1)
-                size2 = last_candidate.stat().st_size
-                if size1 == size2 and size2 > 0:
-                    # validar que se puede abrir (evitar lock)
-                    try:
-                        with open(last_candidate, "rb") as f:
-                            f.read(64)
-                        return last_candidate
-                    except Exception:
-                        # si está bloqueado, seguir esperando
-                        pass
-            except Exception:
-                pass
-
+        archivo = tomar_alarm_report(downloadcenter_root, before, pedido)
+        if archivo is not None:
+            return archivo
         time.sleep(1)
 
-    return last_candidate
+    return None
 
 
 def copiar_alarm_report_a_downloads(src: Path, host_dir: Path, host_label: str) -> Path:
@@ -345,11 +339,51 @@ def copiar_alarm_report_a_downloads(src: Path, host_dir: Path, host_label: str)
     return destino
 
 
-def esperar_descarga(download_dir: Path, archivos_previos, timeout: int = 120) -> str:
+@trazado("archivo")
+def esperar_alarm_report_en_memoria(
+    downloadcenter_root: Path,
+    before: set[Path],
+    pedido: float,
+    interceptor: InterceptorExport,
+    timeout: int = 180,
+) -> LibroCapturado | None:
+    """
+    Espera el export en memoria: primero la respuesta interceptada por CDP Fetch
+    (si el libro pasa por el navegador); si HCWebControlService lo baja por fuera
+    del navegador, lee el Alarm_Report_* de Downloadcenter una sola vez a memoria.
+    """
+    fin = time.time() + espera("descarga", timeout)
+
+    while time.time() < fin:
+        libro = interceptor.esperar_libro(timeout=1)
+        if libro is not None:
+            return libro
+
+        candidato = tomar_alarm_report(downloadcenter_root, before, pedido)
+        if candidato is None:
+            continue
+        try:
+            contenido = candidato.read_bytes()
+        except OSError as exc:
+            print(f"[ERROR] No se pudo leer {candidato}: {exc}")
+            return None
+        return LibroCapturado(nombre=candidato.name, contenido=contenido, url=str(candidato))
+
+    return None
+
+
+@trazado("archivo")
+def esperar_descarga(
+    download_dir: Path,
+    archivos_previos,
+    timeout: int = 120,
+    timer: StepTimer | None = None,
+) -> str:
     """Espera hasta detectar un nuevo archivo .xlsx o .xls en download_dir."""
 
     print("[9] Esperando archivo descargado...")
     inicio = time.time()
+    timeout = espera("descarga", timeout)
 
     while True:
         archivos_actuales = os.listdir(download_dir)
@@ -365,8 +399,8 @@ def esperar_descarga(download_dir: Path, archivos_previos, timeout: int = 120) -
             archivo = nuevos[0]
             ruta = str(download_dir / archivo)
             print(f"[9] Archivo encontrado: {ruta}")
-            if step_timer:
-                step_timer.mark("[9] Descarga detectada")
+            if timer:
+                timer.mark("[9] Descarga detectada")
             return ruta
 
         if time.time() - inicio > timeout:
@@ -374,15 +408,6 @@ def esperar_descarga(download_dir: Path, archivos_previos, timeout: int = 120) -
 
         time.sleep(2)
 
-cpu_measurements: list[float] = []
-step_timer: StepTimer | None = None
-performance_recorder: PerformanceRecorder | None = None
-
-
-def registrar_cpu(medicion: float):
-    cpu_measurements.append(medicion)
-
-
 def get_pg_connection():
     return psycopg2.connect(
         host=os.getenv("DB_HOST", "localhost"),
@@ -393,6 +418,7 @@ def get_pg_connection():
     )
 
 
+@trazado("db")
 def crear_registro_extraccion(conn, archivo_nombre: str) -> int:
     """
     Inserta una fila en hik_alarm_extraccion con estado EN_PROCESO
@@ -473,15 +499,112 @@ def calcular_periodo(value):
     return int(v.strftime("%Y%m%d"))
 
 
+ALARM_EVENTO_INSERT_SQL = """
+    INSERT INTO public.hik_alarm_evento (
+        ID_EXTRACCION,
+        MARK,
+        NAME,
+        TRIGGER_ALARM,
+        PRIORITY,
+        TRIGGERING_TIME_CLIENT,
+        SOURCE,
+        REGION,
+        TRIGGER_EVENT,
+        DESCRIPTION,
+        STATUS,
+        ALARM_ACKNOWLEDGMENT_TIME,
+        ALARM_CATEGORY,
+        REMARKS,
+        MORE,
+        EVENT_KEY,
+        PERIODO,
+        FECHA_CREACION
+    )
+    VALUES %s
+    ON CONFLICT (EVENT_KEY) DO NOTHING
+    RETURNING 1;
+"""
+
+
+def construir_event_key(row) -> str:
+    """
+    Clave de deduplicación de hik_alarm_evento (md5). La usan el export Excel y
+    el receptor push, por eso ambos caminos deduplican entre sí.
+    """
+
+    def normalize_value(value) -> str:
+        if pd.isna(value):
+            return ""
+        # pd.Timestamp (Excel) y datetime (push) dan el mismo texto: si no, no deduplican entre sí
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime()
+        if isinstance(value, datetime):
+            return value.replace(tzinfo=None).isoformat()
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day).isoformat()
+        return str(value).strip()
+
+    parts = [
+        normalize_value(row.get("name")),
+        normalize_value(row.get("triggering_time_client")),
+        normalize_value(row.get("source")),
+        normalize_value(row.get("region")),
+        normalize_value(row.get("trigger_event")),
+        normalize_value(row.get("priority")),
+        normalize_value(row.get("status")),
+    ]
+    raw_key = "|".join(parts)
+    return hashlib.md5(raw_key.encode("utf-8")).hexdigest()
+
+
+def fila_alarm_evento(id_extraccion: int, row: dict, fecha_creacion: datetime) -> tuple:
+    """Arma la tupla de ALARM_EVENTO_INSERT_SQL a partir de un registro mapeado."""
+    triggering_time = normalize_ts(row.get("triggering_time_client"))
+    ack_time = normalize_ts(row.get("alarm_acknowledgment_time"))
+    event_key = row.get("event_key") or construir_event_key(row)
+    return (
+        id_extraccion,
+        row.get("mark"),
+        row.get("name"),
+        row.get("trigger_alarm"),
+        row.get("priority"),
+        triggering_time,
+        row.get("source"),
+        row.get("region"),
+        row.get("trigger_event"),
+        row.get("description"),
+        row.get("status"),
+        ack_time,
+        row.get("alarm_category"),
+        row.get("remarks"),
+        row.get("more"),
+        event_key,
+        calcular_periodo(triggering_time),
+        fecha_creacion,
+    )
+
+
+@trazado("db")
+def insertar_filas_alarm_evento(conn, rows: list[tuple]) -> int:
+    """Inserta en hik_alarm_evento (ON CONFLICT EVENT_KEY) y devuelve cuántas filas eran nuevas."""
+    if not rows:
+        return 0
+    with conn.cursor() as cur:
+        insertadas = execute_values(cur, ALARM_EVENTO_INSERT_SQL, rows, page_size=500, fetch=True)
+    conn.commit()
+    return len(insertadas)
+
+
 def registrar_ejecucion_y_pasos(
     opcion: str,
     duracion_total_seg: float,
     cpu_final: float,
     ram_final: float,
     recorder: PerformanceRecorder | None,
+    conn=None,
 ):
     try:
-        conn = get_pg_connection()
+        conn = conn or get_pg_connection()
 
         cpu_max_value = recorder.cpu_max if recorder and recorder.cpu_max is not None else 0.0
         observacion = (
@@ -511,29 +634,14 @@ def registrar_ejecucion_y_pasos(
                 id_ejecucion = cur.fetchone()[0]
 
                 if recorder:
-                    pasos_ordenados = sorted(recorder.steps, key=lambda x: x.get("num_paso", 0))
-                    cur.executemany(
-                        """
-                        INSERT INTO PUBLIC.LOG_RPA_EJECUCION_PASO
-                        (ID_EJECUCION, NUM_PASO, DESCRIPCION, TIEMPO_PASO_SEG, TIEMPO_TOTAL_SEG, CPU_PORCENTAJE, RAM_PORCENTAJE, PY_MEM_NIVEL)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        [
-                            (
-                                id_ejecucion,
-                                paso.get("num_paso"),
-                                paso.get("descripcion"),
-                                paso.get("tiempo_paso"),
-                                paso.get("tiempo_total"),
-                                paso.get("cpu"),
-                                paso.get("ram"),
-                                paso.get("py_mem"),
-                            )
-                            for paso in pasos_ordenados
-                        ],
-                    )
+                    insertar_pasos_ejecucion(cur, id_ejecucion, recorder.steps)
+                    if recorder.perfilador:
+                        recorder.perfilador.guardar(id_ejecucion)
+                    guardar_detalle_ejecucion(cur, id_ejecucion, recorder.detalle)
 
         print("[INFO] Registro de rendimiento y pasos insertado correctamente.")
+        if recorder:
+            revisar_ejecucion(conn, id_ejecucion)
         return id_ejecucion
     except Exception as e:
         print(f"[ERROR] No se pudo registrar el rendimiento en la base de datos: {e}")
@@ -602,7 +710,7 @@ def ir_a_event_and_alarm(driver, wait: WebDriverWait):
 
     driver.execute_script("arguments[0].click();", tile)
 
-    WebDriverWait(driver, 30).until(
+    WebDriverWait(driver, espera("menu", 30)).until(
         EC.presence_of_element_located(
             (
                 By.XPATH,
@@ -613,11 +721,11 @@ def ir_a_event_and_alarm(driver, wait: WebDriverWait):
 
 
 def wait_visible(driver, by, value, timeout=20):
-    return WebDriverWait(driver, timeout).until(EC.visibility_of_element_located((by, value)))
+    return WebDriverWait(driver, espera("ui", timeout)).until(EC.visibility_of_element_located((by, value)))
 
 
 def wait_click(driver, by, value, timeout=20):
-    el = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable((by, value)))
+    el = WebDriverWait(driver, espera("ui", timeout)).until(EC.element_to_be_clickable((by, value)))
     safe_click(driver, el)
     return el
 
@@ -718,7 +826,7 @@ def find_export_container(driver):
 
 def wait_export_container(driver, timeout=12):
     logger_info = _resolve_logger("log_info")
-    wait = WebDriverWait(driver, timeout)
+    wait = WebDriverWait(driver, espera("export", timeout))
     wait.until(lambda d: find_export_container(d) is not None)
     container = find_export_container(driver)
     _log_message(logger_info, "info", "[EXPORT] Contenedor Export detectado")
@@ -815,7 +923,7 @@ def click_save_in_export(driver, export_container, timeout=10, timer=None):
     logger_info = _resolve_logger("log_info")
     logger_warn = _resolve_logger("log_warn")
     logger_error = _resolve_logger("log_error")
-    wait = WebDriverWait(driver, timeout)
+    wait = WebDriverWait(driver, espera("export", timeout))
 
     def find_save_button():
         try:
@@ -867,7 +975,7 @@ return Array.from(document.querySelectorAll('button'))
         timer.mark("[7] CLICK_EXPORT_EVENT_AND_ALARM_SAVE_BUTTON")
 
     try:
-        WebDriverWait(driver, 8).until(
+        WebDriverWait(driver, espera("export", 8)).until(
             lambda d: find_save_button() is None or not export_container.is_displayed()
         )
     except TimeoutException:
@@ -919,7 +1027,7 @@ def type_export_password_and_confirm_if_present(driver, timeout=8, timer=None) -
     Si el panel Export muestra campos Password/Confirm Password, escribe la misma
     contraseña HIK_PASSWORD usada en el login. Si no aparecen, continuar sin error.
     """
-    wait = WebDriverWait(driver, timeout)
+    wait = WebDriverWait(driver, espera("export", timeout))
 
     logger_warn = globals().get("log_warn", print)
     logger_info = globals().get("log_info", print)
@@ -1031,6 +1139,7 @@ def handle_export_password_if_needed(driver, timeout: int = 8):
     escribe la misma clave del login (HIK_PASSWORD) y hace clic en Confirm / OK.
     Si no aparece nada, sigue de largo sin lanzar excepción.
     """
+    timeout = espera("export", timeout)
     try:
         dialog = WebDriverWait(driver, timeout).until(
             EC.visibility_of_element_located(
@@ -1069,6 +1178,7 @@ def handle_password_confirm_if_present(driver, timeout: int = 10):
     Si aparece el diálogo de confirmación de contraseña al exportar,
     ingresa HIK_PASSWORD y confirma. Si no aparece, no lanza error.
     """
+    timeout = espera("export", timeout)
     try:
         wait = WebDriverWait(driver, timeout)
 
@@ -1111,6 +1221,7 @@ def click_sidebar_alarm_search(driver, timeout=20, timer: StepTimer | None = Non
     encontrar 'Event and Alarm Search'. Eso se hace en
     click_sidebar_event_and_alarm_search.
     """
+    timeout = espera("menu", timeout)
     # Esperar a que la página esté completamente cargada
     WebDriverWait(driver, timeout).until(
         lambda d: d.execute_script("return document.readyState === 'complete'")
@@ -1154,6 +1265,7 @@ def click_sidebar_alarm_search(driver, timeout=20, timer: StepTimer | None = Non
 
 def click_sidebar_event_and_alarm_search(driver, timeout=20, timer: StepTimer | None = None):
     print("[5] Abriendo Event and Alarm Search desde el menú Search...")
+    timeout = espera("menu", timeout)
 
     try:
         WebDriverWait(driver, 5).until(
@@ -1206,7 +1318,7 @@ def validar_event_and_alarm_search_screen(driver, timeout=30, timer: StepTimer |
     Valida que la pantalla actual corresponde a 'Event and Alarm Search'.
     Basta con encontrar algún título o texto visible con ese nombre.
     """
-    WebDriverWait(driver, timeout).until(
+    WebDriverWait(driver, espera("menu", timeout)).until(
         EC.presence_of_element_located(
             (
                 By.XPATH,
@@ -1225,7 +1337,7 @@ def click_search_button(driver, timeout=30, timer: StepTimer | None = None):
     """
     print("[6] Haciendo clic en botón Search...")
 
-    wait = WebDriverWait(driver, timeout)
+    wait = WebDriverWait(driver, espera("menu", timeout))
 
     # Selector principal: button primario con el texto 'Search' dentro de div.el-button-slot-wrapper
     search_xpath = (
@@ -1272,14 +1384,16 @@ def click_export_event_and_alarm(
     host_label: str,
     timeout=30,
     timer: StepTimer | None = None,
+    interceptor: InterceptorExport | None = None,
 ):
     """
     Abre el panel 'Export' en Event and Alarm Search, introduce password si se solicita
     y hace clic en la opción de exportar (Excel) para disparar la descarga.
+    Con `interceptor` devuelve el libro en memoria (LibroCapturado) y lo archiva en segundo plano.
     """
     print("[7] Abriendo panel Export en Event and Alarm Search...")
 
-    wait = WebDriverWait(driver, timeout)
+    wait = WebDriverWait(driver, espera("export", timeout))
 
     export_icon_xpath = "//i[contains(@class,'h-icon-export')]/ancestor::button[1]"
 
@@ -1293,10 +1407,55 @@ def click_export_event_and_alarm(
             EC.element_to_be_clickable((By.XPATH, fallback_xpath))
         )
 
-    # snapshot del downloadcenter ANTES de exportar
     downloadcenter_root = get_downloadcenter_root()
-    before = snapshot_alarm_reports(downloadcenter_root)
     print(f"[EXPORT] Downloadcenter: {downloadcenter_root}")
+    export = _exportar_y_esperar_alarm_report(
+        driver, export_btn, wait, password, downloadcenter_root, timeout, timer, interceptor
+    )
+
+    log_info = globals().get("log_info", print)
+    if export is None:
+        return None
+
+    if isinstance(export, LibroCapturado):
+        host_suffix = host_label.replace(".", "_")
+        sufijo = Path(export.nombre).suffix or ".xlsx"
+        export.nombre = f"Alarm_Report_{datetime.now().strftime('%Y%m%d%H%M%S')}_{host_suffix}{sufijo}"
+        archivar_async(export.contenido, download_dir / export.nombre)
+        log_info(f"[EXPORT] Alarm_Report recibido en memoria desde: {export.url}")
+
+        if timer:
+            timer.mark("[9] Descarga detectada")
+
+        return export
+
+    # Copiar a tu downloads por host y renombrar
+    limpiar_descargas(download_dir)  # limpia SOLO tu carpeta destino
+    final_file = copiar_alarm_report_a_downloads(export, download_dir, host_label)
+    log_info(f"[EXPORT] Archivo detectado en Downloadcenter: {export}")
+    log_info(f"[EXPORT] Archivo copiado a: {final_file}")
+
+    if timer:
+        timer.mark("[9] Descarga detectada")
+
+    return final_file
+
+
+def _exportar_y_esperar_alarm_report(
+    driver,
+    export_btn,
+    wait: WebDriverWait,
+    password,
+    downloadcenter_root: Path,
+    timeout,
+    timer: StepTimer | None,
+    interceptor: InterceptorExport | None,
+) -> Path | LibroCapturado | None:
+    """Clic en Export, password + Save y espera del Alarm_Report que corresponde a este Save."""
+    if interceptor is not None:
+        # Un libro que llegó tarde de un export anterior de esta sesión no es de esta búsqueda
+        for viejo in interceptor.descartar_pendientes():
+            print(f"[WARN] Libro interceptado de un export anterior, se descarta: {viejo.nombre}")
 
     safe_js_click(driver, export_btn)
     if timer:
@@ -1338,30 +1497,40 @@ return Array.from(document.querySelectorAll('input[placeholder="Password"]'))
         raise
 
     fill_confirm_password_in_container(driver, container, password, logger=log_info)
-    click_save_in_export(driver, container, timeout=12, timer=timer)
+
+    # Solo snapshot + clic en Save van con lock: fija el orden de los pedidos en Downloadcenter
+    with lock_downloadcenter(downloadcenter_root):
+        before = snapshot_alarm_reports(downloadcenter_root)
+        pedido = registrar_export(downloadcenter_root)
+        try:
+            click_save_in_export(driver, container, timeout=12, timer=timer)
+        except Exception:
+            liberar_export(downloadcenter_root, pedido)
+            raise
 
     if timer:
         timer.mark("[7] CLICK_EXPORT_EVENT_AND_ALARM")
 
-    # Esperar el archivo REAL en Downloadcenter (NO en DOWNLOAD_DIR)
-    log_info("[EXPORT] Esperando Alarm_Report_* en Downloadcenter (HCWebControlService)...")
-    src_file = wait_new_alarm_report(downloadcenter_root, before, timeout=max(180, timeout))
+    try:
+        if interceptor is not None:
+            log_info("[EXPORT] Esperando Alarm_Report en memoria (CDP Fetch / Downloadcenter)...")
+            export = esperar_alarm_report_en_memoria(
+                downloadcenter_root, before, pedido, interceptor, timeout=max(180, timeout)
+            )
+            if export is None:
+                log_error("[ERROR] No se recibió el Alarm_Report en memoria.")
+        else:
+            # Esperar el archivo REAL en Downloadcenter (NO en DOWNLOAD_DIR)
+            log_info("[EXPORT] Esperando Alarm_Report_* en Downloadcenter (HCWebControlService)...")
+            export = wait_new_alarm_report(downloadcenter_root, before, pedido, timeout=max(180, timeout))
+            if export is None:
+                log_error("[ERROR] No se detectó Alarm_Report_* en Downloadcenter.")
+    finally:
+        liberar_export(downloadcenter_root, pedido)
 
-    if not src_file or not src_file.exists():
-        log_error("[ERROR] No se detectó Alarm_Report_* en Downloadcenter.")
+    if export is None:
         take_screenshot(driver, "event_and_alarm_search_no_file")
-        return None
-
-    # Copiar a tu downloads por host y renombrar
-    limpiar_descargas(download_dir)  # limpia SOLO tu carpeta destino
-    final_file = copiar_alarm_report_a_downloads(src_file, download_dir, host_label)
-    log_info(f"[EXPORT] Archivo detectado en Downloadcenter: {src_file}")
-    log_info(f"[EXPORT] Archivo copiado a: {final_file}")
-
-    if timer:
-        timer.mark("[9] Descarga detectada")
-
-    return final_file
+    return export
 
 
 def click_trigger_alarm_button(driver, timeout=20, timer: StepTimer | None = None):
@@ -1369,6 +1538,7 @@ def click_trigger_alarm_button(driver, timeout=20, timer: StepTimer | None = Non
     En la pantalla 'Event and Alarm Search' hace clic en el botón 'Trigger Alarm'
     dentro del grupo de filtros Trigger Alarm (All / Not Trigger Alarm / Trigger Alarm).
     """
+    timeout = espera("menu", timeout)
 
     # Asegurar que la pantalla de Event and Alarm Search está cargada
     WebDriverWait(driver, timeout).until(
@@ -1403,6 +1573,118 @@ def click_trigger_alarm_button(driver, timeout=20, timer: StepTimer | None = Non
         timer.mark("[9] CLICK_TRIGGER_ALARM")
 
 
+FORMATO_RANGO_HIK = "%Y-%m-%d %H:%M:%S"
+
+TIME_SELECT_XPATH = (
+    "//div[contains(@class,'el-form-item')][.//label[normalize-space()='Time' "
+    "or normalize-space()='Triggering Time']]//div[contains(@class,'el-select')]//input"
+)
+CUSTOM_TIME_OPTION_XPATH = (
+    "//li[contains(@class,'el-select-dropdown__item')]"
+    "[normalize-space()='Custom Time Interval' or normalize-space()='Custom']"
+)
+RANGE_INPUTS_XPATH = (
+    "//div[contains(@class,'el-date-editor--datetimerange')]//input[contains(@class,'el-range-input')]"
+)
+PICKER_EDITOR_XPATH = (
+    "//div[contains(@class,'el-date-range-picker') and not(contains(@style,'display: none'))]"
+    "//input[@placeholder='{placeholder}']"
+)
+PICKER_OK_XPATH = (
+    "//div[contains(@class,'el-date-range-picker') and not(contains(@style,'display: none'))]"
+    "//div[contains(@class,'el-picker-panel__footer')]//button[normalize-space()='OK' or .//span[normalize-space()='OK']]"
+)
+
+
+def _escribir_input(driver, element, value: str):
+    driver.execute_script(
+        """
+const el = arguments[0];
+el.focus();
+el.value = arguments[1];
+el.dispatchEvent(new Event('input', {bubbles: true}));
+el.dispatchEvent(new Event('change', {bubbles: true}));
+""",
+        element,
+        value,
+    )
+
+
+def fijar_rango_busqueda(
+    driver,
+    desde: datetime,
+    hasta: datetime,
+    timeout=20,
+    timer: StepTimer | None = None,
+):
+    """
+    En Event and Alarm Search selecciona 'Custom Time Interval' en Time y escribe
+    el rango [desde, hasta]. Usa los editores del panel (Start date/time, End date/time)
+    y, si no aparecen, escribe directo en los dos inputs del rango.
+    """
+    wait = WebDriverWait(driver, espera("menu", timeout))
+    print(f"[6] Fijando rango de búsqueda: {desde:%Y-%m-%d %H:%M:%S} -> {hasta:%Y-%m-%d %H:%M:%S}")
+
+    time_select = wait.until(EC.element_to_be_clickable((By.XPATH, TIME_SELECT_XPATH)))
+    safe_js_click(driver, time_select)
+    custom = wait.until(EC.element_to_be_clickable((By.XPATH, CUSTOM_TIME_OPTION_XPATH)))
+    safe_js_click(driver, custom)
+
+    range_inputs = wait.until(
+        lambda d: [e for e in d.find_elements(By.XPATH, RANGE_INPUTS_XPATH) if e.is_displayed()] or False
+    )
+    safe_js_click(driver, range_inputs[0])
+
+    valores = {
+        "Start date": desde.strftime("%Y-%m-%d"),
+        "Start time": desde.strftime("%H:%M:%S"),
+        "End date": hasta.strftime("%Y-%m-%d"),
+        "End time": hasta.strftime("%H:%M:%S"),
+    }
+    try:
+        for placeholder, valor in valores.items():
+            editor = WebDriverWait(driver, 5).until(
+                EC.presence_of_element_located(
+                    (By.XPATH, PICKER_EDITOR_XPATH.format(placeholder=placeholder))
+                )
+            )
+            _escribir_input(driver, editor, valor)
+        safe_js_click(driver, WebDriverWait(driver, 5).until(
+            EC.element_to_be_clickable((By.XPATH, PICKER_OK_XPATH))
+        ))
+    except TimeoutException:
+        print("[WARN] Panel de fechas sin editores; se escribe el rango en los inputs.")
+        _escribir_input(driver, range_inputs[0], desde.strftime(FORMATO_RANGO_HIK))
+        _escribir_input(driver, range_inputs[1], hasta.strftime(FORMATO_RANGO_HIK))
+        range_inputs[1].send_keys(Keys.ENTER)
+
+    actuales = [e.get_attribute("value") or "" for e in range_inputs[:2]]
+    esperados = [desde.strftime(FORMATO_RANGO_HIK), hasta.strftime(FORMATO_RANGO_HIK)]
+    if actuales != esperados:
+        print(f"[WARN] El rango mostrado {actuales} no coincide con el pedido {esperados}.")
+
+    if timer:
+        timer.mark("[6] FIJAR_RANGO_BUSQUEDA")
+
+
+def partir_rango(desde: datetime, hasta: datetime, ventanas: int) -> list[tuple[datetime, datetime]]:
+    """Divide [desde, hasta] en `ventanas` sub-rangos contiguos (al segundo, sin solaparse)."""
+    if hasta <= desde:
+        raise ValueError("El fin del rango debe ser posterior al inicio.")
+    ventanas = max(1, ventanas)
+    paso = (hasta - desde) / ventanas
+    cortes = [desde + paso * i for i in range(ventanas)] + [hasta]
+    cortes = [c.replace(microsecond=0) for c in cortes]
+
+    rangos = []
+    for i in range(ventanas):
+        inicio = cortes[i]
+        fin = cortes[i + 1] - timedelta(seconds=1) if i < ventanas - 1 else cortes[i + 1]
+        if fin >= inicio:
+            rangos.append((inicio, fin))
+    return rangos
+
+
 def limpiar_descargas(download_dir: Path = DOWNLOAD_DIR):
     """Elimina archivos previos en la carpeta de descargas para identificar el nuevo Excel."""
     for f in download_dir.glob("*"):
@@ -1412,9 +1694,13 @@ def limpiar_descargas(download_dir: Path = DOWNLOAD_DIR):
             pass
 
 
-def esperar_descarga_archivo(nombre_parcial: str | None = None, timeout: int = 180) -> Path | None:
+def esperar_descarga_archivo(
+    nombre_parcial: str | None = None,
+    timeout: int = 180,
+    download_dir: Path = DOWNLOAD_DIR,
+) -> Path | None:
     """
-    Espera a que se descargue un archivo en DOWNLOAD_DIR.
+    Espera a que se descargue un archivo en download_dir.
 
     Si se especifica `nombre_parcial`, busca archivos cuyo nombre contenga esa
     cadena (excluyendo extensiones temporales). Valida que el archivo no tenga
@@ -1422,15 +1708,15 @@ def esperar_descarga_archivo(nombre_parcial: str | None = None, timeout: int = 1
     devolverlo.
     """
 
-    DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    download_dir.mkdir(parents=True, exist_ok=True)
 
-    fin = time.time() + timeout
+    fin = time.time() + espera("descarga", timeout)
     candidato: Path | None = None
 
     while time.time() < fin:
         archivos = [
             f
-            for f in DOWNLOAD_DIR.glob("*")
+            for f in download_dir.glob("*")
             if f.is_file()
             and not f.name.endswith(".crdownload")
             and (nombre_parcial is None or nombre_parcial in f.name)
@@ -1449,23 +1735,26 @@ def esperar_descarga_archivo(nombre_parcial: str | None = None, timeout: int = 1
     return candidato
 
 
-def esperar_descarga_event_and_alarm(timeout: int = 180) -> Path | None:
+def esperar_descarga_event_and_alarm(
+    timeout: int = 180,
+    download_dir: Path = DOWNLOAD_DIR,
+) -> Path | None:
     """
     Espera a que aparezca un nuevo archivo de export de Event and Alarm Search
-    en DOWNLOAD_DIR y devuelve el Path cuando la descarga termina.
+    en download_dir y devuelve el Path cuando la descarga termina.
     """
 
-    DOWNLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    download_dir.mkdir(parents=True, exist_ok=True)
 
-    existentes = {f.name for f in DOWNLOAD_DIR.glob("*") if f.is_file()}
+    existentes = {f.name for f in download_dir.glob("*") if f.is_file()}
 
-    fin = time.time() + timeout
+    fin = time.time() + espera("descarga", timeout)
     candidato: Path | None = None
 
     while time.time() < fin:
         archivos = [
             f
-            for f in DOWNLOAD_DIR.glob("*")
+            for f in download_dir.glob("*")
             if f.is_file() and not f.name.endswith(".crdownload")
         ]
         nuevos = [f for f in archivos if f.name not in existentes]
@@ -1487,6 +1776,7 @@ def esperar_descarga_y_renombrar(
     download_dir: Path = DOWNLOAD_DIR,
     prefix: str = "event_and_alarm",
     timeout: int = 180,
+    timer: StepTimer | None = None,
 ) -> Path:
     """
     Espera la finalización de una descarga en download_dir y renombra el archivo
@@ -1495,7 +1785,7 @@ def esperar_descarga_y_renombrar(
 
     download_dir.mkdir(parents=True, exist_ok=True)
     existentes = {f.name for f in download_dir.glob("*") if f.is_file()}
-    fin = time.time() + timeout
+    fin = time.time() + espera("descarga", timeout)
     ultimo_archivo: Path | None = None
 
     while time.time() < fin:
@@ -1518,8 +1808,8 @@ def esperar_descarga_y_renombrar(
                 destino = download_dir / nuevo_nombre
                 ultimo_archivo = ultimo_archivo.rename(destino)
                 print(f"[INFO] Archivo descargado y renombrado a: {ultimo_archivo}")
-                if step_timer:
-                    step_timer.mark("[9] Descarga detectada")
+                if timer:
+                    timer.mark("[9] Descarga detectada")
                 return ultimo_archivo
 
         time.sleep(1)
@@ -1531,6 +1821,7 @@ def esperar_descarga_y_renombrar_host(
     download_dir: Path,
     host_label: str,
     timeout: int = 180,
+    timer: StepTimer | None = None,
 ) -> Path:
     """
     Espera la finalización de una descarga en download_dir y renombra el archivo
@@ -1538,7 +1829,7 @@ def esperar_descarga_y_renombrar_host(
     """
     download_dir.mkdir(parents=True, exist_ok=True)
     existentes = {f.name for f in download_dir.glob("*") if f.is_file()}
-    fin = time.time() + timeout
+    fin = time.time() + espera("descarga", timeout)
     ultimo_archivo: Path | None = None
     host_suffix = host_label.replace(".", "_")
 
@@ -1562,8 +1853,8 @@ def esperar_descarga_y_renombrar_host(
                 destino = download_dir / nuevo_nombre
                 ultimo_archivo = ultimo_archivo.rename(destino)
                 print(f"[INFO] Archivo descargado y renombrado a: {ultimo_archivo}")
-                if step_timer:
-                    step_timer.mark("[9] Descarga detectada")
+                if timer:
+                    timer.mark("[9] Descarga detectada")
                 return ultimo_archivo
 
         time.sleep(1)
@@ -1571,26 +1862,35 @@ def esperar_descarga_y_renombrar_host(
     raise TimeoutError("No se detectó ningún archivo descargado en el tiempo esperado.")
 
 
-def insertar_alarm_evento_from_excel(excel_path: Path) -> dict:
+@trazado("carga")
+@perfilado("carga")
+def insertar_alarm_evento_from_excel(
+    excel_path: Path | io.BytesIO, archivo_nombre: str | None = None, conn=None
+) -> dict:
+    """Con `conn` usa la conexión del RunContext (no la cierra); sin ella abre una propia."""
     log_info = globals().get("log_info", print)
     log_error = globals().get("log_error", print)
 
-    conn = get_pg_connection()
+    conexion_propia = conn is None
+    conn = conn or get_pg_connection()
     id_extraccion = None
     total_preparados = 0
     total_insertados = 0
     total_omitidos = 0
+    mem = etapas_memoria("Alarm and Event Log")
     try:
-        archivo_nombre = os.path.basename(excel_path)
+        archivo_nombre = archivo_nombre or os.path.basename(excel_path)
         id_extraccion = crear_registro_extraccion(conn, archivo_nombre)
 
-        log_info(f"[INFO] Leyendo Alarm Report desde: {excel_path}")
-        raw = pd.read_excel(
-            excel_path,
-            sheet_name="Alarm and Event Log",
-            header=None,
-            dtype=str,
-        )
+        log_info(f"[INFO] Leyendo Alarm Report desde: {archivo_nombre}")
+        with span("read_excel Alarm and Event Log", "excel"):
+            raw = leer_excel(
+                excel_path,
+                hoja="Alarm and Event Log",
+                header=None,
+                dtype=str,
+            )
+        mem.marcar("read_excel")
 
         header_row = None
         for idx in range(len(raw)):
@@ -1638,6 +1938,7 @@ def insertar_alarm_evento_from_excel(excel_path: Path) -> dict:
             )
 
         df = df[list(column_map.keys())].rename(columns=column_map)
+        mem.marcar("cabecera_y_filtro")
 
         string_columns = [
             "mark",
@@ -1659,6 +1960,7 @@ def insertar_alarm_evento_from_excel(excel_path: Path) -> dict:
             df[col] = df[col].astype("string")
             df[col] = df[col].str.strip()
             df[col] = df[col].where(df[col].notna(), None)
+        mem.marcar("limpieza_texto")
 
         df["triggering_time_client"] = pd.to_datetime(
             df["triggering_time_client"], errors="coerce"
@@ -1667,6 +1969,7 @@ def insertar_alarm_evento_from_excel(excel_path: Path) -> dict:
             df["alarm_acknowledgment_time"], errors="coerce"
         )
         df = df.applymap(to_py)
+        mem.marcar("fechas_y_applymap")
 
         required_data_cols = [
             "name",
@@ -1704,29 +2007,10 @@ def insertar_alarm_evento_from_excel(excel_path: Path) -> dict:
                 "omitidos_duplicado": total_omitidos,
             }
 
-        def build_event_key(row) -> str:
-            def normalize_value(value) -> str:
-                if pd.isna(value):
-                    return ""
-                if isinstance(value, pd.Timestamp):
-                    return value.to_pydatetime().replace(tzinfo=None).isoformat()
-                return str(value).strip()
-
-            parts = [
-                normalize_value(row.get("name")),
-                normalize_value(row.get("triggering_time_client")),
-                normalize_value(row.get("source")),
-                normalize_value(row.get("region")),
-                normalize_value(row.get("trigger_event")),
-                normalize_value(row.get("priority")),
-                normalize_value(row.get("status")),
-            ]
-            raw_key = "|".join(parts)
-            return hashlib.md5(raw_key.encode("utf-8")).hexdigest()
-
         total_original = len(df)
-        df["event_key"] = df.apply(build_event_key, axis=1)
+        df["event_key"] = df.apply(construir_event_key, axis=1)
         df = df.drop_duplicates(subset=["event_key"]).copy()
+        mem.marcar("event_key")
 
         df["id_extraccion"] = id_extraccion
 
@@ -1734,34 +2018,12 @@ def insertar_alarm_evento_from_excel(excel_path: Path) -> dict:
         log_info(f"[EVENT] Filas extraídas: {len(df)}")
         log_info(f"[EVENT] Preview registros mapeados: {preview_records}")
 
-        rows = []
         fecha_creacion = datetime.now()
-        for _, row in df.iterrows():
-            triggering_time = normalize_ts(row.get("triggering_time_client"))
-            ack_time = normalize_ts(row.get("alarm_acknowledgment_time"))
-            periodo = calcular_periodo(triggering_time)
-            rows.append(
-                (
-                    id_extraccion,
-                    row.get("mark"),
-                    row.get("name"),
-                    row.get("trigger_alarm"),
-                    row.get("priority"),
-                    triggering_time,
-                    row.get("source"),
-                    row.get("region"),
-                    row.get("trigger_event"),
-                    row.get("description"),
-                    row.get("status"),
-                    ack_time,
-                    row.get("alarm_category"),
-                    row.get("remarks"),
-                    row.get("more"),
-                    row.get("event_key"),
-                    periodo,
-                    fecha_creacion,
-                )
-            )
+        rows = [
+            fila_alarm_evento(id_extraccion, row, fecha_creacion)
+            for row in df.to_dict(orient="records")
+        ]
+        mem.marcar("tuplas")
 
         total_preparados = len(rows)
         total_insertados = 0
@@ -1770,38 +2032,12 @@ def insertar_alarm_evento_from_excel(excel_path: Path) -> dict:
         if not rows:
             log_info("[INFO] No hay filas para insertar en hik_alarm_evento.")
         else:
-            sql = """
-                INSERT INTO public.hik_alarm_evento (
-                    ID_EXTRACCION,
-                    MARK,
-                    NAME,
-                    TRIGGER_ALARM,
-                    PRIORITY,
-                    TRIGGERING_TIME_CLIENT,
-                    SOURCE,
-                    REGION,
-                    TRIGGER_EVENT,
-                    DESCRIPTION,
-                    STATUS,
-                    ALARM_ACKNOWLEDGMENT_TIME,
-                    ALARM_CATEGORY,
-                    REMARKS,
-                    MORE,
-                    EVENT_KEY,
-                    PERIODO,
-                    FECHA_CREACION
-                )
-                VALUES %s
-                ON CONFLICT (EVENT_KEY) DO NOTHING;
-            """
-            with conn.cursor() as cur:
-                execute_values(cur, sql, rows, page_size=500)
-                total_insertados = cur.rowcount
-            conn.commit()
+            total_insertados = insertar_filas_alarm_evento(conn, rows)
             total_omitidos = total_preparados - total_insertados
             log_info(f"[INFO] Total registros preparados: {total_preparados}")
             log_info(f"[INFO] Insertados: {total_insertados}")
             log_info(f"[INFO] Omitidos por duplicado: {total_omitidos}")
+            mem.marcar("insert")
 
         with conn.cursor() as cur:
             cur.execute(
@@ -1839,7 +2075,9 @@ def insertar_alarm_evento_from_excel(excel_path: Path) -> dict:
             conn.commit()
         raise
     finally:
-        conn.close()
+        mem.cerrar()
+        if conexion_propia:
+            conn.close()
     return {
         "filas_extraidas": total_preparados,
         "insertados": total_insertados,
@@ -1858,6 +2096,7 @@ def procesar_alarm_report(file_path: str, timer: StepTimer) -> None:
 
     conn = get_pg_connection()
     id_extraccion = None
+    mem = etapas_memoria("Alarm Report")
 
     try:
         archivo_nombre = os.path.basename(file_path)
@@ -1866,7 +2105,8 @@ def procesar_alarm_report(file_path: str, timer: StepTimer) -> None:
         logger_info("[DB] Procesar Alarm Report e insertar en hik_alarm_evento")
         logger_info(f"[DB] Leyendo archivo Excel de Alarm Report: {file_path}")
 
-        df = pd.read_excel(file_path)
+        df = leer_excel(file_path)
+        mem.marcar("read_excel")
         df.columns = [str(c).strip() for c in df.columns]
         logger_info(f"[EVENT] Columnas encontradas en Alarm_Report: {list(df.columns)}")
 
@@ -1892,6 +2132,7 @@ def procesar_alarm_report(file_path: str, timer: StepTimer) -> None:
         if filtradas > 0:
             logger_info(f"[EVENT] Filas descartadas por Event Key vacío o NaN: {filtradas}")
         df = df.where(pd.notnull(df), None)
+        mem.marcar("event_key_y_filtro")
 
         column_map = {
             "Mark": "mark",
@@ -1932,6 +2173,7 @@ def procesar_alarm_report(file_path: str, timer: StepTimer) -> None:
         df["fecha_creacion"] = datetime.now()
         df = df.where(pd.notnull(df), None)
         df = df.applymap(to_py)
+        mem.marcar("fechas_y_applymap")
 
         registros = []
         for _, row in df.iterrows():
@@ -1968,6 +2210,7 @@ def procesar_alarm_report(file_path: str, timer: StepTimer) -> None:
                     periodo,
                 )
             )
+        mem.marcar("tuplas")
 
         if not registros:
             logger_info("[DB] No hay registros de Alarm Report para insertar.")
@@ -2025,6 +2268,7 @@ def procesar_alarm_report(file_path: str, timer: StepTimer) -> None:
             execute_values(cur, sql, registros, page_size=500)
             total_insertados = cur.rowcount
         conn.commit()
+        mem.marcar("insert")
         total_omitidos = total_preparados - total_insertados
         logger_info(
             f"[INFO] Total registros preparados: {total_preparados}"
@@ -2084,10 +2328,16 @@ def procesar_alarm_report(file_path: str, timer: StepTimer) -> None:
             conn.commit()
         raise
     finally:
+        mem.cerrar()
         conn.close()
 
 
-def crear_driver(download_dir: Path) -> webdriver.Chrome:
+def crear_driver(
+    download_dir: Path,
+    lean: bool = False,
+    headless: bool = False,
+    capturar_red: bool = False,
+) -> webdriver.Chrome:
     """Configura y devuelve un driver de Chrome listo para descargar archivos."""
 
     download_dir.mkdir(parents=True, exist_ok=True)
@@ -2110,10 +2360,26 @@ def crear_driver(download_dir: Path) -> webdriver.Chrome:
     chrome_options.add_argument("--safebrowsing-disable-download-protection")
     chrome_options.add_argument("--disable-popup-blocking")
     chrome_options.add_argument("--disable-features=BlockInsecureDownloadRestrictions,DownloadBubble")
-    chrome_options.add_argument("--start-maximized")
+    if capturar_red:
+        habilitar_captura_red(chrome_options)
 
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    lean = perfil_lean_solicitado(lean)
+    user_data_dir = None
+    if lean:
+        user_data_dir = aplicar_opciones_lean(chrome_options, headless=headless_solicitado(headless))
+    else:
+        chrome_options.add_argument("--start-maximized")
+
+    try:
+        service = Service(resolver_chromedriver())
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+    except Exception:
+        # Sin driver no hay cerrar_driver(): el user-data-dir temporal se borra acá
+        if user_data_dir:
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+        raise
+    driver.hik_user_data_dir = user_data_dir
+    instrumentar_driver(driver)
 
     driver.execute_cdp_cmd(
         "Page.setDownloadBehavior",
@@ -2123,7 +2389,10 @@ def crear_driver(download_dir: Path) -> webdriver.Chrome:
         },
     )
 
-    driver.maximize_window()
+    if lean:
+        activar_bloqueo_recursos(driver)
+    else:
+        driver.maximize_window()
     print(f"[DEBUG] DOWNLOAD_DIR = {download_dir}")
     return driver
 
@@ -2162,75 +2431,58 @@ def cerrar_sesion(driver, wait: WebDriverWait):
         print("[WARN] No se pudo cerrar sesión limpiamente.")
 
 
-def run_for_host(host: str) -> dict:
-    global step_timer, performance_recorder
-
-    print(f"[INFO] === Iniciando extracción para host {host} ===")
-    performance_recorder = PerformanceRecorder(time.perf_counter())
+def login_portal(driver, wait: WebDriverWait, url: str, timer: StepTimer | None = None):
+    """Abre la URL de login, ingresa credenciales y espera el portal principal."""
+    print("[1] Abriendo URL de login...")
+    driver.get(url)
+    if timer:
+        timer.mark("[1] ABRIR_URL_LOGIN")
 
-    baseline_cpu = psutil.cpu_percent(interval=1)
-    registrar_cpu(baseline_cpu)
-    baseline_ram = psutil.virtual_memory().percent
-    print(
-        f"[PERF] [0] Baseline antes de automatizar... CPU: {baseline_cpu:.1f}% | RAM: {baseline_ram:.1f}%"
+    print("[2] Iniciando sesión...")
+    user_input = wait.until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, 'input[placeholder="User Name"]'))
     )
-    if performance_recorder:
-        performance_recorder.record_baseline(baseline_cpu, baseline_ram)
-
-    driver = None
-    wait: WebDriverWait | None = None
-    step_timer = StepTimer(
-        start_time=performance_recorder.start_time if performance_recorder else None,
-        recorder=performance_recorder,
+    password_input = wait.until(
+        EC.presence_of_element_located((By.CSS_SELECTOR, 'input[placeholder="Password"]'))
     )
-    timer = step_timer
 
-    export_file_path: Path | None = None
-    resultados_carga = {
-        "filas_extraidas": 0,
-        "insertados": 0,
-        "omitidos_duplicado": 0,
-    }
-    host_dir = DOWNLOAD_DIR / host.replace(".", "_")
-
-    try:
-        global URL
-        URL = f"http://{host}/#/"
-
-        driver = crear_driver(download_dir=host_dir)
-        wait = WebDriverWait(driver, 30)
-
-        print("[1] Abriendo URL de login...")
-        driver.get(URL)
-        if timer:
-            timer.mark("[1] ABRIR_URL_LOGIN")
-
-        print("[2] Iniciando sesión...")
-        user_input = wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, 'input[placeholder="User Name"]'))
-        )
-        password_input = wait.until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, 'input[placeholder="Password"]'))
-        )
+    user_input.clear()
+    user_input.send_keys(HIK_USER)
 
-        user_input.clear()
-        user_input.send_keys(HIK_USER)
+    password_input.clear()
+    password_input.send_keys(HIK_PASSWORD)
 
-        password_input.clear()
-        password_input.send_keys(HIK_PASSWORD)
+    login_button = wait.until(
+        EC.element_to_be_clickable((By.XPATH, "//*[normalize-space(text())='Log In']"))
+    )
+    login_button.click()
+    if timer:
+        timer.mark("[2] LOGIN")
 
-        login_button = wait.until(
-            EC.element_to_be_clickable((By.XPATH, "//*[normalize-space(text())='Log In']"))
-        )
-        login_button.click()
-        if timer:
-            timer.mark("[2] LOGIN")
+    print("[3] Esperando carga del portal principal...")
+    wait.until(lambda d: "/portal" in d.current_url)
+    if timer:
+        timer.mark("[3] PORTAL_PRINCIPAL_CARGADO")
 
-        print("[3] Esperando carga del portal principal...")
-        wait.until(lambda d: "/portal" in d.current_url)
-        if timer:
-            timer.mark("[3] PORTAL_PRINCIPAL_CARGADO")
 
+def exportar_event_and_alarm_ui(
+    driver,
+    wait: WebDriverWait,
+    host: str,
+    host_dir: Path,
+    timer: StepTimer | None = None,
+    interceptor: InterceptorExport | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+    navegar: bool = True,
+) -> Path | LibroCapturado:
+    """
+    Flujo UI completo: Event and Alarm -> Event and Alarm Search -> Trigger Alarm ->
+    Search -> Export (password + Save) y espera del Alarm_Report en Downloadcenter.
+    Con `desde`/`hasta` fija un Custom Time Interval antes de Search; con navegar=False
+    reutiliza la pantalla de búsqueda ya abierta (ventanas siguientes de la misma sesión).
+    """
+    if navegar:
         print("[3] Navegando a Event and Alarm...")
         ir_a_event_and_alarm(driver, wait)
         if timer:
@@ -2240,9 +2492,12 @@ def run_for_host(host: str) -> dict:
         click_sidebar_event_and_alarm_search(driver, timeout=30, timer=timer)
         validar_event_and_alarm_search_screen(driver, timeout=40, timer=timer)
         click_trigger_alarm_button(driver, timeout=30, timer=timer)
-        click_search_button(driver, timeout=40, timer=timer)
+    if desde is not None and hasta is not None:
+        fijar_rango_busqueda(driver, desde, hasta, timeout=20, timer=timer)
+    click_search_button(driver, timeout=40, timer=timer)
 
-        limpiar_descargas(host_dir)
+    limpiar_descargas(host_dir)
+    with grabar_har(timer, "Export Event and Alarm"):
         export_file_path = click_export_event_and_alarm(
             driver,
             password=HIK_PASSWORD,
@@ -2250,33 +2505,151 @@ def run_for_host(host: str) -> dict:
             host_label=host,
             timeout=30,
             timer=timer,
+            interceptor=interceptor,
         )
 
-        print(f"[INFO] Ruta final del archivo exportado: {export_file_path}")
+    print(f"[INFO] Ruta final del archivo exportado: {export_file_path}")
 
-        if export_file_path is None:
-            raise RuntimeError(
-                "No se detectó ningún archivo descargado desde Event and Alarm Search."
-            )
+    if export_file_path is None:
+        raise RuntimeError(
+            "No se detectó ningún archivo descargado desde Event and Alarm Search."
+        )
 
+    if isinstance(export_file_path, LibroCapturado):
+        size_mb = len(export_file_path.contenido) / (1024 * 1024)
+    else:
         size_mb = export_file_path.stat().st_size / (1024 * 1024)
-        print(
-            f"[8] Archivo de Event and Alarm Search descargado: {export_file_path} "
-            f"({size_mb:.2f} MB)"
+    print(
+        f"[8] Archivo de Event and Alarm Search descargado: {export_file_path} "
+        f"({size_mb:.2f} MB)"
+    )
+
+    LOG_DIR.mkdir(parents=True, exist_ok=True)
+    screenshot_path = LOG_DIR / f"event_and_alarm_search_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
+    driver.save_screenshot(str(screenshot_path))
+    print(f"[INFO] Screenshot guardado en: {screenshot_path}")
+    if timer:
+        timer.mark("[9] SCREENSHOT_EVENT_AND_ALARM_SEARCH")
+
+    return export_file_path
+
+
+def crear_contexto(
+    host: str,
+    opcion: str,
+    contar_comandos: bool = False,
+    metricas_pagina: bool = False,
+    har: bool = False,
+    perfil: bool = False,
+    memoria: bool = False,
+    plazo: Plazo | None = None,
+) -> RunContext:
+    """Contexto de una ejecución contra `host`: URL, carpeta de descargas propia y conexión lazy."""
+    return RunContext(
+        opcion=opcion,
+        url=f"http://{host}/#/",
+        host=host,
+        download_dir=DOWNLOAD_DIR / host.replace(".", "_"),
+        conectar=get_pg_connection,
+        contar_comandos=contar_comandos,
+        metricas_pagina=metricas_pagina,
+        har=har,
+        perfil=perfil,
+        memoria=memoria,
+        log_dir=LOG_DIR,
+        script=SCRIPT_NAME,
+        plazo=plazo,
+    )
+
+
+def run_for_host(
+    host: str,
+    lean: bool = False,
+    headless: bool = False,
+    http_export: bool = False,
+    en_memoria: bool = False,
+    spool: bool = False,
+    ctx: RunContext | None = None,
+) -> dict:
+    ctx = ctx or crear_contexto(host, "Event and Alarm")
+
+    print(f"[INFO] === Iniciando extracción para host {host} ===")
+    ctx.baseline()
+    token_traza = ctx.activar()
+    ctx.iniciar_fase("automatizacion")
+
+    driver = None
+    wait: WebDriverWait | None = None
+    interceptor: InterceptorExport | None = None
+    timer = ctx.timer
+
+    export_file_path: Path | None = None
+    resultados_carga = {
+        "filas_extraidas": 0,
+        "insertados": 0,
+        "omitidos_duplicado": 0,
+    }
+    host_dir = ctx.download_dir
+
+    try:
+        if ctx.plazo:
+            ctx.plazo.verificar("inicio")
+        driver = crear_driver(
+            download_dir=host_dir,
+            lean=lean,
+            headless=headless,
+            capturar_red=http_export or ctx.har,
         )
+        ctx.instrumentar(driver)
+        wait = WebDriverWait(driver, espera("ui", 30))
 
-        LOG_DIR.mkdir(parents=True, exist_ok=True)
-        screenshot_path = LOG_DIR / f"event_and_alarm_search_{datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        driver.save_screenshot(str(screenshot_path))
-        print(f"[INFO] Screenshot guardado en: {screenshot_path}")
-        if timer:
-            timer.mark("[9] SCREENSHOT_EVENT_AND_ALARM_SEARCH")
+        login_portal(driver, wait, ctx.url, timer=timer)
+
+        libro_http = None
+        if http_export:
+            libro_http = exportar_por_http(driver, ctx.url, host, "Event and Alarm")
+
+        archivo_nombre = None
+        if libro_http is not None:
+            archivo_nombre = (
+                f"Alarm_Report_{datetime.now().strftime('%Y%m%d%H%M%S')}_"
+                f"{host.replace('.', '_')}.xlsx"
+            )
+            fuente_carga = io.BytesIO(libro_http)
+            if timer:
+                timer.mark("[7] EXPORT_HTTP_DIRECTO")
+        else:
+            if en_memoria:
+                interceptor = InterceptorExport(driver)
+                if not interceptor.iniciar():
+                    interceptor = None
+            export = exportar_event_and_alarm_ui(
+                driver, wait, host, host_dir, timer=timer, interceptor=interceptor
+            )
+            if http_export:
+                registrar_receta_desde_ui(driver, ctx.url, host, "Event and Alarm")
+            if isinstance(export, LibroCapturado):
+                archivo_nombre = export.nombre
+                fuente_carga = export.buffer()
+            else:
+                export_file_path = export
+                fuente_carga = export_file_path
 
         print("[OK] Flujo Event and Alarm Search + Export completado.")
         if timer:
             timer.mark("[10] FIN_OK")
 
-        resultados_carga = insertar_alarm_evento_from_excel(export_file_path)
+        if spool:
+            # La carga la hace hikcentral_spool_loader; el navegador se cierra ya
+            contenido = fuente_carga.getvalue() if isinstance(fuente_carga, io.BytesIO) else fuente_carga
+            manifiesto = encolar_export(contenido, host, "Event and Alarm", archivo_nombre=archivo_nombre)
+            if timer:
+                timer.mark("[11] EXPORT_ENCOLADO_SPOOL")
+            return {"host": host, "ok": True, "archivo": str(manifiesto), **resultados_carga}
+
+        resultados_carga = insertar_alarm_evento_from_excel(
+            fuente_carga, archivo_nombre=archivo_nombre, conn=ctx.conexion()
+        )
 
         print(
             "[INFO] === Fin host "
@@ -2288,11 +2661,23 @@ def run_for_host(host: str) -> dict:
         return {
             "host": host,
             "ok": True,
-            "archivo": str(export_file_path),
+            "archivo": archivo_nombre or str(export_file_path),
             **resultados_carga,
         }
 
     except Exception as e:
+        if ctx.fin_por_plazo(e):
+            # Corte limpio: sin screenshot ni traceback, se cierra sesión y se registra igual
+            if timer:
+                timer.mark("[ERROR] Fin por plazo")
+            return {
+                "host": host,
+                "ok": False,
+                "estado": "deadline",
+                "error": str(e),
+                "archivo": None,
+                **resultados_carga,
+            }
         print(f"[ERROR] Ocurrió un problema en el flujo Event and Alarm: {e}")
         traceback.print_exc()
         if driver:
@@ -2308,70 +2693,579 @@ def run_for_host(host: str) -> dict:
         raise
 
     finally:
+        if interceptor is not None:
+            interceptor.detener()
         if driver:
             try:
                 if wait:
-                    cerrar_sesion(driver, wait)
+                    # Con el plazo vencido el logout solo usa lo reservado, sin esperas largas
+                    cerrar_sesion(driver, WebDriverWait(driver, 5) if ctx.plazo_vencido() else wait)
             except Exception:
                 pass
-            driver.quit()
+            cerrar_driver(driver)
 
-        final_cpu = psutil.cpu_percent(interval=1)
-        final_ram = psutil.virtual_memory().percent
-        registrar_cpu(final_cpu)
-        if performance_recorder:
-            performance_recorder.update_cpu(final_cpu)
-        print(
-            f"[PERF] [FIN] Estado al terminar script... CPU: {final_cpu:.1f}% | RAM: {final_ram:.1f}%"
+        final_cpu, final_ram, duracion_total_seg = ctx.finalizar()
+        try:
+            conn = ctx.conexion()
+        except Exception:
+            conn = None
+        registrar_ejecucion_y_pasos(
+            opcion=ctx.opcion,
+            duracion_total_seg=duracion_total_seg,
+            cpu_final=final_cpu,
+            ram_final=final_ram,
+            recorder=ctx.recorder,
+            conn=conn,
         )
+        ctx.cerrar()
+        ctx.desactivar(token_traza)
+
+
+def parse_fecha_cli(valor: str, fin_de_dia: bool = False) -> datetime:
+    """'YYYY-MM-DD' o 'YYYY-MM-DD HH:MM[:SS]'. Con fin_de_dia, una fecha sola cubre hasta 23:59:59."""
+    fecha = datetime.fromisoformat(valor.strip())
+    if fin_de_dia and len(valor.strip()) == 10:
+        fecha = fecha.replace(hour=23, minute=59, second=59)
+    return fecha
+
+
+def _exportar_ventanas_en_sesion(
+    num_sesion: int,
+    ctx: RunContext,
+    cola: "queue.Queue[tuple[int, datetime, datetime]]",
+    cargador: ThreadPoolExecutor,
+    cargas: list[tuple[int, datetime, datetime, Future]],
+    errores: list[dict],
+    lean: bool = False,
+    headless: bool = False,
+    en_memoria: bool = False,
+    al_terminar: Callable[[int, datetime, datetime, dict | None, str | None], None] | None = None,
+):
+    """
+    Una sesión de Chrome (login propio) que toma ventanas de la cola hasta vaciarla.
+    Cada export se entrega al `cargador` apenas llega y la sesión sigue con la próxima ventana.
+    `al_terminar(idx, desde, hasta, resultado, error)` se llama cuando la ventana termina de cargar o falla.
+    """
+    host = ctx.host
+    host_dir = ctx.download_dir
+    timer = ctx.nuevo_timer()
+    token_traza = ctx.activar()
+    ctx.iniciar_fase("automatizacion")
+    driver = None
+    wait: WebDriverWait | None = None
+    interceptor: InterceptorExport | None = None
 
-        duracion_total_seg = (
-            time.perf_counter() - performance_recorder.start_time if performance_recorder else 0.0
+    try:
+        driver = crear_driver(
+            download_dir=host_dir / f"sesion_{num_sesion}",
+            lean=lean,
+            headless=headless,
+            capturar_red=ctx.har,
         )
+        ctx.instrumentar(driver, timer)
+        wait = WebDriverWait(driver, espera("ui", 30))
+        login_portal(driver, wait, ctx.url, timer=timer)
+        if en_memoria:
+            interceptor = InterceptorExport(driver)
+            if not interceptor.iniciar():
+                interceptor = None
+
+        navegar = True
+        while not ctx.plazo_vencido():
+            try:
+                idx, desde, hasta = cola.get_nowait()
+            except queue.Empty:
+                break
 
+            print(f"[VENTANA] S{num_sesion} | ventana {idx}: {desde} -> {hasta}")
+            try:
+                with span(f"Ventana {idx}", "ventana", desde=desde, hasta=hasta, sesion=num_sesion):
+                    export = exportar_event_and_alarm_ui(
+                        driver,
+                        wait,
+                        host,
+                        host_dir / f"ventana_{idx:03d}",
+                        timer=timer,
+                        interceptor=interceptor,
+                        desde=desde,
+                        hasta=hasta,
+                        navegar=navegar,
+                    )
+                navegar = False
+            except Exception as exc:
+                print(f"[ERROR] S{num_sesion} | ventana {idx} falló: {exc}")
+                errores.append({"ventana": idx, "desde": desde, "hasta": hasta, "error": str(exc)})
+                if al_terminar:
+                    al_terminar(idx, desde, hasta, None, str(exc))
+                navegar = True
+                continue
+
+            if isinstance(export, LibroCapturado):
+                futuro = cargador.submit(
+                    en_contexto(insertar_alarm_evento_from_excel), export.buffer(), export.nombre
+                )
+            else:
+                futuro = cargador.submit(en_contexto(insertar_alarm_evento_from_excel), export)
+            if al_terminar:
+                futuro.add_done_callback(
+                    lambda f, i=idx, d=desde, h=hasta: al_terminar(
+                        i,
+                        d,
+                        h,
+                        None if f.exception() else f.result(),
+                        str(f.exception()) if f.exception() else None,
+                    )
+                )
+            cargas.append((idx, desde, hasta, futuro))
+    except Exception as exc:
+        print(f"[ERROR] Sesión S{num_sesion} de {host} no pudo continuar: {exc}")
+        traceback.print_exc()
+    finally:
+        if interceptor is not None:
+            interceptor.detener()
+        if driver:
+            try:
+                if wait:
+                    # Con el plazo vencido el logout solo usa lo reservado, sin esperas largas
+                    cerrar_sesion(driver, WebDriverWait(driver, 5) if ctx.plazo_vencido() else wait)
+            except Exception:
+                pass
+            cerrar_driver(driver)
+        ctx.detener_fase()
+        ctx.desactivar(token_traza)
+
+
+def run_sharded_for_host(
+    host: str,
+    desde: datetime,
+    hasta: datetime,
+    ventanas: int = 4,
+    paralelo: int = 2,
+    lean: bool = False,
+    headless: bool = False,
+    en_memoria: bool = False,
+    rangos: list[tuple[datetime, datetime]] | None = None,
+    al_terminar: Callable[[int, datetime, datetime, dict | None, str | None], None] | None = None,
+    opcion: str = "Event and Alarm (ventanas)",
+    ctx: RunContext | None = None,
+) -> dict:
+    """
+    Divide [desde, hasta] en `ventanas` sub-rangos y los exporta con `paralelo` sesiones
+    de Chrome a la vez. Cada Alarm_Report se carga en hik_alarm_evento en cuanto llega
+    (la dedupe por event_key cubre solapes o reintentos entre ventanas). Login, búsqueda y
+    carga van en paralelo; solo el clic en Save del Export es de a uno por Downloadcenter.
+    Con `rangos` se usan esas ventanas tal cual (backfill por día).
+    """
+    rangos = rangos if rangos is not None else partir_rango(desde, hasta, ventanas)
+    if not rangos:
+        print(f"[INFO] {host}: no hay ventanas para exportar.")
+        return {
+            "host": host,
+            "ok": True,
+            "archivo": "0/0 ventanas",
+            "error": None,
+            "filas_extraidas": 0,
+            "insertados": 0,
+            "omitidos_duplicado": 0,
+        }
+    paralelo = max(1, min(paralelo, len(rangos)))
+    print(
+        f"[INFO] === {host}: {len(rangos)} ventanas entre {desde} y {hasta} "
+        f"con {paralelo} sesiones en paralelo ==="
+    )
+
+    ctx = ctx or crear_contexto(host, opcion)
+    ctx.baseline()
+    token_traza = ctx.activar()
+
+    cola: queue.Queue[tuple[int, datetime, datetime]] = queue.Queue()
+    for idx, (inicio, fin) in enumerate(rangos, start=1):
+        cola.put((idx, inicio, fin))
+
+    cargas: list[tuple[int, datetime, datetime, Future]] = []
+    errores: list[dict] = []
+    totales = {"filas_extraidas": 0, "insertados": 0, "omitidos_duplicado": 0}
+
+    try:
+        with ThreadPoolExecutor(max_workers=paralelo, thread_name_prefix="hik_carga") as cargador:
+            with ThreadPoolExecutor(max_workers=paralelo, thread_name_prefix="hik_sesion") as sesiones:
+                for num_sesion in range(1, paralelo + 1):
+                    sesiones.submit(
+                        _exportar_ventanas_en_sesion,
+                        num_sesion,
+                        ctx,
+                        cola,
+                        cargador,
+                        cargas,
+                        errores,
+                        lean,
+                        headless,
+                        en_memoria,
+                        al_terminar,
+                    )
+
+            motivo = "Plazo agotado" if ctx.plazo_vencido() else "Sin sesión disponible"
+            while not cola.empty():
+                idx, inicio, fin = cola.get_nowait()
+                errores.append({"ventana": idx, "desde": inicio, "hasta": fin, "error": motivo})
+
+            for idx, inicio, fin, futuro in sorted(cargas, key=lambda c: c[0]):
+                try:
+                    res = futuro.result()
+                except Exception as exc:
+                    errores.append({"ventana": idx, "desde": inicio, "hasta": fin, "error": f"Carga: {exc}"})
+                    continue
+                for clave in totales:
+                    totales[clave] += res.get(clave, 0)
+                print(
+                    f"[VENTANA] {idx}: {inicio} -> {fin} | extraídas: {res['filas_extraidas']} | "
+                    f"insertados: {res['insertados']} | duplicados: {res['omitidos_duplicado']}"
+                )
+    finally:
+        deadline = ctx.fin_por_plazo()
+        final_cpu, final_ram, duracion_total_seg = ctx.finalizar()
         registrar_ejecucion_y_pasos(
-            opcion="Event and Alarm",
+            opcion=ctx.opcion,
             duracion_total_seg=duracion_total_seg,
             cpu_final=final_cpu,
             ram_final=final_ram,
-            recorder=performance_recorder,
+            recorder=ctx.recorder,
         )
+        ctx.cerrar()
+        ctx.desactivar(token_traza)
+
+    for err in sorted(errores, key=lambda e: e["ventana"]):
+        print(f"[ERROR] Ventana {err['ventana']} ({err['desde']} -> {err['hasta']}): {err['error']}")
+
+    return {
+        "host": host,
+        "ok": not errores,
+        "estado": "deadline" if deadline else None,
+        "archivo": f"{len(cargas)}/{len(rangos)} ventanas",
+        "error": f"{len(errores)} ventanas con error" if errores else None,
+        **totales,
+    }
+
+
+# ========================
+# BACKFILL HISTÓRICO POR DÍA
+# ========================
+def asegurar_tabla_checkpoint(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS public.hik_alarm_backfill_checkpoint (
+                HOST VARCHAR(100) NOT NULL,
+                DIA DATE NOT NULL,
+                ESTADO VARCHAR(20) NOT NULL,
+                FILAS_EXTRAIDAS INTEGER,
+                INSERTADOS INTEGER,
+                OMITIDOS_DUPLICADO INTEGER,
+                INTENTOS INTEGER NOT NULL DEFAULT 0,
+                OBSERVACION TEXT,
+                FECHA_ACTUALIZACION TIMESTAMP NOT NULL DEFAULT now(),
+                PRIMARY KEY (HOST, DIA)
+            );
+            """
+        )
+    conn.commit()
+
+
+def dias_pendientes_backfill(host: str, desde: date, hasta: date) -> list[date]:
+    """Días de [desde, hasta] que todavía no tienen checkpoint OK para el host."""
+    conn = get_pg_connection()
+    try:
+        asegurar_tabla_checkpoint(conn)
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT DIA FROM public.hik_alarm_backfill_checkpoint
+                WHERE HOST = %s AND DIA BETWEEN %s AND %s AND ESTADO = 'OK';
+                """,
+                (host, desde, hasta),
+            )
+            completos = {row[0] for row in cur.fetchall()}
+    finally:
+        conn.close()
+
+    dias = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    return [d for d in dias if d not in completos]
+
+
+def marcar_checkpoint_backfill(host: str, dia: date, resultado: dict | None, error: str | None):
+    estado = "OK" if error is None else "ERROR"
+    resultado = resultado or {}
+    try:
+        conn = get_pg_connection()
+    except Exception as exc:
+        print(f"[ERROR] No se pudo guardar checkpoint de {host} {dia}: {exc}")
+        return
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO public.hik_alarm_backfill_checkpoint
+                    (HOST, DIA, ESTADO, FILAS_EXTRAIDAS, INSERTADOS, OMITIDOS_DUPLICADO, INTENTOS, OBSERVACION)
+                VALUES (%s, %s, %s, %s, %s, %s, 1, %s)
+                ON CONFLICT (HOST, DIA) DO UPDATE SET
+                    ESTADO = EXCLUDED.ESTADO,
+                    FILAS_EXTRAIDAS = EXCLUDED.FILAS_EXTRAIDAS,
+                    INSERTADOS = EXCLUDED.INSERTADOS,
+                    OMITIDOS_DUPLICADO = EXCLUDED.OMITIDOS_DUPLICADO,
+                    INTENTOS = hik_alarm_backfill_checkpoint.INTENTOS + 1,
+                    OBSERVACION = EXCLUDED.OBSERVACION,
+                    FECHA_ACTUALIZACION = now();
+                """,
+                (
+                    host,
+                    dia,
+                    estado,
+                    resultado.get("filas_extraidas"),
+                    resultado.get("insertados"),
+                    resultado.get("omitidos_duplicado"),
+                    error,
+                ),
+            )
+        conn.commit()
+        print(f"[BACKFILL] {host} {dia}: {estado}")
+    except Exception as exc:
+        print(f"[ERROR] No se pudo guardar checkpoint de {host} {dia}: {exc}")
+    finally:
+        conn.close()
+
+
+def run_backfill_for_host(
+    host: str,
+    desde: date,
+    hasta: date,
+    en_vuelo: int = 2,
+    lean: bool = False,
+    headless: bool = False,
+    en_memoria: bool = False,
+    ctx: RunContext | None = None,
+) -> dict:
+    """
+    Recorre [desde, hasta] día por día. Cada día es una ventana y `en_vuelo` limita cuántas
+    se exportan a la vez (sesiones simultáneas contra el servidor). Los días con checkpoint
+    OK se saltan, así que tras una caída se retoma en el primer día sin completar.
+    """
+    pendientes = dias_pendientes_backfill(host, desde, hasta)
+    print(
+        f"[BACKFILL] {host}: {len(pendientes)} de {(hasta - desde).days + 1} días pendientes "
+        f"entre {desde} y {hasta} ({en_vuelo} ventanas en vuelo)"
+    )
+
+    rangos = []
+    for dia in pendientes:
+        inicio = datetime.combine(dia, datetime.min.time())
+        rangos.append((inicio, inicio + timedelta(days=1, seconds=-1)))
+
+    def al_terminar(idx, inicio, fin, resultado, error):
+        marcar_checkpoint_backfill(host, inicio.date(), resultado, error)
+
+    return run_sharded_for_host(
+        host,
+        desde=datetime.combine(desde, datetime.min.time()),
+        hasta=datetime.combine(hasta, datetime.max.time()),
+        paralelo=en_vuelo,
+        lean=lean,
+        headless=headless,
+        en_memoria=en_memoria,
+        rangos=rangos,
+        al_terminar=al_terminar,
+        opcion="Event and Alarm (backfill)",
+        ctx=ctx,
+    )
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Automatiza Event and Alarm Search en HikCentral.")
+    parser.add_argument(
+        "accion",
+        nargs="?",
+        default="run",
+        choices=["run", "backfill"],
+        help="run: extracción normal (default). backfill: carga histórica día por día con checkpoints.",
+    )
     parser.add_argument("--host", type=str, help="Host/IP de HikCentral (ej: 172.16.9.11)")
     parser.add_argument("--hosts", type=str, help="Hosts/IP separados por coma")
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        help="Perfil de navegador lean (bloquea imágenes/fuentes/mapas, viewport fijo).",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Ejecuta Chrome sin ventana (solo con --lean o HIK_BROWSER_PROFILE=lean).",
+    )
+    parser.add_argument(
+        "--http-export",
+        action="store_true",
+        help="Reproduce por HTTP el export grabado (lo graba en la primera ejecución por UI).",
+    )
+    parser.add_argument(
+        "--en-memoria",
+        action="store_true",
+        help="Intercepta el export (CDP Fetch) y lo carga desde memoria; archiva a disco en segundo plano.",
+    )
+    parser.add_argument(
+        "--desde",
+        type=str,
+        help="Inicio del rango a exportar (YYYY-MM-DD o 'YYYY-MM-DD HH:MM:SS'). Activa exports por ventanas.",
+    )
+    parser.add_argument("--hasta", type=str, help="Fin del rango (default: ahora; una fecha sola incluye el día)")
+    parser.add_argument(
+        "--spool",
+        action="store_true",
+        help="Deja el export en el spool y no carga a Postgres (lo hace hikcentral_spool_loader.py).",
+    )
+    parser.add_argument("--ventanas", type=int, default=4, help="Sub-rangos en que se divide el rango")
+    parser.add_argument("--paralelo", type=int, default=2, help="Sesiones de Chrome simultáneas por host")
+    parser.add_argument(
+        "--en-vuelo",
+        type=int,
+        default=int(os.getenv("HIK_BACKFILL_EN_VUELO", "2")),
+        help="backfill: días exportándose a la vez por host",
+    )
+    parser.add_argument(
+        "--hosts-paralelo",
+        type=int,
+        default=1,
+        help="Hosts procesados a la vez en este proceso (cada uno con su RunContext)",
+    )
+    parser.add_argument(
+        "--contar-comandos",
+        action="store_true",
+        help="Cuenta los comandos WebDriver por tipo y por paso (también HIK_CONTAR_COMANDOS=1).",
+    )
+    parser.add_argument(
+        "--metricas-pagina",
+        action="store_true",
+        help="Guarda por paso las métricas CDP de la página: heap, DOM, layout/script (también HIK_METRICAS_PAGINA=1).",
+    )
+    parser.add_argument(
+        "--har",
+        action="store_true",
+        help="Graba un HAR de los pasos de export en LOG_DIR/har con timings por request (también HIK_HAR=1).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Perfila por separado automatización y carga; perfiles en LOG_DIR/perfiles (también HIK_PROFILE=1).",
+    )
+    parser.add_argument(
+        "--memoria",
+        action="store_true",
+        help="Mide con tracemalloc el pico y lo retenido por etapa de la carga (también HIK_MEMORIA=1).",
+    )
+    parser.add_argument(
+        "--plazo-seg",
+        type=float,
+        default=PLAZO_SEG,
+        help="Plazo total del proceso (todos los hosts); vencido, se corta con estado deadline (también HIK_PLAZO_SEG).",
+    )
     args = parser.parse_args()
 
+    if args.accion == "backfill" and not args.desde:
+        parser.error("backfill requiere --desde (YYYY-MM-DD)")
+    # Los exports por ventanas y el backfill van siempre por la UI y cargan directo a Postgres
+    if args.desde and (args.http_export or args.spool):
+        parser.error("--http-export y --spool solo aplican a la extracción normal (sin --desde ni backfill)")
+
     if args.host or args.hosts:
         hosts_to_run = parse_hosts_from_args(args.host, args.hosts)
     else:
         hosts_to_run = parse_hosts_from_env()
 
-    resultados = []
-    for host in hosts_to_run:
-        if not host_is_up(host):
-            print(f"[WARN] Host no responde: {host}. Se omite.")
-            resultados.append(
-                {
-                    "host": host,
-                    "ok": False,
-                    "error": "Host no responde",
-                    "archivo": None,
-                    "filas_extraidas": 0,
-                    "insertados": 0,
-                    "omitidos_duplicado": 0,
-                }
+    # Un solo sondeo concurrente para todos los hosts; se corre primero el de menor latencia
+    hosts_arriba, hosts_caidos = ordenar_hosts(hosts_to_run)
+
+    # Un solo plazo para el proceso: con hosts en serie, el último no se pasa del slot del scheduler
+    plazo = plazo_solicitado(args.plazo_seg)
+
+    def correr_host(host: str) -> dict:
+        def contexto(opcion: str) -> RunContext:
+            return crear_contexto(
+                host,
+                opcion,
+                args.contar_comandos,
+                args.metricas_pagina,
+                args.har,
+                args.profile,
+                args.memoria,
+                plazo,
             )
-            continue
 
         try:
-            res = run_for_host(host)
-            resultados.append(res)
+            if args.accion == "backfill":
+                return run_backfill_for_host(
+                    host,
+                    desde=parse_fecha_cli(args.desde).date(),
+                    hasta=(
+                        parse_fecha_cli(args.hasta).date()
+                        if args.hasta
+                        else date.today() - timedelta(days=1)
+                    ),
+                    en_vuelo=args.en_vuelo,
+                    lean=args.lean,
+                    headless=args.headless,
+                    en_memoria=args.en_memoria,
+                    ctx=contexto("Event and Alarm (backfill)"),
+                )
+            if args.desde:
+                return run_sharded_for_host(
+                    host,
+                    desde=parse_fecha_cli(args.desde),
+                    hasta=parse_fecha_cli(args.hasta, fin_de_dia=True) if args.hasta else datetime.now(),
+                    ventanas=args.ventanas,
+                    paralelo=args.paralelo,
+                    lean=args.lean,
+                    headless=args.headless,
+                    en_memoria=args.en_memoria,
+                    ctx=contexto("Event and Alarm (ventanas)"),
+                )
+            return run_for_host(
+                host,
+                lean=args.lean,
+                headless=args.headless,
+                http_export=args.http_export,
+                en_memoria=args.en_memoria,
+                spool=args.spool,
+                ctx=contexto("Event and Alarm"),
+            )
+        except PlazoAgotado as ex:
+            print(f"[DEADLINE] Host {host} no se procesó: {ex}")
+            return {"host": host, "ok": False, "estado": "deadline", "error": str(ex)}
         except Exception as ex:
             print(f"[ERROR] Falló host {host}: {ex}")
-            resultados.append({"host": host, "ok": False, "error": str(ex)})
+            return {"host": host, "ok": False, "error": str(ex)}
+
+    # Una traza por proceso: cada host queda como span dentro de "run"
+    trazador = Trazador(f"eventalarms_{args.accion}")
+    activar(trazador)
+
+    # Cada host arma su propio RunContext, así que pueden correr en hilos del mismo proceso
+    with trazador.span("run", "run", accion=args.accion, hosts=hosts_arriba):
+        with ThreadPoolExecutor(max_workers=max(1, args.hosts_paralelo), thread_name_prefix="hik_host") as pool:
+            resultados = list(pool.map(en_contexto(correr_host), hosts_arriba))
+    trazador.guardar()
+
+    for host in hosts_caidos:
+        print(f"[WARN] Host no responde: {host}. Se omite.")
+        resultados.append(
+            {
+                "host": host,
+                "ok": False,
+                "error": "Host no responde",
+                "archivo": None,
+                "filas_extraidas": 0,
+                "insertados": 0,
+                "omitidos_duplicado": 0,
+            }
+        )
+
+    esperar_archivado()
 
     print("[INFO] === Resumen final por host ===")
     for res in resultados:
@@ -2384,9 +3278,10 @@ if __name__ == "__main__":
                 f"duplicados: {res.get('omitidos_duplicado')}"
             )
         else:
+            estado = "DEADLINE" if res.get("estado") == "deadline" else "ERROR"
             print(
                 "[INFO] Host "
-                f"{res.get('host')} | ERROR | "
+                f"{res.get('host')} | {estado} | "
                 f"motivo: {res.get('error', 'desconocido')}"
             )
 
@@ -0,0 +1,350 @@
+"""
+Extracción de Resource Status por la OpenAPI HTTP de HikCentral (sin navegador).
+
+Produce los mismos registros (dicts) que arman process_camera_resource_status,
+process_encoding_device_status, process_ip_speaker_status y
+process_alarm_input_status a partir del Excel, para pasarlos a sus guardar_*.
+
+Configuración (.env):
+    HIK_OPENAPI_URL          https://172.16.9.10:443
+    HIK_OPENAPI_KEY          AppKey del partner
+    HIK_OPENAPI_SECRET       AppSecret del partner
+    HIK_OPENAPI_CONCURRENCIA páginas en paralelo (default 4)
+    HIK_OPENAPI_PAGE_SIZE    tamaño de página (default 500)
+    HIK_OPENAPI_PATHS        JSON opcional {"camera": "/artemis/api/..."} para otra versión de HCP
+
+Nota: DEVICE_CODE de cámaras y (name, address) de dispositivos son las claves de
+upsert. DEVICE_CODE es la "Channel Address" del Excel (<IP del dispositivo>_<canal>):
+se toma channelAddress o se arma con la IP y channelNo; las cámaras sin esos datos no
+se cargan (con otra clave el upsert duplicaría las filas que dejó el Excel).
+"""
+import argparse
+import base64
+import hashlib
+import hmac
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+ARTEMIS_ACCEPT = "*/*"
+ARTEMIS_CONTENT_TYPE = "application/json;charset=UTF-8"
+ARTEMIS_HEADERS_FIRMADOS = ("x-ca-key", "x-ca-nonce", "x-ca-timestamp")
+
+OPENAPI_PATHS = {
+    "camera": "/artemis/api/nms/v1/online/camera/get",
+    "encoding device": "/artemis/api/nms/v1/online/encode_device/get",
+    "ip speaker": "/artemis/api/nms/v1/online/ip_speaker/get",
+    "alarm input": "/artemis/api/resource/v1/alarmInput/alarmInputList",
+}
+
+
+class HikOpenApiError(Exception):
+    pass
+
+
+def calcular_firma(app_secret: str, method: str, path: str, headers: dict[str, str]) -> str:
+    """
+    Firma Artemis (HMAC-SHA256, base64) sobre:
+    METHOD, Accept, [Content-MD5], Content-Type, [Date], x-ca-* firmados (ordenados) y path.
+    """
+    h = {k.lower(): v for k, v in headers.items()}
+    partes = [method.upper(), h.get("accept", ARTEMIS_ACCEPT)]
+    if h.get("content-md5"):
+        partes.append(h["content-md5"])
+    partes.append(h.get("content-type", ARTEMIS_CONTENT_TYPE))
+    if h.get("date"):
+        partes.append(h["date"])
+
+    firmados = h.get("x-ca-signature-headers", ",".join(ARTEMIS_HEADERS_FIRMADOS))
+    for nombre in sorted(n.strip() for n in firmados.split(",") if n.strip()):
+        partes.append(f"{nombre}:{h.get(nombre, '')}")
+    partes.append(path)
+
+    cadena = "\n".join(partes)
+    digest = hmac.new(app_secret.encode("utf-8"), cadena.encode("utf-8"), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode("ascii")
+
+
+class HikOpenApiClient:
+    def __init__(
+        self,
+        base_url: str,
+        app_key: str,
+        app_secret: str,
+        max_concurrencia: int = 4,
+        page_size: int = 500,
+        timeout: float = 15,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.app_key = app_key
+        self.app_secret = app_secret
+        self.max_concurrencia = max(1, max_concurrencia)
+        self.page_size = page_size
+        self.timeout = timeout
+        self._semaforo = threading.BoundedSemaphore(self.max_concurrencia)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrencia)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.verify = False
+
+    @classmethod
+    def desde_env(cls) -> "HikOpenApiClient":
+        base_url = os.getenv("HIK_OPENAPI_URL")
+        app_key = os.getenv("HIK_OPENAPI_KEY")
+        app_secret = os.getenv("HIK_OPENAPI_SECRET")
+        if not base_url or not app_key or not app_secret:
+            raise HikOpenApiError("Faltan HIK_OPENAPI_URL / HIK_OPENAPI_KEY / HIK_OPENAPI_SECRET en el entorno.")
+        return cls(
+            base_url,
+            app_key,
+            app_secret,
+            max_concurrencia=int(os.getenv("HIK_OPENAPI_CONCURRENCIA", "4")),
+            page_size=int(os.getenv("HIK_OPENAPI_PAGE_SIZE", "500")),
+        )
+
+    def _headers_firmados(self, method: str, path: str) -> dict[str, str]:
+        headers = {
+            "Accept": ARTEMIS_ACCEPT,
+            "Content-Type": ARTEMIS_CONTENT_TYPE,
+            "x-ca-key": self.app_key,
+            "x-ca-nonce": str(uuid.uuid4()),
+            "x-ca-timestamp": str(int(time.time() * 1000)),
+            "x-ca-signature-headers": ",".join(ARTEMIS_HEADERS_FIRMADOS),
+        }
+        headers["x-ca-signature"] = calcular_firma(self.app_secret, method, path, headers)
+        return headers
+
+    def post(self, path: str, body: dict) -> dict:
+        with self._semaforo:
+            resp = self.session.post(
+                f"{self.base_url}{path}",
+                data=json.dumps(body),
+                headers=self._headers_firmados("POST", path),
+                timeout=self.timeout,
+            )
+        if resp.status_code >= 400:
+            raise HikOpenApiError(f"{path}: HTTP {resp.status_code} {resp.text[:200]}")
+        data = resp.json()
+        if str(data.get("code")) != "0":
+            raise HikOpenApiError(f"{path}: code={data.get('code')} msg={data.get('msg')}")
+        return data.get("data") or {}
+
+    def listar_paginado(self, path: str, body: dict | None = None) -> list[dict]:
+        """Primera página secuencial (para conocer total) y el resto en paralelo, acotado por max_concurrencia."""
+        base = dict(body or {})
+        primera = self.post(path, {**base, "pageNo": 1, "pageSize": self.page_size})
+        items = list(primera.get("list") or [])
+        total = int(primera.get("total") or len(items))
+        paginas = math.ceil(total / self.page_size) if self.page_size else 1
+
+        if paginas <= 1:
+            return items
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrencia) as pool:
+            resultados = pool.map(
+                lambda n: self.post(path, {**base, "pageNo": n, "pageSize": self.page_size}),
+                range(2, paginas + 1),
+            )
+            for data in resultados:
+                items.extend(data.get("list") or [])
+        return items
+
+    def close(self):
+        self.session.close()
+
+
+def _campo(item: dict, *nombres):
+    for nombre in nombres:
+        valor = item.get(nombre)
+        if valor not in (None, ""):
+            return valor
+    return None
+
+
+def _texto(item: dict, *nombres) -> str:
+    valor = _campo(item, *nombres)
+    return "" if valor is None else str(valor).strip()
+
+
+def _estado_red(valor) -> str | None:
+    if valor is None or valor == "":
+        return None
+    if str(valor).strip() in {"1", "True", "true"}:
+        return "Online"
+    if str(valor).strip() in {"0", "False", "false"}:
+        return "Offline"
+    return str(valor).strip()
+
+
+def _fecha(valor) -> datetime | None:
+    if valor in (None, ""):
+        return None
+    try:
+        return datetime.fromisoformat(str(valor).replace("Z", "+00:00")).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+
+def _direccion(item: dict) -> str:
+    direccion = _texto(item, "address", "deviceAddress")
+    if direccion:
+        return direccion
+    ip = _texto(item, "ip", "ipAddress")
+    puerto = _texto(item, "port")
+    return f"{ip}:{puerto}" if ip and puerto else ip
+
+
+def _channel_address(item: dict) -> str:
+    """Misma clave que la columna "Channel Address" del Excel; "" si el item no trae con qué armarla."""
+    direccion = _texto(item, "channelAddress")
+    if direccion:
+        return direccion
+    ip = _texto(item, "deviceAddress", "ip")
+    canal = _texto(item, "channelNo")
+    return f"{ip}_{canal}" if ip and canal else ""
+
+
+def mapear_camera(item: dict) -> dict:
+    estado = _estado_red(_campo(item, "online", "status"))
+    return {
+        "camera_name": _texto(item, "name", "cameraName"),
+        "device_code": _channel_address(item),
+        "site_name": _texto(item, "regionName", "areaName"),
+        "device_type": _texto(item, "deviceType", "deviceModel"),
+        "online_status": estado.upper() if estado else None,
+        "record_status": _texto(item, "recordStatus"),
+        "signal_status": _texto(item, "videoSignal", "signalStatus"),
+        "last_online_time": _fecha(_campo(item, "collectTime", "autoCheckTime")),
+        "ip_address": _texto(item, "deviceAddress", "ip"),
+    }
+
+
+def mapear_encoding_device(item: dict) -> dict:
+    return {
+        "name": _campo(item, "name", "encodeDevName"),
+        "address": _direccion(item) or None,
+        "serial_no": _campo(item, "serialNo", "devSerialNum"),
+        "version": _campo(item, "version", "firmwareVersion"),
+        "network_status": _estado_red(_campo(item, "online", "status")),
+        "time_sync_status": _campo(item, "timeSyncStatus"),
+        "hdd_status": _campo(item, "hddStatus"),
+        "hdd_usage": _campo(item, "hddUsage"),
+        "raid": _campo(item, "raid"),
+        "recording_status": _campo(item, "recordStatus"),
+        "hot_spare_status": _campo(item, "hotSpareStatus"),
+        "arming_status": _campo(item, "armingStatus"),
+        "manufacturer": _campo(item, "manufacturer", "treatyType"),
+        "first_added_time": _fecha(_campo(item, "createTime", "firstAddedTime")),
+        "auto_check_time": _fecha(_campo(item, "collectTime", "autoCheckTime")),
+    }
+
+
+def mapear_ip_speaker(item: dict) -> dict:
+    return {
+        "name": _campo(item, "name", "speakerName"),
+        "address": _direccion(item) or None,
+        "serial_no": _campo(item, "serialNo", "devSerialNum"),
+        "version": _campo(item, "version", "firmwareVersion"),
+        "network_status": _estado_red(_campo(item, "online", "status")),
+        "time_sync_status": _campo(item, "timeSyncStatus"),
+        "first_added_time": _fecha(_campo(item, "createTime", "firstAddedTime")),
+        "auto_check_time": _fecha(_campo(item, "collectTime", "autoCheckTime")),
+    }
+
+
+def mapear_alarm_input(item: dict) -> dict:
+    return {
+        "name": _campo(item, "name", "alarmInputName"),
+        "device": _campo(item, "deviceName", "device"),
+        "area": _campo(item, "regionName", "area"),
+        "partition_area": _campo(item, "partitionName", "partitionArea"),
+        "network_status": _estado_red(_campo(item, "online", "networkStatus")),
+        "arming_status": _campo(item, "armingStatus"),
+        "bypass_status": _campo(item, "bypassStatus"),
+        "fault_status": _campo(item, "faultStatus"),
+        "alarm_status": _campo(item, "alarmStatus"),
+        "detector_connection_status": _campo(item, "detectorConnectionStatus"),
+        "battery_status": _campo(item, "batteryStatus"),
+        "device_battery_capacity": _campo(item, "deviceBatteryCapacity"),
+        "zone_tampering_status": _campo(item, "zoneTamperingStatus"),
+        "auto_check_time": _fecha(_campo(item, "collectTime", "autoCheckTime")),
+    }
+
+
+MAPEOS_OPENAPI = {
+    "camera": mapear_camera,
+    "encoding device": mapear_encoding_device,
+    "ip speaker": mapear_ip_speaker,
+    "alarm input": mapear_alarm_input,
+}
+
+
+def _paths_configurados() -> dict[str, str]:
+    paths = dict(OPENAPI_PATHS)
+    env_paths = os.getenv("HIK_OPENAPI_PATHS")
+    if env_paths:
+        try:
+            paths.update({k.lower(): v for k, v in json.loads(env_paths).items()})
+        except ValueError:
+            print("[WARN] HIK_OPENAPI_PATHS no es un JSON válido; se usan los paths por defecto.")
+    return paths
+
+
+def extraer_resource_status_openapi(opcion: str, cliente: HikOpenApiClient | None = None) -> list[dict]:
+    """Devuelve los registros de la opción (Camera, Encoding Device, IP Speaker, Alarm Input)."""
+    clave = opcion.strip().lower()
+    if clave not in MAPEOS_OPENAPI:
+        raise HikOpenApiError(f"Opción de recurso desconocida para OpenAPI: {opcion}")
+
+    propio = cliente is None
+    cliente = cliente or HikOpenApiClient.desde_env()
+    inicio = time.perf_counter()
+    try:
+        items = cliente.listar_paginado(_paths_configurados()[clave])
+    finally:
+        if propio:
+            cliente.close()
+
+    mapeo = MAPEOS_OPENAPI[clave]
+    records = [mapeo(item) for item in items]
+    if clave == "camera":
+        sin_clave = sum(1 for r in records if not r["device_code"])
+        if sin_clave:
+            print(f"[WARN] {sin_clave} cámaras sin channelAddress ni IP/channelNo; no se cargan.")
+        records = [r for r in records if r["device_code"]]
+    else:
+        records = [r for r in records if r["name"]]
+
+    print(
+        f"[OPENAPI] {opcion}: {len(records)} registros en {time.perf_counter() - inicio:.2f}s "
+        f"({len(items)} items, concurrencia {cliente.max_concurrencia})"
+    )
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extrae Resource Status por OpenAPI (sin navegador).")
+    parser.add_argument("--option", "-o", dest="opcion", default="Camera")
+    parser.add_argument("--dry-run", action="store_true", help="Solo extrae, no escribe en la base")
+    args = parser.parse_args()
+
+    registros = extraer_resource_status_openapi(args.opcion)
+    if args.dry_run:
+        print(json.dumps(registros[:3], default=str, indent=2, ensure_ascii=False))
+    else:
+        import hikcentral_export_resourcestatus as resourcestatus
+
+        resourcestatus.guardar_resource_status(args.opcion, registros)
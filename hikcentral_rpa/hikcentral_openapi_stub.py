@@ -0,0 +1,195 @@
+"""
+Servidor local que imita la OpenAPI de HikCentral para pruebas de hikcentral_openapi.
+
+Valida la firma Artemis, pagina (pageNo/pageSize) y devuelve dispositivos sintéticos
+para los cuatro paths de OPENAPI_PATHS, con latencia configurable por petición.
+
+Uso:
+    python hikcentral_openapi_stub.py --puerto 9443 --dispositivos 5000 --latencia 0.05
+    HIK_OPENAPI_URL=http://127.0.0.1:9443 HIK_OPENAPI_KEY=stub HIK_OPENAPI_SECRET=stub \
+        python hikcentral_openapi.py --option Camera --dry-run
+"""
+import argparse
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hikcentral_openapi import OPENAPI_PATHS, calcular_firma
+
+
+def generar_dispositivos(cantidad: int) -> dict[str, list[dict]]:
+    base = datetime(2026, 1, 1, 8, 0, 0)
+    camaras, encoders, speakers, alarm_inputs = [], [], [], []
+    for i in range(cantidad):
+        ip = f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}"
+        online = 0 if i % 17 == 0 else 1
+        visto = (base + timedelta(minutes=i)).isoformat() + "-05:00"
+        camaras.append(
+            {
+                "indexCode": f"CAM-{i:06d}",
+                "name": f"Camara {i}",
+                "regionName": f"Sitio {i % 50}",
+                "deviceType": "DS-2CD2143G2-I",
+                "ip": ip,
+                "channelNo": 1,
+                "online": online,
+                "recordStatus": "Recording" if online else "Exception",
+                "videoSignal": "Normal" if online else "Video Loss",
+                "collectTime": visto,
+            }
+        )
+        encoders.append(
+            {
+                "name": f"NVR {i}",
+                "ip": ip,
+                "port": 8000,
+                "serialNo": f"DS-7616NI{i:09d}",
+                "version": "V4.30.085",
+                "online": online,
+                "timeSyncStatus": "Synchronized",
+                "hddStatus": "Normal",
+                "hddUsage": f"{i % 100}%",
+                "manufacturer": "hikvision",
+                "createTime": visto,
+                "collectTime": visto,
+            }
+        )
+        speakers.append(
+            {
+                "name": f"Speaker {i}",
+                "ip": ip,
+                "port": 80,
+                "serialNo": f"DS-QAZ1325G1{i:09d}",
+                "version": "V1.0.1",
+                "online": online,
+                "timeSyncStatus": "Synchronized",
+                "createTime": visto,
+                "collectTime": visto,
+            }
+        )
+        alarm_inputs.append(
+            {
+                "name": f"Zona {i}",
+                "deviceName": f"Panel {i // 8}",
+                "regionName": f"Sitio {i % 50}",
+                "partitionName": f"Partición {i % 4}",
+                "online": online,
+                "armingStatus": "Armed",
+                "bypassStatus": "Normal",
+                "faultStatus": "Normal",
+                "alarmStatus": "Normal",
+                "collectTime": visto,
+            }
+        )
+
+    return {
+        OPENAPI_PATHS["camera"]: camaras,
+        OPENAPI_PATHS["encoding device"]: encoders,
+        OPENAPI_PATHS["ip speaker"]: speakers,
+        OPENAPI_PATHS["alarm input"]: alarm_inputs,
+    }
+
+
+class StubOpenApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, direccion, app_key: str, app_secret: str, datos: dict, latencia: float):
+        super().__init__(direccion, StubOpenApiHandler)
+        self.app_key = app_key
+        self.app_secret = app_secret
+        self.datos = datos
+        self.latencia = latencia
+        self.peticiones = 0
+        self._lock = threading.Lock()
+
+
+class StubOpenApiHandler(BaseHTTPRequestHandler):
+    server: StubOpenApiServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _responder(self, status: int, payload: dict):
+        cuerpo = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_POST(self):
+        with self.server._lock:
+            self.server.peticiones += 1
+
+        path = self.path.split("?", 1)[0]
+        largo = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(largo) or b"{}")
+
+        headers = {k: v for k, v in self.headers.items()}
+        firma = self.headers.get("x-ca-signature", "")
+        if (
+            self.headers.get("x-ca-key") != self.server.app_key
+            or calcular_firma(self.server.app_secret, "POST", path, headers) != firma
+        ):
+            self._responder(401, {"code": "0x02401003", "msg": "signature verification failed"})
+            return
+
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+
+        items = self.server.datos.get(path)
+        if items is None:
+            self._responder(404, {"code": "0x02401404", "msg": f"unknown api {path}"})
+            return
+
+        page_no = max(1, int(body.get("pageNo", 1)))
+        page_size = max(1, int(body.get("pageSize", 500)))
+        inicio = (page_no - 1) * page_size
+        self._responder(
+            200,
+            {
+                "code": "0",
+                "msg": "Success",
+                "data": {
+                    "total": len(items),
+                    "pageNo": page_no,
+                    "pageSize": page_size,
+                    "list": items[inicio : inicio + page_size],
+                },
+            },
+        )
+
+
+def iniciar_stub(
+    app_key: str = "stub",
+    app_secret: str = "stub",
+    dispositivos: int = 1000,
+    latencia: float = 0.0,
+    puerto: int = 0,
+) -> tuple[StubOpenApiServer, str]:
+    """Levanta el stub en un hilo daemon y devuelve (server, base_url). Con puerto=0 elige uno libre."""
+    server = StubOpenApiServer(
+        ("127.0.0.1", puerto), app_key, app_secret, generar_dispositivos(dispositivos), latencia
+    )
+    threading.Thread(target=server.serve_forever, name="hik_openapi_stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in local de la OpenAPI de HikCentral.")
+    parser.add_argument("--puerto", type=int, default=9443)
+    parser.add_argument("--dispositivos", type=int, default=1000)
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por petición")
+    parser.add_argument("--key", default="stub")
+    parser.add_argument("--secret", default="stub")
+    args = parser.parse_args()
+
+    server, url = iniciar_stub(args.key, args.secret, args.dispositivos, args.latencia, args.puerto)
+    print(f"[STUB] OpenAPI de prueba escuchando en {url} ({args.dispositivos} dispositivos por recurso)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,235 @@
+import contextvars
+import cProfile
+import functools
+import os
+import pstats
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+
+# ========================
+# PERFILADO DE PYTHON POR FASE (opt-in)
+# ========================
+# Separa el tiempo de CPU de Python de la automatización (Selenium, esperas) y de la carga
+# (pandas + Postgres) para poder ver los puntos calientes en el servidor de producción.
+# Una fase anidada (la carga dentro del flujo de UI) pausa la de afuera mientras corre.
+# Se guarda un .prof por fase en LOG_DIR/perfiles (snakeviz / pstats) con el id de la
+# ejecución, y las N funciones con más tiempo propio quedan en LOG_RPA_EJECUCION.DETALLE.
+#   HIK_PROFILE=1                 activa el perfilado (o --profile en los scripts)
+#   HIK_PROFILER=pyinstrument     usa pyinstrument si está instalado (un HTML por fase, sin top N)
+#   HIK_PROFILE_TOP_N             funciones en el resumen (default 15)
+#
+# cProfile solo mide el hilo que lo activa; en Python 3.12+ además admite un único perfil
+# activo por proceso, así que en sesiones paralelas solo se perfila la primera que llega.
+
+PROFILE_TOP_N = int(os.getenv("HIK_PROFILE_TOP_N", "15"))
+MOTOR = os.getenv("HIK_PROFILER", "cprofile").strip().lower()
+
+_perfilador_actual: contextvars.ContextVar["PerfiladorFases | None"] = contextvars.ContextVar(
+    "hik_perfilador_actual", default=None
+)
+
+
+def perfil_solicitado(flag: bool = False) -> bool:
+    return flag or os.getenv("HIK_PROFILE", "").strip().lower() in ("1", "true", "si", "yes")
+
+
+def _motor_disponible(motor: str) -> str:
+    if motor != "pyinstrument":
+        return "cprofile"
+    try:
+        import pyinstrument  # noqa: F401
+    except ImportError:
+        print("[WARN] pyinstrument no está instalado; se perfila con cProfile.")
+        return "cprofile"
+    return "pyinstrument"
+
+
+class _Medicion:
+    """Un perfil de una fase en un hilo (cProfile.Profile o pyinstrument.Profiler)."""
+
+    def __init__(self, motor: str):
+        self.motor = motor
+        if motor == "pyinstrument":
+            from pyinstrument import Profiler
+
+            self.perfil = Profiler()
+        else:
+            self.perfil = cProfile.Profile()
+
+    def encender(self):
+        if self.motor == "pyinstrument":
+            self.perfil.start()
+        else:
+            self.perfil.enable()
+
+    def apagar(self):
+        if self.motor == "pyinstrument":
+            self.perfil.stop()
+        else:
+            self.perfil.disable()
+
+
+class PerfiladorFases:
+    def __init__(
+        self,
+        nombre: str,
+        log_dir: Path,
+        recorder=None,
+        motor: str = MOTOR,
+        top_n: int = PROFILE_TOP_N,
+    ):
+        self.nombre = "".join(c if c.isalnum() or c in "-_." else "_" for c in nombre)
+        self.carpeta = Path(log_dir) / "perfiles"
+        self.recorder = recorder
+        self.motor = _motor_disponible(motor)
+        self.top_n = top_n
+        self.guardado = False
+        self._mediciones: dict[str, list[_Medicion]] = {}
+        self._pilas = threading.local()
+        self._lock = threading.Lock()
+        self._aviso_ocupado = False
+
+    def _pila(self) -> list[_Medicion]:
+        if not hasattr(self._pilas, "pila"):
+            self._pilas.pila = []
+        return self._pilas.pila
+
+    def iniciar(self, fase: str) -> bool:
+        """Empieza `fase` en el hilo actual; pausa la fase que estuviera activa en el hilo."""
+        pila = self._pila()
+        medicion = _Medicion(self.motor)
+        if pila:
+            pila[-1].apagar()
+        try:
+            medicion.encender()
+        except (ValueError, RuntimeError) as exc:
+            # Otro hilo ya tiene un perfil activo (Python 3.12+): esta fase queda sin medir
+            if pila:
+                pila[-1].encender()
+            with self._lock:
+                if not self._aviso_ocupado:
+                    self._aviso_ocupado = True
+                    print(f"[PROFILE] Fase '{fase}' sin perfilar en {threading.current_thread().name}: {exc}")
+            return False
+        pila.append(medicion)
+        with self._lock:
+            self._mediciones.setdefault(fase, []).append(medicion)
+        return True
+
+    def detener(self):
+        """Termina la fase actual del hilo y reanuda la de afuera."""
+        pila = self._pila()
+        if not pila:
+            return
+        pila.pop().apagar()
+        if pila:
+            pila[-1].encender()
+
+    def detener_todo(self):
+        while self._pila():
+            self.detener()
+
+    @contextmanager
+    def fase(self, fase: str):
+        iniciada = self.iniciar(fase)
+        try:
+            yield
+        finally:
+            if iniciada:
+                self.detener()
+
+    def _top_funciones(self, stats: pstats.Stats) -> list[dict]:
+        filas = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[: self.top_n]
+        return [
+            {
+                "funcion": f"{Path(archivo).name}:{linea}({funcion})",
+                "llamadas": llamadas,
+                "propio_seg": round(propio, 4),
+                "acumulado_seg": round(acumulado, 4),
+            }
+            for (archivo, linea, funcion), (_, llamadas, propio, acumulado, _) in filas
+        ]
+
+    def guardar(self, id_ejecucion: int | None = None) -> dict:
+        """Escribe un perfil por fase y deja el resumen en recorder.detalle['perfil']."""
+        self.detener_todo()
+        etiqueta = str(id_ejecucion) if id_ejecucion is not None else datetime.now().strftime("%Y%m%d_%H%M%S")
+        resumen = {"motor": self.motor, "fases": {}}
+        with self._lock:
+            mediciones = {fase: list(lista) for fase, lista in self._mediciones.items()}
+        try:
+            self.carpeta.mkdir(parents=True, exist_ok=True)
+        except OSError as exc:
+            print(f"[WARN] No se pudo crear {self.carpeta}: {exc}")
+            return resumen
+
+        for fase, lista in mediciones.items():
+            base = self.carpeta / f"{self.nombre}_{etiqueta}_{fase}"
+            try:
+                if self.motor == "pyinstrument":
+                    for i, medicion in enumerate(lista):
+                        sufijo = f"_{i}" if len(lista) > 1 else ""
+                        Path(f"{base}{sufijo}.html").write_text(medicion.perfil.output_html(), encoding="utf-8")
+                    resumen["fases"][fase] = {"archivo": f"{base}.html", "hilos": len(lista)}
+                    print(f"[PROFILE] {fase}: {base}.html")
+                    continue
+
+                stats = pstats.Stats(lista[0].perfil)
+                for medicion in lista[1:]:
+                    stats.add(medicion.perfil)
+                stats.dump_stats(f"{base}.prof")
+            except (OSError, TypeError) as exc:
+                # TypeError: pstats.Stats de un perfil que nunca llegó a registrar llamadas
+                print(f"[WARN] No se pudo guardar el perfil de {fase}: {exc}")
+                continue
+
+            top = self._top_funciones(stats)
+            resumen["fases"][fase] = {
+                "archivo": f"{base}.prof",
+                "hilos": len(lista),
+                "total_seg": round(stats.total_tt, 3),
+                "top": top,
+            }
+            print(f"[PROFILE] {fase}: {stats.total_tt:.2f}s perfilados -> {base}.prof")
+            for fila in top[:5]:
+                print(
+                    f"[PROFILE]   {fila['propio_seg']:8.3f}s propio | {fila['acumulado_seg']:8.3f}s acum. | "
+                    f"{fila['llamadas']:>8} llamadas | {fila['funcion']}"
+                )
+
+        self.guardado = True
+        if self.recorder is not None:
+            self.recorder.detalle["perfil"] = resumen
+        return resumen
+
+
+def perfilador_actual() -> PerfiladorFases | None:
+    return _perfilador_actual.get()
+
+
+def activar_perfilador(perfilador: PerfiladorFases | None) -> contextvars.Token:
+    return _perfilador_actual.set(perfilador)
+
+
+def desactivar_perfilador(token: contextvars.Token):
+    _perfilador_actual.reset(token)
+
+
+def perfilado(fase: str):
+    """Decorador: cada llamada corre como `fase` del perfilador activo (si hay)."""
+
+    def decorador(fn):
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            perfilador = _perfilador_actual.get()
+            if perfilador is None:
+                return fn(*args, **kwargs)
+            with perfilador.fase(fase):
+                return fn(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
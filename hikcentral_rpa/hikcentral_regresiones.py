@@ -0,0 +1,267 @@
+"""
+Detector de regresiones de tiempo por paso sobre LOG_RPA_EJECUCION_PASO.
+
+Para cada (script, opción, paso) calcula p50/p95 de las últimas N ejecuciones y compara
+la ejecución actual. Los veredictos quedan en LOG_RPA_REGRESION_PASO (se crea si falta).
+Un paso que se repite en la misma ejecución (ventanas, reintentos) se suma por ejecución.
+
+Corre solo al final de cada ejecución (registrar_ejecucion_y_pasos) salvo HIK_REGRESIONES=0,
+o a mano:
+    python hikcentral_regresiones.py                       # última ejecución de cada script/opción
+    python hikcentral_regresiones.py --id-ejecucion 1234
+    python hikcentral_regresiones.py --ultimas 20 --opcion "Event and Alarm"
+
+Variables de entorno:
+    HIK_REGRESION_VENTANA      ejecuciones previas consideradas (default 30)
+    HIK_REGRESION_MIN_MUESTRAS historia mínima para opinar (default 5)
+    HIK_REGRESION_FACTOR       múltiplo del p95 que se tolera (default 1.0)
+    HIK_REGRESION_MIN_DELTA    segundos mínimos sobre el p50 para marcar regresión (default 2)
+"""
+import argparse
+import os
+
+REGRESIONES_HABILITADAS = os.getenv("HIK_REGRESIONES", "1").strip().lower() not in ("0", "false", "no")
+VENTANA = int(os.getenv("HIK_REGRESION_VENTANA", "30"))
+MIN_MUESTRAS = int(os.getenv("HIK_REGRESION_MIN_MUESTRAS", "5"))
+FACTOR_P95 = float(os.getenv("HIK_REGRESION_FACTOR", "1.0"))
+MIN_DELTA_SEG = float(os.getenv("HIK_REGRESION_MIN_DELTA", "2"))
+
+REGRESION = "REGRESION"
+MEJORA = "MEJORA"
+OK = "OK"
+SIN_HISTORIA = "SIN_HISTORIA"
+
+
+def asegurar_tabla_regresiones(conn):
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS PUBLIC.LOG_RPA_REGRESION_PASO (
+                ID_EJECUCION INTEGER NOT NULL,
+                SCRIPT VARCHAR(200),
+                OPCION VARCHAR(200),
+                NUM_PASO INTEGER NOT NULL,
+                DESCRIPCION TEXT NOT NULL,
+                TIEMPO_PASO_SEG NUMERIC(12, 2),
+                P50_SEG NUMERIC(12, 2),
+                P95_SEG NUMERIC(12, 2),
+                MUESTRAS INTEGER NOT NULL,
+                VEREDICTO VARCHAR(20) NOT NULL,
+                FECHA_CREACION TIMESTAMP NOT NULL DEFAULT now(),
+                PRIMARY KEY (ID_EJECUCION, NUM_PASO, DESCRIPCION)
+            );
+            """
+        )
+    conn.commit()
+
+
+def linea_base_pasos(conn, script: str, opcion: str, id_ejecucion: int, ventana: int = VENTANA) -> dict:
+    """p50/p95 por (num_paso, descripción) de las `ventana` ejecuciones anteriores a id_ejecucion."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH PREVIAS AS (
+                SELECT ID_EJECUCION
+                FROM PUBLIC.LOG_RPA_EJECUCION
+                WHERE SCRIPT = %s AND OPCION = %s AND ID_EJECUCION < %s
+                ORDER BY ID_EJECUCION DESC
+                LIMIT %s
+            ), POR_EJECUCION AS (
+                SELECT P.ID_EJECUCION, P.NUM_PASO, P.DESCRIPCION, SUM(P.TIEMPO_PASO_SEG) AS SEG
+                FROM PUBLIC.LOG_RPA_EJECUCION_PASO P
+                JOIN PREVIAS USING (ID_EJECUCION)
+                GROUP BY P.ID_EJECUCION, P.NUM_PASO, P.DESCRIPCION
+            )
+            SELECT NUM_PASO, DESCRIPCION,
+                   percentile_cont(0.5) WITHIN GROUP (ORDER BY SEG),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY SEG),
+                   COUNT(*)
+            FROM POR_EJECUCION
+            GROUP BY NUM_PASO, DESCRIPCION;
+            """,
+            (script, opcion, id_ejecucion, ventana),
+        )
+        return {
+            (num_paso, descripcion): {"p50": float(p50), "p95": float(p95), "muestras": muestras}
+            for num_paso, descripcion, p50, p95, muestras in cur.fetchall()
+        }
+
+
+def veredicto_paso(
+    seg: float,
+    base: dict | None,
+    min_muestras: int = MIN_MUESTRAS,
+    factor: float = FACTOR_P95,
+    min_delta: float = MIN_DELTA_SEG,
+) -> str:
+    if not base or base["muestras"] < min_muestras:
+        return SIN_HISTORIA
+    if seg > base["p95"] * factor and seg - base["p50"] >= min_delta:
+        return REGRESION
+    if seg < base["p50"] * 0.5 and base["p50"] - seg >= min_delta:
+        return MEJORA
+    return OK
+
+
+def analizar_ejecucion(conn, id_ejecucion: int, ventana: int = VENTANA) -> list[dict]:
+    """Compara los pasos de id_ejecucion contra su historia y guarda los veredictos."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "SELECT SCRIPT, OPCION FROM PUBLIC.LOG_RPA_EJECUCION WHERE ID_EJECUCION = %s",
+            (id_ejecucion,),
+        )
+        fila = cur.fetchone()
+        if fila is None:
+            raise ValueError(f"No existe la ejecución {id_ejecucion}")
+        script, opcion = fila
+        cur.execute(
+            """
+            SELECT NUM_PASO, DESCRIPCION, SUM(TIEMPO_PASO_SEG)
+            FROM PUBLIC.LOG_RPA_EJECUCION_PASO
+            WHERE ID_EJECUCION = %s
+            GROUP BY NUM_PASO, DESCRIPCION
+            ORDER BY NUM_PASO;
+            """,
+            (id_ejecucion,),
+        )
+        pasos = cur.fetchall()
+
+    bases = linea_base_pasos(conn, script, opcion, id_ejecucion, ventana)
+    veredictos = []
+    for num_paso, descripcion, seg in pasos:
+        if num_paso == 0:
+            continue  # baseline de CPU/RAM, sin duración propia
+        seg = float(seg or 0)
+        base = bases.get((num_paso, descripcion))
+        veredictos.append(
+            {
+                "id_ejecucion": id_ejecucion,
+                "script": script,
+                "opcion": opcion,
+                "num_paso": num_paso,
+                "descripcion": descripcion,
+                "seg": seg,
+                "p50": base["p50"] if base else None,
+                "p95": base["p95"] if base else None,
+                "muestras": base["muestras"] if base else 0,
+                "veredicto": veredicto_paso(seg, base),
+            }
+        )
+
+    asegurar_tabla_regresiones(conn)
+    with conn:
+        with conn.cursor() as cur:
+            cur.executemany(
+                """
+                INSERT INTO PUBLIC.LOG_RPA_REGRESION_PASO
+                (ID_EJECUCION, SCRIPT, OPCION, NUM_PASO, DESCRIPCION, TIEMPO_PASO_SEG, P50_SEG, P95_SEG, MUESTRAS, VEREDICTO)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (ID_EJECUCION, NUM_PASO, DESCRIPCION) DO UPDATE SET
+                    TIEMPO_PASO_SEG = EXCLUDED.TIEMPO_PASO_SEG,
+                    P50_SEG = EXCLUDED.P50_SEG,
+                    P95_SEG = EXCLUDED.P95_SEG,
+                    MUESTRAS = EXCLUDED.MUESTRAS,
+                    VEREDICTO = EXCLUDED.VEREDICTO,
+                    FECHA_CREACION = now();
+                """,
+                [
+                    (
+                        v["id_ejecucion"],
+                        v["script"],
+                        v["opcion"],
+                        v["num_paso"],
+                        v["descripcion"],
+                        round(v["seg"], 2),
+                        round(v["p50"], 2) if v["p50"] is not None else None,
+                        round(v["p95"], 2) if v["p95"] is not None else None,
+                        v["muestras"],
+                        v["veredicto"],
+                    )
+                    for v in veredictos
+                ],
+            )
+    return veredictos
+
+
+def imprimir_veredictos(veredictos: list[dict], solo_alertas: bool = True):
+    if not veredictos:
+        return
+    cabecera = veredictos[0]
+    regresiones = [v for v in veredictos if v["veredicto"] == REGRESION]
+    print(
+        f"[REGRESION] Ejecución {cabecera['id_ejecucion']} ({cabecera['script']} | {cabecera['opcion']}): "
+        f"{len(regresiones)} pasos sobre p95 de {len(veredictos)}"
+    )
+    for v in veredictos:
+        if solo_alertas and v["veredicto"] not in (REGRESION, MEJORA):
+            continue
+        base = f"p50 {v['p50']:.2f}s / p95 {v['p95']:.2f}s" if v["p50"] is not None else "sin historia"
+        print(
+            f"[REGRESION]   {v['veredicto']:<12} {v['descripcion']:<45} "
+            f"{v['seg']:7.2f}s | {base} | n={v['muestras']}"
+        )
+
+
+def revisar_ejecucion(conn, id_ejecucion: int | None) -> list[dict]:
+    """Hook de fin de ejecución: nunca propaga errores (el registro de rendimiento ya quedó guardado)."""
+    if not REGRESIONES_HABILITADAS or id_ejecucion is None:
+        return []
+    try:
+        veredictos = analizar_ejecucion(conn, id_ejecucion)
+    except Exception as exc:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        print(f"[WARN] No se pudo evaluar regresiones de la ejecución {id_ejecucion}: {exc}")
+        return []
+    imprimir_veredictos(veredictos)
+    return veredictos
+
+
+def ejecuciones_a_analizar(conn, ultimas: int, script: str | None, opcion: str | None) -> list[int]:
+    """Las `ultimas` ejecuciones de cada (script, opción), con filtros opcionales."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT ID_EJECUCION FROM (
+                SELECT ID_EJECUCION,
+                       ROW_NUMBER() OVER (PARTITION BY SCRIPT, OPCION ORDER BY ID_EJECUCION DESC) AS N
+                FROM PUBLIC.LOG_RPA_EJECUCION
+                WHERE (%s IS NULL OR SCRIPT = %s) AND (%s IS NULL OR OPCION = %s)
+            ) T
+            WHERE N <= %s
+            ORDER BY ID_EJECUCION;
+            """,
+            (script, script, opcion, opcion, ultimas),
+        )
+        return [fila[0] for fila in cur.fetchall()]
+
+
+if __name__ == "__main__":
+    from hikcentral_open_eventalarms import get_pg_connection
+
+    parser = argparse.ArgumentParser(description="Detecta regresiones de tiempo por paso de los RPA.")
+    parser.add_argument("--id-ejecucion", type=int, help="Analiza solo esta ejecución")
+    parser.add_argument("--ultimas", type=int, default=1, help="Últimas N ejecuciones por script/opción")
+    parser.add_argument("--script", help="Filtra por SCRIPT (ej: hikcentral_open_eventalarms.py)")
+    parser.add_argument("--opcion", help="Filtra por OPCION (ej: 'Event and Alarm')")
+    parser.add_argument("--ventana", type=int, default=VENTANA, help="Ejecuciones previas para p50/p95")
+    parser.add_argument("--todos", action="store_true", help="Imprime también los pasos OK")
+    args = parser.parse_args()
+
+    conn = get_pg_connection()
+    try:
+        ids = (
+            [args.id_ejecucion]
+            if args.id_ejecucion
+            else ejecuciones_a_analizar(conn, args.ultimas, args.script, args.opcion)
+        )
+        total_regresiones = 0
+        for id_ejecucion in ids:
+            veredictos = analizar_ejecucion(conn, id_ejecucion, args.ventana)
+            imprimir_veredictos(veredictos, solo_alertas=not args.todos)
+            total_regresiones += sum(v["veredicto"] == REGRESION for v in veredictos)
+    finally:
+        conn.close()
+    raise SystemExit(1 if total_regresiones else 0)
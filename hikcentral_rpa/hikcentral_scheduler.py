@@ -0,0 +1,373 @@
+"""
+Scheduler único para los flujos RPA de HikCentral (cámaras, resource status, event/alarm).
+
+Cada job corre como proceso hijo de este scheduler (un mismo intérprete no puede correr
+dos flujos a la vez por el estado global de los scripts), con:
+  - intervalo + jitter aleatorio para no disparar todo en el mismo segundo;
+  - límite de ejecuciones simultáneas global y por host (Chrome / servidor HikCentral);
+  - política de solapamiento por job: 'skip' descarta el disparo si la instancia anterior
+    sigue corriendo o en cola; 'coalesce' deja una sola re-ejecución pendiente;
+  - métricas: profundidad de cola, lag (inicio real - hora programada), duración,
+    omitidas/coalescidas, en scheduler_metrics.json y opcionalmente por HTTP (/metrics).
+
+Uso:
+    python hikcentral_scheduler.py                          # jobs por defecto
+    python hikcentral_scheduler.py --config jobs.json --max-paralelo 3 --metricas-puerto 9108
+    python hikcentral_scheduler.py --solo eventalarms_172.16.9.10 --una-vez
+
+jobs.json: lista de {"nombre", "script", "args", "intervalo_seg", "jitter_seg", "host",
+"solapamiento", "timeout_seg", "plazo_seg"}.
+
+Cada hijo recibe HIK_PLAZO_SEG (plazo_seg, o el 90% del menor entre intervalo y timeout):
+el flujo corta sus esperas y termina con estado "deadline" antes de pisar el próximo disparo.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+LOG_DIR = Path(os.getenv("HIK_SCHEDULER_LOG_DIR") or SCRIPT_DIR / "logs" / "scheduler")
+
+JOBS_POR_DEFECTO = [
+    {
+        "nombre": "cameras",
+        "script": "hikcentral_export_cameras.py",
+        "intervalo_seg": 3600,
+        "jitter_seg": 120,
+        "host": "172.16.9.253",
+    },
+    *[
+        {
+            "nombre": f"resourcestatus_{opcion.lower().replace(' ', '_')}",
+            "script": "hikcentral_export_resourcestatus.py",
+            "args": ["--option", opcion],
+            "intervalo_seg": 900 if opcion == "Camera" else 1800,
+            "jitter_seg": 60,
+            "host": "172.16.9.10",
+        }
+        for opcion in ("Camera", "Encoding Device", "IP Speaker", "Alarm Input")
+    ],
+    *[
+        {
+            "nombre": f"eventalarms_{host}",
+            "script": "hikcentral_open_eventalarms.py",
+            "args": ["--host", host],
+            "intervalo_seg": 600,
+            "jitter_seg": 30,
+            "host": host,
+            "solapamiento": "coalesce",
+        }
+        for host in ("172.16.9.10", "172.16.9.11")
+    ],
+]
+
+
+@dataclass
+class Job:
+    nombre: str
+    script: str
+    intervalo_seg: float
+    args: list[str] = field(default_factory=list)
+    jitter_seg: float = 0.0
+    host: str | None = None
+    solapamiento: str = "skip"
+    timeout_seg: float | None = 3600
+    plazo_seg: float | None = None
+
+    proxima: float = 0.0
+    corriendo: bool = False
+    en_cola: bool = False
+    pendiente: bool = False
+    ejecuciones: int = 0
+    fallidas: int = 0
+    omitidas: int = 0
+    coalescidas: int = 0
+    ultimo_codigo: int | None = None
+    ultima_duracion_seg: float | None = None
+    ultimo_lag_seg: float | None = None
+    lag_max_seg: float = 0.0
+    ultimo_inicio: str | None = None
+
+    def programar_siguiente(self, desde: float):
+        self.proxima = desde + self.intervalo_seg + random.uniform(0, self.jitter_seg)
+
+    def plazo_efectivo(self) -> float:
+        if self.plazo_seg:
+            return self.plazo_seg
+        return 0.9 * min(self.intervalo_seg, self.timeout_seg or self.intervalo_seg)
+
+
+class Scheduler:
+    def __init__(
+        self,
+        jobs: list[Job],
+        max_paralelo: int = 2,
+        limite_por_host: int = 1,
+        una_vez: bool = False,
+    ):
+        self.jobs = jobs
+        self.max_paralelo = max_paralelo
+        self.limite_por_host = limite_por_host
+        self.una_vez = una_vez
+        self._cond = threading.Condition()
+        self._cola: deque[tuple[Job, float]] = deque()
+        self._por_host: Counter = Counter()
+        self._corriendo = 0
+        self._detener = threading.Event()
+        self.inicio = time.time()
+
+        ahora = time.time()
+        for job in jobs:
+            # Primer disparo escalonado dentro del jitter
+            job.proxima = ahora + random.uniform(0, job.jitter_seg)
+
+    # ---------- Disparo ----------
+    def _disparar(self, job: Job, programada: float):
+        if job.corriendo or job.en_cola:
+            if job.solapamiento == "coalesce":
+                if job.pendiente:
+                    job.omitidas += 1
+                else:
+                    job.pendiente = True
+                    job.coalescidas += 1
+                print(f"[SCHED] {job.nombre}: instancia anterior activa, disparo coalescido")
+            else:
+                job.omitidas += 1
+                print(f"[SCHED] {job.nombre}: instancia anterior activa, disparo omitido")
+            return
+        job.en_cola = True
+        self._cola.append((job, programada))
+        self._cond.notify_all()
+
+    def _despachador(self):
+        while not self._detener.is_set():
+            ahora = time.time()
+            with self._cond:
+                for job in self.jobs:
+                    if job.proxima and job.proxima <= ahora:
+                        self._disparar(job, job.proxima)
+                        if self.una_vez:
+                            job.proxima = 0
+                        else:
+                            job.programar_siguiente(job.proxima)
+                            if job.proxima <= ahora:
+                                # Sin acumular atrasos: si se perdieron disparos, se cuenta desde ahora
+                                job.programar_siguiente(ahora)
+                if self.una_vez and all(j.proxima == 0 for j in self.jobs):
+                    if not self._cola and self._corriendo == 0 and not any(j.pendiente for j in self.jobs):
+                        self._detener.set()
+                        self._cond.notify_all()
+                        return
+            pendientes = [j.proxima for j in self.jobs if j.proxima]
+            espera = min(pendientes) - time.time() if pendientes else 1.0
+            self._detener.wait(max(0.05, min(espera, 1.0)))
+
+    # ---------- Ejecución ----------
+    def _tomar_de_cola(self) -> tuple[Job, float] | None:
+        """Primer job de la cola cuyo host tiene cupo (sin cupo, se salta y sigue esperando)."""
+        if self._corriendo >= self.max_paralelo:
+            return None
+        for i, (job, programada) in enumerate(self._cola):
+            if job.host and self._por_host[job.host] >= self.limite_por_host:
+                continue
+            del self._cola[i]
+            return job, programada
+        return None
+
+    def _trabajador(self):
+        while True:
+            with self._cond:
+                item = None
+                while not self._detener.is_set():
+                    item = self._tomar_de_cola()
+                    if item is not None:
+                        break
+                    self._cond.wait(timeout=1.0)
+                if item is None:
+                    return
+                job, programada = item
+                job.en_cola = False
+                job.corriendo = True
+                self._corriendo += 1
+                if job.host:
+                    self._por_host[job.host] += 1
+
+            self._ejecutar(job, programada)
+
+            with self._cond:
+                job.corriendo = False
+                self._corriendo -= 1
+                if job.host:
+                    self._por_host[job.host] -= 1
+                if job.pendiente:
+                    job.pendiente = False
+                    job.en_cola = True
+                    self._cola.append((job, time.time()))
+                self._cond.notify_all()
+
+    def _ejecutar(self, job: Job, programada: float):
+        inicio = time.time()
+        job.ultimo_lag_seg = round(max(0.0, inicio - programada), 2)
+        job.lag_max_seg = max(job.lag_max_seg, job.ultimo_lag_seg)
+        job.ultimo_inicio = datetime.now().isoformat(timespec="seconds")
+        LOG_DIR.mkdir(parents=True, exist_ok=True)
+        log_path = LOG_DIR / f"{job.nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+
+        comando = [sys.executable, str(SCRIPT_DIR / job.script), *job.args]
+        print(f"[SCHED] Inicia {job.nombre} (lag {job.ultimo_lag_seg:.1f}s) -> {log_path.name}")
+        codigo = None
+        try:
+            with open(log_path, "w", encoding="utf-8") as log:
+                # Un HIK_PLAZO_SEG del entorno del scheduler tiene prioridad sobre el del job
+                entorno = {"HIK_PLAZO_SEG": f"{job.plazo_efectivo():.0f}", **os.environ}
+                proceso = subprocess.Popen(
+                    comando, cwd=SCRIPT_DIR, stdout=log, stderr=subprocess.STDOUT, text=True, env=entorno
+                )
+                try:
+                    codigo = proceso.wait(timeout=job.timeout_seg)
+                except subprocess.TimeoutExpired:
+                    proceso.kill()
+                    codigo = proceso.wait()
+                    print(f"[WARN] {job.nombre} superó {job.timeout_seg}s y fue terminado.")
+        except Exception as exc:
+            print(f"[ERROR] No se pudo ejecutar {job.nombre}: {exc}")
+
+        job.ultima_duracion_seg = round(time.time() - inicio, 2)
+        job.ultimo_codigo = codigo
+        job.ejecuciones += 1
+        if codigo != 0:
+            job.fallidas += 1
+        print(
+            f"[SCHED] Fin {job.nombre} | código: {codigo} | duración: {job.ultima_duracion_seg:.1f}s"
+        )
+
+    # ---------- Métricas ----------
+    def metricas(self) -> dict:
+        with self._cond:
+            ahora = time.time()
+            cola = [
+                {"job": job.nombre, "espera_seg": round(ahora - programada, 1), "host": job.host}
+                for job, programada in self._cola
+            ]
+            return {
+                "ts": datetime.now().isoformat(timespec="seconds"),
+                "uptime_seg": round(ahora - self.inicio, 1),
+                "profundidad_cola": len(self._cola),
+                "lag_cola_max_seg": max((c["espera_seg"] for c in cola), default=0.0),
+                "corriendo": self._corriendo,
+                "por_host": dict(self._por_host),
+                "cola": cola,
+                "jobs": {
+                    job.nombre: {
+                        k: v
+                        for k, v in asdict(job).items()
+                        if k not in ("script", "args", "intervalo_seg", "jitter_seg", "timeout_seg", "plazo_seg")
+                    }
+                    for job in self.jobs
+                },
+            }
+
+    def _publicar_metricas(self, cada_seg: float = 10.0):
+        ruta = LOG_DIR / "scheduler_metrics.json"
+        while not self._detener.wait(cada_seg):
+            data = self.metricas()
+            try:
+                LOG_DIR.mkdir(parents=True, exist_ok=True)
+                tmp = ruta.with_suffix(".tmp")
+                tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+                tmp.replace(ruta)
+            except OSError as exc:
+                print(f"[WARN] No se pudieron escribir métricas: {exc}")
+            print(
+                f"[SCHED] cola: {data['profundidad_cola']} | corriendo: {data['corriendo']} | "
+                f"lag cola máx: {data['lag_cola_max_seg']:.1f}s"
+            )
+
+    def servir_metricas(self, puerto: int):
+        scheduler = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                cuerpo = json.dumps(scheduler.metricas(), indent=2).encode("utf-8")
+                self.send_response(200 if self.path.startswith("/metrics") else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        server = ThreadingHTTPServer(("127.0.0.1", puerto), Handler)
+        threading.Thread(target=server.serve_forever, name="sched_metricas", daemon=True).start()
+        print(f"[SCHED] Métricas en http://127.0.0.1:{puerto}/metrics")
+
+    # ---------- Ciclo de vida ----------
+    def ejecutar(self):
+        hilos = [threading.Thread(target=self._despachador, name="sched_despachador", daemon=True)]
+        hilos += [
+            threading.Thread(target=self._trabajador, name=f"sched_trabajador_{i}", daemon=True)
+            for i in range(self.max_paralelo)
+        ]
+        threading.Thread(target=self._publicar_metricas, name="sched_publicador", daemon=True).start()
+        for hilo in hilos:
+            hilo.start()
+        print(
+            f"[SCHED] {len(self.jobs)} jobs | máx. paralelo: {self.max_paralelo} | "
+            f"límite por host: {self.limite_por_host}"
+        )
+        try:
+            while not self._detener.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            print("[SCHED] Deteniendo (se espera a los jobs en curso)...")
+            self._detener.set()
+            with self._cond:
+                self._cond.notify_all()
+        for hilo in hilos[1:]:
+            hilo.join()
+
+
+def cargar_jobs(config: str | None, solo: list[str] | None) -> list[Job]:
+    definiciones = JOBS_POR_DEFECTO
+    if config:
+        with open(config, encoding="utf-8") as f:
+            definiciones = json.load(f)
+    jobs = [Job(**d) for d in definiciones]
+    if solo:
+        jobs = [j for j in jobs if j.nombre in solo]
+    if not jobs:
+        raise SystemExit("[ERROR] No hay jobs para ejecutar.")
+    return jobs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scheduler de los flujos RPA de HikCentral.")
+    parser.add_argument("--config", type=str, help="JSON con la lista de jobs")
+    parser.add_argument("--max-paralelo", type=int, default=int(os.getenv("HIK_SCHED_MAX_PARALELO", "2")))
+    parser.add_argument("--limite-host", type=int, default=int(os.getenv("HIK_SCHED_LIMITE_HOST", "1")))
+    parser.add_argument("--metricas-puerto", type=int, default=None, help="Expone /metrics en este puerto")
+    parser.add_argument("--solo", type=str, help="Jobs a ejecutar, separados por coma")
+    parser.add_argument("--una-vez", action="store_true", help="Dispara cada job una vez y termina")
+    args = parser.parse_args()
+
+    solo = [s.strip() for s in args.solo.split(",")] if args.solo else None
+    scheduler = Scheduler(
+        cargar_jobs(args.config, solo),
+        max_paralelo=args.max_paralelo,
+        limite_por_host=args.limite_host,
+        una_vez=args.una_vez,
+    )
+    if args.metricas_puerto:
+        scheduler.servir_metricas(args.metricas_puerto)
+    scheduler.ejecutar()
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+
+# ========================
+# SPOOL DE EXPORTS (extracción -> carga desacoplada)
+# ========================
+# Los extractores dejan el libro exportado y un manifiesto JSON en spool/pendiente.
+# El manifiesto se escribe al final (tmp + replace), así su presencia indica que el
+# archivo está completo. Un loader lo toma renombrándolo a spool/procesando (rename
+# atómico: si otro loader lo tomó antes, el rename falla y se sigue con el próximo).
+
+SPOOL_DIR = Path(os.getenv("HIK_SPOOL_DIR") or Path(__file__).resolve().parent / "spool")
+PENDIENTE = "pendiente"
+PROCESANDO = "procesando"
+HECHO = "hecho"
+ERROR = "error"
+
+
+def _carpeta(estado: str) -> Path:
+    carpeta = SPOOL_DIR / estado
+    carpeta.mkdir(parents=True, exist_ok=True)
+    return carpeta
+
+
+def _escribir_json(destino: Path, data: dict):
+    tmp = destino.with_suffix(destino.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False, default=str)
+    tmp.replace(destino)
+
+
+def sha256_archivo(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
+
+
+def encolar_export(
+    origen: Path | bytes,
+    host: str,
+    opcion: str,
+    archivo_nombre: str | None = None,
+    desde: datetime | None = None,
+    hasta: datetime | None = None,
+) -> Path:
+    """
+    Deja el export en el spool y devuelve la ruta del manifiesto.
+    `origen` puede ser la ruta descargada (se copia) o el libro en memoria.
+    """
+    pendiente = _carpeta(PENDIENTE)
+    id_spool = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+    if isinstance(origen, (bytes, bytearray)):
+        nombre = archivo_nombre or f"{opcion.replace(' ', '_')}_{id_spool}.xlsx"
+        sufijo = Path(nombre).suffix or ".xlsx"
+        destino = pendiente / f"{id_spool}{sufijo}"
+        tmp = destino.with_suffix(destino.suffix + ".tmp")
+        tmp.write_bytes(origen)
+        tmp.replace(destino)
+    else:
+        origen = Path(origen)
+        nombre = archivo_nombre or origen.name
+        destino = pendiente / f"{id_spool}{origen.suffix or '.xlsx'}"
+        shutil.copy2(origen, destino)
+
+    manifiesto = {
+        "id": id_spool,
+        "host": host,
+        "opcion": opcion,
+        "desde": desde.isoformat() if desde else None,
+        "hasta": hasta.isoformat() if hasta else None,
+        "archivo": destino.name,
+        "archivo_nombre": nombre,
+        "sha256": sha256_archivo(destino),
+        "bytes": destino.stat().st_size,
+        "creado": datetime.now().isoformat(timespec="seconds"),
+    }
+    ruta_manifiesto = pendiente / f"{id_spool}.json"
+    _escribir_json(ruta_manifiesto, manifiesto)
+    print(f"[SPOOL] Export encolado: {opcion} | {host} | {nombre} -> {ruta_manifiesto.name}")
+    return ruta_manifiesto
+
+
+def listar_pendientes() -> list[Path]:
+    return sorted(_carpeta(PENDIENTE).glob("*.json"))
+
+
+def tomar_manifiesto(ruta: Path) -> tuple[Path, dict] | None:
+    """Mueve manifiesto y archivo a 'procesando'. Devuelve None si otro loader lo tomó antes."""
+    procesando = _carpeta(PROCESANDO)
+    destino = procesando / ruta.name
+    try:
+        os.replace(ruta, destino)
+    except FileNotFoundError:
+        return None
+    os.utime(destino)  # la antigüedad en 'procesando' cuenta desde que se tomó
+
+    with open(destino, encoding="utf-8") as f:
+        manifiesto = json.load(f)
+    archivo = ruta.parent / manifiesto["archivo"]
+    if archivo.exists():
+        os.replace(archivo, procesando / manifiesto["archivo"])
+    return destino, manifiesto
+
+
+def cerrar_manifiesto(ruta: Path, manifiesto: dict, resultado: dict | None, error: str | None) -> Path:
+    """Pasa manifiesto y archivo a 'hecho' o 'error' con el resultado de la carga."""
+    carpeta = _carpeta(HECHO if error is None else ERROR)
+    manifiesto = {
+        **manifiesto,
+        "resultado": resultado,
+        "error": error,
+        "procesado": datetime.now().isoformat(timespec="seconds"),
+    }
+    archivo = ruta.parent / manifiesto["archivo"]
+    if archivo.exists():
+        os.replace(archivo, carpeta / manifiesto["archivo"])
+    destino = carpeta / ruta.name
+    _escribir_json(destino, manifiesto)
+    ruta.unlink(missing_ok=True)
+    return destino
+
+
+def recuperar_procesando(antiguedad_seg: float = 0, excluir: set[str] | None = None) -> int:
+    """
+    Devuelve a 'pendiente' lo que quedó en 'procesando' (loader caído a mitad de carga).
+    `excluir`: nombres de manifiesto que el loader que llama está cargando.
+    """
+    procesando = _carpeta(PROCESANDO)
+    pendiente = _carpeta(PENDIENTE)
+    ahora = datetime.now().timestamp()
+    recuperados = 0
+    for ruta in procesando.glob("*.json"):
+        if excluir and ruta.name in excluir:
+            continue
+        try:
+            if ahora - ruta.stat().st_mtime < antiguedad_seg:
+                continue
+            with open(ruta, encoding="utf-8") as f:
+                manifiesto = json.load(f)
+            archivo = procesando / manifiesto["archivo"]
+            if archivo.exists():
+                os.replace(archivo, pendiente / manifiesto["archivo"])
+            os.replace(ruta, pendiente / ruta.name)
+        except FileNotFoundError:
+            continue  # otro loader lo cerró o lo recuperó mientras tanto
+        recuperados += 1
+    if recuperados:
+        print(f"[SPOOL] {recuperados} manifiestos devueltos de 'procesando' a 'pendiente'.")
+    return recuperados
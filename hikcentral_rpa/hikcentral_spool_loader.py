@@ -0,0 +1,135 @@
+"""
+Loader del spool: toma los exports encolados por los extractores (--spool) y los
+carga en Postgres en paralelo, independiente de las sesiones de navegador.
+
+Cada manifiesto se procesa en un proceso del pool (pandas + psycopg2 no comparten
+GIL entre procesos). Antes de cargar se verifica el sha256 del manifiesto.
+
+Uso:
+    python hikcentral_spool_loader.py --workers 4            # queda escuchando el spool
+    python hikcentral_spool_loader.py --workers 4 --una-vez  # vacía lo pendiente y termina
+"""
+import argparse
+import os
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+
+from hikcentral_spool import (
+    cerrar_manifiesto,
+    listar_pendientes,
+    recuperar_procesando,
+    sha256_archivo,
+    tomar_manifiesto,
+)
+
+
+def cargar_export(archivo: str, manifiesto: dict) -> dict:
+    """Corre en el proceso del pool: envía el archivo al cargador de su opción."""
+    opcion = manifiesto["opcion"]
+    path = Path(archivo)
+    if sha256_archivo(path) != manifiesto["sha256"]:
+        raise ValueError(f"sha256 no coincide para {path.name}")
+
+    inicio = time.perf_counter()
+    if opcion.lower().startswith("event and alarm"):
+        import hikcentral_open_eventalarms as eventalarms
+
+        resultado = eventalarms.insertar_alarm_evento_from_excel(
+            path, archivo_nombre=manifiesto.get("archivo_nombre")
+        )
+    else:
+        import hikcentral_export_resourcestatus as resourcestatus
+
+        procesador = resourcestatus.PROCESADORES_RESOURCE_STATUS.get(opcion.lower())
+        if procesador is None:
+            raise ValueError(f"Opción sin cargador: {opcion}")
+        procesador[1](str(path))
+        resultado = {}
+
+    resultado["duracion_seg"] = round(time.perf_counter() - inicio, 2)
+    return resultado
+
+
+def ejecutar_loader(
+    workers: int = 2,
+    una_vez: bool = False,
+    intervalo: float = 2.0,
+    recuperar_seg: float = 900,
+) -> dict:
+    en_curso: dict[Future, tuple[Path, dict]] = {}
+    totales = {"ok": 0, "error": 0}
+    # Revisión de 'procesando' varias veces dentro de recuperar_seg (las marcas propias no llegan a vencer)
+    cada_recuperacion = max(intervalo, min(60.0, recuperar_seg / 3))
+    proxima_recuperacion = 0.0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            if time.monotonic() >= proxima_recuperacion:
+                # Las cargas propias se tocan para que otro loader no las tome por abandonadas;
+                # lo que lleva más de `recuperar_seg` sin tocar en 'procesando' es de un loader caído
+                for ruta_proc, _ in en_curso.values():
+                    try:
+                        os.utime(ruta_proc)
+                    except FileNotFoundError:
+                        pass
+                recuperar_procesando(recuperar_seg, excluir={r.name for r, _ in en_curso.values()})
+                proxima_recuperacion = time.monotonic() + cada_recuperacion
+
+            # Tomar solo lo que el pool puede empezar ya; el resto queda disponible para otros loaders
+            for ruta in listar_pendientes():
+                if len(en_curso) >= workers:
+                    break
+                tomado = tomar_manifiesto(ruta)
+                if tomado is None:
+                    continue
+                ruta_proc, manifiesto = tomado
+                archivo = ruta_proc.parent / manifiesto["archivo"]
+                print(
+                    f"[LOADER] Cargando {manifiesto['opcion']} | {manifiesto['host']} | "
+                    f"{manifiesto['archivo_nombre']}"
+                )
+                en_curso[pool.submit(cargar_export, str(archivo), manifiesto)] = (ruta_proc, manifiesto)
+
+            terminados = [f for f in en_curso if f.done()]
+            for futuro in terminados:
+                ruta_proc, manifiesto = en_curso.pop(futuro)
+                try:
+                    resultado = futuro.result()
+                    cerrar_manifiesto(ruta_proc, manifiesto, resultado, None)
+                    totales["ok"] += 1
+                    print(f"[LOADER] OK {manifiesto['archivo_nombre']} | {resultado}")
+                except Exception as exc:
+                    traceback.print_exception(exc)
+                    cerrar_manifiesto(ruta_proc, manifiesto, None, f"{exc.__class__.__name__}: {exc}")
+                    totales["error"] += 1
+                    print(f"[ERROR] Falló carga de {manifiesto['archivo_nombre']}: {exc}")
+
+            if una_vez and not en_curso and not listar_pendientes():
+                break
+            time.sleep(0.2 if en_curso else intervalo)
+
+    print(f"[LOADER] Fin | cargados: {totales['ok']} | con error: {totales['error']}")
+    return totales
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga en Postgres los exports encolados en el spool.")
+    parser.add_argument("--workers", type=int, default=2, help="Procesos de carga en paralelo")
+    parser.add_argument("--una-vez", action="store_true", help="Vacía lo pendiente y termina")
+    parser.add_argument("--intervalo", type=float, default=2.0, help="Segundos entre revisiones del spool")
+    parser.add_argument(
+        "--recuperar-seg",
+        type=float,
+        default=900,
+        help="Reencola lo que lleva más de N segundos en 'procesando' (0: todo, si es el único loader)",
+    )
+    args = parser.parse_args()
+
+    try:
+        totales = ejecutar_loader(args.workers, args.una_vez, args.intervalo, args.recuperar_seg)
+    except KeyboardInterrupt:
+        print("[LOADER] Detenido por el usuario.")
+        raise SystemExit(0)
+    raise SystemExit(1 if totales["error"] else 0)
@@ -0,0 +1,195 @@
+import contextvars
+import os
+import re
+import time
+from dataclasses import dataclass
+
+
+# ========================
+# TIMEOUTS ADAPTATIVOS POR HOST
+# ========================
+# Las esperas (WebDriverWait, cuadro Export, descargas) tenían constantes pensadas para el
+# peor caso: en un host sano una falla tardaba 30-180 s en notarse, y en uno cargado a veces
+# no alcanzaban. Ahora cada categoría de espera usa el p95 de sus pasos en las últimas
+# ejecuciones de ese host (LOG_RPA_EJECUCION_PASO) por un margen, acotado por piso y techo.
+# Sin historia suficiente (o fuera de una ejecución) se usa la constante de siempre.
+#   HIK_TIMEOUTS_ADAPTATIVOS=0   vuelve a las constantes
+#   HIK_TIMEOUT_MARGEN           múltiplo del p95 (default 2.0)
+#   HIK_TIMEOUT_VENTANA          ejecuciones previas del host consideradas (default 20)
+#   HIK_TIMEOUT_MIN_MUESTRAS     pasos mínimos de la categoría para confiar en el p95 (default 5)
+#
+# Además, con un plazo global (Plazo) ninguna espera pasa de lo que le queda a la ejecución
+# ni de la parte del plazo asignada a su categoría; vencido el plazo, la siguiente espera
+# lanza PlazoAgotado y la ejecución termina con estado "deadline".
+#   HIK_PLAZO_SEG                plazo de la ejecución en segundos (default 0 = sin plazo)
+#   HIK_PLAZO_RESERVA_SEG        segundos que se guardan para cerrar sesión y registrar (default 20)
+
+TIMEOUTS_ADAPTATIVOS = os.getenv("HIK_TIMEOUTS_ADAPTATIVOS", "1").strip().lower() not in ("0", "false", "no")
+MARGEN = float(os.getenv("HIK_TIMEOUT_MARGEN", "2.0"))
+VENTANA = int(os.getenv("HIK_TIMEOUT_VENTANA", "20"))
+MIN_MUESTRAS = int(os.getenv("HIK_TIMEOUT_MIN_MUESTRAS", "5"))
+PLAZO_SEG = float(os.getenv("HIK_PLAZO_SEG", "0"))
+PLAZO_RESERVA_SEG = float(os.getenv("HIK_PLAZO_RESERVA_SEG", "20"))
+
+
+@dataclass(frozen=True)
+class CategoriaEspera:
+    piso: float
+    techo: float
+    # Regex sobre DESCRIPCION de los pasos cuyo tiempo respalda la categoría
+    patron: str
+
+
+# El orden importa: cada paso cuenta para la primera categoría cuyo patrón coincide
+CATEGORIAS = {
+    # Archivo del export en disco o en memoria
+    "descarga": CategoriaEspera(20, 600, r"Descarga|descargado"),
+    # Cuadro Export (contenedor, passwords, Save)
+    "export": CategoriaEspera(4, 30, r"EXPORT_EVENT_AND_ALARM|EXPORT_PASSWORDS|Panel exportación|Export lanzado"),
+    # Menús, pantallas de búsqueda y tablas
+    "menu": CategoriaEspera(8, 90, r"SIDEBAR|SEARCH|ALARM_ABIERTO|RANGO|TRIGGER|Maintenance|Resource Status|Tabla"),
+    # Login, portal y carga general de la SPA
+    "ui": CategoriaEspera(5, 60, r"ABRIR_URL|LOGIN|PORTAL|Navegando|Login|Portal"),
+}
+
+# Parte del plazo que puede consumir una sola espera de cada categoría
+PRESUPUESTO_PLAZO = {"ui": 0.15, "menu": 0.25, "export": 0.15, "descarga": 0.5}
+
+_timeouts_actuales: contextvars.ContextVar["TimeoutsAdaptativos | None"] = contextvars.ContextVar(
+    "hik_timeouts_actuales", default=None
+)
+_plazo_actual: contextvars.ContextVar["Plazo | None"] = contextvars.ContextVar("hik_plazo_actual", default=None)
+
+
+def _percentil(valores: list[float], q: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+class TimeoutsAdaptativos:
+    def __init__(
+        self,
+        p95: dict[str, float] | None = None,
+        muestras: dict[str, int] | None = None,
+        margen: float = MARGEN,
+    ):
+        self.p95 = p95 or {}
+        self.muestras = muestras or {}
+        self.margen = margen
+
+    def para(self, categoria: str, default: float) -> float:
+        cat = CATEGORIAS.get(categoria)
+        p95 = self.p95.get(categoria)
+        if cat is None or p95 is None:
+            return default
+        return round(min(max(p95 * self.margen, cat.piso), cat.techo), 1)
+
+    def resumen(self) -> dict:
+        return {
+            categoria: {
+                "p95_seg": round(self.p95[categoria], 2),
+                "muestras": self.muestras[categoria],
+                "timeout_seg": self.para(categoria, 0),
+            }
+            for categoria in self.p95
+        }
+
+
+def cargar_timeouts(conn, script: str, opcion: str, host: str, ventana: int = VENTANA) -> TimeoutsAdaptativos:
+    """
+    p95 por categoría de los pasos de las últimas `ventana` ejecuciones de (`script`, `opcion`)
+    contra `host`: cada opción tiene sus propios pasos y tiempos (como linea_base_pasos).
+    """
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH PREVIAS AS (
+                SELECT ID_EJECUCION
+                FROM PUBLIC.LOG_RPA_EJECUCION
+                WHERE SCRIPT = %s AND OPCION = %s AND DETALLE->>'host' = %s
+                ORDER BY ID_EJECUCION DESC
+                LIMIT %s
+            )
+            SELECT P.DESCRIPCION, P.TIEMPO_PASO_SEG
+            FROM PUBLIC.LOG_RPA_EJECUCION_PASO P
+            JOIN PREVIAS USING (ID_EJECUCION)
+            WHERE P.NUM_PASO > 0;
+            """,
+            (script, opcion, host, ventana),
+        )
+        filas = cur.fetchall()
+
+    por_categoria: dict[str, list[float]] = {}
+    for descripcion, seg in filas:
+        for categoria, cat in CATEGORIAS.items():
+            if re.search(cat.patron, descripcion or ""):
+                por_categoria.setdefault(categoria, []).append(float(seg or 0))
+                break
+
+    p95 = {}
+    muestras = {}
+    for categoria, valores in por_categoria.items():
+        if len(valores) >= MIN_MUESTRAS:
+            p95[categoria] = _percentil(valores, 0.95)
+            muestras[categoria] = len(valores)
+    return TimeoutsAdaptativos(p95, muestras)
+
+
+class PlazoAgotado(TimeoutError):
+    pass
+
+
+class Plazo:
+    """Plazo global de una ejecución (puede compartirse entre los hosts de un mismo proceso)."""
+
+    def __init__(self, total_seg: float, reserva_seg: float = PLAZO_RESERVA_SEG):
+        self.total_seg = total_seg
+        # La reserva nunca se come más de la mitad del plazo
+        self.reserva_seg = min(reserva_seg, total_seg / 2)
+        self.fin = time.monotonic() + total_seg
+
+    def restante(self) -> float:
+        return self.fin - self.reserva_seg - time.monotonic()
+
+    def vencido(self) -> bool:
+        return self.restante() <= 0
+
+    def verificar(self, contexto: str = ""):
+        if self.vencido():
+            detalle = f" ({contexto})" if contexto else ""
+            raise PlazoAgotado(f"Plazo de {self.total_seg:.0f}s agotado{detalle}")
+
+    def acotar(self, categoria: str, timeout: float) -> float:
+        """Recorta `timeout` a lo que queda del plazo y al presupuesto de la categoría."""
+        self.verificar(f"espera {categoria}")
+        tope = self.total_seg * PRESUPUESTO_PLAZO.get(categoria, 1.0)
+        return round(max(min(timeout, tope, self.restante()), 1), 1)
+
+
+def plazo_solicitado(plazo_seg: float | None = None) -> Plazo | None:
+    segundos = PLAZO_SEG if plazo_seg is None else plazo_seg
+    return Plazo(segundos) if segundos and segundos > 0 else None
+
+
+def activar_timeouts(timeouts: TimeoutsAdaptativos | None, plazo: Plazo | None = None) -> tuple:
+    return _timeouts_actuales.set(timeouts), _plazo_actual.set(plazo)
+
+
+def desactivar_timeouts(token: tuple):
+    token_timeouts, token_plazo = token
+    _plazo_actual.reset(token_plazo)
+    _timeouts_actuales.reset(token_timeouts)
+
+
+def espera(categoria: str, default: float) -> float:
+    """
+    Timeout de una espera de `categoria` para el host de la ejecución activa en el hilo.
+    `default` es la constante histórica: se usa si no hay historia para ese host.
+    Con plazo activo se recorta a lo que queda (y lanza PlazoAgotado si ya no queda nada).
+    """
+    timeouts = _timeouts_actuales.get()
+    timeout = default if timeouts is None else timeouts.para(categoria, default)
+    plazo = _plazo_actual.get()
+    if plazo is None:
+        return timeout
+    return plazo.acotar(categoria, timeout)
@@ -0,0 +1,194 @@
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+
+# ========================
+# TRAZAS EN FORMATO CHROME TRACE-EVENT
+# ========================
+# Cada ejecución deja un JSON que se abre en chrome://tracing o https://ui.perfetto.dev.
+# Los spans son eventos "X" (inicio + duración) por hilo; el visor los anida por tiempo:
+#   run -> host -> paso del StepTimer -> comando WebDriver / sentencia DB / espera de archivo
+#   HIK_TRACE=0       desactiva las trazas
+#   HIK_TRACE_DIR     carpeta de salida (default: hikcentral_rpa/logs/trazas)
+
+TRACE_HABILITADO = os.getenv("HIK_TRACE", "1").strip().lower() not in ("0", "false", "no")
+TRACE_DIR = Path(os.getenv("HIK_TRACE_DIR") or Path(__file__).resolve().parent / "logs" / "trazas")
+
+_trazador_actual: contextvars.ContextVar["Trazador | None"] = contextvars.ContextVar(
+    "hik_trazador_actual", default=None
+)
+
+
+class Trazador:
+    def __init__(self, nombre: str, habilitado: bool | None = None):
+        self.nombre = nombre
+        self.habilitado = TRACE_HABILITADO if habilitado is None else habilitado
+        self.pid = os.getpid()
+        self.eventos: list[dict] = [
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": nombre}}
+        ]
+        self._hilos: set[int] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def ahora_us() -> float:
+        return time.perf_counter_ns() / 1000
+
+    def completo(
+        self,
+        nombre: str,
+        cat: str,
+        inicio_us: float,
+        fin_us: float | None = None,
+        args: dict | None = None,
+    ):
+        """Agrega un span ya cerrado (evento 'X') en el hilo actual."""
+        if not self.habilitado:
+            return
+        fin_us = self.ahora_us() if fin_us is None else fin_us
+        tid = threading.get_native_id()
+        evento = {
+            "name": nombre,
+            "cat": cat,
+            "ph": "X",
+            "ts": round(inicio_us, 1),
+            "dur": round(max(fin_us - inicio_us, 0), 1),
+            "pid": self.pid,
+            "tid": tid,
+        }
+        if args:
+            evento["args"] = args
+        with self._lock:
+            if tid not in self._hilos:
+                self._hilos.add(tid)
+                self.eventos.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": self.pid,
+                        "tid": tid,
+                        "args": {"name": threading.current_thread().name},
+                    }
+                )
+            self.eventos.append(evento)
+
+    def contador(self, nombre: str, valores: dict):
+        """Evento 'C': el visor lo dibuja como serie en el tiempo (heap JS, nodos DOM, ...)."""
+        if not self.habilitado:
+            return
+        evento = {
+            "name": nombre,
+            "ph": "C",
+            "ts": round(self.ahora_us(), 1),
+            "pid": self.pid,
+            "args": valores,
+        }
+        with self._lock:
+            self.eventos.append(evento)
+
+    @contextmanager
+    def span(self, nombre: str, cat: str = "rpa", **args):
+        inicio = self.ahora_us()
+        try:
+            yield
+        except BaseException as exc:
+            args["error"] = f"{exc.__class__.__name__}: {exc}"
+            raise
+        finally:
+            self.completo(nombre, cat, inicio, args=args)
+
+    def guardar(self, destino: Path | None = None) -> Path | None:
+        if not self.habilitado:
+            return None
+        if destino is None:
+            nombre = "".join(c if c.isalnum() or c in "-_." else "_" for c in self.nombre)
+            destino = TRACE_DIR / f"{nombre}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        try:
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock:
+                data = {"traceEvents": list(self.eventos), "displayTimeUnit": "ms"}
+            with open(destino, "w", encoding="utf-8") as f:
+                json.dump(data, f, default=str)
+        except OSError as exc:
+            print(f"[WARN] No se pudo guardar la traza en {destino}: {exc}")
+            return None
+        print(f"[TRACE] Traza guardada en: {destino} ({len(data['traceEvents'])} eventos)")
+        return destino
+
+
+def trazador_actual() -> Trazador | None:
+    return _trazador_actual.get()
+
+
+def activar(trazador: Trazador | None) -> contextvars.Token:
+    return _trazador_actual.set(trazador)
+
+
+def desactivar(token: contextvars.Token):
+    _trazador_actual.reset(token)
+
+
+def span(nombre: str, cat: str = "rpa", **args):
+    """Span en el trazador activo del hilo; sin trazador no hace nada."""
+    trazador = _trazador_actual.get()
+    if trazador is None or not trazador.habilitado:
+        return nullcontext()
+    return trazador.span(nombre, cat, **args)
+
+
+def trazado(cat: str, nombre: str | None = None):
+    """Decorador: cada llamada a la función queda como span `cat` en el trazador activo."""
+
+    def decorador(fn):
+        etiqueta = nombre or fn.__name__
+
+        @functools.wraps(fn)
+        def envoltura(*args, **kwargs):
+            with span(etiqueta, cat):
+                return fn(*args, **kwargs)
+
+        return envoltura
+
+    return decorador
+
+
+def en_contexto(fn):
+    """
+    Envuelve `fn` para un pool de hilos: cada llamada corre con una copia del contexto
+    actual, así el hilo del pool ve el mismo trazador que quien la envió.
+    """
+    base = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def envoltura(*args, **kwargs):
+        return base.copy().run(fn, *args, **kwargs)
+
+    return envoltura
+
+
+def instrumentar_driver(driver):
+    """
+    Cada comando WebDriver (findElement, executeScript, ...) queda como span 'webdriver'
+    en el trazador activo del hilo que lo ejecuta. WebElement también pasa por driver.execute.
+    """
+    original = driver.execute
+
+    def execute(driver_command, params=None):
+        trazador = _trazador_actual.get()
+        if trazador is None or not trazador.habilitado:
+            return original(driver_command, params)
+        inicio = trazador.ahora_us()
+        try:
+            return original(driver_command, params)
+        finally:
+            trazador.completo(driver_command, "webdriver", inicio)
+
+    driver.execute = execute
+    return driver
@@ -0,0 +1,745 @@
+"""
+Servidor local que imita la UI web de HikCentral (Element-UI) para medir los flujos Selenium
+sin el servidor de producción.
+
+Reproduce el DOM que buscan los scripts: login (User Name / Password / Log In), la barra
+superior con navigation_addMenuBtn / navigation_menuPop y el avatar con Log Out,
+Maintenance -> Resource Status (subMenuTitle1, pestañas Camera / Encoding Device /
+IP Speaker / Alarm Input, tabla, botón Export y drawer Export -> descarga del .xlsx) y
+Event and Alarm -> Search -> Event and Alarm Search (Trigger Alarm, Custom Time Interval,
+Search, Export con Confirm Password + Save, que deja el Alarm_Report en el Downloadcenter
+como HCWebControlService).
+
+Los libros salen de los generadores de bench_carga_resource_status / bench_carga_alarmas
+(se cachean en bench_libros). Cada llamada de la página a /api/* espera --latencia; el
+export espera además --latencia-export antes de entregar el archivo.
+
+Uso:
+    python hikcentral_ui_stub.py --puerto 8088 --latencia 0.3 --latencia-export 2
+    python hikcentral_export_resourcestatus.py --url http://127.0.0.1:8088/#/ --option Camera
+    HIK_DOWNLOADCENTER=<carpeta del stub> python hikcentral_open_eventalarms.py --host 127.0.0.1:8088
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import bench_carga_alarmas
+import bench_carga_resource_status
+
+# Filas que muestra la tabla de cada vista (la página real pagina de a 20)
+FILAS_POR_PAGINA = 20
+MIME_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+PAGINA_HTML = r"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>HikCentral Professional</title>
+<style>
+  body { margin: 0; font-family: Arial, sans-serif; font-size: 13px; }
+  .top-bar { display: flex; align-items: center; height: 48px; padding: 0 16px; background: #1f2d3d; color: #fff; }
+  #navigation_addMenuBtn { cursor: pointer; width: 32px; font-size: 20px; }
+  .top-title { flex: 1; margin-left: 12px; }
+  .top-right-area { position: relative; }
+  .top-right-area__avatar { cursor: pointer; padding: 4px 12px; border-radius: 12px; background: #3a4a5d; }
+  .user-menu { position: absolute; right: 0; top: 32px; z-index: 20; margin: 0; padding: 4px 0; list-style: none; background: #fff; color: #333; box-shadow: 0 2px 8px #0003; }
+  .user-menu li { padding: 6px 24px; cursor: pointer; white-space: nowrap; }
+  #navigation_menuPop { position: absolute; left: 16px; top: 52px; z-index: 20; padding: 12px; background: #fff; box-shadow: 0 2px 12px #0004; }
+  .nav-box { display: inline-block; width: 120px; margin: 6px; padding: 18px 6px; text-align: center; border: 1px solid #ddd; cursor: pointer; }
+  .main-content { position: relative; min-height: calc(100vh - 48px); }
+  .layout { display: flex; }
+  .side-menu { width: 220px; min-height: calc(100vh - 48px); background: #f4f5f7; }
+  .el-menu { margin: 0; padding: 0; list-style: none; }
+  .el-submenu__title, .el-menu-item { padding: 10px 16px; cursor: pointer; }
+  .el-menu--inline .el-menu-item { padding-left: 40px; }
+  .panel { flex: 1; padding: 16px; position: relative; }
+  .page-title { font-size: 18px; margin: 0 0 12px; }
+  .card { display: inline-block; width: 320px; margin: 16px; padding: 16px; border: 1px solid #ddd; }
+  .el-tabs__nav { display: flex; border-bottom: 1px solid #ddd; margin-bottom: 12px; }
+  .el-tabs__item { padding: 8px 16px; cursor: pointer; }
+  .el-tabs__item.is-active { color: #e72528; border-bottom: 2px solid #e72528; }
+  .el-button { margin: 4px; padding: 6px 14px; cursor: pointer; border: 1px solid #ccc; background: #fff; }
+  .el-button--primary { background: #e72528; color: #fff; border-color: #e72528; }
+  .el-button-slot-wrapper { display: inline-block; }
+  table { border-collapse: collapse; width: 100%; }
+  td, th { border-bottom: 1px solid #eee; padding: 6px; text-align: left; white-space: nowrap; }
+  .el-table__empty-block { padding: 24px; text-align: center; color: #999; }
+  .el-loading-mask { position: absolute; inset: 0; z-index: 10; background: #fffc; }
+  .el-loading-spinner { margin: 80px auto; width: 32px; height: 32px; border: 3px solid #e72528; border-radius: 50%; }
+  .el-drawer__wrapper { position: fixed; inset: 0; z-index: 30; background: #0004; }
+  .el-drawer { position: absolute; right: 0; top: 0; bottom: 0; width: 420px; padding: 16px; background: #fff; }
+  .drawer-header { font-size: 16px; margin-bottom: 16px; }
+  .el-form-item { margin-bottom: 12px; }
+  .el-form-item__label { display: block; margin-bottom: 4px; color: #666; }
+  .el-form-item__error { color: #e72528; }
+  .el-radio { margin-right: 16px; cursor: pointer; }
+  .el-radio.is-checked { color: #e72528; }
+  .el-input__inner, .el-range-input { padding: 6px; border: 1px solid #ccc; }
+  .button-group .button { display: inline-block; padding: 6px 12px; border: 1px solid #ccc; cursor: pointer; }
+  .button-group .button.select { border-color: #e72528; color: #e72528; }
+  .el-select { position: relative; display: inline-block; }
+  .el-select-dropdown { position: absolute; z-index: 25; background: #fff; box-shadow: 0 2px 8px #0003; }
+  .el-select-dropdown__list { margin: 0; padding: 4px 0; list-style: none; }
+  .el-select-dropdown__item { padding: 6px 16px; cursor: pointer; white-space: nowrap; }
+  .el-date-range-picker { position: absolute; z-index: 26; padding: 12px; background: #fff; box-shadow: 0 2px 8px #0003; }
+  .login-form { width: 320px; margin: 120px auto; }
+  .login-form .el-input__inner { width: 100%; margin-bottom: 12px; box-sizing: border-box; }
+</style>
+</head>
+<body>
+<div id="app"></div>
+<script>
+const CONFIG = __CONFIG__;
+const app = document.getElementById('app');
+
+function esc(valor) {
+  return String(valor == null ? '' : valor).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c]));
+}
+
+async function api(ruta, cuerpo) {
+  const opciones = cuerpo === undefined ? {} : {
+    method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify(cuerpo)
+  };
+  const respuesta = await fetch(ruta, opciones);
+  const datos = await respuesta.json();
+  if (!respuesta.ok) throw new Error(datos.msg || respuesta.status);
+  return datos;
+}
+
+function mascara(contenedor) {
+  const mask = document.createElement('div');
+  mask.className = 'el-loading-mask';
+  mask.innerHTML = '<div class="el-loading-spinner"></div>';
+  contenedor.appendChild(mask);
+  return () => mask.remove();
+}
+
+function ir(ruta) {
+  location.hash = '#' + ruta;
+}
+
+// ---------- Login ----------
+function vistaLogin() {
+  app.innerHTML = `
+    <div class="login-wrapper"><form class="login-form" onsubmit="return false">
+      <div class="el-input"><input class="el-input__inner" type="text" placeholder="User Name" autocomplete="off"></div>
+      <div class="el-input"><input class="el-input__inner" type="password" placeholder="Password" autocomplete="off"></div>
+      <div class="el-form-item__error" id="login-error"></div>
+      <button type="button" class="el-button el-button--primary" id="login-btn"><span>Log In</span></button>
+    </form></div>`;
+  document.getElementById('login-btn').onclick = async () => {
+    const [usuario, password] = Array.from(app.querySelectorAll('input')).map(i => i.value);
+    const quitar = mascara(app);
+    try {
+      await api('/api/login', {usuario, password});
+      sessionStorage.setItem('hik_sesion', usuario);
+      ir('/portal');
+    } catch (e) {
+      quitar();
+      document.getElementById('login-error').textContent = e.message;
+    }
+  };
+}
+
+// ---------- Estructura común (barra superior + menú de módulos) ----------
+function estructura() {
+  app.innerHTML = `
+    <div class="top-bar">
+      <div id="navigation_addMenuBtn" title="All Modules">&#9776;</div>
+      <span class="top-title">HikCentral Professional</span>
+      <div class="top-right-area">
+        <div class="top-right-area__avatar">${esc(sessionStorage.getItem('hik_sesion'))}</div>
+        <ul class="user-menu" style="display: none"><li class="user-menu__item"><span>Log Out</span></li></ul>
+      </div>
+    </div>
+    <div id="navigation_menuPop" style="display: none">
+      <div class="nav-pop-quick-entry-list">
+        <div id="nav_box_s_menu_resourcemaintain_operations" class="nav-box" data-ruta="/portal/maintenance"><span title="Maintenance">Maintenance</span></div>
+        <div id="nav_box_s_menu_alarm_event" class="nav-box" data-ruta="/portal/alarm"><span title="Event and Alarm">Event and Alarm</span></div>
+      </div>
+    </div>
+    <div class="main-content" id="contenido"></div>`;
+  const pop = document.getElementById('navigation_menuPop');
+  document.getElementById('navigation_addMenuBtn').onclick = () => {
+    pop.style.display = pop.style.display === 'none' ? '' : 'none';
+  };
+  pop.querySelectorAll('.nav-box').forEach(caja => {
+    caja.onclick = () => { pop.style.display = 'none'; ir(caja.dataset.ruta); };
+  });
+  const menuUsuario = app.querySelector('.user-menu');
+  app.querySelector('.top-right-area__avatar').onclick = () => {
+    menuUsuario.style.display = menuUsuario.style.display === 'none' ? '' : 'none';
+  };
+  menuUsuario.querySelector('li').onclick = async () => {
+    await api('/api/logout', {});
+    sessionStorage.removeItem('hik_sesion');
+    ir('/');
+  };
+  return document.getElementById('contenido');
+}
+
+function tabla(columnas, filas) {
+  const cuerpo = filas.length
+    ? filas.map(f => '<tr>' + f.map(v => `<td><div class="cell">${esc(v)}</div></td>`).join('') + '</tr>').join('')
+    : '';
+  return `
+    <div class="el-table">
+      <div class="el-table__header-wrapper"><table><thead><tr>${columnas.map(c => `<th>${esc(c)}</th>`).join('')}</tr></thead></table></div>
+      <div class="el-table__body-wrapper"><table><tbody>${cuerpo}</tbody></table></div>
+      ${filas.length ? '' : '<div class="el-table__empty-block">No data.</div>'}
+    </div>`;
+}
+
+function descargar(url) {
+  const enlace = document.createElement('a');
+  enlace.href = url;
+  enlace.download = '';
+  document.body.appendChild(enlace);
+  enlace.click();
+  enlace.remove();
+}
+
+// ---------- Portal ----------
+async function vistaPortal(contenido) {
+  const quitar = mascara(contenido);
+  const datos = await api('/api/vista?nombre=portal');
+  quitar();
+  contenido.innerHTML = `
+    <div class="card device-statistics">
+      <div class="card-title">Device Statistics</div>
+      <p>Online: ${datos.online} | Offline: ${datos.offline}</p>
+      ${CONFIG.go_maintenance ? '<button type="button" class="el-button el-button--text"><div class="el-button-slot-wrapper">Go to Maintenance</div></button>' : ''}
+    </div>`;
+  const boton = contenido.querySelector('button');
+  if (boton) boton.onclick = () => ir('/portal/maintenance');
+}
+
+// ---------- Maintenance -> Resource Status ----------
+async function vistaMaintenance(contenido) {
+  const quitar = mascara(contenido);
+  await api('/api/vista?nombre=maintenance');
+  quitar();
+  contenido.innerHTML = `
+    <div class="layout">
+      <div class="side-menu"><ul class="el-menu">
+        <li class="el-submenu"><div class="el-submenu__title" id="subMenuTitle1">
+          <i class="icon-svg-nav_realtime_status_resources"></i>
+          <span title="Resource Status" class="first-level-weight">Resource Status</span>
+        </div></li>
+        <li class="el-submenu"><div class="el-submenu__title"><span title="Health Overview" class="first-level-weight">Health Overview</span></div></li>
+      </ul></div>
+      <div class="panel" id="panel-recursos"></div>
+    </div>`;
+  document.getElementById('subMenuTitle1').onclick = () => resourceStatus(CONFIG.hojas[0]);
+}
+
+async function resourceStatus(hoja) {
+  const panel = document.getElementById('panel-recursos');
+  if (!panel.querySelector('.access-statics')) {
+    panel.innerHTML = `
+      <div class="access-statics">
+        <div class="el-tabs"><div class="el-tabs__header"><div class="el-tabs__nav">
+          ${CONFIG.hojas.map(h => `<div class="el-tabs__item" role="tab">${esc(h)}</div>`).join('')}
+        </div></div></div>
+        <div class="resource left">
+          <div class="toolbar"><button type="button" title="Export" class="el-button el-button--default">
+            <i class="h-icon-export"></i><div class="el-button-slot-wrapper">Export</div>
+          </button></div>
+          <div id="tabla-recursos"></div>
+          <div class="el-pagination" id="total-recursos"></div>
+        </div>
+      </div>
+      <div class="el-drawer__wrapper" style="display: none"><div class="el-drawer drawer rtl">
+        <div class="drawer-header"><span class="drawer-head-title">Export</span></div>
+        <div class="el-form-item"><label class="el-form-item__label">Format</label>
+          <label class="el-radio is-checked" title="Excel"><span class="el-radio__label">Excel</span></label>
+          <label class="el-radio" title="CSV"><span class="el-radio__label">CSV</span></label>
+        </div>
+        <div class="drawer-footer">
+          <button type="button" class="el-button el-button--primary" id="export-recursos"><div class="el-button-slot-wrapper">Export</div></button>
+          <button type="button" class="el-button el-button--default" id="cancelar-recursos"><div class="el-button-slot-wrapper">Cancel</div></button>
+        </div>
+      </div></div>`;
+    panel.querySelectorAll('.el-tabs__item').forEach(pestana => {
+      pestana.onclick = () => resourceStatus(pestana.textContent.trim());
+    });
+    const drawer = panel.querySelector('.el-drawer__wrapper');
+    panel.querySelector('button[title="Export"]').onclick = () => { drawer.style.display = ''; };
+    panel.querySelectorAll('.el-radio').forEach(radio => {
+      radio.onclick = () => {
+        panel.querySelectorAll('.el-radio').forEach(r => r.classList.remove('is-checked'));
+        radio.classList.add('is-checked');
+      };
+    });
+    document.getElementById('cancelar-recursos').onclick = () => { drawer.style.display = 'none'; };
+    document.getElementById('export-recursos').onclick = async () => {
+      const activa = panel.querySelector('.el-tabs__item.is-active').textContent.trim();
+      drawer.style.display = 'none';
+      await api('/api/export/tarea', {hoja: activa});
+      descargar('/api/export/resource?hoja=' + encodeURIComponent(activa));
+    };
+  }
+  panel.querySelectorAll('.el-tabs__item').forEach(p => {
+    p.classList.toggle('is-active', p.textContent.trim() === hoja);
+  });
+  const quitar = mascara(panel);
+  const datos = await api('/api/recursos?hoja=' + encodeURIComponent(hoja));
+  document.getElementById('tabla-recursos').innerHTML = tabla(datos.columnas, datos.filas);
+  document.getElementById('total-recursos').textContent = `Total ${datos.total}`;
+  quitar();
+}
+
+// ---------- Event and Alarm ----------
+async function vistaAlarmas(contenido, buscar) {
+  if (!contenido.querySelector('#panel-alarmas')) {
+    const quitar = mascara(contenido);
+    await api('/api/vista?nombre=alarm');
+    quitar();
+    contenido.innerHTML = `
+      <div class="layout">
+        <div class="side-menu"><ul class="el-menu">
+          <li class="el-menu-item"><span>Overview</span></li>
+          <li class="el-submenu" id="submenu-search">
+            <div class="el-submenu__title"><i class="icon-svg-nav_search"></i><span>Search</span></div>
+            <ul class="el-menu el-menu--inline" style="display: none">
+              <li class="el-menu-item" data-ruta="/portal/alarm/search"><span>Event and Alarm Search</span></li>
+              <li class="el-menu-item"><span>Alarm Statistics</span></li>
+            </ul>
+          </li>
+        </ul></div>
+        <div class="panel" id="panel-alarmas"></div>
+      </div>`;
+    const submenu = contenido.querySelector('.el-menu--inline');
+    contenido.querySelector('#submenu-search .el-submenu__title').onclick = () => {
+      submenu.style.display = submenu.style.display === 'none' ? '' : 'none';
+    };
+    submenu.querySelector('[data-ruta]').onclick = () => ir('/portal/alarm/search');
+  }
+  const panel = document.getElementById('panel-alarmas');
+  if (!buscar) {
+    panel.innerHTML = `
+      <h2 class="page-title">Alarm Analysis</h2>
+      <div class="card"><div class="card-title">Alarm Trend</div><p>${CONFIG.eventos} alarms in the last 30 days</p></div>`;
+    return;
+  }
+  const quitar = mascara(panel);
+  await api('/api/vista?nombre=alarm_search');
+  quitar();
+  panel.innerHTML = `
+    <h2 class="page-title">Event and Alarm Search</h2>
+    <form class="el-form" onsubmit="return false">
+      <div class="el-form-item"><label class="el-form-item__label">Triggering Time</label>
+        <div class="el-form-item__content">
+          <div class="el-select"><div class="el-input"><input class="el-input__inner" readonly value="Today"></div>
+            <div class="el-select-dropdown" style="display: none"><ul class="el-select-dropdown__list">
+              <li class="el-select-dropdown__item">Today</li>
+              <li class="el-select-dropdown__item">Last 7 Days</li>
+              <li class="el-select-dropdown__item">Custom Time Interval</li>
+            </ul></div>
+          </div>
+          <div class="el-date-editor el-range-editor el-date-editor--datetimerange" style="display: none">
+            <input class="el-range-input" placeholder="Start Time"><span class="el-range-separator">-</span><input class="el-range-input" placeholder="End Time">
+            <div class="el-picker-panel el-date-range-picker" style="display: none">
+              <input class="el-input__inner" placeholder="Start date"><input class="el-input__inner" placeholder="Start time">
+              <input class="el-input__inner" placeholder="End date"><input class="el-input__inner" placeholder="End time">
+              <div class="el-picker-panel__footer"><button type="button" class="el-button el-picker-panel__link-btn"><span>OK</span></button></div>
+            </div>
+          </div>
+        </div>
+      </div>
+      <div class="el-form-item"><label class="el-form-item__label">Trigger Alarm</label>
+        <div class="el-form-item__content button-group">
+          <div title="All" class="button select">All</div><div title="Not Trigger Alarm" class="button">Not Trigger Alarm</div><div title="Trigger Alarm" class="button">Trigger Alarm</div>
+        </div>
+      </div>
+      <button type="button" class="el-button el-button--primary" id="buscar-alarmas"><div class="el-button-slot-wrapper">Search</div></button>
+    </form>
+    <div class="toolbar"><button type="button" class="el-button el-button--default" id="abrir-export-alarmas">
+      <i class="h-icon-export"></i><div class="el-button-slot-wrapper">Export</div>
+    </button></div>
+    <div id="tabla-alarmas">${tabla(CONFIG.columnas_alarmas, [])}</div>
+    <div class="el-pagination" id="total-alarmas"></div>
+    <div class="el-drawer__wrapper" style="display: none"><div class="el-drawer rtl">
+      <div class="drawer-header"><span class="drawer-head-title">Export</span></div>
+      <div class="el-form-item"><label class="el-form-item__label">Format</label>
+        <label class="el-radio is-checked" title="Excel"><span class="el-radio__label">Excel</span></label>
+        <label class="el-radio" title="CSV"><span class="el-radio__label">CSV</span></label>
+      </div>
+      <div class="el-form-item"><label class="el-form-item__label">Confirm Password</label>
+        <div class="el-input"><input type="password" autocomplete="off" placeholder="Password" outerinputtype="password" class="el-input__inner"></div>
+        <div class="el-form-item__error" id="error-export-alarmas"></div>
+      </div>
+      <div class="drawer-footer">
+        <button type="button" title="Save" class="el-button el-button--primary" id="guardar-export-alarmas"><div class="el-button-slot-wrapper">Save</div></button>
+        <button type="button" title="Cancel" class="el-button el-button--default" id="cancelar-export-alarmas"><div class="el-button-slot-wrapper">Cancel</div></button>
+      </div>
+    </div></div>`;
+
+  const select = panel.querySelector('.el-select');
+  const dropdown = select.querySelector('.el-select-dropdown');
+  const rango = panel.querySelector('.el-date-editor--datetimerange');
+  const picker = rango.querySelector('.el-date-range-picker');
+  const [inputDesde, inputHasta] = rango.querySelectorAll('.el-range-input');
+  select.querySelector('input').onclick = () => { dropdown.style.display = dropdown.style.display === 'none' ? '' : 'none'; };
+  dropdown.querySelectorAll('li').forEach(item => {
+    item.onclick = () => {
+      select.querySelector('input').value = item.textContent.trim();
+      dropdown.style.display = 'none';
+      rango.style.display = item.textContent.trim() === 'Custom Time Interval' ? '' : 'none';
+    };
+  });
+  [inputDesde, inputHasta].forEach(i => { i.onclick = () => { picker.style.display = ''; }; });
+  picker.querySelector('.el-picker-panel__footer button').onclick = () => {
+    const valor = p => picker.querySelector(`input[placeholder="${p}"]`).value.trim();
+    inputDesde.value = `${valor('Start date')} ${valor('Start time')}`;
+    inputHasta.value = `${valor('End date')} ${valor('End time')}`;
+    picker.style.display = 'none';
+  };
+
+  panel.querySelectorAll('.button-group .button').forEach(boton => {
+    boton.onclick = () => {
+      panel.querySelectorAll('.button-group .button').forEach(b => b.classList.remove('select'));
+      boton.classList.add('select');
+    };
+  });
+  const filtros = () => ({desde: rango.style.display === 'none' ? '' : inputDesde.value, hasta: rango.style.display === 'none' ? '' : inputHasta.value});
+
+  document.getElementById('buscar-alarmas').onclick = async () => {
+    const quitarMascara = mascara(panel);
+    const {desde, hasta} = filtros();
+    const datos = await api(`/api/alarmas?desde=${encodeURIComponent(desde)}&hasta=${encodeURIComponent(hasta)}`);
+    document.getElementById('tabla-alarmas').innerHTML = tabla(datos.columnas, datos.filas);
+    document.getElementById('total-alarmas').textContent = `Total ${datos.total}`;
+    quitarMascara();
+  };
+
+  const drawer = panel.querySelector('.el-drawer__wrapper');
+  const password = drawer.querySelector('input[placeholder="Password"]');
+  document.getElementById('abrir-export-alarmas').onclick = () => {
+    password.value = '';
+    document.getElementById('error-export-alarmas').textContent = '';
+    drawer.style.display = '';
+  };
+  drawer.querySelectorAll('.el-radio').forEach(radio => {
+    radio.onclick = () => {
+      drawer.querySelectorAll('.el-radio').forEach(r => r.classList.remove('is-checked'));
+      radio.classList.add('is-checked');
+    };
+  });
+  document.getElementById('cancelar-export-alarmas').onclick = () => { drawer.style.display = 'none'; };
+  document.getElementById('guardar-export-alarmas').onclick = async () => {
+    try {
+      await api('/api/export/alarm', {password: password.value, ...filtros()});
+      drawer.style.display = 'none';
+    } catch (e) {
+      document.getElementById('error-export-alarmas').textContent = e.message;
+    }
+  };
+}
+
+// ---------- Rutas ----------
+async function render() {
+  const ruta = location.hash.replace(/^#/, '') || '/';
+  if (!sessionStorage.getItem('hik_sesion')) {
+    if (ruta !== '/') { ir('/'); return; }
+    vistaLogin();
+    return;
+  }
+  if (!ruta.startsWith('/portal')) { ir('/portal'); return; }
+  let contenido = document.getElementById('contenido');
+  const enAlarmas = ruta.startsWith('/portal/alarm');
+  // Dentro de Event and Alarm el menú lateral se conserva al pasar a Search
+  if (!contenido || !(enAlarmas && contenido.querySelector('#panel-alarmas'))) {
+    contenido = estructura();
+  }
+  if (enAlarmas) await vistaAlarmas(contenido, ruta.startsWith('/portal/alarm/search'));
+  else if (ruta.startsWith('/portal/maintenance')) await vistaMaintenance(contenido);
+  else await vistaPortal(contenido);
+}
+
+window.addEventListener('hashchange', render);
+render();
+</script>
+</body>
+</html>
+"""
+
+
+class StubUiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        direccion,
+        libros_recursos: dict[str, Path],
+        alarm_report: Path,
+        downloadcenter: Path,
+        dispositivos: int,
+        eventos: int,
+        latencia: float,
+        latencia_export: float,
+        password: str | None,
+        go_maintenance: bool,
+    ):
+        super().__init__(direccion, StubUiHandler)
+        self.libros_recursos = libros_recursos
+        self.alarm_report = alarm_report
+        self.downloadcenter = downloadcenter
+        self.dispositivos = dispositivos
+        self.eventos = eventos
+        self.latencia = latencia
+        self.latencia_export = latencia_export
+        self.password = password
+        config = {
+            "hojas": list(libros_recursos),
+            "eventos": eventos,
+            "columnas_alarmas": bench_carga_alarmas.COLUMNAS_ALARM_LOG,
+            "go_maintenance": go_maintenance,
+        }
+        self.pagina = PAGINA_HTML.replace("__CONFIG__", json.dumps(config)).encode("utf-8")
+        # Peticiones por ruta, para cruzar con los pasos del script
+        self.peticiones: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filas_recursos(self, hoja: str) -> tuple[list[str], list[list]]:
+        _, _, _, columnas = bench_carga_resource_status.HOJAS[hoja]
+        rnd = random.Random(hoja)
+        ahora = datetime.now().replace(microsecond=0)
+        filas = [
+            bench_carga_resource_status._fila(hoja, i, rnd, ahora)
+            for i in range(min(self.dispositivos, FILAS_POR_PAGINA))
+        ]
+        return columnas, filas
+
+    def filas_alarmas(self) -> list[list]:
+        rnd = random.Random(self.eventos)
+        fin = datetime.now().replace(microsecond=0)
+        inicio = fin - timedelta(days=30)
+        segundos = int((fin - inicio).total_seconds())
+        return [
+            bench_carga_alarmas._evento_aleatorio(rnd, inicio, segundos)
+            for _ in range(min(self.eventos, FILAS_POR_PAGINA))
+        ]
+
+    def publicar_alarm_report(self):
+        """Como HCWebControlService: deja Alarm_Report_<ts>/Alarm_Report_<ts>.xlsx en el Downloadcenter."""
+        if self.latencia_export:
+            time.sleep(self.latencia_export)
+        with self._lock:
+            sello = datetime.now().strftime("%Y%m%d%H%M%S")
+            carpeta = self.downloadcenter / f"Alarm_Report_{sello}"
+            n = 1
+            while carpeta.exists():
+                carpeta = self.downloadcenter / f"Alarm_Report_{sello}_{n}"
+                n += 1
+            carpeta.mkdir(parents=True)
+        destino = carpeta / f"{carpeta.name}.xlsx"
+        # Se escribe con otro nombre y se renombra: el script no ve el archivo a medias
+        parcial = destino.with_suffix(".part")
+        shutil.copyfile(self.alarm_report, parcial)
+        os.replace(parcial, destino)
+
+
+class StubUiHandler(BaseHTTPRequestHandler):
+    server: StubUiServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _contar(self, ruta: str):
+        with self.server._lock:
+            self.server.peticiones[ruta] = self.server.peticiones.get(ruta, 0) + 1
+
+    def _latencia(self, segundos: float):
+        if segundos:
+            time.sleep(segundos)
+
+    def _enviar(self, status: int, cuerpo: bytes, content_type: str, extra: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.send_header("Cache-Control", "no-store")
+        for clave, valor in (extra or {}).items():
+            self.send_header(clave, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _responder(self, status: int, payload: dict):
+        self._enviar(status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        partes = urlsplit(self.path)
+        ruta = partes.path
+        params = {k: v[0] for k, v in parse_qs(partes.query).items()}
+        self._contar(ruta)
+
+        if ruta in ("/", "/index.html"):
+            self._enviar(200, self.server.pagina, "text/html; charset=utf-8")
+            return
+
+        if ruta == "/api/vista":
+            self._latencia(self.server.latencia)
+            online = self.server.dispositivos - self.server.dispositivos // 17
+            self._responder(200, {"vista": params.get("nombre"), "online": online, "offline": self.server.dispositivos - online})
+            return
+
+        if ruta == "/api/recursos":
+            hoja = params.get("hoja", "")
+            if hoja not in self.server.libros_recursos:
+                self._responder(404, {"msg": f"unknown resource {hoja}"})
+                return
+            self._latencia(self.server.latencia)
+            columnas, filas = self.server.filas_recursos(hoja)
+            self._responder(200, {"total": self.server.dispositivos, "columnas": columnas, "filas": filas})
+            return
+
+        if ruta == "/api/alarmas":
+            self._latencia(self.server.latencia)
+            self._responder(
+                200,
+                {
+                    "total": self.server.eventos,
+                    "columnas": bench_carga_alarmas.COLUMNAS_ALARM_LOG,
+                    "filas": self.server.filas_alarmas(),
+                },
+            )
+            return
+
+        if ruta == "/api/export/resource":
+            libro = self.server.libros_recursos.get(params.get("hoja", ""))
+            if libro is None:
+                self._responder(404, {"msg": "unknown resource"})
+                return
+            self._latencia(self.server.latencia_export)
+            nombre = f"{params['hoja']}_{datetime.now().strftime('%Y%m%d%H%M%S')}.xlsx"
+            self._enviar(
+                200,
+                libro.read_bytes(),
+                MIME_XLSX,
+                {"Content-Disposition": f'attachment; filename="{nombre}"'},
+            )
+            return
+
+        self._responder(404, {"msg": f"not found {ruta}"})
+
+    def do_POST(self):
+        ruta = urlsplit(self.path).path
+        self._contar(ruta)
+        largo = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(largo) or b"{}")
+
+        if ruta == "/api/login":
+            self._latencia(self.server.latencia)
+            if not body.get("usuario") or not self._password_valida(body.get("password")):
+                self._responder(401, {"msg": "Incorrect user name or password."})
+                return
+            self._responder(200, {"ok": True})
+            return
+
+        if ruta in ("/api/logout", "/api/export/tarea"):
+            self._latencia(self.server.latencia)
+            self._responder(200, {"ok": True})
+            return
+
+        if ruta == "/api/export/alarm":
+            self._latencia(self.server.latencia)
+            if not self._password_valida(body.get("password")):
+                self._responder(403, {"msg": "Incorrect password."})
+                return
+            threading.Thread(
+                target=self.server.publicar_alarm_report, name="hik_ui_stub_export", daemon=True
+            ).start()
+            self._responder(200, {"ok": True})
+            return
+
+        self._responder(404, {"msg": f"not found {ruta}"})
+
+    def _password_valida(self, password: str | None) -> bool:
+        if not password:
+            return False
+        return self.server.password is None or password == self.server.password
+
+
+def iniciar_stub_ui(
+    downloadcenter: Path,
+    dispositivos: int = 1000,
+    eventos: int = 5000,
+    latencia: float = 0.0,
+    latencia_export: float = 0.0,
+    password: str | None = None,
+    go_maintenance: bool = True,
+    carpeta_libros: Path | None = None,
+    puerto: int = 0,
+) -> tuple[StubUiServer, str]:
+    """
+    Genera (o reusa) los libros, levanta el stub en un hilo daemon y devuelve
+    (server, url de login). Con puerto=0 elige uno libre; sin password acepta cualquiera no vacía.
+    """
+    carpeta_libros = carpeta_libros or Path(__file__).resolve().parent / "bench_libros"
+    libros_recursos = {
+        hoja: bench_carga_resource_status.libro_bench(carpeta_libros, hoja, dispositivos, 42)
+        for hoja in bench_carga_resource_status.HOJAS
+    }
+    alarm_report = bench_carga_alarmas.libro_bench(carpeta_libros, eventos, 0.1, "log", 42)
+    downloadcenter.mkdir(parents=True, exist_ok=True)
+
+    server = StubUiServer(
+        ("127.0.0.1", puerto),
+        libros_recursos,
+        alarm_report,
+        downloadcenter,
+        dispositivos,
+        eventos,
+        latencia,
+        latencia_export,
+        password,
+        go_maintenance,
+    )
+    threading.Thread(target=server.serve_forever, name="hik_ui_stub", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/#/"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in local de la UI web de HikCentral.")
+    parser.add_argument("--puerto", type=int, default=8088)
+    parser.add_argument("--dispositivos", type=int, default=1000, help="Filas de cada libro de Resource Status")
+    parser.add_argument("--eventos", type=int, default=5000, help="Filas del Alarm Report")
+    parser.add_argument("--latencia", type=float, default=0.0, help="Segundos de espera por llamada de la página")
+    parser.add_argument("--latencia-export", type=float, default=0.0, help="Segundos extra hasta entregar cada export")
+    parser.add_argument("--password", default=None, help="Password exigida en login y export (default: cualquiera)")
+    parser.add_argument(
+        "--sin-go-maintenance",
+        action="store_true",
+        help="Sin el botón 'Go to Maintenance' del portal (fuerza el camino por navigation_menuPop)",
+    )
+    parser.add_argument(
+        "--downloadcenter",
+        default=os.getenv("HIK_DOWNLOADCENTER") or str(Path(__file__).resolve().parent / "bench_libros" / "Downloadcenter"),
+        help="Carpeta donde aparecen los Alarm_Report (HIK_DOWNLOADCENTER del script)",
+    )
+    args = parser.parse_args()
+
+    server, url = iniciar_stub_ui(
+        Path(args.downloadcenter),
+        dispositivos=args.dispositivos,
+        eventos=args.eventos,
+        latencia=args.latencia,
+        latencia_export=args.latencia_export,
+        password=args.password,
+        go_maintenance=not args.sin_go_maintenance,
+        puerto=args.puerto,
+    )
+    print(f"[STUB] UI de HikCentral de prueba escuchando en {url} | Downloadcenter: {args.downloadcenter}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,36 @@
+import pandas as pd
+
+from hikcentral_alarm_receiver import mapear_evento_push
+from hikcentral_open_eventalarms import construir_event_key, to_py
+
+
+def test_event_key_push_igual_a_excel():
+    # Mismo evento: como llega por push y como queda la fila del Alarm Report
+    push = {
+        "name": "Motion Detection",
+        "happenTime": "2026-03-01T08:00:00",
+        "srcName": "Camara 12",
+        "regionName": "Sitio 0003",
+        "eventTypeName": "Motion Detection",
+        "priority": "High",
+        "status": "Unacknowledged",
+    }
+    excel = pd.DataFrame(
+        [
+            {
+                "name": "Motion Detection",
+                "triggering_time_client": "2026-03-01 08:00:00",
+                "source": "Camara 12",
+                "region": "Sitio 0003",
+                "trigger_event": "Motion Detection",
+                "priority": "High",
+                "status": "Unacknowledged",
+            }
+        ]
+    )
+    # Igual que insertar_alarm_evento_from_excel antes de calcular event_key
+    excel["triggering_time_client"] = pd.to_datetime(excel["triggering_time_client"], errors="coerce")
+    excel = excel.applymap(to_py)
+    clave_excel = excel.apply(construir_event_key, axis=1).iloc[0]
+
+    assert mapear_evento_push(push)["event_key"] == clave_excel